@@ -1,17 +1,20 @@
-import requests
 import json
-import time
 import logging
 import re
 import os
 from typing import Optional, Dict, Any
+from .http_client import PooledHTTPClient, APIError
+
+# 默认API地址
+DEFAULT_API_URL = "https://api.qingtian.shop/v1/messages"
 
 
 class ClaudeAgent:
     """使用Claude API进行Verilog代码变换的代理"""
 
     def __init__(self, api_key: str, model: str = "[额度]claude-3-7-sonnet",
-                 timeout: int = 60, max_retries: int = 3, logger=None):
+                 timeout: int = 60, max_retries: int = 3, logger=None, api_url: Optional[str] = None,
+                 max_concurrency: int = 16, requests_per_minute: float = 0):
         """
         初始化Claude Agent
 
@@ -21,14 +24,32 @@ class ClaudeAgent:
             timeout: API调用超时时间(秒)
             max_retries: 失败重试次数
             logger: 日志记录器
+            api_url: API地址 (可选，可指向本地模拟服务器)
+            max_concurrency: 同时在途的API请求数上限
+            requests_per_minute: 每分钟请求数上限，0表示不限流
         """
         self.api_key = api_key
         self.model = model
         self.timeout = timeout
         self.max_retries = max_retries
-        self.api_url = "https://api.qingtian.shop/v1/messages"
+        self.api_url = api_url or DEFAULT_API_URL
         self.logger = logger or logging.getLogger(self.__class__.__name__)
 
+        # 所有变换共享一个带连接池和限流的客户端
+        self.client = PooledHTTPClient(
+            url=self.api_url,
+            headers={
+                "x-api-key": self.api_key,
+                "anthropic-version": "2023-06-01",
+                "content-type": "application/json"
+            },
+            timeout=timeout,
+            max_retries=max_retries,
+            max_concurrency=max_concurrency,
+            requests_per_minute=requests_per_minute,
+            logger=self.logger
+        )
+
     def transform(self, code: str, transformation_type: str, transformer) -> str:
         """
         使用Claude执行代码变换
@@ -56,16 +77,21 @@ class ClaudeAgent:
 
                 self.logger.warning(f"变换生成的代码无效，重试...")
 
+            except APIError as e:
+                # 客户端已按退避策略重试过，不再重复请求
+                self.logger.error(f"API调用失败: {str(e)}")
+                break
+
             except Exception as e:
                 self.logger.error(f"API调用失败: {str(e)}")
-                if attempt < self.max_retries - 1:
-                    sleep_time = 2 * (attempt + 1)  # 指数退避
-                    self.logger.info(f"等待 {sleep_time} 秒后重试...")
-                    time.sleep(sleep_time)
 
         self.logger.warning(f"所有尝试都失败，返回原始代码")
         return code
 
+    def close(self):
+        """关闭API客户端的连接池"""
+        self.client.close()
+
     def _create_transformation_prompt(self, code: str, transformation_type: str, transformer) -> str:
         """
         创建用于Claude的变换提示
@@ -97,23 +123,17 @@ class ClaudeAgent:
 
         return system_prompt + "\n\n" + base_prompt
 
-    def _call_claude_api(self, prompt: str) -> Dict[str, Any]:
+    def _build_payload(self, prompt: str) -> Dict[str, Any]:
         """
-        调用Claude API
+        构建API请求体
 
         Args:
             prompt: 提示内容
 
         Returns:
-            Dict: API响应
+            Dict: 请求体
         """
-        headers = {
-            "x-api-key": self.api_key,
-            "anthropic-version": "2023-06-01",
-            "content-type": "application/json"
-        }
-
-        payload = {
+        return {
             "model": self.model,
             "messages": [
                 {
@@ -125,18 +145,17 @@ class ClaudeAgent:
             "temperature": 0.6  # 平衡精确度和发散性
         }
 
-        response = requests.post(
-            self.api_url,
-            headers=headers,
-            json=payload,
-            timeout=self.timeout
-        )
+    def _call_claude_api(self, prompt: str) -> Dict[str, Any]:
+        """
+        调用Claude API
 
-        if response.status_code != 200:
-            self.logger.error(f"API请求失败: {response.status_code} - {response.text}")
-            raise Exception(f"API请求失败: {response.status_code}")
+        Args:
+            prompt: 提示内容
 
-        return response.json()
+        Returns:
+            Dict: API响应
+        """
+        return self.client.post_json(self._build_payload(prompt))
 
     def _parse_response(self, response: Dict[str, Any]) -> Optional[str]:
         """
@@ -226,11 +245,9 @@ class ClaudeAgent:
 
     def _has_iverilog(self) -> bool:
         """检查系统中是否安装了iverilog"""
-        try:
-            result = os.system("iverilog -h > nul 2>&1")
-            return result == 0
-        except:
-            return False
+        # 直接在PATH中查找，不经过shell重定向（"> nul"在Linux上会生成名为nul的文件）
+        import shutil
+        return shutil.which("iverilog") is not None
 
     def _check_with_iverilog(self, code):
         """使用iverilog验证代码语法"""
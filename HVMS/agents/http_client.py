@@ -0,0 +1,174 @@
+import time
+import random
+import logging
+import threading
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+# 可重试的HTTP状态码
+RETRYABLE_STATUS = (408, 409, 425, 429, 500, 502, 503, 504, 529)
+
+
+class APIError(Exception):
+    """API请求失败"""
+
+    def __init__(self, message, status=None, retry_after=None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+    @property
+    def retryable(self):
+        """是否值得重试（限流、服务端错误或连接错误）"""
+        return self.status is None or self.status in RETRYABLE_STATUS
+
+
+class TokenBucket:
+    """令牌桶限流器，所有调用线程共享同一个桶"""
+
+    def __init__(self, rate, capacity=None):
+        """
+        初始化令牌桶
+
+        Args:
+            rate: 每秒补充的令牌数，<=0表示不限流
+            capacity: 桶容量（允许的突发请求数），默认等于一秒的补充量
+        """
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self):
+        """预留一个令牌，返回需要等待的秒数"""
+        if self.rate <= 0:
+            return 0.0
+
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def acquire(self):
+        """阻塞直到获得令牌"""
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+
+def parse_retry_after(value):
+    """
+    解析Retry-After响应头
+
+    Args:
+        value: 秒数或HTTP日期
+
+    Returns:
+        float: 需要等待的秒数，无法解析时返回None
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except Exception:
+        return None
+
+
+class PooledHTTPClient:
+    """
+    带连接池、并发上限、令牌桶限流和抖动指数退避的JSON POST客户端
+
+    所有线程共享一个requests.Session（HTTP keep-alive），连接池大小与并发上限一致。
+    """
+
+    def __init__(self, url, headers=None, timeout=60, max_retries=3, max_concurrency=16,
+                 requests_per_minute=0, burst=None, backoff_base=1.0, backoff_max=60.0, logger=None):
+        """
+        初始化HTTP客户端
+
+        Args:
+            url: 请求地址
+            headers: 公共请求头
+            timeout: 单次请求超时时间(秒)
+            max_retries: 可重试错误的最大重试次数
+            max_concurrency: 同时在途的请求数上限（同时也是连接池大小）
+            requests_per_minute: 每分钟请求数上限，0表示不限流
+            burst: 允许的突发请求数 (可选)
+            backoff_base: 退避基准时间(秒)
+            backoff_max: 单次退避的最长时间(秒)
+            logger: 日志记录器
+        """
+        self.url = url
+        self.headers = dict(headers or {})
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.max_concurrency = max(1, max_concurrency)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.logger = logger or logging.getLogger(self.__class__.__name__)
+
+        self.bucket = TokenBucket(requests_per_minute / 60.0, burst)
+
+        # 共享会话与连接池
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.max_concurrency, pool_maxsize=self.max_concurrency)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+        self._slots = threading.BoundedSemaphore(self.max_concurrency)
+
+    def _backoff(self, attempt, retry_after=None):
+        """计算第attempt次重试前的等待时间（带完全抖动的指数退避，服务端给出Retry-After时优先）"""
+        if retry_after is not None:
+            return min(retry_after, self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _check_status(self, status, text, retry_after_header):
+        """检查响应状态码，失败时抛出APIError"""
+        if status == 200:
+            return
+        raise APIError(f"API请求失败: {status} - {text[:500]}", status=status,
+                       retry_after=parse_retry_after(retry_after_header))
+
+    def post_json(self, payload):
+        """
+        发送JSON POST请求
+
+        Args:
+            payload: 请求体
+
+        Returns:
+            dict: 响应JSON
+        """
+        for attempt in range(self.max_retries + 1):
+            self.bucket.acquire()
+            try:
+                with self._slots:
+                    response = self._session.post(self.url, headers=self.headers, json=payload,
+                                                  timeout=self.timeout)
+                self._check_status(response.status_code, response.text, response.headers.get("Retry-After"))
+                return response.json()
+
+            except (APIError, requests.RequestException) as e:
+                error = e if isinstance(e, APIError) else APIError(f"连接失败: {str(e)}")
+                if not error.retryable or attempt >= self.max_retries:
+                    raise error
+
+                wait = self._backoff(attempt, error.retry_after)
+                self.logger.warning(f"{str(error)}，{wait:.1f} 秒后重试 ({attempt + 1}/{self.max_retries})")
+                time.sleep(wait)
+
+    def close(self):
+        """关闭会话及其连接池"""
+        self._session.close()
@@ -1,3 +1,4 @@
 from .framework import HVMSFramework
 from .mcts import MCTSSearch
-from .nodes import MCTSNode
\ No newline at end of file
+from .nodes import MCTSNode
+from .job_queue import JobQueue, JobWorker, LocalWorkerPool
@@ -0,0 +1,83 @@
+import os
+import gzip
+import json
+import time
+import logging
+import threading
+
+
+class SearchCheckpoint:
+    """单个种子的搜索状态检查点，gzip压缩的JSON文件，以原子替换方式写入"""
+
+    def __init__(self, checkpoint_file, interval=60, logger=None):
+        """
+        初始化检查点
+
+        Args:
+            checkpoint_file: 检查点文件路径
+            interval: 两次定期保存的最短间隔(秒)
+            logger: 日志记录器
+        """
+        self.checkpoint_file = checkpoint_file
+        self.interval = interval
+        self.logger = logger or logging.getLogger(self.__class__.__name__)
+        self._lock = threading.Lock()
+        self._last_save = time.time()
+
+    def due(self):
+        """距上次保存是否已超过保存间隔"""
+        return time.time() - self._last_save >= self.interval
+
+    def load(self):
+        """
+        加载检查点
+
+        Returns:
+            dict: 保存的搜索状态，文件不存在或损坏时返回None
+        """
+        if not os.path.exists(self.checkpoint_file):
+            return None
+        try:
+            with gzip.open(self.checkpoint_file, 'rt', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            self.logger.error(f"加载检查点失败: {self.checkpoint_file}, {str(e)}")
+            return None
+
+    def save(self, state):
+        """
+        保存搜索状态
+
+        Args:
+            state: 可JSON序列化的搜索状态
+
+        Returns:
+            bool: 是否保存成功
+        """
+        with self._lock:
+            self._last_save = time.time()
+            directory = os.path.dirname(self.checkpoint_file)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+            # 写临时文件后替换，保证检查点在任意时刻都完整
+            tmp_file = f"{self.checkpoint_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+            try:
+                with gzip.open(tmp_file, 'wt', encoding='utf-8', compresslevel=6) as f:
+                    json.dump(state, f, ensure_ascii=False, separators=(',', ':'))
+                os.replace(tmp_file, self.checkpoint_file)
+                return True
+            except Exception as e:
+                self.logger.error(f"保存检查点失败: {str(e)}")
+                if os.path.exists(tmp_file):
+                    os.remove(tmp_file)
+                return False
+
+    def remove(self):
+        """种子处理完成后删除检查点"""
+        with self._lock:
+            try:
+                if os.path.exists(self.checkpoint_file):
+                    os.remove(self.checkpoint_file)
+            except Exception as e:
+                self.logger.warning(f"删除检查点失败: {str(e)}")
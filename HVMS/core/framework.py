@@ -1,4 +1,3 @@
-import json
 import os
 import logging
 import yaml
@@ -7,6 +6,8 @@ import re
 from pathlib import Path
 from multiprocessing import cpu_count
 from .parallel_mcts import ParallelMCTSSearch  # 导入并行MCTS
+from .scheduler import SeedScheduler, StageBudget, ProgressStore
+from .checkpoint import SearchCheckpoint
 from utils import VerilogParser, setup_logger
 
 
@@ -32,6 +33,7 @@ class HVMSFramework:
         self.logger.info(f"初始化HVMS框架，配置文件: {config_path}")
 
         # 加载配置
+        self.config_path = config_path
         self.config = self._load_config(config_path)
 
         # 设置正式日志记录器
@@ -46,8 +48,9 @@ class HVMSFramework:
 
         # 导入必要的组件
         from agents import ClaudeAgent
-        from transformers import TransformerManager
-        from tools import VivadoTool, VerilogVerifier
+        from transformers import TransformerManager, TransformationMemo
+        from tools import VivadoTool, VerilogVerifier, PPACache, VivadoSessionPool, VivadoJobRunner, VerificationExecutor
+        from tools import FormalChecker, SurrogatePPAModel
 
         # 初始化Claude Agent
         self.agent = ClaudeAgent(
@@ -55,12 +58,56 @@ class HVMSFramework:
             model=self.config['agent']['model'],
             timeout=self.config['agent']['timeout'],
             max_retries=self.config['agent']['max_retries'],
-            logger=self.logger
+            logger=self.logger,
+            api_url=self.config['agent'].get('api_url'),
+            max_concurrency=self.config['agent'].get('max_concurrency', 16),
+            requests_per_minute=self.config['agent'].get('requests_per_minute', 0)
         )
 
+        # 初始化变换结果记忆表
+        self.transform_memo = None
+        if self.config['memo'].get('enabled', False):
+            self.transform_memo = TransformationMemo(
+                db_path=self.config['memo']['path'],
+                logger=self.logger
+            )
+            self.logger.info(f"变换记忆表: {self.config['memo']['path']}")
+
         # 初始化变换器管理器
         self.transformer_manager = TransformerManager(
             agent=self.agent,
+            logger=self.logger,
+            memo=self.transform_memo
+        )
+
+        # 初始化PPA结果缓存
+        self.ppa_cache = None
+        if self.config['vivado'].get('cache_enabled', True):
+            self.ppa_cache = PPACache(
+                cache_dir=self.config['vivado']['cache_dir'],
+                max_entries=self.config['vivado'].get('cache_max_entries', 20000),
+                logger=self.logger
+            )
+            self.logger.info(f"PPA缓存目录: {self.config['vivado']['cache_dir']}")
+
+        # 初始化常驻Vivado会话池
+        self.vivado_pool = None
+        if self.config['vivado'].get('pool_size', 0) > 0:
+            self.vivado_pool = VivadoSessionPool(
+                vivado_path=self.config['vivado']['path'],
+                tcl_script=self.config['vivado']['tcl_script'],
+                size=self.config['vivado']['pool_size'],
+                jobs_per_session=self.config['vivado'].get('jobs_per_session', 20),
+                job_timeout=self.config['vivado'].get('job_timeout', 1800),
+                session_script=self.config['vivado'].get('session_script'),
+                logger=self.logger
+            )
+            self.logger.info(f"Vivado会话池大小: {self.config['vivado']['pool_size']}")
+
+        # 初始化批处理模式的Vivado任务执行器
+        self.vivado_runner = VivadoJobRunner(
+            stage_timeouts=self.config['vivado'].get('stage_timeouts'),
+            total_timeout=self.config['vivado'].get('timeout', 1800),
             logger=self.logger
         )
 
@@ -69,14 +116,82 @@ class HVMSFramework:
             vivado_path=self.config['vivado']['path'],
             tcl_script=self.config['vivado']['tcl_script'],
             fpga_part=self.config['vivado']['fpga_part'],
-            logger=self.logger
+            logger=self.logger,
+            cache=self.ppa_cache,
+            tool_version=self.config['vivado'].get('version'),
+            session_pool=self.vivado_pool,
+            runner=self.vivado_runner,
+            fidelity=self.config['vivado'].get('fidelity', 'full'),
+            promote_fraction=self.config['vivado'].get('promote_fraction', 0.25),
+            promote_margin=self.config['vivado'].get('promote_margin', 0.05),
+            batch_script=self.config['vivado'].get('batch_script')
         )
 
+        # 初始化形式验证工具（yosys不可用时自动跳过）
+        self.formal_checker = None
+        if self.config['verification'].get('formal', False):
+            self.formal_checker = FormalChecker(
+                yosys_path=self.config['verification'].get('yosys_path', 'yosys'),
+                cache_dir=self.config['verification'].get('formal_cache_dir'),
+                max_lines=self.config['verification'].get('formal_max_lines', 400),
+                max_state_bits=self.config['verification'].get('formal_max_state_bits', 64),
+                seq_depth=self.config['verification'].get('formal_depth', 12),
+                timeout=self.config['verification'].get('formal_timeout', 60),
+                num_workers=self.config['verification'].get('formal_workers', 2),
+                logger=self.logger
+            )
+
         # 初始化验证工具
         self.verifier = VerilogVerifier(
+            trace_cache_dir=self.config['verification'].get('trace_cache_dir'),
+            min_vectors=self.config['verification'].get('min_vectors', 32),
+            max_vectors=self.config['verification'].get('max_vectors', 1000),
+            coverage_patience=self.config['verification'].get('coverage_patience', 32),
+            sim_timeout=self.config['verification'].get('sim_timeout', 120),
+            cpu_limit=self.config['verification'].get('cpu_limit', 60),
+            native_sim=self.config['verification'].get('native_sim', True),
+            native_vectors=self.config['verification'].get('native_vectors', 4096),
+            formal_checker=self.formal_checker,
             logger=self.logger
         )
 
+        # 初始化验证线程池（每个工作线程复用独立的工作目录）
+        self.verification_executor = None
+        if self.config['verification'].get('workers', 0) > 0:
+            self.verification_executor = VerificationExecutor(
+                verifier=self.verifier,
+                num_workers=self.config['verification']['workers'],
+                scratch_root=self.config['verification'].get('scratch_dir'),
+                logger=self.logger
+            )
+
+        # 初始化PPA代理模型（在run()中按种子数据集训练或加载，搜索中随Vivado结果在线更新）
+        self.surrogate = None
+        if self.config['surrogate'].get('enabled', False):
+            self.surrogate = SurrogatePPAModel(
+                cache_dir=self.config['surrogate'].get('cache_dir'),
+                ensemble_size=self.config['surrogate'].get('ensemble_size', 8),
+                alpha=self.config['surrogate'].get('alpha', 1.0),
+                min_probability=self.config['surrogate'].get('min_probability', 0.3),
+                uncertainty_threshold=self.config['surrogate'].get('uncertainty_threshold', 0.15),
+                online=self.config['surrogate'].get('online_update', True),
+                refit_interval=self.config['surrogate'].get('refit_interval', 8),
+                online_weight=self.config['surrogate'].get('online_weight', 4.0),
+                logger=self.logger
+            )
+
+        # 初始化分布式任务队列
+        self.job_queue = None
+        if self.config['distributed'].get('enabled', False):
+            from .job_queue import JobQueue
+            self.job_queue = JobQueue(
+                db_path=self.config['distributed']['queue_path'],
+                lease_timeout=self.config['distributed'].get('lease_timeout', 1800),
+                max_attempts=self.config['distributed'].get('max_attempts', 3),
+                logger=self.logger
+            )
+            self.logger.info(f"分布式任务队列: {self.config['distributed']['queue_path']}")
+
         # 初始化路径
         self.seed_verilog_path = self.config['paths']['seed_verilog']
         self.seed_ppa_path = self.config['paths']['seed_ppa']
@@ -123,24 +238,16 @@ class HVMSFramework:
         # 加载种子数据集
         seed_files = VerilogParser.scan_directory(self.seed_verilog_path)
 
-        # 加载进度跟踪文件
+        # 加载进度跟踪文件（多个种子并发完成时原子更新）
         progress_file = os.path.join(os.path.dirname(self.output_verilog_path), "progress.json")
-        processed_seeds = {}
-        if os.path.exists(progress_file):
-            try:
-                with open(progress_file, 'r') as f:
-                    processed_seeds = json.load(f)
-                self.logger.info(f"加载进度文件，已处理 {len(processed_seeds)} 个种子文件")
-            except Exception as e:
-                self.logger.error(f"加载进度文件失败: {str(e)}")
-                processed_seeds = {}
+        progress = ProgressStore(progress_file, logger=self.logger)
 
         # 过滤掉已处理的种子文件
         remaining_seeds = []
         for seed_file in seed_files:
             seed_basename = os.path.basename(seed_file)
             seed_name = os.path.splitext(seed_basename)[0]
-            if seed_name not in processed_seeds:
+            if seed_name not in progress:
                 remaining_seeds.append(seed_file)
 
         self.logger.info(f"找到 {len(seed_files)} 个种子文件，其中 {len(remaining_seeds)} 个未处理")
@@ -165,87 +272,64 @@ class HVMSFramework:
             'start_time': time.time()
         }
 
-        # 处理每个剩余的种子文件
-        for i, seed_file in enumerate(remaining_seeds):
-            seed_basename = os.path.basename(seed_file)
-            seed_name = os.path.splitext(seed_basename)[0]
-
-            self.logger.info(f"处理种子文件 [{i + 1}/{len(remaining_seeds)}]: {seed_basename}")
-
-            try:
-                # 读取种子代码
-                seed_code = VerilogParser.read_file(seed_file)
-
-                # 获取种子代码的PPA指标
-                seed_ppa = self._get_seed_ppa(seed_name)
-
-                if not seed_ppa:
-                    self.logger.warning(f"未找到种子 {seed_name} 的PPA数据，跳过")
-                    continue
-
-                # 创建并行MCTS搜索实例
-                mcts = ParallelMCTSSearch(
-                    seed_code=seed_code,
-                    seed_ppa=seed_ppa,
-                    transformer_manager=self.transformer_manager,
-                    vivado_tool=self.vivado_tool,
-                    verifier=self.verifier,
-                    max_depth=self.config['mcts']['max_depth'],
-                    ppa_threshold=self.config['mcts']['ppa_threshold'],
-                    c_param=self.config['mcts']['c_param'],
-                    max_workers=self.num_workers,
-                    paths_per_batch=self.paths_per_batch,
-                    logger=self.logger
-                )
-
-                # 运行MCTS搜索，获取变异代码
-                variations = mcts.search(
-                    target_count=num_variations_per_seed,
-                    max_iterations=self.config['mcts']['max_iterations']
-                )
-
-                # 保存变异代码和PPA报告
-                for j, (var_code, var_ppa) in enumerate(variations):
-                    # 提取模块名
-                    module_match = re.search(r'module\s+(\w+)', var_code)
-                    if module_match:
-                        module_name = module_match.group(1)
-                    else:
-                        module_name = f"{seed_name}_variant_{j + 1}"
-
-                    # 构建文件名
-                    var_name = f"{seed_name}_variant_{j + 1}"
-
-                    # 保存变异代码
-                    var_file = os.path.join(self.output_verilog_path, f"{var_name}.v")
-                    VerilogParser.write_file(var_file, var_code)
-
-                    # 保存PPA报告
-                    ppa_file = os.path.join(self.output_ppa_path, f"{var_name}_report.txt")
-                    self.vivado_tool.save_ppa_report(var_ppa, ppa_file, module_name)
-
-                # 更新统计信息
-                stats['processed_seeds'] += 1
-                stats['total_variations'] += len(variations)
+        # 预先计算各种子可用的变换（结果写入适用性缓存），没有任何可用变换的种子无法产生变异，不参与调度
+        applicability = self.transformer_manager.applicability_matrix(
+            remaining_seeds,
+            num_workers=self.config['scheduler'].get('applicability_workers', 1)
+        )
+        planned_seeds = []
+        for seed_file, vector in zip(applicability['seeds'], applicability['matrix']):
+            if any(vector):
+                planned_seeds.append(seed_file)
+            else:
+                self.logger.info(f"种子 {os.path.basename(seed_file)} 没有适用的变换，跳过")
+        stats['inapplicable_seeds'] = len(remaining_seeds) - len(planned_seeds)
+        remaining_seeds = planned_seeds
+
+        # 用种子数据集(代码, PPA报告)训练代理模型，训练失败时不做预筛
+        if self.surrogate is not None:
+            self.surrogate.fit_from_dataset(
+                self.seed_verilog_path,
+                self.seed_ppa_path,
+                num_workers=self.config['surrogate'].get('train_workers', 1)
+            )
+
+        # 启动本地工作进程（远程主机上的工作进程通过 main.py --worker 启动）
+        local_workers = None
+        if self.job_queue is not None and self.config['distributed'].get('local_workers', 0) > 0:
+            from .job_queue import LocalWorkerPool
+            local_workers = LocalWorkerPool(
+                config_path=self.config_path,
+                num_workers=self.config['distributed']['local_workers'],
+                logger=self.logger
+            )
+            local_workers.start()
+
+        # 多个种子并发搜索，LLM、验证和综合阶段共享全局并发额度
+        scheduler_config = self.config['scheduler']
+        budget = StageBudget(
+            llm=scheduler_config.get('llm_concurrency', 4),
+            verify=scheduler_config.get('verify_concurrency', 4),
+            synth=scheduler_config.get('synth_concurrency', 2)
+        )
+        scheduler = SeedScheduler(
+            max_parallel_seeds=scheduler_config.get('parallel_seeds', 1),
+            num_workers=self.num_workers * scheduler_config.get('parallel_seeds', 1),
+            budget=budget,
+            logger=self.logger
+        )
 
-                self.logger.info(f"种子 {seed_name} 处理完成，生成了 {len(variations)} 个变异")
+        def process_seed(seed_file, index, executor):
+            self.logger.info(f"处理种子文件 [{index + 1}/{len(remaining_seeds)}]: {os.path.basename(seed_file)}")
+            return self._process_seed(seed_file, num_variations_per_seed, progress, budget, executor)
 
-                # 更新进度文件
-                processed_seeds[seed_name] = {
-                    "processed_time": time.strftime("%Y-%m-%d %H:%M:%S"),
-                    "variations_count": len(variations)
-                }
+        results = scheduler.run(remaining_seeds, process_seed)
 
-                try:
-                    with open(progress_file, 'w') as f:
-                        json.dump(processed_seeds, f, indent=2)
-                except Exception as e:
-                    self.logger.error(f"保存进度文件失败: {str(e)}")
-
-            except Exception as e:
-                self.logger.error(f"处理种子 {seed_name} 时出错: {str(e)}")
-                import traceback
-                self.logger.error(traceback.format_exc())
+        # 更新统计信息
+        for variations_count in results:
+            if variations_count is not None:
+                stats['processed_seeds'] += 1
+                stats['total_variations'] += variations_count
 
         # 计算运行时间
         stats['end_time'] = time.time()
@@ -257,8 +341,187 @@ class HVMSFramework:
         self.logger.info(f"生成了 {stats['total_variations']} 个有价值的变异")
         self.logger.info(f"总运行时间: {stats['duration']:.2f} 秒")
 
+        if self.ppa_cache is not None:
+            stats['ppa_cache'] = self.ppa_cache.stats()
+            self.logger.info(f"PPA缓存统计: {stats['ppa_cache']}")
+
+        stats['applicability'] = self.transformer_manager.applicability_stats()
+        self.logger.info(f"变换适用性缓存统计: {stats['applicability']}")
+
+        if self.transform_memo is not None:
+            stats['transform_memo'] = self.transform_memo.stats()
+            self.logger.info(f"变换记忆表统计: {stats['transform_memo']}")
+
+        if local_workers is not None:
+            local_workers.stop()
+
+        if self.job_queue is not None:
+            stats['job_queue'] = self.job_queue.stats()
+            self.logger.info(f"任务队列统计: {stats['job_queue']}")
+
+        if self.verification_executor is not None:
+            stats['verification'] = self.verification_executor.stats()
+            self.logger.info(f"验证线程池统计: {stats['verification']}")
+            self.verification_executor.shutdown()
+
+        if self.verifier.pysim is not None:
+            stats['native_sim'] = {'decided': self.verifier.native_decided,
+                                   'fallbacks': self.verifier.native_fallbacks}
+            self.logger.info(f"本地仿真统计: {stats['native_sim']}")
+
+        if self.surrogate is not None:
+            stats['surrogate'] = self.surrogate.stats()
+            self.logger.info(f"PPA代理模型预筛统计: {stats['surrogate']}")
+            # 保存尚未落盘的在线更新，下次续跑时继续使用
+            self.surrogate.save()
+
+        if self.formal_checker is not None:
+            stats['formal'] = self.formal_checker.stats()
+            self.logger.info(f"形式验证统计: {stats['formal']}")
+            self.formal_checker.shutdown()
+
+        # 关闭常驻Vivado会话和API连接池
+        self.vivado_tool.close()
+        self.agent.close()
+
         return stats
 
+    def run_worker(self, worker_id=None, max_jobs=None, idle_timeout=None, stop_event=None):
+        """
+        以工作进程模式运行：从分布式任务队列领取综合和验证任务
+
+        Args:
+            worker_id: 工作进程标识 (可选)
+            max_jobs: 最多执行的任务数 (可选)
+            idle_timeout: 队列持续为空多久后退出(秒) (可选)
+            stop_event: 停止事件 (可选)
+
+        Returns:
+            int: 执行的任务数
+        """
+        if self.job_queue is None:
+            raise RuntimeError("未启用分布式任务队列，请在配置文件中设置 distributed.enabled")
+
+        from .job_queue import JobWorker
+        worker = JobWorker(
+            job_queue=self.job_queue,
+            vivado_tool=self.vivado_tool,
+            verifier=self.verifier,
+            worker_id=worker_id,
+            poll_interval=self.config['distributed'].get('poll_interval', 1.0),
+            logger=self.logger
+        )
+
+        try:
+            return worker.run(max_jobs=max_jobs, idle_timeout=idle_timeout, stop_event=stop_event)
+        finally:
+            self.vivado_tool.close()
+
+    def _process_seed(self, seed_file, num_variations_per_seed, progress, budget=None, executor=None):
+        """
+        对单个种子运行MCTS搜索并保存变异
+
+        Args:
+            seed_file: 种子文件路径
+            num_variations_per_seed: 目标变异数量
+            progress: 进度存储
+            budget: 阶段并发额度 (可选)
+            executor: 共享工作线程池 (可选)
+
+        Returns:
+            int: 生成的变异数量，种子被跳过时返回None
+        """
+        seed_basename = os.path.basename(seed_file)
+        seed_name = os.path.splitext(seed_basename)[0]
+
+        # 读取种子代码
+        seed_code = VerilogParser.read_file(seed_file)
+
+        # 获取种子代码的PPA指标
+        seed_ppa = self._get_seed_ppa(seed_name)
+
+        if not seed_ppa:
+            self.logger.warning(f"未找到种子 {seed_name} 的PPA数据，跳过")
+            return None
+
+        # 搜索状态检查点，中断后重新运行时从检查点继续
+        checkpoint = None
+        if self.config['checkpoint'].get('enabled', False):
+            checkpoint_dir = self.config['checkpoint'].get('dir') or os.path.join(
+                os.path.dirname(self.output_verilog_path), "checkpoints")
+            checkpoint = SearchCheckpoint(
+                os.path.join(checkpoint_dir, f"{seed_name}.json.gz"),
+                interval=self.config['checkpoint'].get('interval', 60),
+                logger=self.logger
+            )
+
+        # 创建并行MCTS搜索实例
+        mcts = ParallelMCTSSearch(
+            seed_code=seed_code,
+            seed_ppa=seed_ppa,
+            transformer_manager=self.transformer_manager,
+            vivado_tool=self.vivado_tool,
+            verifier=self.verifier,
+            max_depth=self.config['mcts']['max_depth'],
+            ppa_threshold=self.config['mcts']['ppa_threshold'],
+            c_param=self.config['mcts']['c_param'],
+            max_workers=self.num_workers,
+            paths_per_batch=self.paths_per_batch,
+            job_queue=self.job_queue,
+            batch_timeout=self.config['distributed'].get('batch_timeout', 7200),
+            budget=budget,
+            executor=executor,
+            executor_owner=seed_file,
+            stage_limits={
+                'transform': self.config['scheduler'].get('transform_workers', self.num_workers),
+                'verify': self.config['scheduler'].get('verify_workers', self.num_workers),
+                'synth': self.config['scheduler'].get('synth_workers', 1)
+            },
+            verify_batch_size=self.config['verification'].get('batch_size', 8),
+            # 会话池中的会话已常驻，没有启动开销可省，候选逐个提交以便各会话并行综合
+            synth_batch_size=1 if self.vivado_tool.session_pool is not None
+            else self.config['vivado'].get('batch_size', 4),
+            verification_executor=self.verification_executor,
+            surrogate=self.surrogate,
+            checkpoint=checkpoint,
+            logger=self.logger
+        )
+
+        # 运行MCTS搜索，获取变异代码
+        variations = mcts.search(
+            target_count=num_variations_per_seed,
+            max_iterations=self.config['mcts']['max_iterations']
+        )
+
+        # 保存变异代码和PPA报告
+        for j, (var_code, var_ppa) in enumerate(variations):
+            # 提取模块名
+            module_match = re.search(r'module\s+(\w+)', var_code)
+            if module_match:
+                module_name = module_match.group(1)
+            else:
+                module_name = f"{seed_name}_variant_{j + 1}"
+
+            # 构建文件名
+            var_name = f"{seed_name}_variant_{j + 1}"
+
+            # 保存变异代码
+            var_file = os.path.join(self.output_verilog_path, f"{var_name}.v")
+            VerilogParser.write_file(var_file, var_code)
+
+            # 保存PPA报告
+            ppa_file = os.path.join(self.output_ppa_path, f"{var_name}_report.txt")
+            self.vivado_tool.save_ppa_report(var_ppa, ppa_file, module_name)
+
+        self.logger.info(f"种子 {seed_name} 处理完成，生成了 {len(variations)} 个变异")
+
+        # 更新进度文件
+        progress.mark_done(seed_name, len(variations))
+        if checkpoint is not None:
+            checkpoint.remove()
+
+        return len(variations)
+
     def _load_config(self, config_path):
         """
         加载配置文件
@@ -279,7 +542,10 @@ class HVMSFramework:
                 'api_key': "sk-QH95zut9TmvlmV2QzY4jOqQ0qxKq1IWfKyuJkmeX8zigFPmW",
                 'model': "[额度]claude-3-7-sonnet",
                 'timeout': 60,
-                'max_retries': 3
+                'max_retries': 3,
+                'api_url': "https://api.qingtian.shop/v1/messages",
+                'max_concurrency': 16,
+                'requests_per_minute': 0
             },
             'mcts': {
                 'max_depth': 3,
@@ -299,7 +565,86 @@ class HVMSFramework:
             'vivado': {
                 'path': "D:/Xilinx/Vivado/2018.3/bin/vivado.bat",
                 'tcl_script': "D:/tcl/vivado_synth.tcl",
-                'fpga_part': "xcku3p-ffva676-2-e"
+                'fpga_part': "xcku3p-ffva676-2-e",
+                'cache_enabled': True,
+                'cache_dir': "D:/tcl/HVMS_cache",
+                'cache_max_entries': 20000,
+                'pool_size': 0,
+                'jobs_per_session': 20,
+                'job_timeout': 1800,
+                'timeout': 1800,
+                'fidelity': "full",
+                'promote_fraction': 0.25,
+                'promote_margin': 0.05,
+                'batch_script': None,
+                'batch_size': 4,
+                'stage_timeouts': {
+                    'startup': 300,
+                    'synthesis': 900,
+                    'implementation': 1200,
+                    'report': 300
+                }
+            },
+            'memo': {
+                'enabled': False,
+                'path': "D:/tcl/HVMS_cache/transform_memo.sqlite3"
+            },
+            'scheduler': {
+                'parallel_seeds': 1,
+                'llm_concurrency': 4,
+                'verify_concurrency': 4,
+                'synth_concurrency': 2,
+                'transform_workers': 4,
+                'verify_workers': 4,
+                'synth_workers': 1,
+                'applicability_workers': 1
+            },
+            'verification': {
+                'batch_size': 8,
+                'min_vectors': 32,
+                'max_vectors': 1000,
+                'coverage_patience': 32,
+                'trace_cache_dir': "D:/tcl/HVMS_cache/traces",
+                'workers': 4,
+                'scratch_dir': None,
+                'sim_timeout': 120,
+                'cpu_limit': 60,
+                'native_sim': True,
+                'native_vectors': 4096,
+                'formal': True,
+                'yosys_path': "yosys",
+                'formal_cache_dir': "D:/tcl/HVMS_cache/formal",
+                'formal_max_lines': 400,
+                'formal_max_state_bits': 64,
+                'formal_depth': 12,
+                'formal_timeout': 60,
+                'formal_workers': 2
+            },
+            'surrogate': {
+                'enabled': False,
+                'cache_dir': "D:/tcl/HVMS_cache/surrogate",
+                'ensemble_size': 8,
+                'alpha': 1.0,
+                'min_probability': 0.3,
+                'uncertainty_threshold': 0.15,
+                'train_workers': 1,
+                'online_update': True,
+                'refit_interval': 8,
+                'online_weight': 4.0
+            },
+            'checkpoint': {
+                'enabled': True,
+                'dir': None,
+                'interval': 60
+            },
+            'distributed': {
+                'enabled': False,
+                'queue_path': "D:/tcl/HVMS_queue/jobs.sqlite3",
+                'local_workers': 2,
+                'lease_timeout': 1800,
+                'max_attempts': 3,
+                'batch_timeout': 7200,
+                'poll_interval': 1.0
             },
             'logging': {
                 'level': "INFO",
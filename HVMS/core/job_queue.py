@@ -0,0 +1,510 @@
+import os
+import json
+import time
+import socket
+import sqlite3
+import logging
+import threading
+import traceback
+import multiprocessing
+
+
+# 任务状态
+PENDING = 'pending'
+LEASED = 'leased'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+# 支持的任务类型
+JOB_KINDS = ('synthesis', 'verification')
+
+
+class JobQueue:
+    """
+    基于SQLite的综合/验证任务队列
+
+    多台主机共享同一个数据库文件（例如放在共享目录中）即可协同处理任务。
+    工作进程以租约方式领取任务，租约过期未完成的任务会被重新派发，
+    超过最大尝试次数后标记为失败。
+    """
+
+    def __init__(self, db_path, lease_timeout=1800, max_attempts=3, logger=None):
+        """
+        初始化任务队列
+
+        Args:
+            db_path: SQLite数据库文件路径
+            lease_timeout: 任务租约时长(秒)，工作进程需在此时间内完成或续约
+            max_attempts: 单个任务的最大尝试次数
+            logger: 日志记录器
+        """
+        self.db_path = db_path
+        self.lease_timeout = lease_timeout
+        self.max_attempts = max_attempts
+        self.logger = logger or logging.getLogger(self.__class__.__name__)
+
+        db_dir = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(db_dir, exist_ok=True)
+
+        self._init_db()
+
+    def _connect(self):
+        """创建数据库连接（每次操作独立连接，可在线程和进程间安全使用）"""
+        conn = sqlite3.connect(self.db_path, timeout=60)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _init_db(self):
+        """初始化任务表结构"""
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS jobs ("
+                    "  id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                    "  batch_id TEXT NOT NULL,"
+                    "  kind TEXT NOT NULL,"
+                    "  payload TEXT NOT NULL,"
+                    "  status TEXT NOT NULL,"
+                    "  attempts INTEGER NOT NULL DEFAULT 0,"
+                    "  worker TEXT,"
+                    "  lease_expires REAL,"
+                    "  result TEXT,"
+                    "  error TEXT,"
+                    "  created REAL NOT NULL,"
+                    "  updated REAL NOT NULL"
+                    ")"
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, kind, id)")
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_batch ON jobs(batch_id)")
+        finally:
+            conn.close()
+
+    def submit_batch(self, kind, payloads, batch_id=None):
+        """
+        提交一批任务
+
+        Args:
+            kind: 任务类型 ('synthesis' 或 'verification')
+            payloads: 任务参数字典列表
+            batch_id: 批次标识 (可选，默认自动生成)
+
+        Returns:
+            tuple: (批次标识, 任务ID列表)，任务ID与payloads顺序一致
+        """
+        if kind not in JOB_KINDS:
+            raise ValueError(f"不支持的任务类型: {kind}")
+
+        if batch_id is None:
+            batch_id = f"{socket.gethostname()}-{os.getpid()}-{time.time_ns()}"
+
+        now = time.time()
+        job_ids = []
+        conn = self._connect()
+        try:
+            with conn:
+                for payload in payloads:
+                    cursor = conn.execute(
+                        "INSERT INTO jobs (batch_id, kind, payload, status, created, updated) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        (batch_id, kind, json.dumps(payload), PENDING, now, now)
+                    )
+                    job_ids.append(cursor.lastrowid)
+        finally:
+            conn.close()
+
+        self.logger.info(f"提交任务批次 {batch_id}: {len(job_ids)} 个{kind}任务")
+        return batch_id, job_ids
+
+    def _reclaim_expired(self, conn, now):
+        """回收租约过期的任务：未达到最大尝试次数则重新排队，否则标记失败"""
+        conn.execute(
+            "UPDATE jobs SET status = ?, error = ?, updated = ? "
+            "WHERE status = ? AND lease_expires < ? AND attempts >= ?",
+            (FAILED, "租约过期且超过最大尝试次数", now, LEASED, now, self.max_attempts)
+        )
+        conn.execute(
+            "UPDATE jobs SET status = ?, worker = NULL, lease_expires = NULL, updated = ? "
+            "WHERE status = ? AND lease_expires < ?",
+            (PENDING, now, LEASED, now)
+        )
+
+    def lease(self, worker_id, kinds=None):
+        """
+        领取一个待处理任务
+
+        Args:
+            worker_id: 工作进程标识
+            kinds: 可处理的任务类型列表 (可选，默认全部)
+
+        Returns:
+            dict: 任务信息 {'id', 'batch_id', 'kind', 'payload', 'attempts'}，无任务时返回None
+        """
+        kinds = list(kinds or JOB_KINDS)
+        placeholders = ",".join("?" for _ in kinds)
+        now = time.time()
+
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                self._reclaim_expired(conn, now)
+
+                row = conn.execute(
+                    f"SELECT id, batch_id, kind, payload, attempts FROM jobs "
+                    f"WHERE status = ? AND kind IN ({placeholders}) ORDER BY id LIMIT 1",
+                    [PENDING] + kinds
+                ).fetchone()
+                if not row:
+                    return None
+
+                job_id, batch_id, kind, payload, attempts = row
+                conn.execute(
+                    "UPDATE jobs SET status = ?, worker = ?, lease_expires = ?, attempts = ?, updated = ? "
+                    "WHERE id = ?",
+                    (LEASED, worker_id, now + self.lease_timeout, attempts + 1, now, job_id)
+                )
+        finally:
+            conn.close()
+
+        return {
+            'id': job_id,
+            'batch_id': batch_id,
+            'kind': kind,
+            'payload': json.loads(payload),
+            'attempts': attempts + 1
+        }
+
+    def heartbeat(self, job_id, worker_id):
+        """
+        续约任务
+
+        Returns:
+            bool: 是否仍持有该任务的租约
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            with conn:
+                cursor = conn.execute(
+                    "UPDATE jobs SET lease_expires = ?, updated = ? WHERE id = ? AND worker = ? AND status = ?",
+                    (now + self.lease_timeout, now, job_id, worker_id, LEASED)
+                )
+                return cursor.rowcount > 0
+        finally:
+            conn.close()
+
+    def complete(self, job_id, worker_id, result):
+        """
+        写回任务结果
+
+        Args:
+            job_id: 任务ID
+            worker_id: 工作进程标识
+            result: 任务结果（可JSON序列化）
+
+        Returns:
+            bool: 是否写回成功（租约已被回收时返回False）
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            with conn:
+                cursor = conn.execute(
+                    "UPDATE jobs SET status = ?, result = ?, error = NULL, lease_expires = NULL, updated = ? "
+                    "WHERE id = ? AND worker = ? AND status = ?",
+                    (DONE, json.dumps(result), now, job_id, worker_id, LEASED)
+                )
+                return cursor.rowcount > 0
+        finally:
+            conn.close()
+
+    def fail(self, job_id, worker_id, error):
+        """
+        报告任务失败，未达到最大尝试次数时重新排队
+
+        Args:
+            job_id: 任务ID
+            worker_id: 工作进程标识
+            error: 错误信息
+
+        Returns:
+            bool: 是否记录成功
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            with conn:
+                cursor = conn.execute(
+                    "UPDATE jobs SET status = CASE WHEN attempts >= ? THEN ? ELSE ? END, "
+                    "worker = NULL, lease_expires = NULL, error = ?, updated = ? "
+                    "WHERE id = ? AND worker = ? AND status = ?",
+                    (self.max_attempts, FAILED, PENDING, str(error), now, job_id, worker_id, LEASED)
+                )
+                return cursor.rowcount > 0
+        finally:
+            conn.close()
+
+    def cancel_batch(self, batch_id):
+        """取消批次中尚未开始的任务"""
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "UPDATE jobs SET status = ?, updated = ? WHERE batch_id = ? AND status = ?",
+                    (CANCELLED, time.time(), batch_id, PENDING)
+                )
+        finally:
+            conn.close()
+
+    def batch_status(self, batch_id):
+        """
+        查询批次中各任务的状态
+
+        Returns:
+            dict: 任务ID -> (状态, 结果)
+        """
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT id, status, result FROM jobs WHERE batch_id = ?", (batch_id,)
+            ).fetchall()
+        finally:
+            conn.close()
+
+        return {
+            job_id: (status, json.loads(result) if result is not None else None)
+            for job_id, status, result in rows
+        }
+
+    def wait_batch(self, batch_id, job_ids, timeout=7200, poll_interval=1.0):
+        """
+        等待批次完成并收集结果
+
+        Args:
+            batch_id: 批次标识
+            job_ids: 任务ID列表
+            timeout: 最长等待时间(秒)
+            poll_interval: 查询间隔(秒)
+
+        Returns:
+            list: 与job_ids顺序一致的结果列表，失败或超时的任务为None
+        """
+        deadline = time.time() + timeout
+        finished_states = (DONE, FAILED, CANCELLED)
+
+        while True:
+            status = self.batch_status(batch_id)
+            finished = sum(1 for job_id in job_ids if status.get(job_id, (FAILED,))[0] in finished_states)
+            if finished == len(job_ids):
+                break
+
+            if time.time() >= deadline:
+                self.logger.warning(f"等待任务批次 {batch_id} 超时，"
+                                    f"已完成 {finished}/{len(job_ids)}，取消剩余任务")
+                self.cancel_batch(batch_id)
+                status = self.batch_status(batch_id)
+                break
+
+            time.sleep(poll_interval)
+
+        results = []
+        for job_id in job_ids:
+            state, result = status.get(job_id, (FAILED, None))
+            results.append(result if state == DONE else None)
+        return results
+
+    def stats(self):
+        """
+        获取队列统计信息
+
+        Returns:
+            dict: 各状态的任务数量
+        """
+        conn = self._connect()
+        try:
+            rows = conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        finally:
+            conn.close()
+        return dict(rows)
+
+
+class JobWorker:
+    """从任务队列领取并执行综合/验证任务的工作进程"""
+
+    def __init__(self, job_queue, vivado_tool=None, verifier=None, worker_id=None, kinds=None,
+                 poll_interval=1.0, logger=None):
+        """
+        初始化工作进程
+
+        Args:
+            job_queue: 任务队列
+            vivado_tool: Vivado工具接口 (处理synthesis任务时必需)
+            verifier: 功能验证工具 (处理verification任务时必需)
+            worker_id: 工作进程标识 (可选，默认使用主机名和进程号)
+            kinds: 可处理的任务类型列表 (可选，默认根据提供的工具确定)
+            poll_interval: 队列为空时的查询间隔(秒)
+            logger: 日志记录器
+        """
+        self.job_queue = job_queue
+        self.vivado_tool = vivado_tool
+        self.verifier = verifier
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.poll_interval = poll_interval
+        self.logger = logger or logging.getLogger(self.__class__.__name__)
+
+        if kinds is None:
+            kinds = []
+            if vivado_tool is not None:
+                kinds.append('synthesis')
+            if verifier is not None:
+                kinds.append('verification')
+        self.kinds = kinds
+
+        self.jobs_done = 0
+
+    def run(self, max_jobs=None, idle_timeout=None, stop_event=None):
+        """
+        持续领取并执行任务
+
+        Args:
+            max_jobs: 最多执行的任务数 (可选)
+            idle_timeout: 队列持续为空多久后退出(秒) (可选，默认一直等待)
+            stop_event: 停止事件 (可选)
+
+        Returns:
+            int: 执行的任务数
+        """
+        self.logger.info(f"工作进程 {self.worker_id} 启动，处理任务类型: {self.kinds}")
+        idle_since = time.time()
+
+        while True:
+            if stop_event is not None and stop_event.is_set():
+                break
+            if max_jobs is not None and self.jobs_done >= max_jobs:
+                break
+
+            job = self.job_queue.lease(self.worker_id, self.kinds)
+            if job is None:
+                if idle_timeout is not None and time.time() - idle_since > idle_timeout:
+                    self.logger.info(f"工作进程 {self.worker_id} 空闲超过 {idle_timeout} 秒，退出")
+                    break
+                time.sleep(self.poll_interval)
+                continue
+
+            self.execute(job)
+            idle_since = time.time()
+
+        self.logger.info(f"工作进程 {self.worker_id} 退出，共执行 {self.jobs_done} 个任务")
+        return self.jobs_done
+
+    def execute(self, job):
+        """
+        执行单个任务并写回结果，执行期间定期续约
+
+        Args:
+            job: lease返回的任务信息
+        """
+        self.logger.info(f"执行任务 {job['id']} ({job['kind']}，第 {job['attempts']} 次尝试)")
+
+        stop_heartbeat = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat_loop, args=(job['id'], stop_heartbeat), daemon=True)
+        heartbeat.start()
+
+        try:
+            if job['kind'] == 'synthesis':
+                result = self._run_synthesis(job['payload'])
+            elif job['kind'] == 'verification':
+                result = self._run_verification(job['payload'])
+            else:
+                raise ValueError(f"不支持的任务类型: {job['kind']}")
+
+            stop_heartbeat.set()
+            if not self.job_queue.complete(job['id'], self.worker_id, result):
+                self.logger.warning(f"任务 {job['id']} 的租约已失效，结果未写回")
+
+        except Exception as e:
+            stop_heartbeat.set()
+            self.logger.error(f"任务 {job['id']} 执行失败: {str(e)}")
+            self.logger.error(traceback.format_exc())
+            self.job_queue.fail(job['id'], self.worker_id, str(e))
+
+        finally:
+            heartbeat.join(timeout=5)
+            self.jobs_done += 1
+
+    def _heartbeat_loop(self, job_id, stop_event):
+        """定期续约，间隔为租约时长的三分之一"""
+        interval = max(self.job_queue.lease_timeout / 3, 1)
+        while not stop_event.wait(interval):
+            if not self.job_queue.heartbeat(job_id, self.worker_id):
+                self.logger.warning(f"任务 {job_id} 续约失败，租约可能已被回收")
+                break
+
+    def _run_synthesis(self, payload):
+        """执行综合任务，返回PPA指标（综合失败时为None）"""
+        return self.vivado_tool.get_ppa_metrics(payload['code'], payload.get('module_name'),
+                                                fidelity=payload.get('fidelity'))
+
+    def _run_verification(self, payload):
+        """执行功能等价性验证任务"""
+        equivalent = self.verifier.verify_equivalence(
+            payload['original_code'],
+            payload['transformed_code'],
+            transform_count=payload.get('transform_count')
+        )
+        return {'equivalent': bool(equivalent)}
+
+
+def _local_worker_main(config_path, worker_id, stop_event):
+    """本地工作进程入口：按配置文件构建工具后持续处理任务"""
+    from .framework import HVMSFramework
+
+    hvms = HVMSFramework(config_path=config_path)
+    hvms.run_worker(worker_id=worker_id, stop_event=stop_event)
+
+
+class LocalWorkerPool:
+    """在本机启动若干工作进程，用于单机运行或测试"""
+
+    def __init__(self, config_path, num_workers=2, logger=None):
+        """
+        初始化本地工作进程池
+
+        Args:
+            config_path: 配置文件路径，工作进程据此构建Vivado和验证工具
+            num_workers: 工作进程数量
+            logger: 日志记录器
+        """
+        self.config_path = config_path
+        self.num_workers = num_workers
+        self.logger = logger or logging.getLogger(self.__class__.__name__)
+
+        self._stop_event = multiprocessing.Event()
+        self._processes = []
+
+    def start(self):
+        """启动工作进程"""
+        for i in range(self.num_workers):
+            worker_id = f"{socket.gethostname()}-local{i}"
+            process = multiprocessing.Process(
+                target=_local_worker_main,
+                args=(self.config_path, worker_id, self._stop_event),
+                daemon=True
+            )
+            process.start()
+            self._processes.append(process)
+
+        self.logger.info(f"启动 {self.num_workers} 个本地工作进程")
+
+    def stop(self, timeout=60):
+        """通知工作进程在完成当前任务后退出"""
+        self._stop_event.set()
+        for process in self._processes:
+            process.join(timeout=timeout)
+            if process.is_alive():
+                self.logger.warning(f"工作进程 {process.pid} 未能及时退出，强制终止")
+                process.terminate()
+        self._processes = []
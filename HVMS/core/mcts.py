@@ -4,6 +4,7 @@ import logging
 import os
 from .nodes import MCTSNode
 import re
+from utils import VariantIndex
 
 
 class MCTSSearch:
@@ -47,6 +48,7 @@ class MCTSSearch:
 
         # 存储有价值的变异
         self.valuable_variants = []
+        self.valuable_index = VariantIndex()
 
     def search(self, target_count=10, max_iterations=1000):
         """
@@ -182,8 +184,8 @@ class MCTSSearch:
             self.logger.info(f"尝试应用变换: {action}")
             new_state = self._apply_transformation(node.state, action)
 
-            # 检查变换是否产生了新的代码
-            if new_state == node.state:
+            # 检查变换是否产生了新的代码（仅注释、空白或信号命名不同也视为未变化）
+            if VariantIndex.same(new_state, node.state):
                 self.logger.info(f"变换 {action} 未产生变化")
                 return self._expand(node)  # 重试扩展
 
@@ -227,13 +229,7 @@ class MCTSSearch:
             variant_tuple = (node.state, node.ppa_metrics)
 
             # 检查是否已经存在
-            variant_exists = False
-            for existing_code, _ in self.valuable_variants:
-                if existing_code == node.state:
-                    variant_exists = True
-                    break
-
-            if not variant_exists:
+            if self.valuable_index.add(node.state):
                 self.valuable_variants.append(variant_tuple)
                 self.logger.info(f"找到有价值的变异，PPA变化: {ppa_change:.2f}")
 
@@ -275,13 +271,7 @@ class MCTSSearch:
                 variant_tuple = (node.state, node.ppa_metrics)
 
                 # 检查是否已经存在
-                variant_exists = False
-                for existing_code, _ in self.valuable_variants:
-                    if existing_code == node.state:
-                        variant_exists = True
-                        break
-
-                if not variant_exists:
+                if self.valuable_index.add(node.state):
                     self.valuable_variants.append(variant_tuple)
                     self.logger.info(f"找到有价值的变异，PPA变化: {ppa_change:.2f}")
 
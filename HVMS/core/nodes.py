@@ -25,6 +25,10 @@ class MCTSNode:
         self.max_depth = max_depth  # 最大搜索深度
         self.untried_actions = []  # 未尝试的动作
         self.ppa_metrics = None  # 节点的PPA指标
+        self.actions_loaded = False  # untried_actions是否已根据状态初始化
+        self.pending_actions = set()  # 正在由其他并行路径扩展的动作
+        self.action_failures = {}  # 各动作扩展失败的次数
+        self.virtual_loss = 0  # 并行选择时施加的虚拟损失
 
     @property
     def is_fully_expanded(self):
@@ -36,29 +40,50 @@ class MCTSNode:
         """判断节点是否为终端节点"""
         return self.depth >= self.max_depth  # 达到最大深度
 
-    @property
     def uct_value(self, c_param=1.414):
         """
         计算节点的UCT值
 
+        正在经过本节点的并行路径以虚拟损失计入：每条路径算作一次奖励为0的访问，
+        使其他路径倾向于选择不同的分支
+
         Args:
             c_param: UCT公式中的探索参数
 
         Returns:
             float: UCT值
         """
-        if self.visits == 0:
+        visits = self.visits + self.virtual_loss
+        if visits == 0:
             return float('inf')
 
-        exploitation = self.value / self.visits
+        exploitation = self.value / visits
+
+        parent_visits = 0
+        if self.parent is not None:
+            parent_visits = self.parent.visits + self.parent.virtual_loss
 
-        if self.parent is None or self.parent.visits == 0:
+        if parent_visits == 0:
             exploration = c_param
         else:
-            exploration = c_param * math.sqrt(2 * math.log(self.parent.visits) / self.visits)
+            exploration = c_param * math.sqrt(2 * math.log(parent_visits) / visits)
 
         return exploitation + exploration
 
+    def best_child(self, c_param=1.414):
+        """
+        按UCT值选择子节点
+
+        Args:
+            c_param: UCT公式中的探索参数
+
+        Returns:
+            MCTSNode: UCT值最大的子节点，没有子节点时返回None
+        """
+        if not self.children:
+            return None
+        return max(self.children, key=lambda child: child.uct_value(c_param))
+
     def add_child(self, state, action):
         """
         添加子节点
@@ -1,11 +1,16 @@
 import os
 import time
+import hashlib
 import random
 import logging
-import subprocess
-import multiprocessing
-from multiprocessing.pool import ThreadPool
+import threading
+from contextlib import nullcontext
+import traceback
+from concurrent.futures import Future, ThreadPoolExecutor
 from typing import List, Tuple, Dict, Any
+from utils import VariantIndex
+from .nodes import MCTSNode
+from .pipeline import PipelineStage
 
 
 class ParallelMCTSSearch:
@@ -13,7 +18,9 @@ class ParallelMCTSSearch:
 
     def __init__(self, seed_code, seed_ppa, transformer_manager, vivado_tool,
                  verifier, max_depth=3, ppa_threshold=0.2, c_param=1.414,
-                 max_workers=4, paths_per_batch=8, logger=None):
+                 max_workers=4, paths_per_batch=8, job_queue=None, batch_timeout=7200,
+                 budget=None, executor=None, executor_owner=None, stage_limits=None, verify_batch_size=8,
+                 synth_batch_size=1, verification_executor=None, surrogate=None, checkpoint=None, logger=None):
         """
         初始化并行MCTS搜索
 
@@ -27,7 +34,18 @@ class ParallelMCTSSearch:
             ppa_threshold: PPA变化阈值
             c_param: UCT公式中的探索参数
             max_workers: 最大并行工作线程数
-            paths_per_batch: 每批次探索的路径数
+            paths_per_batch: 同时在流水线中的路径数
+            job_queue: 分布式任务队列 (可选，提供时综合与验证任务交由工作进程执行)
+            batch_timeout: 等待一个任务批次完成的最长时间(秒)
+            budget: 阶段并发额度 (可选，StageBudget实例，多个种子共享)
+            executor: 共享工作线程池 (可选，WorkStealingExecutor实例，提供时不再创建私有线程池)
+            executor_owner: 在共享线程池中标识本种子任务的键
+            stage_limits: 各阶段并发上限 {'transform', 'verify', 'synth'} (可选，默认变换和验证为max_workers，综合为1)
+            verify_batch_size: 验证阶段单批最多合并的候选数，同一批候选共用一次编译和仿真
+            synth_batch_size: 综合阶段单批最多合并的候选数，同一批候选在一次Vivado运行中综合
+            verification_executor: 验证线程池 (可选，VerificationExecutor实例，提供时验证异步执行，不占用流水线线程)
+            surrogate: PPA代理模型 (可选，SurrogatePPAModel实例，提供时只综合预计能通过阈值或预测不确定的候选)
+            checkpoint: 搜索状态检查点 (可选，SearchCheckpoint实例，提供时定期保存搜索状态，并从已有检查点继续搜索)
             logger: 日志记录器
         """
         self.seed_code = seed_code
@@ -40,23 +58,60 @@ class ParallelMCTSSearch:
         self.c_param = c_param
         self.max_workers = max_workers
         self.paths_per_batch = paths_per_batch
+        self.job_queue = job_queue
+        self.batch_timeout = batch_timeout
+        self.budget = budget
+        self.executor = executor
+        self.executor_owner = executor_owner if executor_owner is not None else id(self)
+        self.stage_limits = {'transform': max_workers, 'verify': max_workers, 'synth': 1}
+        self.stage_limits.update(stage_limits or {})
+        self.verify_batch_size = max(1, verify_batch_size)
+        self.synth_batch_size = max(1, synth_batch_size)
+        self.verification_executor = verification_executor
+        self.surrogate = surrogate if surrogate is not None and surrogate.trained else None
+        self.checkpoint = checkpoint
         self.logger = logger or logging.getLogger(self.__class__.__name__)
 
-        # 存储有价值的变异
+        # 存储有价值的变异（综合阶段多线程更新，需加锁）
         self.valuable_variants = []
+        self.valuable_index = VariantIndex()
+        self._valuable_lock = threading.Lock()
+        self.target_count = 0
 
-        # 不在初始化时创建进程池，而是在需要时创建并在使用后关闭
+        # 多精度模式下此前各批的综合阶段分数，用于按比例挑选提升到完整流程的候选
+        self._synth_scores = []
+        self._fidelity_lock = threading.Lock()
 
-        # 创建变体候选队列
-        self.candidate_queue = []
+        # 种子的综合阶段PPA（首次需要与只综合的结果比较时评估一次）
+        self._seed_synth_ppa = None
+        self._seed_synth_evaluated = False
+        self._seed_synth_lock = threading.Lock()
+
+        # 已送入PPA评估的变体索引（包含种子本身），规范形式相同的候选不会重复综合
+        self.evaluated_index = VariantIndex([seed_code])
+
+        # 所有并行路径共享的搜索树，节点缓存变换结果和PPA，树结构与统计量由树锁保护
+        self.root = MCTSNode(state=seed_code, max_depth=max_depth)
+        self.root.ppa_metrics = seed_ppa
+        self._tree_lock = threading.Lock()
+
+        # 等待其他路径完成扩展的路径，键为节点id
+        self._parked = {}
+
+        # 已启动的路径总数（从检查点继续时包含此前运行启动的路径）
+        self._started = 0
 
     def search(self, target_count=10, max_iterations=1000):
         """
         执行并行MCTS搜索
 
+        变换(LLM)、功能验证(iverilog)和综合(Vivado)三个阶段以有界队列串成流水线，
+        各阶段并发上限独立，路径在某一跳验证通过后立即进入下一跳或综合，
+        达到目标变异数量后提前停止。所有路径共享一棵UCT搜索树。
+
         Args:
             target_count: 目标变异数量
-            max_iterations: 最大迭代次数
+            max_iterations: 最大迭代次数（启动的路径总数）
 
         Returns:
             list: 有价值的变异列表
@@ -65,127 +120,516 @@ class ParallelMCTSSearch:
                          f"max_depth={self.max_depth}, "
                          f"ppa_threshold={self.ppa_threshold}, "
                          f"max_workers={self.max_workers}, "
-                         f"paths_per_batch={self.paths_per_batch},")
-
-        iteration = 0
-        batch_size = min(self.paths_per_batch, max_iterations)
-
-        while len(self.valuable_variants) < target_count and iteration < max_iterations:
-            self.logger.info(f"MCTS迭代批次 {iteration // batch_size + 1}, "
-                             f"已找到 {len(self.valuable_variants)}/{target_count} 个有价值变异")
-
-            # 1. 并行探索多条路径
-            paths = self._explore_multiple_paths(batch_size)
-
-            # 2. 批量评估候选变体
-            candidates = self._evaluate_candidates(paths)
-
-            # 3. 更新有价值的变异
-            self._update_valuable_variants(candidates)
-
-            iteration += batch_size
-
+                         f"paths_per_batch={self.paths_per_batch}, "
+                         f"stage_limits={self.stage_limits}")
+
+        self.target_count = target_count
+        self._stop_event = threading.Event()
+        self._in_flight = 0
+        self._in_flight_cond = threading.Condition()
+        self._search_start = time.time()
+        self._first_synth_logged = False
+
+        # 同时在流水线中的路径数不超过paths_per_batch，队列容量不小于该值，保证放入不会互相阻塞
+        max_in_flight = max(1, self.paths_per_batch)
+        private_pool = None
+        if self.executor is not None:
+            submit = lambda fn, *args: self.executor.submit(self.executor_owner, fn, *args)
+        else:
+            private_pool = ThreadPoolExecutor(max_workers=sum(self.stage_limits.values()))
+            submit = private_pool.submit
+
+        self._stages = {}
+        for name, handler, batch_size in (('transform', self._transform_step, 1),
+                                          ('verify', self._verify_step, self.verify_batch_size),
+                                          ('synth', self._synth_step, self.synth_batch_size)):
+            if name != 'transform' and batch_size == 1:
+                # 验证和综合的处理函数接收路径列表，不合并时逐条包装为单元素列表
+                handler = lambda path, handler=handler: handler([path])
+            self._stages[name] = PipelineStage(
+                name=name,
+                handler=handler,
+                submit=submit,
+                limit=self.stage_limits[name],
+                queue_size=max_in_flight,
+                batch_size=batch_size,
+                on_error=lambda path, error: self._finish_path(path),
+                logger=self.logger
+            )
+
+        # 从检查点恢复此前运行的搜索树、评估结果和有价值变异
+        self._started = 0
+        if self.checkpoint is not None:
+            self._restore(self.checkpoint.load())
             if len(self.valuable_variants) >= target_count:
-                break
-
-        self.logger.info(f"MCTS搜索完成，找到 {len(self.valuable_variants)}/{target_count} 个有价值变异")
+                self._stop_event.set()
+
+        try:
+            while self._started < max_iterations and not self._stop_event.is_set():
+                with self._in_flight_cond:
+                    while self._in_flight >= max_in_flight and not self._stop_event.is_set():
+                        self._in_flight_cond.wait(timeout=1.0)
+                        self._maybe_checkpoint()
+                    if self._stop_event.is_set():
+                        break
+                    self._in_flight += 1
+
+                self._started += 1
+                self._stages['transform'].put(self._new_path(self._started))
+
+                if self._started % max_in_flight == 0:
+                    self.logger.info(f"MCTS已启动 {self._started} 条路径, "
+                                     f"已找到 {len(self.valuable_variants)}/{target_count} 个有价值变异")
+
+            # 等待流水线中剩余的路径结束（已停止时各阶段会直接丢弃任务）
+            with self._in_flight_cond:
+                while self._in_flight > 0:
+                    self._in_flight_cond.wait(timeout=1.0)
+                    self._maybe_checkpoint()
+
+        finally:
+            self._stop_event.set()
+            for stage in self._stages.values():
+                stage.close()
+            if private_pool is not None:
+                private_pool.shutdown(wait=True)
+            if self.checkpoint is not None:
+                self.checkpoint.save(self._snapshot())
+
+        self.logger.info(f"MCTS搜索完成，共启动 {self._started} 条路径，"
+                         f"找到 {len(self.valuable_variants)}/{target_count} 个有价值变异")
         return self.valuable_variants
 
-    def _explore_multiple_paths(self, num_paths):
+    def _new_path(self, path_id):
         """
-        并行探索多条搜索路径
+        创建一条新路径的状态，路径从共享搜索树的根节点出发
 
         Args:
-            num_paths: 要探索的路径数量
+            path_id: 路径编号
 
         Returns:
-            list: 探索路径列表，每个元素为(最终代码, 变换序列)
+            dict: 路径状态
         """
-        paths = []
+        # 根据指定概率随机选择最大搜索深度
+        depth_choices = [1, 2, 3]
+        depth_weights = [0.3, 0.5, 0.2]  # 30%, 50%, 20%的概率
+        path_max_depth = min(random.choices(depth_choices, weights=depth_weights, k=1)[0], self.max_depth)
 
-        # 使用线程池而不是进程池
-        with ThreadPool(processes=self.max_workers) as pool:
-            # 启动多个探索任务 - 注意这里不应传入额外参数
-            search_tasks = []
-            for _ in range(num_paths):
-                task = pool.apply_async(self._explore_single_path)  # 确保这里不传递额外参数
-                search_tasks.append(task)
+        self.logger.info(f"路径 {path_id} 随机选择最大深度: {path_max_depth}")
 
-            # 收集结果
-            for task in search_tasks:
-                try:
-                    path = task.get(timeout=600)  # 10分钟超时
-                    if path:
-                        paths.append(path)
-                except Exception as e:
-                    self.logger.error(f"路径探索失败: {str(e)}")
+        return {
+            'id': path_id,
+            'node': self.root,
+            'max_depth': path_max_depth,
+            'attempts': 0,
+            'visited': [],
+            'pending': None
+        }
 
-        return paths
+    def _finish_path(self, path, reward=0.0):
+        """
+        路径结束（综合完成、被丢弃或出错）：撤销虚拟损失、反向传播奖励并释放在途名额
 
-    def _explore_single_path(self):
+        Args:
+            path: 路径状态
+            reward: 路径终点的奖励
+        """
+        parked = []
+        with self._tree_lock:
+            # 撤销尚未完成的扩展
+            if path.get('pending') is not None:
+                _, action = path['pending']
+                path['node'].pending_actions.discard(action)
+                path['pending'] = None
+                parked = self._parked.pop(id(path['node']), [])
+
+            for node in path['visited']:
+                node.virtual_loss -= 1
+            path['visited'] = []
+
+            node = path['node']
+            while node is not None:
+                node.update(reward)
+                node = node.parent
+
+        self._resume_parked(parked)
+
+        with self._in_flight_cond:
+            self._in_flight -= 1
+            self._in_flight_cond.notify_all()
+
+    def _resume_parked(self, parked):
+        """将等待扩展结果的路径重新送回变换阶段"""
+        for waiting_path in parked:
+            self._stages['transform'].put(waiting_path)
+
+    def _maybe_checkpoint(self):
+        """到达保存间隔时保存检查点"""
+        if self.checkpoint is not None and self.checkpoint.due():
+            if self.checkpoint.save(self._snapshot()):
+                self.logger.info(f"已保存搜索检查点，已启动 {self._started} 条路径")
+
+    def _snapshot(self):
         """
-        探索单条路径到指定深度
+        导出可恢复的搜索状态
+
+        搜索树按先序导出，子节点记录父节点下标；虚拟损失、扩展中的动作和在途路径属于运行时状态，不保存，
+        在途路径的变换与综合在恢复后重新进行
 
         Returns:
-            tuple: (最终代码, 变换序列, 变换深度)
+            dict: 可JSON序列化的搜索状态
+        """
+        nodes = []
+        node_index = {}
+        with self._tree_lock:
+            stack = [(self.root, -1)]
+            while stack:
+                node, parent_index = stack.pop()
+                node_index[id(node)] = len(nodes)
+                nodes.append({
+                    'parent': parent_index,
+                    'action': node.action,
+                    'state': node.state if node.parent is not None else None,
+                    'visits': node.visits,
+                    'value': node.value,
+                    'ppa': node.ppa_metrics if node.parent is not None else None,
+                    'untried': list(node.untried_actions),
+                    'loaded': node.actions_loaded,
+                    'failures': dict(node.action_failures)
+                })
+                current = len(nodes) - 1
+                stack.extend((child, current) for child in reversed(node.children))
+            states = {nodes[i]['state']: i for i in range(1, len(nodes))}
+
+        with self._valuable_lock:
+            valuable = [[states.get(code, code), ppa_metrics] for code, ppa_metrics in self.valuable_variants]
+
+        with self._fidelity_lock:
+            synth_scores = list(self._synth_scores)
+
+        return {
+            'version': 1,
+            'seed_hash': hashlib.sha256(self.seed_code.encode('utf-8')).hexdigest(),
+            'saved_time': time.strftime("%Y-%m-%d %H:%M:%S"),
+            'started': self._started,
+            'nodes': nodes,
+            'valuable': valuable,
+            'synth_scores': synth_scores
+        }
+
+    def _restore(self, state):
         """
-        import random
+        从检查点恢复搜索状态
 
-        # 根据指定概率随机选择最大搜索深度
-        depth_choices = [1, 2, 3]
-        depth_weights = [0.3, 0.5, 0.2]  # 30%, 50%, 20%的概率
-        path_max_depth = random.choices(depth_choices, weights=depth_weights, k=1)[0]
+        已评估索引由种子和已获得PPA的节点重建，此前评估失败或仍在评估中的候选会在恢复后再次评估
 
-        self.logger.info(f"为此路径随机选择最大深度: {path_max_depth}")
+        Args:
+            state: _snapshot导出的搜索状态 (为None时不做任何事)
 
-        current_code = self.seed_code
-        transformations = []
-        current_depth = 0
-        transform_attempt = 0
+        Returns:
+            bool: 是否已恢复
+        """
+        if not state:
+            return False
+        seed_hash = hashlib.sha256(self.seed_code.encode('utf-8')).hexdigest()
+        if state.get('version') != 1 or state.get('seed_hash') != seed_hash:
+            self.logger.warning("检查点与当前种子不匹配，忽略检查点并重新搜索")
+            return False
+
+        try:
+            nodes = []
+            for record in state['nodes']:
+                if record['parent'] < 0:
+                    node = self.root
+                else:
+                    parent = nodes[record['parent']]
+                    node = MCTSNode(state=record['state'], parent=parent, action=record['action'],
+                                    depth=parent.depth + 1, max_depth=self.max_depth)
+                    node.ppa_metrics = record['ppa']
+                    parent.children.append(node)
+                node.visits = record['visits']
+                node.value = record['value']
+                node.untried_actions = list(record['untried'])
+                node.actions_loaded = record['loaded']
+                node.action_failures = dict(record['failures'])
+                nodes.append(node)
+        except Exception as e:
+            self.logger.error(f"恢复检查点失败，重新搜索: {str(e)}")
+            self.logger.error(traceback.format_exc())
+            self.root = MCTSNode(state=self.seed_code, max_depth=self.max_depth)
+            self.root.ppa_metrics = self.seed_ppa
+            return False
+
+        for node in nodes[1:]:
+            if node.ppa_metrics is not None:
+                self.evaluated_index.add(node.state)
+
+        for entry, ppa_metrics in state.get('valuable', []):
+            code = nodes[entry].state if isinstance(entry, int) else entry
+            if self.valuable_index.add(code):
+                self.valuable_variants.append((code, ppa_metrics))
+
+        self._synth_scores = list(state.get('synth_scores', []))
+        self._started = state.get('started', 0)
+
+        self.logger.info(f"从检查点恢复搜索 (保存于 {state.get('saved_time')}): "
+                         f"{len(nodes)} 个树节点, 已启动 {self._started} 条路径, "
+                         f"{len(self.valuable_variants)} 个有价值变异")
+        return True
+
+    def _load_actions(self, node):
+        """首次访问节点时初始化其可用变换，调用时需持有树锁"""
+        if not node.actions_loaded:
+            node.untried_actions = list(self._get_available_actions(node.state))
+            node.actions_loaded = True
+
+    def _route(self, path):
+        """
+        将路径送往下一阶段：未达到深度继续变换，否则进入综合
 
-        while current_depth < path_max_depth:  # 使用随机生成的最大深度
-            # 显示当前深度
-            self.logger.info(f"当前搜索深度: {current_depth}/{path_max_depth} 跳")
+        每条路径的变换尝试次数上限为最大深度的3倍，避免LLM反复产生无效变换时路径无法结束
+        """
+        if self._stop_event.is_set():
+            self._finish_path(path)
+        elif path['node'].depth < path['max_depth'] and path['attempts'] < path['max_depth'] * 3:
+            self._stages['transform'].put(path)
+        else:
+            self.logger.info(f"路径 {path['id']} 探索完成，"
+                             f"总共完成 {path['node'].depth}/{path['max_depth']} 跳变换")
+            self._stages['synth'].put(path)
 
-            # 获取可用变换
-            available_actions = self._get_available_actions(current_code)
-            if not available_actions:
-                self.logger.info(f"没有更多可用变换，搜索停止于第 {current_depth} 跳")
-                break
+    def _transform_step(self, path):
+        """
+        变换阶段：沿共享搜索树选择，遇到未扩展的动作时调用LLM
 
-            # 随机选择一个变换
-            action = random.choice(available_actions)
+        已扩展的子节点直接复用其缓存的代码，相同的变换前缀只请求一次LLM；
+        子节点全部扩展后按带虚拟损失的UCT值选择分支
+        """
+        if self._stop_event.is_set():
+            self._finish_path(path)
+            return
+
+        action = None
+        with self._tree_lock:
+            node = path['node']
+            while node.depth < path['max_depth']:
+                self._load_actions(node)
+                expandable = [a for a in node.untried_actions if a not in node.pending_actions]
+                if expandable:
+                    action = random.choice(expandable)
+                    node.pending_actions.add(action)
+                    break
+
+                child = node.best_child(self.c_param)
+                if child is None:
+                    if node.pending_actions:
+                        # 其余动作正由其他路径扩展，等待其结果而不是重复请求LLM
+                        self._parked.setdefault(id(node), []).append(path)
+                        return
+                    break
+
+                # 沿已有分支下行，施加虚拟损失使并行路径分散到其他分支
+                child.virtual_loss += 1
+                path['visited'].append(child)
+                path['node'] = node = child
+                self.logger.info(f"路径 {path['id']} 复用已扩展节点: {child.action} (深度 {child.depth})")
+
+        if action is None:
+            if node.depth < path['max_depth']:
+                self.logger.info(f"没有更多可用变换，路径 {path['id']} 停止于第 {node.depth} 跳")
+            path['attempts'] = path['max_depth'] * 3
+            self._route(path)
+            return
+
+        path['attempts'] += 1
+        path['pending'] = (None, action)
+
+        # 应用变换
+        self.logger.info(f"路径 {path['id']} 尝试第 {node.depth + 1} 跳变换: {action}")
+        new_code = self._apply_transformation(node.state, action)
+
+        # 跳过未变化的代码（仅注释、空白或信号命名不同也视为未变化）
+        if VariantIndex.same(new_code, node.state):
+            self.logger.info(f"变换未产生代码变化，跳过")
+            self._record_failure(path)
+            self._route(path)
+            return
+
+        path['pending'] = (new_code, action)
+        self._stages['verify'].put(path)
+
+    def _record_failure(self, path, max_failures=2):
+        """记录一次扩展失败，同一动作失败达到上限后不再尝试"""
+        _, action = path['pending']
+        path['pending'] = None
+        with self._tree_lock:
+            node = path['node']
+            node.pending_actions.discard(action)
+            node.action_failures[action] = node.action_failures.get(action, 0) + 1
+            if node.action_failures[action] >= max_failures and action in node.untried_actions:
+                node.untried_actions.remove(action)
+            parked = self._parked.pop(id(node), [])
+        self._resume_parked(parked)
+
+    def _verify_step(self, paths):
+        """
+        验证阶段：按父节点分组批量检查变换前后的功能等价性，通过后将结果加入搜索树
 
+        配置了验证线程池时各组异步验证，返回在全部分组处理完成后结束的Future
+        """
+        if self._stop_event.is_set():
+            for path in paths:
+                self._finish_path(path)
+            return None
+
+        # 同一父节点的候选共用一个原始模块，合并为一次仿真
+        groups = {}
+        for path in paths:
+            groups.setdefault(id(path['node']), []).append(path)
+        groups = list(groups.values())
+
+        if self.verification_executor is None or self.job_queue is not None:
+            for group in groups:
+                results = self._verify_functionality_batch(
+                    group[0]['node'].state,
+                    [path['pending'][0] for path in group],
+                    max(path['attempts'] for path in group)
+                )
+                for path, equivalent in zip(group, results):
+                    self._accept_verified(path, equivalent)
+            return None
+
+        done = Future()
+        remaining = [len(groups)]
+        remaining_lock = threading.Lock()
+
+        def _on_verified(group, future):
             try:
-                # 记录变换尝试次数
-                transform_attempt += 1
-
-                # 应用变换
-                self.logger.info(f"尝试第 {current_depth + 1} 跳变换: {action}")
-                new_code = self._apply_transformation(current_code, action)
-
-                # 跳过未变化的代码
-                if new_code == current_code:
-                    self.logger.info(f"变换未产生代码变化，跳过")
+                try:
+                    results = future.result()
+                except Exception as e:
+                    self.logger.error(f"验证任务出错: {str(e)}")
+                    results = [False] * len(group)
+                for path, equivalent in zip(group, results):
+                    try:
+                        self._accept_verified(path, equivalent)
+                    except Exception as e:
+                        self.logger.error(f"处理验证结果出错: {str(e)}")
+                        self.logger.error(traceback.format_exc())
+                        self._finish_path(path)
+            finally:
+                with remaining_lock:
+                    remaining[0] -= 1
+                    finished = remaining[0] == 0
+                if finished:
+                    done.set_result(None)
+
+        for group in groups:
+            future = self.verification_executor.submit(
+                group[0]['node'].state,
+                [path['pending'][0] for path in group],
+                max(path['attempts'] for path in group)
+            )
+            future.add_done_callback(lambda f, group=group: _on_verified(group, f))
+
+        return done
+
+    def _accept_verified(self, path, equivalent):
+        """处理单条路径的验证结果：失败时记录失败，通过时加入或复用子节点"""
+        node = path['node']
+        new_code, action = path['pending']
+        self.transformer_manager.record_verification(node.state, action, new_code, equivalent)
+
+        if not equivalent:
+            self.logger.info(f"功能等价性验证失败，跳过此变换")
+            self._record_failure(path)
+            self._route(path)
+            return
+
+        path['pending'] = None
+        with self._tree_lock:
+            node.pending_actions.discard(action)
+
+            # 不同动作得到规范形式相同的代码时复用已有子节点
+            child = None
+            for existing in node.children:
+                if VariantIndex.same(existing.state, new_code):
+                    child = existing
+                    break
+
+            if child is None:
+                child = node.add_child(new_code, action)
+            elif action in node.untried_actions:
+                node.untried_actions.remove(action)
+
+            child.virtual_loss += 1
+            path['visited'].append(child)
+            path['node'] = child
+            parked = self._parked.pop(id(node), [])
+
+        self._resume_parked(parked)
+        self.logger.info(f"路径 {path['id']} 成功完成第 {child.depth} 跳变换: {action}")
+        self._route(path)
+
+    def _path_transformations(self, node):
+        """从根节点到给定节点的变换序列"""
+        transformations = []
+        while node is not None and node.parent is not None:
+            transformations.append(node.action)
+            node = node.parent
+        return list(reversed(transformations))
+
+    def _synth_step(self, paths):
+        """综合阶段：评估一批路径终点的PPA（同一批在一次Vivado运行中综合），结果缓存在节点上并作为奖励反向传播"""
+        rewards = [0.0] * len(paths)
+        try:
+            if self._stop_event.is_set():
+                return
+
+            pending = []
+            for i, path in enumerate(paths):
+                node = path['node']
+                if node.parent is None:
                     continue
-
-                # 验证功能等价性
-                if not self._verify_functionality(current_code, new_code, transform_attempt):
-                    self.logger.info(f"功能等价性验证失败，跳过此变换")
+                # 节点PPA已由其他路径评估过，直接复用
+                if node.ppa_metrics is not None:
+                    rewards[i] = self._ppa_change(node.ppa_metrics)
                     continue
-
-                # 更新当前状态
-                current_code = new_code
-                transformations.append(action)
-                current_depth += 1
-                self.logger.info(f"成功完成第 {current_depth} 跳变换: {action}")
-
-            except Exception as e:
-                self.logger.error(f"变换应用失败: {str(e)}")
-                continue
-
-        self.logger.info(f"路径探索完成，总共完成 {current_depth}/{path_max_depth} 跳变换")
-        return (current_code, transformations, transform_attempt)
+                pending.append(i)
+
+            if not pending:
+                return
+
+            if not self._first_synth_logged:
+                self._first_synth_logged = True
+                self.logger.info(f"首个候选进入综合，距搜索开始 {time.time() - self._search_start:.2f} 秒")
+
+            candidates = self._evaluate_candidates([
+                (paths[i]['node'].state, self._path_transformations(paths[i]['node']), paths[i]['attempts'])
+                for i in pending
+            ])
+            if not candidates:
+                return
+
+            metrics_by_code = {code: ppa_metrics for code, ppa_metrics, _, _ in candidates}
+            for i in pending:
+                node = paths[i]['node']
+                ppa_metrics = metrics_by_code.get(node.state)
+                if ppa_metrics is None:
+                    continue
+                node.ppa_metrics = ppa_metrics
+                self.transformer_manager.record_ppa(node.state, node.ppa_metrics)
+                rewards[i] = self._ppa_change(node.ppa_metrics)
+
+            with self._valuable_lock:
+                self._update_valuable_variants(candidates)
+                if len(self.valuable_variants) >= self.target_count:
+                    if not self._stop_event.is_set():
+                        self.logger.info(f"已达到目标变异数量 {self.target_count}，停止流水线")
+                    self._stop_event.set()
+        finally:
+            for path, reward in zip(paths, rewards):
+                self._finish_path(path, reward)
 
     def _evaluate_candidates(self, paths):
         """
@@ -199,32 +643,151 @@ class ParallelMCTSSearch:
         """
         candidates = []
 
-        # 过滤重复代码
+        # 过滤重复代码（按规范形式判重，包括此前批次已评估过的变体）
         unique_paths = []
-        unique_codes = set()
 
         for code, transforms, transform_depth in paths:
-            if code not in unique_codes and code != self.seed_code:
-                unique_codes.add(code)
+            if self.evaluated_index.add(code):
                 unique_paths.append((code, transforms, transform_depth))
+            else:
+                self.logger.info(f"跳过重复变体，变换序列: {transforms}")
+
+        # 代理模型预筛：跳过预计PPA变化达不到阈值的候选
+        if self.surrogate is not None:
+            unique_paths = self._screen_candidates(unique_paths)
 
         # 如果没有有效路径，直接返回
         if not unique_paths:
             return []
 
-        # 为了减少Vivado启动次数，逐个评估变体
+        # 多精度模式：全部候选先只做综合，再把部分候选提升到完整流程
+        if self.vivado_tool.fidelity == 'halving':
+            results = self._promote_candidates(unique_paths, self._synthesize(unique_paths, 'synth'))
+        else:
+            results = self._synthesize(unique_paths, self.vivado_tool.fidelity)
+
+        for (code, transforms, transform_depth), ppa_metrics in zip(unique_paths, results):
+            if ppa_metrics:
+                candidates.append((code, ppa_metrics, transforms, transform_depth))
+                self._observe_ppa(code, ppa_metrics)
+
+        return candidates
+
+    def _synthesize(self, unique_paths, fidelity):
+        """
+        以给定精度评估一批候选
+
+        Args:
+            unique_paths: 路径列表，每个元素为(代码, 变换序列, 变换深度)
+            fidelity: 评估精度 synth/full
+
+        Returns:
+            list: 与unique_paths顺序一致的PPA指标，评估失败的候选为None
+        """
+        # 启用任务队列时整批提交，由任意数量的工作进程并行综合
+        if self.job_queue is not None:
+            return self._synthesize_distributed(unique_paths, fidelity)
+
+        # 同一批变体在一次Vivado运行中综合，启动开销每批只付一次
         for i, (code, transforms, transform_depth) in enumerate(unique_paths):
-            # 对于每个变体单独评估PPA
+            self.logger.info(f"评估变体 {i + 1}/{len(unique_paths)} (精度: {fidelity}), 变换序列: {transforms}")
+        try:
+            with self._stage('synth'):
+                return self.vivado_tool.get_ppa_metrics_batch([code for code, _, _ in unique_paths], fidelity=fidelity)
+        except Exception as e:
+            self.logger.error(f"评估变体失败: {str(e)}")
+            return [None] * len(unique_paths)
+
+    def _promote_candidates(self, unique_paths, results):
+        """
+        按综合阶段的PPA变化挑选候选运行完整流程，完整流程失败的候选保留综合阶段的结果
+
+        Args:
+            unique_paths: 路径列表
+            results: 综合阶段的PPA指标列表
+
+        Returns:
+            list: 合并后的PPA指标列表
+        """
+        # 已是完整流程的结果（缓存命中或脚本不支持只综合）不再重复评估
+        scores = [self._ppa_change(ppa_metrics)
+                  if ppa_metrics and ppa_metrics.get('fidelity') != 'full' else None
+                  for ppa_metrics in results]
+        with self._fidelity_lock:
+            promoted = self.vivado_tool.select_promotions(scores, self.ppa_threshold, self._synth_scores)
+        if not promoted:
+            return results
+
+        self.logger.info(f"{len(promoted)}/{len(unique_paths)} 个候选提升到完整流程")
+        results = list(results)
+        full_results = self._synthesize([unique_paths[i] for i in promoted], 'full')
+        for i, ppa_metrics in zip(promoted, full_results):
+            if ppa_metrics:
+                results[i] = ppa_metrics
+        return results
+
+    def _screen_candidates(self, unique_paths):
+        """
+        用PPA代理模型预筛候选，预测失败的候选照常综合
+
+        Args:
+            unique_paths: 去重后的路径列表，每个元素为(代码, 变换序列, 变换深度)
+
+        Returns:
+            list: 需要综合的路径
+        """
+        selected_paths = []
+        for code, transforms, transform_depth in unique_paths:
             try:
-                self.logger.info(f"评估变体 {i + 1}/{len(unique_paths)}, 变换序列: {transforms}")
-                # 使用现有vivado工具评估PPA
-                ppa_metrics = self.vivado_tool.get_ppa_metrics(code)
-                if ppa_metrics:
-                    candidates.append((code, ppa_metrics, transforms, transform_depth))
+                selected, probability, _ = self.surrogate.screen(
+                    self.seed_code, self.seed_ppa, code, self._calculate_ppa_change, self.ppa_threshold)
             except Exception as e:
-                self.logger.error(f"评估变体 {i + 1} 失败: {str(e)}")
+                self.logger.warning(f"代理模型预测失败，照常综合: {str(e)}")
+                selected = True
+            if selected:
+                selected_paths.append((code, transforms, transform_depth))
+            else:
+                self.logger.info(f"代理模型预计PPA变化不足（通过概率 {probability:.2f}），跳过综合，变换序列: {transforms}")
+        return selected_paths
+
+    def _observe_ppa(self, code, ppa_metrics):
+        """把新的完整流程结果交给代理模型在线更新（代理模型以完整流程的PPA为目标）"""
+        if self.surrogate is None or ppa_metrics.get('fidelity', 'full') != 'full':
+            return
+        try:
+            self.surrogate.update(self.seed_code, self.seed_ppa, code, ppa_metrics,
+                                  change_fn=self._calculate_ppa_change, threshold=self.ppa_threshold)
+        except Exception as e:
+            self.logger.warning(f"代理模型在线更新失败: {str(e)}")
+
+    def _synthesize_distributed(self, unique_paths, fidelity):
+        """
+        通过任务队列批量评估候选变体
 
-        return candidates
+        Args:
+            unique_paths: 去重后的路径列表，每个元素为(代码, 变换序列, 变换深度)
+            fidelity: 评估精度 synth/full
+
+        Returns:
+            list: 与unique_paths顺序一致的PPA指标，评估失败的候选为None
+        """
+        try:
+            payloads = [{'code': code, 'fidelity': fidelity} for code, _, _ in unique_paths]
+            batch_id, job_ids = self.job_queue.submit_batch('synthesis', payloads)
+            results = self.job_queue.wait_batch(batch_id, job_ids, timeout=self.batch_timeout)
+        except Exception as e:
+            self.logger.error(f"分布式评估失败: {str(e)}")
+            import traceback
+            self.logger.error(traceback.format_exc())
+            return [None] * len(unique_paths)
+
+        for i, ((code, transforms, transform_depth), ppa_metrics) in enumerate(zip(unique_paths, results)):
+            if not ppa_metrics:
+                self.logger.warning(f"变体 {i + 1} 评估失败，变换序列: {transforms}")
+
+        succeeded = sum(1 for ppa_metrics in results if ppa_metrics)
+        self.logger.info(f"批次 {batch_id} 评估完成 (精度: {fidelity}): {succeeded}/{len(unique_paths)} 个变体获得PPA指标")
+        return list(results)
 
     def _update_valuable_variants(self, candidates):
         """
@@ -234,48 +797,86 @@ class ParallelMCTSSearch:
             candidates: 候选变体列表，每个元素为(代码, PPA指标, 变换序列, 变换深度)
         """
         for code, ppa_metrics, transforms, transform_depth in candidates:
-            # 计算PPA变化程度
-            ppa_change = self._calculate_ppa_change(self.seed_ppa, ppa_metrics)
+            # halving模式下可能通过阈值的候选都会提升，只有经完整流程确认的结果才算有价值的变异
+            if self.vivado_tool.fidelity == 'halving' and ppa_metrics.get('fidelity', 'full') != 'full':
+                continue
+
+            # 计算PPA变化程度（与同精度的种子PPA比较）
+            ppa_change = self._ppa_change(ppa_metrics)
 
             # 如果PPA变化超过阈值，认为是有价值的变异
             if ppa_change > self.ppa_threshold:
                 # 检查是否已存在
-                variant_exists = False
-                for existing_code, _ in self.valuable_variants:
-                    if existing_code == code:
-                        variant_exists = True
-                        break
-
-                if not variant_exists:
+                if self.valuable_index.add(code):
                     self.valuable_variants.append((code, ppa_metrics))
                     self.logger.info(
                         f"找到有价值的变异，PPA变化: {ppa_change:.2f}，变换序列: {transforms}，变换深度: {transform_depth}")
 
+    def _stage(self, name):
+        """占用共享的阶段并发额度，未配置额度时不做限制"""
+        if self.budget is None:
+            return nullcontext()
+        return self.budget.stage(name)
+
     def _get_available_actions(self, code):
         """获取适用于给定代码的所有变换动作"""
         return self.transformer_manager.get_available_transformations(code)
 
     def _apply_transformation(self, code, action):
         """应用变换动作到代码上"""
-        return self.transformer_manager.apply_transformation(code, action)
+        with self._stage('llm'):
+            return self.transformer_manager.apply_transformation(code, action)
 
-    def _verify_functionality(self, original_code, transformed_code, transform_count):
+    def _verify_functionality_batch(self, original_code, transformed_codes, transform_count):
         """
-        验证变换前后代码的功能等价性
+        批量验证多个候选与同一原始代码的功能等价性
 
         Args:
             original_code: 原始代码
-            transformed_code: 变换后的代码
+            transformed_codes: 变换后的代码列表
             transform_count: 变换计数
 
         Returns:
-            bool: 是否功能等价
+            list: 与transformed_codes顺序一致的等价性结果
+        """
+        if self.job_queue is not None:
+            payloads = [{
+                'original_code': original_code,
+                'transformed_code': code,
+                'transform_count': transform_count
+            } for code in transformed_codes]
+            batch_id, job_ids = self.job_queue.submit_batch('verification', payloads)
+            results = self.job_queue.wait_batch(batch_id, job_ids, timeout=self.batch_timeout)
+            return [bool(result and result.get('equivalent')) for result in results]
+
+        with self._stage('verify'):
+            return self.verifier.verify_equivalence_batch(
+                original_code,
+                transformed_codes,
+                transform_count=transform_count
+            )
+
+    def _reference_ppa(self, ppa_metrics):
+        """
+        与候选同精度的种子PPA
+
+        种子报告来自完整的布局布线流程，只综合的时延和功耗与之存在系统性偏差，
+        因此只综合的结果与种子的综合阶段PPA比较
         """
-        return self.verifier.verify_equivalence(
-            original_code,
-            transformed_code,
-            transform_count=transform_count
-        )
+        if not ppa_metrics or ppa_metrics.get('fidelity', 'full') == 'full':
+            return self.seed_ppa
+
+        with self._seed_synth_lock:
+            if not self._seed_synth_evaluated:
+                self._seed_synth_evaluated = True
+                self._seed_synth_ppa = self._synthesize([(self.seed_code, [], 0)], 'synth')[0]
+                if not self._seed_synth_ppa:
+                    self.logger.warning("种子综合阶段PPA评估失败，只综合的结果将不计PPA变化")
+            return self._seed_synth_ppa
+
+    def _ppa_change(self, ppa_metrics):
+        """候选相对同精度种子PPA的变化程度"""
+        return self._calculate_ppa_change(self._reference_ppa(ppa_metrics), ppa_metrics)
 
     def _calculate_ppa_change(self, base_ppa, current_ppa):
         """
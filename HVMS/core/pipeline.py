@@ -0,0 +1,119 @@
+import queue
+import logging
+import threading
+import traceback
+from concurrent.futures import Future
+
+
+class PipelineStage:
+    """
+    流水线中的一个阶段：有界输入队列 + 独立的并发上限
+
+    分发线程从输入队列取出任务，在并发额度允许时交给执行器运行，
+    处理函数负责把结果放入下一阶段的队列。batch_size大于1时，
+    分发线程会把队列中已积压的任务（至多batch_size个）合并为一批交给处理函数。
+    处理函数返回Future时，并发额度在Future完成后才释放，执行器线程可以先行返回。
+    """
+
+    def __init__(self, name, handler, submit, limit=1, queue_size=8, batch_size=1, on_error=None,
+                 logger=None):
+        """
+        初始化流水线阶段
+
+        Args:
+            name: 阶段名
+            handler: 处理函数，签名为 handler(item)；batch_size大于1时为 handler(items)
+            submit: 任务提交函数，签名为 submit(fn, *args)
+            limit: 本阶段同时处理的任务数上限（批量模式下为同时处理的批次数）
+            queue_size: 输入队列容量
+            batch_size: 单批最多合并的任务数，1表示不合并
+            on_error: 处理函数抛出异常时的回调，签名为 on_error(item, exception)，批量模式下对批内每个任务调用 (可选)
+            logger: 日志记录器
+        """
+        self.name = name
+        self.handler = handler
+        self.submit = submit
+        self.limit = max(1, limit)
+        self.batch_size = max(1, batch_size)
+        self.on_error = on_error
+        self.logger = logger or logging.getLogger(self.__class__.__name__)
+
+        self.queue = queue.Queue(maxsize=max(1, queue_size))
+        self.processed = 0
+        self._processed_lock = threading.Lock()
+
+        self._slots = threading.BoundedSemaphore(self.limit)
+        self._closed = threading.Event()
+        self._dispatcher = threading.Thread(target=self._dispatch_loop, daemon=True,
+                                            name=f"pipeline-{name}")
+        self._dispatcher.start()
+
+    def put(self, item):
+        """放入任务，队列满时阻塞"""
+        self.queue.put(item)
+
+    def _dispatch_loop(self):
+        """分发线程主循环"""
+        while not self._closed.is_set():
+            try:
+                item = self.queue.get(timeout=0.2)
+            except queue.Empty:
+                continue
+
+            self._slots.acquire()
+            if self.batch_size > 1:
+                # 获得额度后再收集积压任务，上一批处理期间到达的任务会合并进来
+                item = [item]
+                while len(item) < self.batch_size:
+                    try:
+                        item.append(self.queue.get_nowait())
+                    except queue.Empty:
+                        break
+            try:
+                self.submit(self._run, item)
+            except Exception as e:
+                self._slots.release()
+                self._fail(item, e)
+
+    def _run(self, item):
+        """在执行器线程中运行处理函数"""
+        try:
+            result = self.handler(item)
+        except Exception as e:
+            self._fail(item, e)
+            self._done(item)
+            return
+
+        if isinstance(result, Future):
+            result.add_done_callback(lambda future: self._complete(item, future))
+        else:
+            self._done(item)
+
+    def _complete(self, item, future):
+        """处理函数返回的Future完成"""
+        try:
+            error = future.exception()
+        except Exception as e:  # Future被取消
+            error = e
+        if error is not None:
+            self._fail(item, error)
+        self._done(item)
+
+    def _done(self, item):
+        """任务处理结束，释放并发额度"""
+        with self._processed_lock:
+            self.processed += len(item) if self.batch_size > 1 else 1
+        self._slots.release()
+
+    def _fail(self, item, error):
+        """记录处理异常"""
+        self.logger.error(f"流水线阶段 {self.name} 处理失败: {str(error)}")
+        self.logger.debug(traceback.format_exc())
+        if self.on_error is not None:
+            for each in (item if self.batch_size > 1 else [item]):
+                self.on_error(each, error)
+
+    def close(self):
+        """停止分发线程"""
+        self._closed.set()
+        self._dispatcher.join(timeout=5)
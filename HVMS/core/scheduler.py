@@ -0,0 +1,277 @@
+import os
+import json
+import time
+import logging
+import threading
+import traceback
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import Future, ThreadPoolExecutor
+
+
+class StageBudget:
+    """各流水线阶段（LLM、功能验证、综合）的全局并发额度，由所有种子的搜索共享"""
+
+    STAGES = ('llm', 'verify', 'synth')
+
+    def __init__(self, llm=4, verify=4, synth=2):
+        """
+        初始化阶段并发额度
+
+        Args:
+            llm: 同时进行的LLM调用数
+            verify: 同时进行的iverilog验证数
+            synth: 同时进行的Vivado综合数
+        """
+        self.limits = {'llm': llm, 'verify': verify, 'synth': synth}
+        self._semaphores = {name: threading.BoundedSemaphore(max(1, limit))
+                            for name, limit in self.limits.items()}
+
+    @contextmanager
+    def stage(self, name):
+        """
+        占用一个阶段额度
+
+        Args:
+            name: 阶段名 ('llm', 'verify' 或 'synth')
+        """
+        semaphore = self._semaphores[name]
+        semaphore.acquire()
+        try:
+            yield
+        finally:
+            semaphore.release()
+
+
+class WorkStealingExecutor:
+    """
+    多种子共享的工作窃取线程池
+
+    每个种子拥有独立的任务双端队列，每个工作线程绑定一个主队列：
+    优先从主队列尾部取任务（后进先出，利于局部性），主队列为空时
+    从其他种子队列头部窃取最早提交的任务，避免某个种子任务少时线程空闲。
+    """
+
+    def __init__(self, num_workers=4, logger=None):
+        """
+        初始化线程池
+
+        Args:
+            num_workers: 工作线程数
+            logger: 日志记录器
+        """
+        self.num_workers = num_workers
+        self.logger = logger or logging.getLogger(self.__class__.__name__)
+
+        self._queues = {}
+        self._owners = []
+        self._condition = threading.Condition()
+        self._shutdown = False
+        self.steals = 0
+
+        self._threads = []
+        for i in range(num_workers):
+            thread = threading.Thread(target=self._worker_loop, args=(i,), daemon=True,
+                                      name=f"hvms-worker-{i}")
+            thread.start()
+            self._threads.append(thread)
+
+    def register(self, owner):
+        """注册一个种子的任务队列"""
+        with self._condition:
+            if owner not in self._queues:
+                self._queues[owner] = deque()
+                self._owners.append(owner)
+
+    def unregister(self, owner):
+        """注销种子的任务队列，未执行的任务会被取消"""
+        with self._condition:
+            tasks = self._queues.pop(owner, None)
+            if owner in self._owners:
+                self._owners.remove(owner)
+        for future, _, _, _ in tasks or []:
+            future.cancel()
+
+    def submit(self, owner, fn, *args, **kwargs):
+        """
+        提交任务
+
+        Args:
+            owner: 任务所属种子
+            fn: 任务函数
+
+        Returns:
+            Future: 任务结果
+        """
+        future = Future()
+        with self._condition:
+            if self._shutdown:
+                raise RuntimeError("线程池已关闭")
+            if owner not in self._queues:
+                self._queues[owner] = deque()
+                self._owners.append(owner)
+            self._queues[owner].append((future, fn, args, kwargs))
+            self._condition.notify()
+        return future
+
+    def _next_task(self, worker_index):
+        """取出下一个任务，调用时需持有锁"""
+        if not self._owners:
+            return None
+
+        # 工作线程按编号轮流绑定到各种子的主队列
+        home = self._owners[worker_index % len(self._owners)]
+        home_queue = self._queues.get(home)
+        if home_queue:
+            return home_queue.pop()
+
+        # 主队列为空，从积压最多的队列头部窃取
+        victim = max(self._owners, key=lambda owner: len(self._queues[owner]))
+        if self._queues[victim]:
+            self.steals += 1
+            return self._queues[victim].popleft()
+        return None
+
+    def _worker_loop(self, worker_index):
+        """工作线程主循环"""
+        while True:
+            with self._condition:
+                task = self._next_task(worker_index)
+                while task is None:
+                    if self._shutdown:
+                        return
+                    self._condition.wait()
+                    task = self._next_task(worker_index)
+
+            future, fn, args, kwargs = task
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except BaseException as e:
+                future.set_exception(e)
+
+    def shutdown(self, wait=True):
+        """关闭线程池"""
+        with self._condition:
+            self._shutdown = True
+            self._condition.notify_all()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+
+class ProgressStore:
+    """线程安全的种子处理进度文件，每次更新以原子替换方式写入"""
+
+    def __init__(self, progress_file, logger=None):
+        """
+        初始化进度存储
+
+        Args:
+            progress_file: 进度文件路径
+            logger: 日志记录器
+        """
+        self.progress_file = progress_file
+        self.logger = logger or logging.getLogger(self.__class__.__name__)
+        self._lock = threading.Lock()
+        self._data = self._load()
+
+    def _load(self):
+        """加载已有进度"""
+        if not os.path.exists(self.progress_file):
+            return {}
+        try:
+            with open(self.progress_file, 'r') as f:
+                data = json.load(f)
+            self.logger.info(f"加载进度文件，已处理 {len(data)} 个种子文件")
+            return data
+        except Exception as e:
+            self.logger.error(f"加载进度文件失败: {str(e)}")
+            return {}
+
+    def __contains__(self, seed_name):
+        with self._lock:
+            return seed_name in self._data
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+    def mark_done(self, seed_name, variations_count):
+        """
+        记录种子处理完成并保存进度文件
+
+        Args:
+            seed_name: 种子名称
+            variations_count: 生成的变异数量
+        """
+        with self._lock:
+            self._data[seed_name] = {
+                "processed_time": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "variations_count": variations_count
+            }
+            snapshot = dict(self._data)
+
+            # 写临时文件后替换，保证进度文件在任意时刻都完整
+            tmp_file = f"{self.progress_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+            try:
+                with open(tmp_file, 'w') as f:
+                    json.dump(snapshot, f, indent=2)
+                os.replace(tmp_file, self.progress_file)
+            except Exception as e:
+                self.logger.error(f"保存进度文件失败: {str(e)}")
+                if os.path.exists(tmp_file):
+                    os.remove(tmp_file)
+
+
+class SeedScheduler:
+    """同时处理多个种子的调度器，各种子的路径探索任务共享同一个工作窃取线程池"""
+
+    def __init__(self, max_parallel_seeds=2, num_workers=4, budget=None, logger=None):
+        """
+        初始化种子调度器
+
+        Args:
+            max_parallel_seeds: 同时处理的种子数
+            num_workers: 共享工作线程数
+            budget: 阶段并发额度 (可选，StageBudget实例)
+            logger: 日志记录器
+        """
+        self.max_parallel_seeds = max(1, max_parallel_seeds)
+        self.budget = budget
+        self.logger = logger or logging.getLogger(self.__class__.__name__)
+        self.executor = WorkStealingExecutor(num_workers=num_workers, logger=self.logger)
+
+    def run(self, seed_files, process_seed):
+        """
+        并发处理种子文件
+
+        Args:
+            seed_files: 种子文件列表
+            process_seed: 处理单个种子的函数，签名为 process_seed(seed_file, index, executor)
+
+        Returns:
+            list: 与seed_files顺序一致的处理结果，出错的种子为None
+        """
+        results = [None] * len(seed_files)
+
+        def _run_one(index, seed_file):
+            self.executor.register(seed_file)
+            try:
+                results[index] = process_seed(seed_file, index, self.executor)
+            except Exception as e:
+                self.logger.error(f"处理种子 {os.path.basename(seed_file)} 时出错: {str(e)}")
+                self.logger.error(traceback.format_exc())
+            finally:
+                self.executor.unregister(seed_file)
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_parallel_seeds) as drivers:
+                for index, seed_file in enumerate(seed_files):
+                    drivers.submit(_run_one, index, seed_file)
+        finally:
+            self.executor.shutdown()
+
+        self.logger.info(f"种子调度完成，跨种子窃取任务 {self.executor.steals} 次")
+        return results
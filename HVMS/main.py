@@ -13,6 +13,9 @@ def main():
     parser.add_argument('--variations', type=int, help='每个种子代码的目标变异数量 (可选，默认使用配置文件值)')
     parser.add_argument('--verbose', action='store_true', help='启用详细日志输出')
     parser.add_argument('--reset-progress', action='store_true', help='重置进度，从头开始处理所有种子文件')
+    parser.add_argument('--worker', action='store_true', help='以工作进程模式运行，从分布式任务队列领取综合和验证任务')
+    parser.add_argument('--worker-id', help='工作进程标识 (可选，默认使用主机名和进程号)')
+    parser.add_argument('--idle-timeout', type=float, help='工作进程模式下队列持续为空多久后退出(秒) (可选)')
 
     args = parser.parse_args()
 
@@ -28,6 +31,12 @@ def main():
         # 创建HVMS框架实例
         hvms = HVMSFramework(config_path=config_path)
 
+        # 工作进程模式
+        if args.worker:
+            jobs_done = hvms.run_worker(worker_id=args.worker_id, idle_timeout=args.idle_timeout)
+            print(f"工作进程退出，共执行 {jobs_done} 个任务")
+            return 0
+
         # 如果需要重置进度
         if args.reset_progress:
             progress_file = os.path.join(os.path.dirname(hvms.output_verilog_path), "progress.json")
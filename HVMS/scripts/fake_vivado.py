@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Vivado替身脚本，用于在没有安装Vivado的环境中调试HVMS的综合流程
+
+支持与真实Vivado相同的调用方式:
+  fake_vivado.py -mode batch -source <tcl> -tclargs <verilog_file> <module_name> <fpga_part> <work_dir> ...
+  fake_vivado.py -mode batch -source vivado_batch.tcl -tclargs <manifest_file> <fpga_part> <synth_script> ...
+  fake_vivado.py -mode tcl   (从标准输入读取hvms_session.tcl协议命令)
+
+环境变量:
+  FAKE_VIVADO_DELAY    每个阶段的模拟耗时(秒)，默认0
+  FAKE_VIVADO_STARTUP  启动耗时(秒)，默认0
+  FAKE_VIVADO_PROMPT   -mode tcl下协议标记前附加的提示符 (如 "Vivado% ")，默认无
+
+模块名包含"crash"时进程直接退出，包含"fail"时任务失败，用于测试异常恢复
+"""
+import os
+import re
+import sys
+import time
+
+
+def _stage_delay():
+    time.sleep(float(os.environ.get("FAKE_VIVADO_DELAY", "0")))
+
+
+def _split_tcl_words(command):
+    """按Tcl规则拆分花括号参数"""
+    return [a if a else b for a, b in re.findall(r'\{([^{}]*)\}|(\S+)', command)]
+
+
+def synthesize(verilog_file, module_name, fpga_part, work_dir, extra_args=()):
+    """模拟综合流程并写出PPA报告"""
+    if "crash" in module_name:
+        sys.stdout.flush()
+        os._exit(3)
+
+    print(f"Verilog文件: {verilog_file}")
+    print(f"模块名: {module_name}")
+    print("HVMS_STAGE synthesis")
+    print("开始综合...", flush=True)
+    _stage_delay()
+
+    if "fail" in module_name:
+        print("综合失败或未完成", flush=True)
+        return False
+
+    with open(verilog_file, 'r', encoding='utf-8', errors='ignore') as f:
+        code = f.read()
+
+    # 根据代码结构生成确定性的伪PPA指标
+    lut = len(re.findall(r'[&|^+\-*?]', code)) + 1
+    ff = len(re.findall(r'<=', code))
+    io = len(re.findall(r'\b(?:input|output)\b', code)) * 4
+    cells = lut + ff + io
+    delay = 0.5 + 0.1 * lut
+    print("综合完成", flush=True)
+
+    fidelity = "full"
+    for arg in extra_args:
+        if arg in ("synth", "full"):
+            fidelity = arg
+
+    if fidelity == "full":
+        print("HVMS_STAGE implementation")
+        print("开始实现...", flush=True)
+        _stage_delay()
+        print("实现完成", flush=True)
+    else:
+        # 只综合时没有布线延迟，时延和功耗系统性偏低
+        delay *= 0.7
+
+    report = os.path.join(work_dir, f"{module_name}_ppa_report.txt")
+    print("HVMS_STAGE report")
+    print(f"生成PPA报告: {report}", flush=True)
+    with open(report, 'w') as f:
+        f.write(f"PPA Report for {module_name}.v (Module: {module_name})\n")
+        f.write("==========================================\n\n")
+        f.write(f"FPGA Device: {fpga_part} (UltraScale+ 16nm Technology)\n")
+        f.write(f"Fidelity: {fidelity}\n\n")
+        f.write("AREA METRICS:\n------------\n")
+        f.write(f"LUT Count: {lut}\nFF Count: {ff}\nIO Count: {io}\nCell Count: {cells}\n\n")
+        f.write("PERFORMANCE METRICS:\n-------------------\n")
+        if ff:
+            f.write(f"Maximum Clock Frequency: {1000.0 / (delay + 1.0):.2f} MHz\n")
+        else:
+            f.write("Maximum Clock Frequency: N/A (Combinational logic)\n")
+        f.write(f"Longest Path Delay: {delay:.3f} ns\n\n")
+        f.write("POWER METRICS:\n-------------\n")
+        f.write(f"Total Power Consumption: {(0.4 + 0.001 * cells) * (1.0 if fidelity == 'full' else 0.8):.3f} W\n")
+    print("处理完成", flush=True)
+    return True
+
+
+def run_manifest(tclargs):
+    """按vivado_batch.tcl的清单协议依次综合多个模块，每个模块结束后写入status.txt"""
+    if len(tclargs) < 3:
+        print("错误: 需要至少3个参数: <manifest_file> <fpga_part> <synth_script> ?extra_args?")
+        return 1
+    manifest_file, fpga_part, _, extra_args = tclargs[0], tclargs[1], tclargs[2], tclargs[3:]
+    with open(manifest_file, 'r', encoding='utf-8') as f:
+        entries = [line.split("\t") for line in f.read().strip().split("\n") if line]
+
+    for index, (module_name, verilog_file, job_dir) in enumerate(entries, 1):
+        print(f"HVMS_BATCH_MODULE {index}/{len(entries)} {module_name}", flush=True)
+        try:
+            ok = synthesize(verilog_file, module_name, fpga_part, job_dir, extra_args)
+        except Exception as e:
+            print(f"HVMS_BATCH_ERROR {module_name} {e}")
+            ok = False
+        with open(os.path.join(job_dir, "status.txt"), 'w') as f:
+            f.write("ok\n" if ok else "error\n")
+
+    print("HVMS_BATCH_COMPLETE", flush=True)
+    return 0
+
+
+def run_batch(args):
+    tclargs = args[args.index("-tclargs") + 1:] if "-tclargs" in args else []
+    source = args[args.index("-source") + 1] if "-source" in args else ""
+    if os.path.basename(source) == "vivado_batch.tcl":
+        return run_manifest(tclargs)
+    if len(tclargs) < 4:
+        print("错误: 需要4个参数: <verilog_file> <module_name> <fpga_part> <work_dir>")
+        return 1
+    # 与vivado_synth.tcl一致：综合失败时仍以0退出，由调用方检查报告是否生成
+    synthesize(*tclargs[:4], extra_args=tclargs[4:])
+    return 0
+
+
+def run_tcl_session():
+    prompt = os.environ.get("FAKE_VIVADO_PROMPT", "")
+    for line in sys.stdin:
+        words = _split_tcl_words(line.strip())
+        if not words:
+            continue
+
+        if words[0] == "exit":
+            return 0
+
+        if words[0] == "source" and len(words) > 1:
+            if words[1].endswith("hvms_session.tcl"):
+                print(f"{prompt}HVMS_SESSION_READY", flush=True)
+            continue
+
+        if words[0] == "hvms_run_job" and len(words) >= 7:
+            job_id = words[1]
+            extra_args = words[7].split() if len(words) > 7 else []
+            try:
+                os.chdir(words[6])
+                ok = synthesize(words[3], words[4], words[5], words[6], extra_args)
+            except Exception as e:
+                print(f"HVMS_JOB_ERROR {job_id} {e}")
+                ok = False
+            print(f"{prompt}HVMS_JOB_DONE {job_id} {'ok' if ok else 'error'}", flush=True)
+            continue
+
+        print(f"invalid command name \"{words[0]}\"", flush=True)
+    return 0
+
+
+def main(args):
+    time.sleep(float(os.environ.get("FAKE_VIVADO_STARTUP", "0")))
+    mode = args[args.index("-mode") + 1] if "-mode" in args else "tcl"
+    if mode == "batch":
+        return run_batch(args)
+    return run_tcl_session()
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
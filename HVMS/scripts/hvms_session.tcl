@@ -0,0 +1,51 @@
+# hvms_session.tcl
+# 常驻Vivado Tcl会话的任务驱动脚本
+#
+# 在 vivado -mode tcl 会话中 source 本脚本后，通过标准输入发送:
+#   hvms_run_job <job_id> <tcl_script> <verilog_file> <module_name> <fpga_part> <work_dir>
+# 每个任务以 "HVMS_JOB_DONE <job_id> <ok|error>" 结束，供Python侧解析
+
+# 任务执行期间拦截综合脚本中的exit，避免退出常驻会话
+if {[llength [info commands ::hvms_real_exit]] == 0} {
+    rename ::exit ::hvms_real_exit
+    proc ::exit {{code 0}} {
+        if {[info exists ::hvms_in_job] && $::hvms_in_job} {
+            return -code error "HVMS_EXIT $code"
+        }
+        ::hvms_real_exit $code
+    }
+}
+
+set ::hvms_in_job 0
+
+proc hvms_run_job {job_id tcl_script verilog_file module_name fpga_part work_dir {extra_args {}}} {
+    # 以与批处理模式相同的参数形式调用综合脚本
+    set ::argv [concat [list $verilog_file $module_name $fpga_part $work_dir] $extra_args]
+    set ::argc [llength $::argv]
+    set ::hvms_in_job 1
+    set status "ok"
+    set old_dir [pwd]
+
+    if {[catch {
+        cd $work_dir
+        uplevel #0 [list source $tcl_script]
+    } err]} {
+        if {![string match "HVMS_EXIT 0*" $err]} {
+            set status "error"
+            puts "HVMS_JOB_ERROR $job_id $err"
+        }
+    }
+
+    set ::hvms_in_job 0
+
+    # 重置会话状态，供下一个任务使用
+    catch {close_design}
+    catch {close_project}
+    catch {cd $old_dir}
+
+    puts "HVMS_JOB_DONE $job_id $status"
+    flush stdout
+}
+
+puts "HVMS_SESSION_READY"
+flush stdout
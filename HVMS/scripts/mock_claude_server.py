@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Claude Messages API模拟服务器，用于在本地调试ClaudeAgent的并发、限流和重试行为
+
+用法:
+  mock_claude_server.py [--port 8765] [--latency 0.5] [--rate-limit-every 0] [--retry-after 1]
+
+将配置文件中的 agent.api_url 设为 http://127.0.0.1:8765/v1/messages 即可。
+服务器把提示中的第一段Verilog代码原样返回，并在endmodule前追加一行注释。
+--rate-limit-every N 表示每N个请求返回一次429（附带Retry-After）。
+"""
+import re
+import sys
+import json
+import time
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class MockClaudeHandler(BaseHTTPRequestHandler):
+    """处理 /v1/messages 请求"""
+
+    protocol_version = "HTTP/1.1"  # 支持keep-alive
+    counter = 0
+    counter_lock = threading.Lock()
+    in_flight = 0
+    max_in_flight = 0
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, body, headers=None):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+
+        cls = self.__class__
+        with cls.counter_lock:
+            cls.counter += 1
+            request_no = cls.counter
+            cls.in_flight += 1
+            cls.max_in_flight = max(cls.max_in_flight, cls.in_flight)
+
+        try:
+            if self.server.rate_limit_every and request_no % self.server.rate_limit_every == 0:
+                self._send_json(429, {"type": "error", "error": {"type": "rate_limit_error"}},
+                                {"Retry-After": str(self.server.retry_after)})
+                return
+
+            time.sleep(self.server.latency)
+
+            prompt = payload.get("messages", [{}])[0].get("content", "")
+            match = re.search(r'```verilog\s*([\s\S]*?)```', prompt)
+            code = match.group(1).strip() if match else "module mock(input a, output y);\nassign y = a;\nendmodule"
+            code = code.replace("endmodule", f"// mock response {request_no}\nendmodule", 1)
+
+            self._send_json(200, {
+                "id": f"msg_mock_{request_no}",
+                "type": "message",
+                "role": "assistant",
+                "content": [{"type": "text", "text": f"```verilog\n{code}\n```"}]
+            })
+        finally:
+            with cls.counter_lock:
+                cls.in_flight -= 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Claude API模拟服务器')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.5, help='每个请求的模拟耗时(秒)')
+    parser.add_argument('--rate-limit-every', type=int, default=0, help='每N个请求返回一次429')
+    parser.add_argument('--retry-after', type=float, default=1, help='429响应中的Retry-After(秒)')
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), MockClaudeHandler)
+    server.latency = args.latency
+    server.rate_limit_every = args.rate_limit_every
+    server.retry_after = args.retry_after
+    server.daemon_threads = True
+
+    print(f"模拟Claude API服务器已启动: http://127.0.0.1:{args.port}/v1/messages", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"共处理 {MockClaudeHandler.counter} 个请求，最大并发 {MockClaudeHandler.max_in_flight}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,61 @@
+# vivado_batch.tcl
+# 在一次Vivado批处理运行中依次综合多个模块，Vivado启动开销每批只付一次
+#
+# 参数:
+# - argv[0]: 任务清单文件，每行一个模块: <模块名>\t<Verilog文件路径>\t<工作目录>
+# - argv[1]: FPGA型号
+# - argv[2]: 单模块综合脚本 (vivado_synth.tcl)
+# - argv[3...]: 传给单模块综合脚本的额外参数 (可选，如评估精度)
+#
+# 每个模块以与单独运行相同的参数调用单模块综合脚本，报告写入该模块的工作目录；
+# 模块结束后在其工作目录写入status.txt (ok/error)，单个模块出错不影响其余模块
+
+if {$argc < 3} {
+    puts "错误: 需要至少3个参数: <manifest_file> <fpga_part> <synth_script> ?extra_args?"
+    exit 1
+}
+
+# 单模块脚本结束时会调用exit，执行期间将其转为错误，避免结束整个批处理
+rename ::exit ::hvms_real_exit
+proc ::exit {{code 0}} {
+    return -code error "HVMS_EXIT $code"
+}
+
+proc hvms_run_batch {manifest_file fpga_part synth_script extra_args} {
+    set fd [open $manifest_file r]
+    fconfigure $fd -encoding utf-8
+    set entries [split [string trim [read $fd]] "\n"]
+    close $fd
+
+    set index 0
+    foreach entry $entries {
+        incr index
+        lassign [split $entry "\t"] module_name verilog_file job_dir
+        puts "HVMS_BATCH_MODULE $index/[llength $entries] $module_name"
+
+        # 以与批处理模式相同的参数形式调用单模块综合脚本
+        set ::argv [concat [list $verilog_file $module_name $fpga_part $job_dir] $extra_args]
+        set ::argc [llength $::argv]
+        set status "ok"
+        if {[catch {uplevel #0 [list source $synth_script]} err]} {
+            if {![string match "HVMS_EXIT 0*" $err]} {
+                set status "error"
+                puts "HVMS_BATCH_ERROR $module_name $err"
+            }
+        }
+
+        # 重置工程，供下一个模块使用
+        catch {close_design}
+        catch {close_project}
+
+        set status_fd [open [file join $job_dir "status.txt"] w]
+        puts $status_fd $status
+        close $status_fd
+        flush stdout
+    }
+}
+
+hvms_run_batch [lindex $argv 0] [lindex $argv 1] [lindex $argv 2] [lrange $argv 3 end]
+
+puts "HVMS_BATCH_COMPLETE"
+::hvms_real_exit 0
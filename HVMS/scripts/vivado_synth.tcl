@@ -6,6 +6,7 @@
 # - argv[1]: 模块名
 # - argv[2]: FPGA型号
 # - argv[3]: 工作目录
+# - argv[4]: 评估精度 (可选) full: 综合+实现 (默认)；synth: 只运行综合，功耗在综合网表上估算
 
 # 提取命令行参数
 if {$argc < 4} {
@@ -17,12 +18,17 @@ set verilog_file [lindex $argv 0]
 set module_name [lindex $argv 1]
 set fpga_part [lindex $argv 2]
 set work_dir [lindex $argv 3]
+set fidelity "full"
+if {$argc > 4} {
+    set fidelity [lindex $argv 4]
+}
 
 # 打印参数
 puts "Verilog文件: $verilog_file"
 puts "模块名: $module_name"
 puts "FPGA型号: $fpga_part"
 puts "工作目录: $work_dir"
+puts "评估精度: $fidelity"
 
 # 设置输出文件路径
 set utilization_rpt "$work_dir/utilization.rpt"
@@ -95,6 +101,32 @@ add_files -fileset constrs_1 $xdc_file
 set_property used_in_synthesis true [get_files $xdc_file]
 set_property used_in_implementation true [get_files $xdc_file]
 
+# 从功耗报告中提取总功耗、动态功耗和静态功耗
+proc read_power_report {power_rpt total_var dynamic_var static_var} {
+    upvar $total_var total_power
+    upvar $dynamic_var dynamic_power
+    upvar $static_var static_power
+
+    set power_file [open $power_rpt r]
+    set power_data [read $power_file]
+    close $power_file
+
+    # 提取总功耗
+    if {[regexp {Total On-Chip Power \(W\)\s*\|\s*(\d+\.\d+)} $power_data match power_val]} {
+        set total_power $power_val
+    }
+
+    # 提取动态功耗
+    if {[regexp {Dynamic \(W\)\s*\|\s*(\d+\.\d+)} $power_data match dynamic_val]} {
+        set dynamic_power $dynamic_val
+    }
+
+    # 提取静态功耗
+    if {[regexp {Device Static \(W\)\s*\|\s*(\d+\.\d+)} $power_data match static_val]} {
+        set static_power $static_val
+    }
+}
+
 # 初始化PPA指标变量
 set lut_count "N/A"
 set ff_count "N/A"
@@ -107,30 +139,17 @@ set dynamic_power "N/A"
 set static_power "N/A"
 
 # 运行综合
+puts "HVMS_STAGE synthesis"
 puts "开始综合..."
 reset_run synth_1
 launch_runs synth_1 -jobs 4
 
-# 等待综合完成，最多15分钟
-set timeout_seconds 900
-set start_time [clock seconds]
-set completed 0
-
-while {!$completed} {
-    # 检查综合是否完成
-    if {[get_property PROGRESS [get_runs synth_1]] == "100%"} {
-        set completed 1
-    }
-
-    # 检查超时
-    set current_time [clock seconds]
-    if {[expr {$current_time - $start_time}] > $timeout_seconds} {
-        puts "警告: 综合超时，超过 $timeout_seconds 秒"
-        break
-    }
-
-    # 避免CPU过载
-    after 5000
+# 等待综合完成，最多15分钟（wait_on_run在run结束时立即返回，-timeout单位为分钟）
+if {[catch {wait_on_run synth_1 -timeout 15} result]} {
+    puts "警告: 等待综合时出错: $result"
+}
+if {[get_property PROGRESS [get_runs synth_1]] != "100%"} {
+    puts "警告: 综合超时，超过 900 秒"
 }
 
 # 检查综合是否成功
@@ -245,115 +264,91 @@ if {[get_property PROGRESS [get_runs synth_1]] == "100%" &&
         }
     }
 
-    # 运行实现
-    puts "开始实现..."
-    reset_run impl_1
-    launch_runs impl_1 -jobs 4
-
-    # 等待实现完成，最多20分钟
-    set timeout_seconds 1200
-    set start_time [clock seconds]
-    set completed 0
-
-    while {!$completed} {
-        # 检查实现是否完成
-        if {[get_property PROGRESS [get_runs impl_1]] == "100%"} {
-            set completed 1
+    if {$fidelity == "synth"} {
+        # 只综合：在综合网表上估算功耗，不运行实现
+        puts "仅综合模式，跳过实现"
+        report_power -file $power_rpt
+        read_power_report $power_rpt total_power dynamic_power static_power
+    } else {
+        # 运行实现
+        puts "HVMS_STAGE implementation"
+        puts "开始实现..."
+        reset_run impl_1
+        launch_runs impl_1 -jobs 4
+
+        # 等待实现完成，最多20分钟
+        if {[catch {wait_on_run impl_1 -timeout 20} result]} {
+            puts "警告: 等待实现时出错: $result"
         }
-
-        # 检查超时
-        set current_time [clock seconds]
-        if {[expr {$current_time - $start_time}] > $timeout_seconds} {
-            puts "警告: 实现超时，超过 $timeout_seconds 秒"
-            break
+        if {[get_property PROGRESS [get_runs impl_1]] != "100%"} {
+            puts "警告: 实现超时，超过 1200 秒"
         }
 
-        # 避免CPU过载
-        after 5000
-    }
-
-    # 检查实现是否成功
-    if {[get_property PROGRESS [get_runs impl_1]] == "100%" &&
-        [get_property STATUS [get_runs impl_1]] != "Route Design ERROR"} {
+        # 检查实现是否成功
+        if {[get_property PROGRESS [get_runs impl_1]] == "100%" &&
+            [get_property STATUS [get_runs impl_1]] != "Route Design ERROR"} {
 
-        puts "实现完成"
+            puts "实现完成"
 
-        # 打开实现结果
-        open_run impl_1
+            # 打开实现结果
+            open_run impl_1
 
-        # 生成功耗报告
-        report_power -file $power_rpt
-
-        # 提取功耗数据
-        set power_file [open $power_rpt r]
-        set power_data [read $power_file]
-        close $power_file
+            # 生成功耗报告并提取功耗数据
+            report_power -file $power_rpt
+            read_power_report $power_rpt total_power dynamic_power static_power
 
-        # 提取总功耗
-        if {[regexp {Total On-Chip Power \(W\)\s*\|\s*(\d+\.\d+)} $power_data match power_val]} {
-            set total_power $power_val
-        }
+            # 如果是时序设计，再次提取时序信息（可能更准确）
+            if {$has_clock} {
+                report_timing_summary -file "${work_dir}/impl_timing.rpt"
 
-        # 提取动态功耗
-        if {[regexp {Dynamic \(W\)\s*\|\s*(\d+\.\d+)} $power_data match dynamic_val]} {
-            set dynamic_power $dynamic_val
-        }
+                set timing_file [open "${work_dir}/impl_timing.rpt" r]
+                set timing_data [read $timing_file]
+                close $timing_file
 
-        # 提取静态功耗
-        if {[regexp {Device Static \(W\)\s*\|\s*(\d+\.\d+)} $power_data match static_val]} {
-            set static_power $static_val
-        }
+                # 查找WNS
+                if {[regexp {WNS(?:\(ns\))?\s*\|?\s*(-?\d+\.\d+)} $timing_data match wns]} {
+                    # 从WNS计算最大频率
+                    set period 10.000
+                    set slack [expr double($wns)]
 
-        # 如果是时序设计，再次提取时序信息（可能更准确）
-        if {$has_clock} {
-            report_timing_summary -file "${work_dir}/impl_timing.rpt"
-
-            set timing_file [open "${work_dir}/impl_timing.rpt" r]
-            set timing_data [read $timing_file]
-            close $timing_file
-
-            # 查找WNS
-            if {[regexp {WNS(?:\(ns\))?\s*\|?\s*(-?\d+\.\d+)} $timing_data match wns]} {
-                # 从WNS计算最大频率
-                set period 10.000
-                set slack [expr double($wns)]
-
-                # 如果slack为正，则满足时序约束
-                if {$slack >= 0} {
-                    set max_freq [format "%.2f" [expr {1000.0 / $period}]]
-                } else {
-                    # 如果slack为负，则计算实际可达最大频率
-                    set actual_period [expr {$period - $slack}]
-                    set max_freq [format "%.2f" [expr {1000.0 / $actual_period}]]
-                }
+                    # 如果slack为正，则满足时序约束
+                    if {$slack >= 0} {
+                        set max_freq [format "%.2f" [expr {1000.0 / $period}]]
+                    } else {
+                        # 如果slack为负，则计算实际可达最大频率
+                        set actual_period [expr {$period - $slack}]
+                        set max_freq [format "%.2f" [expr {1000.0 / $actual_period}]]
+                    }
 
-                # 提取关键路径延迟
-                if {[regexp {data path delay:\s+(\d+\.\d+)} $timing_data match path_delay]} {
-                    set longest_path $path_delay
-                } elseif {[regexp {Data Path Delay:\s+(\d+\.\d+)} $timing_data match path_delay]} {
-                    set longest_path $path_delay
-                } else {
-                    # 尝试直接获取时序路径
-                    if {[catch {
-                        set timing_paths [get_timing_paths -max_paths 1 -nworst 1 -setup]
-                        if {[llength $timing_paths] > 0} {
-                            set path_delay [get_property DATAPATH_DELAY $timing_paths]
-                            set longest_path [format "%.3f" $path_delay]
+                    # 提取关键路径延迟
+                    if {[regexp {data path delay:\s+(\d+\.\d+)} $timing_data match path_delay]} {
+                        set longest_path $path_delay
+                    } elseif {[regexp {Data Path Delay:\s+(\d+\.\d+)} $timing_data match path_delay]} {
+                        set longest_path $path_delay
+                    } else {
+                        # 尝试直接获取时序路径
+                        if {[catch {
+                            set timing_paths [get_timing_paths -max_paths 1 -nworst 1 -setup]
+                            if {[llength $timing_paths] > 0} {
+                                set path_delay [get_property DATAPATH_DELAY $timing_paths]
+                                set longest_path [format "%.3f" $path_delay]
+                            }
+                        } result]} {
+                            puts "警告：无法获取实现后的路径延迟: $result"
                         }
-                    } result]} {
-                        puts "警告：无法获取实现后的路径延迟: $result"
                     }
                 }
             }
+        } else {
+            puts "实现失败或未完成"
         }
-    } else {
-        puts "实现失败或未完成"
     }
 } else {
     puts "综合失败或未完成"
 }
 
 # 生成PPA报告文件
+puts "HVMS_STAGE report"
 puts "生成PPA报告: $ppa_report"
 set ppa_fd [open $ppa_report w]
 
@@ -361,6 +356,7 @@ puts $ppa_fd "PPA Report for ${module_name}.v (Module: ${module_name})"
 puts $ppa_fd "=========================================="
 puts $ppa_fd ""
 puts $ppa_fd "FPGA Device: $fpga_part (UltraScale+ 16nm Technology)"
+puts $ppa_fd "Fidelity: $fidelity"
 puts $ppa_fd ""
 
 puts $ppa_fd "AREA METRICS:"
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 测试直接从源码目录导入HVMS的各个包
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
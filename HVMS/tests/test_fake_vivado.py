@@ -0,0 +1,50 @@
+"""用Vivado替身(scripts/fake_vivado.py)测试VivadoTool的单次综合、批量清单和异常恢复"""
+import os
+
+import pytest
+
+from tools.vivado import VivadoTool
+
+HVMS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FAKE_VIVADO = os.path.join(HVMS_DIR, "scripts", "fake_vivado.py")
+SYNTH_TCL = os.path.join(HVMS_DIR, "scripts", "vivado_synth.tcl")
+
+
+def module(name, body="assign y = a & b;"):
+    return f"module {name}(input a, input b, output y);\n{body}\nendmodule\n"
+
+
+@pytest.fixture
+def tool():
+    return VivadoTool(FAKE_VIVADO, SYNTH_TCL, "xc7a35tcpg236-1")
+
+
+def test_single_run(tool):
+    ppa = tool.get_ppa_metrics(module("m1"))
+    assert ppa["fidelity"] == "full"
+    assert ppa["lut"] == 2
+    assert ppa["critical_path_delay"] > 0 and ppa["total_power"] > 0
+
+
+def test_fidelity_line(tool):
+    full = tool.get_ppa_metrics(module("m1"), fidelity="full")
+    synth = tool.get_ppa_metrics(module("m1"), fidelity="synth")
+    assert synth["fidelity"] == "synth"
+    assert synth["critical_path_delay"] < full["critical_path_delay"]
+
+
+def test_fail_module(tool):
+    assert tool.get_ppa_metrics(module("fail1")) is None
+
+
+def test_batch_manifest(tool):
+    results = tool.get_ppa_metrics_batch([module("m1"), module("m2"), module("m3", "assign y = a | b ^ a;")])
+    assert all(results)
+    assert results[2]["lut"] > results[0]["lut"]
+
+
+def test_batch_recovers_from_crash_and_failure(tool):
+    assert [bool(r) for r in tool.get_ppa_metrics_batch([module("crash1"), module("m4"), module("m5")])] == \
+        [False, True, True]
+    assert [bool(r) for r in tool.get_ppa_metrics_batch([module("m6"), module("fail2"), module("m7")])] == \
+        [True, False, True]
@@ -0,0 +1,78 @@
+"""用模拟服务器(scripts/mock_claude_server.py)测试ClaudeAgent的请求、解析与限流重试"""
+import os
+import sys
+import threading
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from agents.claude_agent import ClaudeAgent
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+from mock_claude_server import MockClaudeHandler  # noqa: E402
+
+CODE = "module m(input a, input b, output y);\nassign y = a & b;\nendmodule"
+
+
+class PromptTransformer:
+    def get_prompt(self, code):
+        return f"Rewrite this module:\n```verilog\n{code}\n```"
+
+
+@pytest.fixture
+def server():
+    def start(rate_limit_every=0):
+        httpd = ThreadingHTTPServer(("127.0.0.1", 0), MockClaudeHandler)
+        httpd.latency = 0
+        httpd.rate_limit_every = rate_limit_every
+        httpd.retry_after = 0
+        httpd.daemon_threads = True
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+        servers.append(httpd)
+        return f"http://127.0.0.1:{httpd.server_address[1]}/v1/messages"
+
+    servers = []
+    MockClaudeHandler.counter = 0
+    yield start
+    for httpd in servers:
+        httpd.shutdown()
+        httpd.server_close()
+
+
+def make_agent(url, **kwargs):
+    agent = ClaudeAgent("test-key", api_url=url, **kwargs)
+    # 不依赖本机是否安装iverilog
+    agent._has_iverilog = lambda: False
+    return agent
+
+
+def test_transform_returns_server_code(server):
+    agent = make_agent(server())
+    try:
+        result = agent.transform(CODE, "test", PromptTransformer())
+    finally:
+        agent.close()
+    assert result.startswith("module m(")
+    assert "// mock response 1" in result
+
+
+def test_rate_limit_is_retried(server):
+    agent = make_agent(server(rate_limit_every=2), max_retries=2)
+    try:
+        first = agent.transform(CODE, "test", PromptTransformer())
+        second = agent.transform(CODE, "test", PromptTransformer())
+    finally:
+        agent.close()
+    assert "// mock response 1" in first
+    # 第2个请求收到429，客户端重试后拿到第3个响应
+    assert "// mock response 3" in second
+
+
+def test_persistent_rate_limit_returns_original(server):
+    agent = make_agent(server(rate_limit_every=1), max_retries=1)
+    try:
+        assert agent.transform(CODE, "test", PromptTransformer()) == CODE
+    finally:
+        agent.close()
+    # 客户端已重试过，ClaudeAgent不再重复请求
+    assert MockClaudeHandler.counter == 2
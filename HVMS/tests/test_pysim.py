@@ -0,0 +1,152 @@
+"""本地仿真器(tools/pysim.py)的等价性判定测试，每组同时覆盖等价与不等价的改写"""
+import pytest
+
+from tools.verification import VerilogVerifier
+
+
+@pytest.fixture(scope="module")
+def verifier():
+    return VerilogVerifier()
+
+
+def check(verifier, original, *candidates):
+    return verifier.pysim.check_equivalence(original, list(candidates), verifier._port_roles)
+
+
+ADD = """module add(input [3:0] a, input [3:0] b, output [3:0] s, output co);
+assign {co, s} = a + b;
+endmodule
+"""
+ADD_EQ = """module add(input [3:0] a, input [3:0] b, output [3:0] s, output co);
+wire [4:0] t = a + b;
+assign s = t[3:0];
+assign co = t[4];
+endmodule
+"""
+# 中间结果只有4位，进位被截断
+ADD_NE = """module add(input [3:0] a, input [3:0] b, output [3:0] s, output co);
+wire [3:0] t = a + b;
+assign {co, s} = t;
+endmodule
+"""
+
+SYNC = """module r(input clk, input rst, input [3:0] d, output reg [3:0] q);
+always @(posedge clk) begin
+  if (rst) q <= 4'd0;
+  else q <= d;
+end
+endmodule
+"""
+SYNC_EQ = """module r(input clk, input rst, input [3:0] d, output reg [3:0] q);
+always @(posedge clk) q <= rst ? 4'd0 : d;
+endmodule
+"""
+ASYNC = """module r(input clk, input rst, input [3:0] d, output reg [3:0] q);
+always @(posedge clk or posedge rst) begin
+  if (rst) q <= 4'd0;
+  else q <= d;
+end
+endmodule
+"""
+
+NBA = """module p(input clk, input [3:0] d, output reg [3:0] q);
+reg [3:0] m;
+always @(posedge clk) begin
+  m <= d;
+  q <= m;
+end
+endmodule
+"""
+NBA_EQ = """module p(input clk, input [3:0] d, output reg [3:0] q);
+reg [3:0] m;
+always @(posedge clk) q <= m;
+always @(posedge clk) m <= d;
+endmodule
+"""
+# 阻塞赋值使两级流水线退化为一级
+BLOCKING = """module p(input clk, input [3:0] d, output reg [3:0] q);
+reg [3:0] m;
+always @(posedge clk) begin
+  m = d;
+  q = m;
+end
+endmodule
+"""
+
+LATCH = """module l(input en, input [3:0] d, output reg [3:0] q);
+always @(*) begin
+  if (en) q = d;
+end
+endmodule
+"""
+LATCH_EQ = """module l(input en, input [3:0] d, output reg [3:0] q);
+always @(*) begin
+  q = q;
+  if (en) q = d;
+end
+endmodule
+"""
+MUX = """module l(input en, input [3:0] d, output reg [3:0] q);
+always @(*) begin
+  if (en) q = d;
+  else q = 4'd0;
+end
+endmodule
+"""
+
+CASE = """module c(input [1:0] s, input [3:0] a, input [3:0] b, input [3:0] c, output reg [3:0] y);
+always @(*) begin
+  case (s)
+    2'd0: y = a;
+    2'd1: y = b;
+    2'd2: y = c;
+    default: y = 4'd0;
+  endcase
+end
+endmodule
+"""
+IFS = """module c(input [1:0] s, input [3:0] a, input [3:0] b, input [3:0] c, output reg [3:0] y);
+always @(*) begin
+  if (s == 2'd0) y = a;
+  else if (s == 2'd1) y = b;
+  else if (s == 2'd2) y = c;
+  else y = 4'd0;
+end
+endmodule
+"""
+# 丢失了default分支
+IFS_NE = """module c(input [1:0] s, input [3:0] a, input [3:0] b, input [3:0] c, output reg [3:0] y);
+always @(*) begin
+  if (s == 2'd0) y = a;
+  else if (s == 2'd1) y = b;
+  else y = c;
+end
+endmodule
+"""
+
+
+def test_width_and_carry(verifier):
+    assert check(verifier, ADD, ADD_EQ, ADD_NE) == [True, False]
+
+
+def test_sync_vs_async_reset(verifier):
+    assert check(verifier, SYNC, SYNC_EQ, ASYNC) == [True, False]
+    assert check(verifier, ASYNC, SYNC) == [False]
+
+
+def test_blocking_vs_nonblocking(verifier):
+    assert check(verifier, NBA, NBA_EQ, BLOCKING) == [True, False]
+
+
+def test_latch(verifier):
+    assert check(verifier, LATCH, LATCH_EQ, MUX) == [True, False]
+    assert check(verifier, MUX, LATCH) == [False]
+
+
+def test_case_vs_if(verifier):
+    assert check(verifier, CASE, IFS, IFS_NE) == [True, False]
+
+
+def test_port_mismatch(verifier):
+    renamed = ADD.replace("output co", "output carry").replace("{co, s}", "{carry, s}")
+    assert check(verifier, ADD, renamed) == [False]
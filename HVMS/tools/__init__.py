@@ -1,2 +1,10 @@
 from .vivado import VivadoTool
 from .verification import VerilogVerifier
+from .ppa_cache import PPACache
+from .vivado_pool import VivadoSessionPool
+from .vivado_runner import VivadoJobRunner
+from .verification_pool import VerificationExecutor
+from .pysim import PySimulator, UnsupportedConstruct
+from .sim_result import SimulationResult, Mismatch
+from .formal import FormalChecker
+from .surrogate import SurrogatePPAModel
@@ -0,0 +1,363 @@
+import os
+import re
+import time
+import shutil
+import sqlite3
+import logging
+import tempfile
+import threading
+import traceback
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from utils import VerilogParser
+
+from .stimulus import estimate_state_bits
+
+
+# 时序逻辑的特征：边沿触发的always块
+_SEQUENTIAL_RE = re.compile(r'@\s*\(\s*(?:posedge|negedge)\b|\balways_ff\b')
+
+# 乘法、除法、取模和幂运算的SAT证明代价过高，不走形式验证（always @(*)和(* 属性 *)除外）
+_HARD_ARITHMETIC_RE = re.compile(r'(?<![(@])\*(?!\))|/|%')
+
+
+class FormalChecker:
+    """
+    基于本地Yosys的形式等价性检查
+
+    组合模块构造miter后用SAT求解器证明所有输入下输出一致；
+    时序模块在第一拍施加复位、寄存器初值置零，做有界深度的时序等价检查
+    （通过的结论只覆盖复位后seq_depth个周期，见is_bounded，调用方仍需仿真；找到的反例始终有效）。
+    只有规模足够小的模块才会被选中（见selects），结果按(原始代码规范哈希, 候选代码规范哈希, 展开深度)持久化缓存。
+    """
+
+    def __init__(self, yosys_path="yosys", cache_dir=None, max_lines=400, max_state_bits=64,
+                 seq_depth=12, timeout=60, num_workers=2, logger=None):
+        """
+        初始化形式验证工具
+
+        Args:
+            yosys_path: yosys可执行文件路径
+            cache_dir: 结果缓存目录 (可选，不提供时只在内存中缓存)
+            max_lines: 选用形式验证的最大代码行数（不含空行和注释）
+            max_state_bits: 时序模块选用形式验证的最大状态位数
+            seq_depth: 时序模块有界检查的展开深度（时钟周期数）
+            timeout: 单次yosys运行的最长时间(秒)，超时视为无结论
+            num_workers: 同时运行的yosys进程数
+            logger: 日志记录器
+        """
+        self.yosys_path = yosys_path
+        self.cache_dir = cache_dir
+        self.max_lines = max_lines
+        self.max_state_bits = max_state_bits
+        self.seq_depth = seq_depth
+        self.timeout = timeout
+        self.num_workers = max(1, num_workers)
+        self.logger = logger or logging.getLogger(self.__class__.__name__)
+
+        self._available = None
+        self._pool = ThreadPoolExecutor(max_workers=self.num_workers, thread_name_prefix="hvms-formal")
+
+        self._results = {}
+        self._lock = threading.Lock()
+        self.proofs = 0
+        self.counterexamples = 0
+        self.inconclusive = 0
+        self.cache_hits = 0
+
+        self.db_path = None
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+            self.db_path = os.path.join(cache_dir, "formal_cache.sqlite3")
+            self._init_db()
+
+    def _connect(self):
+        """创建数据库连接（每次操作独立连接）"""
+        conn = sqlite3.connect(self.db_path, timeout=60)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _init_db(self):
+        """初始化缓存表结构"""
+        conn = self._connect()
+        try:
+            with conn:
+                # 旧版缓存未记录展开深度，时序模块的结论无法区分，整体丢弃
+                columns = {row[1] for row in conn.execute("PRAGMA table_info(formal_results)")}
+                if columns and 'seq_depth' not in columns:
+                    conn.execute("DROP TABLE formal_results")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS formal_results ("
+                    "  original_hash TEXT NOT NULL,"
+                    "  candidate_hash TEXT NOT NULL,"
+                    "  seq_depth INTEGER NOT NULL,"
+                    "  equivalent INTEGER NOT NULL,"
+                    "  created REAL NOT NULL,"
+                    "  PRIMARY KEY (original_hash, candidate_hash, seq_depth)"
+                    ")"
+                )
+        finally:
+            conn.close()
+
+    def available(self):
+        """检查yosys是否可用"""
+        if self._available is None:
+            self._available = shutil.which(self.yosys_path) is not None
+            if not self._available:
+                self.logger.info(f"未找到yosys ({self.yosys_path})，形式验证不可用")
+        return self._available
+
+    def is_sequential(self, code):
+        """代码是否包含时序逻辑"""
+        return bool(_SEQUENTIAL_RE.search(VerilogParser.strip_comments(code)))
+
+    def is_bounded(self, original_code, transformed_code):
+        """
+        证明结论是否只覆盖有限周期（任一方含时序逻辑时为有界检查）
+
+        Args:
+            original_code: 原始代码
+            transformed_code: 变换后的代码
+
+        Returns:
+            bool: 是否为有界检查
+        """
+        return self.is_sequential(original_code) or self.is_sequential(transformed_code)
+
+    def selects(self, code):
+        """
+        按模块规模判断是否适合形式验证
+
+        Args:
+            code: 原始代码
+
+        Returns:
+            bool: 是否选用形式验证
+        """
+        stripped = re.sub(r'`[^\n]*', '', VerilogParser.strip_comments(code))
+        lines = sum(1 for line in stripped.splitlines() if line.strip())
+        if lines > self.max_lines or _HARD_ARITHMETIC_RE.search(stripped):
+            return False
+        if self.is_sequential(stripped) and estimate_state_bits(stripped) > self.max_state_bits:
+            return False
+        return True
+
+    def check_batch(self, original_code, transformed_codes, resets=None, work_dir=None):
+        """
+        并行检查多个候选
+
+        Args:
+            original_code: 原始代码
+            transformed_codes: 变换后的代码列表
+            resets: 复位端口名 -> 'tb_rst_n'(低有效)/'~tb_rst_n'(高有效)，时序检查在第一拍施加复位
+            work_dir: 工作目录的父目录 (可选)
+
+        Returns:
+            list: 每个候选的结果，True/False为证明结论，None表示无结论（应回退到仿真）
+        """
+        futures = [self._pool.submit(self.check, original_code, code, resets, work_dir)
+                   for code in transformed_codes]
+        return [future.result() for future in futures]
+
+    def check(self, original_code, transformed_code, resets=None, work_dir=None):
+        """
+        检查单个候选与原始代码的等价性（带缓存）
+
+        Args:
+            original_code: 原始代码
+            transformed_code: 变换后的代码
+            resets: 复位端口映射 (可选)
+            work_dir: 工作目录的父目录 (可选)
+
+        Returns:
+            bool: 证明结论，无结论时返回None
+        """
+        # 组合模块的结论与展开深度无关，深度记为0
+        seq_depth = self.seq_depth if self.is_bounded(original_code, transformed_code) else 0
+        key = (VerilogParser.canonical_hash(original_code), VerilogParser.canonical_hash(transformed_code), seq_depth)
+        cached = self._lookup(key)
+        if cached is not None:
+            with self._lock:
+                self.cache_hits += 1
+            return cached
+
+        result = self._prove(original_code, transformed_code, resets or {}, work_dir)
+        with self._lock:
+            if result is True:
+                self.proofs += 1
+            elif result is False:
+                self.counterexamples += 1
+            else:
+                self.inconclusive += 1
+        if result is not None:
+            self._store(key, result)
+        return result
+
+    def _lookup(self, key):
+        """查询缓存的结论"""
+        with self._lock:
+            if key in self._results:
+                return self._results[key]
+        if not self.db_path:
+            return None
+        try:
+            conn = self._connect()
+            try:
+                row = conn.execute(
+                    "SELECT equivalent FROM formal_results "
+                    "WHERE original_hash = ? AND candidate_hash = ? AND seq_depth = ?", key
+                ).fetchone()
+            finally:
+                conn.close()
+        except Exception as e:
+            self.logger.warning(f"读取形式验证缓存失败: {str(e)}")
+            return None
+        if row is None:
+            return None
+        with self._lock:
+            self._results[key] = bool(row[0])
+        return bool(row[0])
+
+    def _store(self, key, equivalent):
+        """记录结论"""
+        with self._lock:
+            self._results[key] = equivalent
+        if not self.db_path:
+            return
+        try:
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO formal_results "
+                        "(original_hash, candidate_hash, seq_depth, equivalent, created) VALUES (?, ?, ?, ?, ?)",
+                        key + (int(equivalent), time.time())
+                    )
+            finally:
+                conn.close()
+        except Exception as e:
+            self.logger.warning(f"写入形式验证缓存失败: {str(e)}")
+
+    def _prove(self, original_code, transformed_code, resets, work_dir):
+        """运行yosys完成一次证明"""
+        gold_top = VerilogParser.extract_module_name(original_code)
+        gate_top = VerilogParser.extract_module_name(transformed_code)
+        if not gold_top or not gate_top:
+            return None
+
+        sequential = self.is_bounded(original_code, transformed_code)
+
+        temp_dir = tempfile.mkdtemp(prefix="hvms_formal_", dir=work_dir)
+        try:
+            gold_file = os.path.join(temp_dir, "gold.v")
+            gate_file = os.path.join(temp_dir, "gate.v")
+            with open(gold_file, 'w', encoding='utf-8') as f:
+                f.write(original_code)
+            with open(gate_file, 'w', encoding='utf-8') as f:
+                f.write(transformed_code)
+
+            script_file = os.path.join(temp_dir, "equiv.ys")
+            with open(script_file, 'w', encoding='utf-8') as f:
+                f.write(self._generate_script(gold_top, gate_top, sequential, resets))
+
+            try:
+                completed = subprocess.run(
+                    [self.yosys_path, "-s", script_file],
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.STDOUT,
+                    text=True,
+                    encoding='utf-8',
+                    errors='replace',
+                    cwd=temp_dir,
+                    timeout=self.timeout or None
+                )
+            except subprocess.TimeoutExpired:
+                self.logger.info(f"形式验证超时（{self.timeout} 秒），回退到仿真")
+                return None
+
+            return self._parse_result(completed.stdout)
+
+        except Exception as e:
+            self.logger.warning(f"形式验证出错: {str(e)}")
+            self.logger.debug(traceback.format_exc())
+            return None
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    def _generate_script(self, gold_top, gate_top, sequential, resets):
+        """
+        生成yosys等价性检查脚本
+
+        Args:
+            gold_top: 原始代码顶层模块名
+            gate_top: 候选代码顶层模块名
+            sequential: 是否做时序检查
+            resets: 复位端口名 -> 'tb_rst_n'(低有效)/'~tb_rst_n'(高有效)
+
+        Returns:
+            str: yosys脚本
+        """
+        # 两份代码分别读入并展平，避免同名子模块互相覆盖
+        script = f"""read_verilog -sv gold.v
+hierarchy -check -top {gold_top}
+proc; flatten; opt_clean
+rename {gold_top} gold
+design -stash gold_design
+read_verilog -sv gate.v
+hierarchy -check -top {gate_top}
+proc; flatten; opt_clean
+rename {gate_top} gate
+design -stash gate_design
+design -copy-from gold_design -as gold gold
+design -copy-from gate_design -as gate gate
+async2sync
+miter -equiv -flatten -make_outputs -ignore_gold_x gold gate miter
+hierarchy -top miter
+"""
+        if not sequential:
+            return script + "sat -verify -prove trigger 0 -show-inputs miter\n"
+
+        # 第一拍施加复位，之后复位无效，寄存器初值置零
+        reset_args = ""
+        for name, role in resets.items():
+            asserted, released = (0, 1) if role == 'tb_rst_n' else (1, 0)
+            reset_args += f" -set-at 1 in_{name} {asserted}"
+            reset_args += ''.join(f" -set-at {step} in_{name} {released}" for step in range(2, self.seq_depth + 1))
+        return script + (f"sat -verify -seq {self.seq_depth} -set-init-zero{reset_args} "
+                         f"-prove trigger 0 -show-inputs miter\n")
+
+    def _parse_result(self, output):
+        """
+        解析yosys输出
+
+        Args:
+            output: yosys输出
+
+        Returns:
+            bool: 证明通过为True，找到反例为False，其他情况（语法错误、端口不一致等）为None
+        """
+        if "SUCCESS!" in output:
+            return True
+        if "proof did fail" in output:
+            return False
+        self.logger.debug(f"形式验证无结论: {output[-2000:]}")
+        return None
+
+    def stats(self):
+        """
+        获取统计信息
+
+        Returns:
+            dict: 证明通过数、反例数、无结论数及缓存命中数
+        """
+        with self._lock:
+            return {
+                'proofs': self.proofs,
+                'counterexamples': self.counterexamples,
+                'inconclusive': self.inconclusive,
+                'cache_hits': self.cache_hits
+            }
+
+    def shutdown(self):
+        """关闭工作线程"""
+        self._pool.shutdown(wait=True)
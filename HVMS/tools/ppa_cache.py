@@ -0,0 +1,210 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from utils import VerilogParser
+
+
+class PPACache:
+    """基于内容寻址的持久化PPA结果缓存（SQLite存储，LRU淘汰）"""
+
+    def __init__(self, cache_dir, max_entries=20000, logger=None):
+        """
+        初始化PPA缓存
+
+        Args:
+            cache_dir: 缓存目录
+            max_entries: 最大缓存条目数，超过后按最近最少使用淘汰
+            logger: 日志记录器
+        """
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.logger = logger or logging.getLogger(self.__class__.__name__)
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self.db_path = os.path.join(cache_dir, "ppa_cache.sqlite3")
+
+        # 命中统计（进程内）
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._init_db()
+
+    def _connect(self):
+        """
+        创建数据库连接
+
+        每次操作使用独立连接，保证线程池和多个HVMS进程并发写入时的安全性
+        """
+        conn = sqlite3.connect(self.db_path, timeout=60)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _init_db(self):
+        """初始化缓存表结构"""
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS ppa_cache ("
+                    "  key TEXT PRIMARY KEY,"
+                    "  metrics TEXT NOT NULL,"
+                    "  created REAL NOT NULL,"
+                    "  last_access REAL NOT NULL"
+                    ")"
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_ppa_cache_access ON ppa_cache(last_access)")
+        finally:
+            conn.close()
+
+    @staticmethod
+    def normalize_code(code):
+        """
+        规范化Verilog代码：去除注释、统一空白并对内部信号做alpha重命名
+
+        Args:
+            code: Verilog代码
+
+        Returns:
+            str: 规范化后的代码
+        """
+        return VerilogParser.canonicalize(code)
+
+    def make_key(self, code, fpga_part, tcl_digest, tool_version):
+        """
+        计算缓存键
+
+        Args:
+            code: Verilog代码
+            fpga_part: 目标FPGA型号
+            tcl_digest: 综合TCL脚本的摘要
+            tool_version: Vivado版本
+
+        Returns:
+            str: 缓存键(sha256)
+        """
+        hasher = hashlib.sha256()
+        for part in (self.normalize_code(code), fpga_part, tcl_digest, tool_version):
+            hasher.update(str(part).encode('utf-8'))
+            hasher.update(b'\0')
+        return hasher.hexdigest()
+
+    def get(self, *keys):
+        """
+        查询缓存
+
+        Args:
+            *keys: 缓存键，按优先级排列；多个键在一次查询中完成，返回第一个命中的键的结果，
+                整次查询只计一次命中或未命中
+
+        Returns:
+            dict: PPA指标，未命中时返回None
+        """
+        metrics = None
+        try:
+            conn = self._connect()
+            try:
+                with conn:
+                    placeholders = ','.join('?' * len(keys))
+                    rows = dict(conn.execute(
+                        f"SELECT key, metrics FROM ppa_cache WHERE key IN ({placeholders})", keys).fetchall())
+                    key = next((key for key in keys if key in rows), None)
+                    if key is not None:
+                        metrics = rows[key]
+                        conn.execute("UPDATE ppa_cache SET last_access = ? WHERE key = ?", (time.time(), key))
+            finally:
+                conn.close()
+        except Exception as e:
+            self.logger.warning(f"读取PPA缓存失败: {str(e)}")
+            metrics = None
+
+        with self._stats_lock:
+            if metrics:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+        if not metrics:
+            return None
+        return json.loads(metrics)
+
+    def put(self, key, metrics):
+        """
+        写入缓存，必要时淘汰最久未使用的条目
+
+        数值指标全部为0的结果（报告缺失或为空）不写入，避免失败的综合被永久缓存
+
+        Args:
+            key: 缓存键
+            metrics: PPA指标
+        """
+        if not metrics or not any(value for value in metrics.values()
+                                  if isinstance(value, (int, float)) and not isinstance(value, bool)):
+            return
+
+        now = time.time()
+        try:
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.execute("BEGIN IMMEDIATE")
+                    conn.execute(
+                        "INSERT OR REPLACE INTO ppa_cache (key, metrics, created, last_access) VALUES (?, ?, ?, ?)",
+                        (key, json.dumps(metrics), now, now)
+                    )
+                    count = conn.execute("SELECT COUNT(*) FROM ppa_cache").fetchone()[0]
+                    overflow = count - self.max_entries
+                    if overflow > 0:
+                        conn.execute(
+                            "DELETE FROM ppa_cache WHERE key IN "
+                            "(SELECT key FROM ppa_cache ORDER BY last_access ASC LIMIT ?)",
+                            (overflow,)
+                        )
+                        with self._stats_lock:
+                            self.evictions += overflow
+            finally:
+                conn.close()
+        except Exception as e:
+            self.logger.warning(f"写入PPA缓存失败: {str(e)}")
+
+    def clear(self):
+        """清空缓存"""
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("DELETE FROM ppa_cache")
+        finally:
+            conn.close()
+
+    def __len__(self):
+        conn = self._connect()
+        try:
+            return conn.execute("SELECT COUNT(*) FROM ppa_cache").fetchone()[0]
+        finally:
+            conn.close()
+
+    def stats(self):
+        """
+        获取缓存统计信息
+
+        Returns:
+            dict: 命中、未命中、淘汰次数及当前条目数
+        """
+        with self._stats_lock:
+            hits, misses, evictions = self.hits, self.misses, self.evictions
+
+        total = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'evictions': evictions,
+            'hit_rate': hits / total if total else 0.0,
+            'entries': len(self),
+            'max_entries': self.max_entries
+        }
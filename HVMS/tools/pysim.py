@@ -0,0 +1,1514 @@
+import re
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from .stimulus import StimulusPlan
+
+
+class UnsupportedConstruct(Exception):
+    """代码包含本地仿真器不支持的语法结构，调用方应回退到iverilog"""
+
+
+# 词法规则：空白与注释、编译指令、数字、标识符、系统函数、运算符
+_TOKEN_RE = re.compile(r"""
+    (?P<ws>\s+|//[^\n]*|/\*.*?\*/)
+  | (?P<directive>`[A-Za-z_]\w*[^\n]*)
+  | (?P<number>(?:\d[\d_]*\s*)?'[sS]?[bBoOdDhH]\s*[0-9a-fA-FxXzZ?_]+|\d[\d_]*)
+  | (?P<ident>[A-Za-z_][\w$]*)
+  | (?P<system>\$[A-Za-z_]\w*)
+  | (?P<op><<<|>>>|===|!==|==|!=|<=|>=|&&|\|\||<<|>>|~&|~\||~\^|\^~|\*\*|\+:|-:|[-+*/%<>!~&|^?:;,.()\[\]{}=@#])
+""", re.S | re.X)
+
+# 忽略的编译指令，其余指令（如`define、`include）视为不支持
+_IGNORED_DIRECTIVES = ('`timescale', '`default_nettype', '`resetall', '`celldefine', '`endcelldefine')
+
+# 二元运算符优先级（数值越大优先级越高）
+_BINARY_PRECEDENCE = {
+    '||': 1, '&&': 2, '|': 3, '^': 4, '~^': 4, '^~': 4, '&': 5,
+    '==': 6, '!=': 6, '===': 6, '!==': 6,
+    '<': 7, '<=': 7, '>': 7, '>=': 7,
+    '<<': 8, '>>': 8, '<<<': 8, '>>>': 8,
+    '+': 9, '-': 9, '*': 10,
+}
+
+_UNARY_OPS = ('!', '~', '-', '+', '&', '|', '^', '~&', '~|', '~^', '^~')
+
+_MAX_WIDTH = 64
+
+
+def _tokenize(code):
+    """将Verilog源码切分为(类型, 文本)序列"""
+    tokens = []
+    pos = 0
+    while pos < len(code):
+        match = _TOKEN_RE.match(code, pos)
+        if match is None:
+            raise UnsupportedConstruct(f"无法识别的字符: {code[pos:pos + 10]!r}")
+        pos = match.end()
+        kind = match.lastgroup
+        text = match.group(kind)
+        if kind == 'ws':
+            continue
+        if kind == 'directive':
+            if not text.startswith(_IGNORED_DIRECTIVES):
+                raise UnsupportedConstruct(f"不支持的编译指令: {text.split()[0]}")
+            continue
+        tokens.append((kind, text))
+    return tokens
+
+
+def _parse_number(text):
+    """
+    解析数字字面量
+
+    Returns:
+        tuple: (数值, 位宽)
+    """
+    text = text.replace('_', '').replace(' ', '')
+    if "'" not in text:
+        return int(text), 32
+    size, rest = text.split("'", 1)
+    if rest[0] in 'sS':
+        raise UnsupportedConstruct("不支持有符号数字")
+    base = {'b': 2, 'o': 8, 'd': 10, 'h': 16}[rest[0].lower()]
+    digits = rest[1:]
+    if re.search(r'[xXzZ?]', digits):
+        raise UnsupportedConstruct("不支持x/z值")
+    width = int(size) if size else 32
+    if width > _MAX_WIDTH:
+        raise UnsupportedConstruct(f"位宽超过{_MAX_WIDTH}位")
+    return int(digits, base) & ((1 << width) - 1), width
+
+
+class _Parser:
+    """Verilog可综合子集的递归下降语法分析器"""
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.pos = 0
+
+    def peek(self, offset=0):
+        index = self.pos + offset
+        return self.tokens[index][1] if index < len(self.tokens) else None
+
+    def next(self):
+        if self.pos >= len(self.tokens):
+            raise UnsupportedConstruct("代码意外结束")
+        token = self.tokens[self.pos][1]
+        self.pos += 1
+        return token
+
+    def accept(self, text):
+        if self.peek() == text:
+            self.pos += 1
+            return True
+        return False
+
+    def expect(self, text):
+        token = self.next()
+        if token != text:
+            raise UnsupportedConstruct(f"期望 {text}，实际为 {token}")
+        return token
+
+    def ident(self):
+        kind = self.tokens[self.pos][0] if self.pos < len(self.tokens) else None
+        if kind != 'ident':
+            raise UnsupportedConstruct(f"期望标识符，实际为 {self.peek()}")
+        return self.next()
+
+    # ---------------- 模块 ----------------
+
+    def parse_modules(self):
+        """解析文件中的全部模块，返回按出现顺序排列的模块字典"""
+        modules = OrderedDict()
+        while self.peek() is not None:
+            if self.peek() != 'module':
+                raise UnsupportedConstruct(f"模块外出现不支持的内容: {self.peek()}")
+            module = self.parse_module()
+            modules[module['name']] = module
+        if not modules:
+            raise UnsupportedConstruct("没有找到模块")
+        return modules
+
+    def parse_module(self):
+        self.expect('module')
+        module = {
+            'name': self.ident(),
+            'params': OrderedDict(),  # 名称 -> (默认值表达式, 位宽范围, 是否可覆盖)
+            'port_order': [],
+            'ports': {},              # 名称 -> 方向
+            'decls': OrderedDict(),   # 名称 -> (种类, 位宽范围)
+            'assigns': [],
+            'always': [],
+            'instances': [],
+            'inits': {}
+        }
+
+        if self.accept('#'):
+            self.expect('(')
+            while not self.accept(')'):
+                self.accept('parameter')
+                self.parse_param_decls(module, overridable=True, terminators=(',', ')'))
+                self.accept(',')
+
+        if self.accept('('):
+            if self.peek() in ('input', 'output', 'inout'):
+                self.parse_ansi_ports(module)
+            else:
+                while not self.accept(')'):
+                    module['port_order'].append(self.ident())
+                    self.accept(',')
+        self.expect(';')
+
+        while not self.accept('endmodule'):
+            self.parse_item(module)
+        return module
+
+    def parse_range(self):
+        """解析可选的[msb:lsb]，返回(msb表达式, lsb表达式)或None"""
+        if not self.accept('['):
+            return None
+        msb = self.parse_expr()
+        self.expect(':')
+        lsb = self.parse_expr()
+        self.expect(']')
+        return (msb, lsb)
+
+    def parse_net_type(self):
+        """跳过线网/变量类型关键字，返回是否为reg类"""
+        is_reg = False
+        while self.peek() in ('wire', 'reg', 'logic', 'signed', 'unsigned'):
+            token = self.next()
+            if token == 'signed':
+                raise UnsupportedConstruct("不支持有符号信号")
+            if token in ('reg', 'logic'):
+                is_reg = True
+        return is_reg
+
+    def parse_ansi_ports(self, module):
+        direction, rng = None, None
+        while not self.accept(')'):
+            if self.peek() in ('input', 'output', 'inout'):
+                direction = self.next()
+                self.parse_net_type()
+                rng = self.parse_range()
+            elif self.peek() in ('wire', 'reg', 'logic'):
+                self.parse_net_type()
+                rng = self.parse_range()
+            name = self.ident()
+            if self.peek() == '[':
+                raise UnsupportedConstruct("不支持数组端口")
+            module['port_order'].append(name)
+            module['ports'][name] = direction
+            module['decls'][name] = ('net', rng)
+            self.accept(',')
+
+    def parse_param_decls(self, module, overridable, terminators=(';',)):
+        """解析 parameter/localparam 的声明列表"""
+        while self.peek() in ('integer', 'signed', 'unsigned'):
+            if self.next() == 'signed':
+                raise UnsupportedConstruct("不支持有符号参数")
+        rng = self.parse_range()
+        while True:
+            name = self.ident()
+            self.expect('=')
+            module['params'][name] = (self.parse_expr(), rng, overridable)
+            if self.peek() == ',' and self.tokens[self.pos + 1][0] == 'ident' and self.peek(2) == '=':
+                self.next()
+                continue
+            break
+        if self.peek() not in terminators:
+            raise UnsupportedConstruct(f"参数声明后出现 {self.peek()}")
+
+    def parse_item(self, module):
+        token = self.peek()
+
+        if token in ('parameter', 'localparam'):
+            self.next()
+            self.parse_param_decls(module, overridable=(token == 'parameter'))
+            self.expect(';')
+
+        elif token in ('input', 'output', 'inout'):
+            direction = self.next()
+            self.parse_net_type()
+            rng = self.parse_range()
+            for name in self.parse_name_list(module, rng):
+                module['ports'][name] = direction
+                if name not in module['decls'] or rng is not None:
+                    module['decls'][name] = ('net', rng)
+
+        elif token in ('wire', 'reg', 'logic'):
+            self.parse_net_type()
+            rng = self.parse_range()
+            for name in self.parse_name_list(module, rng):
+                if name not in module['decls'] or rng is not None:
+                    module['decls'][name] = ('net', rng)
+
+        elif token == 'assign':
+            self.next()
+            while True:
+                lhs = self.parse_lvalue()
+                self.expect('=')
+                module['assigns'].append((lhs, self.parse_expr()))
+                if not self.accept(','):
+                    break
+            self.expect(';')
+
+        elif token in ('always', 'always_comb', 'always_ff'):
+            self.next()
+            sensitivity = '*' if token == 'always_comb' else None
+            if self.accept('@'):
+                sensitivity = self.parse_sensitivity()
+            if sensitivity is None:
+                raise UnsupportedConstruct("always块缺少敏感列表")
+            module['always'].append((sensitivity, self.parse_statement()))
+
+        elif self.tokens[self.pos][0] == 'ident' and (self.peek(1) == '#' or
+                                                        (self.tokens[self.pos + 1][0] == 'ident'
+                                                         and self.peek(2) == '(')):
+            self.parse_instances(module)
+
+        else:
+            raise UnsupportedConstruct(f"不支持的模块项: {token}")
+
+    def parse_name_list(self, module, rng):
+        """解析以分号结束的信号名列表，带初始值的线网转换为连续赋值，带初始值的变量记录为初值"""
+        names = []
+        while True:
+            name = self.ident()
+            if self.peek() == '[':
+                raise UnsupportedConstruct("不支持存储器数组")
+            if self.accept('='):
+                value = self.parse_expr()
+                module['inits'][name] = value
+            names.append(name)
+            if not self.accept(','):
+                break
+        self.expect(';')
+        return names
+
+    def parse_instances(self, module):
+        module_name = self.ident()
+        overrides = []
+        if self.accept('#'):
+            self.expect('(')
+            overrides = self.parse_connections()
+        while True:
+            instance_name = self.ident()
+            self.expect('(')
+            module['instances'].append((module_name, instance_name, overrides, self.parse_connections()))
+            if not self.accept(','):
+                break
+        self.expect(';')
+
+    def parse_connections(self):
+        """解析实例的参数覆盖或端口连接列表（左括号之后），返回[(名称或None, 表达式或None)]"""
+        connections = []
+        while not self.accept(')'):
+            if self.accept('.'):
+                name = self.ident()
+                self.expect('(')
+                expr = None if self.peek() == ')' else self.parse_expr()
+                self.expect(')')
+                connections.append((name, expr))
+            else:
+                connections.append((None, self.parse_expr()))
+            self.accept(',')
+        return connections
+
+    def parse_sensitivity(self):
+        """解析敏感列表，返回'*'或[(边沿, 信号名)]"""
+        if self.accept('*'):
+            return '*'
+        self.expect('(')
+        if self.accept('*'):
+            self.expect(')')
+            return '*'
+        events = []
+        while not self.accept(')'):
+            edge = None
+            if self.peek() in ('posedge', 'negedge'):
+                edge = self.next()
+            events.append((edge, self.ident()))
+            if not self.accept('or'):
+                self.accept(',')
+        if all(edge is None for edge, _ in events):
+            return '*'
+        if any(edge is None for edge, _ in events):
+            raise UnsupportedConstruct("敏感列表混合了边沿和电平事件")
+        return events
+
+    # ---------------- 语句 ----------------
+
+    def parse_statement(self):
+        token = self.peek()
+
+        if token == 'begin':
+            self.next()
+            if self.accept(':'):
+                self.ident()
+            statements = []
+            while not self.accept('end'):
+                statements.append(self.parse_statement())
+            if self.accept(':'):
+                self.ident()
+            return ('block', statements)
+
+        if token == 'if':
+            self.next()
+            self.expect('(')
+            condition = self.parse_expr()
+            self.expect(')')
+            then = self.parse_statement()
+            otherwise = self.parse_statement() if self.accept('else') else None
+            return ('if', condition, then, otherwise)
+
+        if token in ('unique', 'priority'):
+            self.next()
+            return self.parse_statement()
+
+        if token == 'case':
+            self.next()
+            self.expect('(')
+            subject = self.parse_expr()
+            self.expect(')')
+            items = []
+            while not self.accept('endcase'):
+                if self.accept('default'):
+                    self.accept(':')
+                    labels = None
+                else:
+                    labels = [self.parse_expr()]
+                    while self.accept(','):
+                        labels.append(self.parse_expr())
+                    self.expect(':')
+                items.append((labels, self.parse_statement()))
+            return ('case', subject, items)
+
+        if token == ';':
+            self.next()
+            return ('block', [])
+
+        if token in ('casez', 'casex', 'for', 'while', 'repeat', 'forever', 'fork', 'disable', 'wait', '#'):
+            raise UnsupportedConstruct(f"不支持的语句: {token}")
+
+        lhs = self.parse_lvalue()
+        if self.accept('<='):
+            nonblocking = True
+        else:
+            self.expect('=')
+            nonblocking = False
+        rhs = self.parse_expr()
+        self.expect(';')
+        return ('assign', lhs, rhs, nonblocking)
+
+    def parse_lvalue(self):
+        if self.peek() == '{':
+            self.next()
+            parts = [self.parse_lvalue()]
+            while self.accept(','):
+                parts.append(self.parse_lvalue())
+            self.expect('}')
+            return ('cat', parts)
+        return self.parse_selected(self.ident())
+
+    # ---------------- 表达式 ----------------
+
+    def parse_expr(self):
+        condition = self.parse_binary(1)
+        if self.accept('?'):
+            then = self.parse_expr()
+            self.expect(':')
+            otherwise = self.parse_expr()
+            return ('tern', condition, then, otherwise)
+        return condition
+
+    def parse_binary(self, min_precedence):
+        left = self.parse_unary()
+        while True:
+            op = self.peek()
+            if op in ('/', '%', '**'):
+                raise UnsupportedConstruct(f"不支持的运算符: {op}")
+            precedence = _BINARY_PRECEDENCE.get(op)
+            if precedence is None or precedence < min_precedence:
+                return left
+            self.next()
+            right = self.parse_binary(precedence + 1)
+            left = ('bin', op, left, right)
+
+    def parse_unary(self):
+        if self.peek() in _UNARY_OPS and self.tokens[self.pos][0] == 'op':
+            op = self.next()
+            return ('un', op, self.parse_unary())
+        return self.parse_primary()
+
+    def parse_primary(self):
+        kind, token = self.tokens[self.pos] if self.pos < len(self.tokens) else (None, None)
+
+        if kind == 'number':
+            self.next()
+            value, width = _parse_number(token)
+            return ('num', value, width)
+
+        if kind == 'system':
+            self.next()
+            self.expect('(')
+            args = [self.parse_expr()]
+            while self.accept(','):
+                args.append(self.parse_expr())
+            self.expect(')')
+            return ('call', token, args)
+
+        if token == '(':
+            self.next()
+            expr = self.parse_expr()
+            self.expect(')')
+            return expr
+
+        if token == '{':
+            self.next()
+            first = self.parse_expr()
+            if self.accept('{'):
+                parts = [self.parse_expr()]
+                while self.accept(','):
+                    parts.append(self.parse_expr())
+                self.expect('}')
+                self.expect('}')
+                return ('rep', first, parts)
+            parts = [first]
+            while self.accept(','):
+                parts.append(self.parse_expr())
+            self.expect('}')
+            return ('cat', parts)
+
+        if kind == 'ident':
+            return self.parse_selected(self.next())
+
+        raise UnsupportedConstruct(f"不支持的表达式: {token}")
+
+    def parse_selected(self, name):
+        """解析标识符后的位选择或部分选择"""
+        if not self.accept('['):
+            return ('id', name)
+        first = self.parse_expr()
+        if self.accept(':'):
+            second = self.parse_expr()
+            self.expect(']')
+            node = ('part', name, first, second)
+        elif self.peek() in ('+:', '-:'):
+            up = self.next() == '+:'
+            width = self.parse_expr()
+            self.expect(']')
+            node = ('ipart', name, first, width, up)
+        else:
+            self.expect(']')
+            node = ('bit', name, first)
+        if self.peek() == '[':
+            raise UnsupportedConstruct("不支持多维选择")
+        return node
+
+
+def _mask(width):
+    return np.uint64((1 << width) - 1)
+
+
+class _Design:
+    """展平后的设计：信号表 + 编译为闭包的组合逻辑与时序逻辑"""
+
+    def __init__(self):
+        self.signals = {}      # 展平名 -> (位宽, msb, lsb)
+        self.inits = {}        # 展平名 -> 初值
+        self.comb = []         # [(写入的信号集合, fn(env))]
+        self.comb_written = set()
+        self.seq = []          # [fn(env, nba)]
+        self.async_seq = []    # 敏感列表含复位边沿的时序块 [(复位事件[(边沿, 展平名)], fn(env, nba))]
+        self.latches = set()   # 组合always块中并非在所有分支上都被完整赋值的展平信号（锁存器）
+        self.ports = []        # 顶层端口 [(方向, 名称, 位宽范围)]
+        self.clocks = set()    # 与顶层时钟等价的展平信号名
+        self.resets = set()    # 与顶层复位等价的展平信号名
+
+
+class _Elaborator:
+    """将模块层次展平并把表达式、语句编译为NumPy向量化闭包"""
+
+    def __init__(self, modules, port_roles):
+        self.modules = modules
+        self.port_roles = port_roles
+        self.design = _Design()
+
+    def elaborate(self):
+        top_name = next(iter(self.modules))
+        top = self.modules[top_name]
+        scope = self._build_scope(top, '', {})
+
+        for name in top['port_order']:
+            direction = top['ports'].get(name)
+            if direction not in ('input', 'output'):
+                raise UnsupportedConstruct(f"不支持的端口方向: {name} {direction}")
+            _, msb, lsb = self.design.signals[scope[name][1]]
+            width_range = (msb, lsb) if top['decls'][name][1] is not None else None
+            self.design.ports.append((direction, name, width_range))
+
+        roles = self.port_roles(self.design.ports)
+        for name, role in roles.items():
+            if role == 'tb_clk':
+                self.design.clocks.add(scope[name][1])
+            else:
+                self.design.resets.add(scope[name][1])
+
+        self._elaborate_body(top, scope)
+        self.design.comb_written = set().union(*(names for names, _ in self.design.comb))
+        return self.design
+
+    # ---------------- 作用域 ----------------
+
+    def _build_scope(self, module, prefix, overrides):
+        """
+        为模块实例建立作用域：参数求值为常量，信号映射为展平名
+
+        Args:
+            module: 模块语法树
+            prefix: 实例路径前缀
+            overrides: 参数覆盖 {名称: (值, 位宽)}
+        """
+        scope = {}
+        for name, (expr, rng, overridable) in module['params'].items():
+            if overridable and name in overrides:
+                value, width = overrides[name]
+            else:
+                value = self._const(expr, scope)
+                width = self._self_width(expr, scope)
+            if rng is not None:
+                width = abs(self._const(rng[0], scope) - self._const(rng[1], scope)) + 1
+                value &= (1 << width) - 1
+            if width > _MAX_WIDTH:
+                raise UnsupportedConstruct(f"参数 {name} 位宽超过{_MAX_WIDTH}位")
+            scope[name] = ('const', value, width)
+
+        for name in module['port_order']:
+            if name not in module['decls']:
+                raise UnsupportedConstruct(f"端口 {name} 缺少声明")
+
+        for name, (_, rng) in module['decls'].items():
+            if rng is None:
+                msb, lsb = 0, 0
+            else:
+                msb, lsb = self._const(rng[0], scope), self._const(rng[1], scope)
+            width = abs(msb - lsb) + 1
+            if width > _MAX_WIDTH:
+                raise UnsupportedConstruct(f"信号 {name} 位宽超过{_MAX_WIDTH}位")
+            flat = prefix + name
+            self.design.signals[flat] = (width, msb, lsb)
+            scope[name] = ('sig', flat)
+        return scope
+
+    def _lookup(self, name, scope):
+        entry = scope.get(name)
+        if entry is None:
+            raise UnsupportedConstruct(f"未声明的标识符: {name}")
+        return entry
+
+    def _elaborate_body(self, module, scope, prefix=''):
+        """展平模块实例的连续赋值、always块和子模块实例"""
+        reg_names = self._reg_names(module)
+        for name, init in module['inits'].items():
+            entry = self._lookup(name, scope)
+            if name in reg_names:
+                self.design.inits[entry[1]] = self._const(init, scope)
+            else:
+                # 线网声明时赋值等价于连续赋值
+                self._add_assign(('id', name), init, scope)
+
+        for lhs, rhs in module['assigns']:
+            self._add_assign(lhs, rhs, scope)
+
+        for sensitivity, statement in module['always']:
+            body = self._compile_stmt(statement, scope)
+            if sensitivity == '*':
+                written = self._written(statement, scope)
+                self.design.latches |= written - self._assigned(statement, scope)
+                self.design.comb.append((written, lambda env, body=body: body(env, None, None)))
+            else:
+                self._check_sequential(sensitivity, scope)
+                self.design.seq.append(lambda env, nba, body=body: body(env, None, nba))
+                reset_events = [(edge, self._lookup(name, scope)[1]) for edge, name in sensitivity
+                                if self._lookup(name, scope)[1] in self.design.resets]
+                if reset_events:
+                    self.design.async_seq.append((reset_events, self.design.seq[-1]))
+
+        for module_name, instance_name, overrides, connections in module['instances']:
+            self._elaborate_instance(module_name, instance_name, overrides, connections, scope, prefix)
+
+    def _reg_names(self, module):
+        """在always块中被赋值的信号名（这些信号声明时的初值是变量初值而非连续赋值）"""
+        names = set()
+
+        def _collect(statement):
+            kind = statement[0]
+            if kind == 'block':
+                for item in statement[1]:
+                    _collect(item)
+            elif kind == 'if':
+                _collect(statement[2])
+                if statement[3] is not None:
+                    _collect(statement[3])
+            elif kind == 'case':
+                for _, item in statement[2]:
+                    _collect(item)
+            elif kind == 'assign':
+                names.update(self._lvalue_names(statement[1]))
+
+        for _, statement in module['always']:
+            _collect(statement)
+        return names
+
+    def _lvalue_names(self, lhs):
+        if lhs[0] == 'cat':
+            return [name for part in lhs[1] for name in self._lvalue_names(part)]
+        return [lhs[1]]
+
+    def _written(self, statement, scope):
+        """组合always块写入的展平信号集合"""
+        names = set()
+
+        def _collect(node):
+            kind = node[0]
+            if kind == 'block':
+                for item in node[1]:
+                    _collect(item)
+            elif kind == 'if':
+                _collect(node[2])
+                if node[3] is not None:
+                    _collect(node[3])
+            elif kind == 'case':
+                for _, item in node[2]:
+                    _collect(item)
+            elif kind == 'assign':
+                names.update(self._lookup(n, scope)[1] for n in self._lvalue_names(node[1]))
+
+        _collect(statement)
+        return names
+
+    def _assigned(self, statement, scope):
+        """语句在所有分支上都完整赋值的展平信号集合（没有default的case按不完整处理）"""
+        kind = statement[0]
+        if kind == 'block':
+            return set().union(*(self._assigned(item, scope) for item in statement[1]))
+        if kind == 'if':
+            if statement[3] is None:
+                return set()
+            return self._assigned(statement[2], scope) & self._assigned(statement[3], scope)
+        if kind == 'case':
+            if all(labels is not None for labels, _ in statement[2]):
+                return set()
+            return set.intersection(*(self._assigned(item, scope) for _, item in statement[2]))
+        if kind == 'assign':
+            return self._full_targets(statement[1], scope)
+        return set()
+
+    def _full_targets(self, lhs, scope):
+        """赋值目标中被整体写入的展平信号（位选择和部分选择不算）"""
+        if lhs[0] == 'cat':
+            return set().union(*(self._full_targets(part, scope) for part in lhs[1]))
+        if lhs[0] == 'id':
+            return {self._lookup(lhs[1], scope)[1]}
+        return set()
+
+    def _check_sequential(self, events, scope):
+        """时序always块只允许顶层时钟的上升沿，以及可选的复位边沿"""
+        clock_events = 0
+        for edge, name in events:
+            flat = self._lookup(name, scope)[1]
+            if flat in self.design.clocks and edge == 'posedge':
+                clock_events += 1
+            elif flat not in self.design.resets:
+                raise UnsupportedConstruct(f"不支持的时钟事件: {edge} {name}")
+        if clock_events != 1:
+            raise UnsupportedConstruct("时序块必须由唯一的时钟上升沿触发")
+
+    def _add_assign(self, lhs, rhs, scope):
+        """添加一条连续赋值"""
+        store, width, written = self._compile_lvalue(lhs, scope)
+        value = self._compile(rhs, max(width, self._self_width(rhs, scope)), scope)
+
+        def _run(env):
+            store(env, value(env), None, None)
+
+        self.design.comb.append((written, _run))
+
+    def _elaborate_instance(self, module_name, instance_name, overrides, connections, scope, parent_prefix):
+        child = self.modules.get(module_name)
+        if child is None:
+            raise UnsupportedConstruct(f"找不到子模块定义: {module_name}")
+
+        # 参数覆盖按名称或位置匹配
+        param_names = [name for name, (_, _, overridable) in child['params'].items() if overridable]
+        resolved = {}
+        for index, (name, expr) in enumerate(overrides):
+            key = name if name is not None else (param_names[index] if index < len(param_names) else None)
+            if key is None or expr is None:
+                raise UnsupportedConstruct(f"无法匹配实例 {instance_name} 的参数覆盖")
+            resolved[key] = (self._const(expr, scope), self._self_width(expr, scope))
+
+        prefix = parent_prefix + instance_name + '.'
+        child_scope = self._build_scope(child, prefix, resolved)
+
+        for index, (name, expr) in enumerate(connections):
+            port = name if name is not None else (child['port_order'][index]
+                                                  if index < len(child['port_order']) else None)
+            if port is None or port not in child['ports']:
+                raise UnsupportedConstruct(f"实例 {instance_name} 的端口连接无法匹配")
+            if expr is None:
+                continue
+            direction = child['ports'][port]
+            child_flat = child_scope[port][1]
+            if direction == 'input':
+                self._connect_input(child_flat, expr, scope)
+            elif direction == 'output':
+                self._connect_output(child_flat, expr, scope)
+            else:
+                raise UnsupportedConstruct("不支持inout端口")
+
+        self._elaborate_body(child, child_scope, prefix)
+
+    def _connect_input(self, child_flat, expr, scope):
+        """子模块输入端口：由父模块表达式驱动，直接连接时钟/复位时继承其角色"""
+        if expr[0] == 'id':
+            entry = self._lookup(expr[1], scope)
+            if entry[0] == 'sig':
+                if entry[1] in self.design.clocks:
+                    self.design.clocks.add(child_flat)
+                if entry[1] in self.design.resets:
+                    self.design.resets.add(child_flat)
+
+        width = self.design.signals[child_flat][0]
+        value = self._compile(expr, max(width, self._self_width(expr, scope)), scope)
+        mask = _mask(width)
+
+        def _run(env):
+            env[child_flat] = value(env) & mask
+
+        self.design.comb.append(({child_flat}, _run))
+
+    def _connect_output(self, child_flat, expr, scope):
+        """子模块输出端口：驱动父模块的线网"""
+        store, width, written = self._compile_lvalue(expr, scope)
+        child_width = self.design.signals[child_flat][0]
+
+        def _run(env):
+            store(env, env[child_flat], None, None)
+
+        if child_width > _MAX_WIDTH or width > _MAX_WIDTH:
+            raise UnsupportedConstruct("端口位宽超过限制")
+        self.design.comb.append((written, _run))
+
+    # ---------------- 常量求值与位宽 ----------------
+
+    def _const(self, expr, scope):
+        """在参数作用域内求常量表达式的值"""
+        kind = expr[0]
+        if kind == 'num':
+            return expr[1]
+        if kind == 'id':
+            entry = self._lookup(expr[1], scope)
+            if entry[0] != 'const':
+                raise UnsupportedConstruct(f"常量表达式中引用了信号 {expr[1]}")
+            return entry[1]
+        if kind == 'un':
+            value = self._const(expr[2], scope)
+            if expr[1] == '-':
+                return -value
+            if expr[1] == '+':
+                return value
+            if expr[1] == '!':
+                return int(not value)
+            raise UnsupportedConstruct(f"常量表达式不支持一元运算 {expr[1]}")
+        if kind == 'bin':
+            left, right = self._const(expr[2], scope), self._const(expr[3], scope)
+            op = expr[1]
+            operations = {
+                '+': lambda: left + right, '-': lambda: left - right, '*': lambda: left * right,
+                '<<': lambda: left << right, '>>': lambda: left >> right,
+                '<<<': lambda: left << right, '>>>': lambda: left >> right,
+                '&': lambda: left & right, '|': lambda: left | right, '^': lambda: left ^ right,
+                '==': lambda: int(left == right), '!=': lambda: int(left != right),
+                '===': lambda: int(left == right), '!==': lambda: int(left != right),
+                '<': lambda: int(left < right), '<=': lambda: int(left <= right),
+                '>': lambda: int(left > right), '>=': lambda: int(left >= right),
+                '&&': lambda: int(bool(left) and bool(right)), '||': lambda: int(bool(left) or bool(right)),
+            }
+            if op not in operations:
+                raise UnsupportedConstruct(f"常量表达式不支持运算 {op}")
+            return operations[op]()
+        if kind == 'tern':
+            return self._const(expr[2] if self._const(expr[1], scope) else expr[3], scope)
+        if kind in ('cat', 'rep'):
+            parts = expr[1] if kind == 'cat' else list(expr[2]) * self._const(expr[1], scope)
+            value = 0
+            for part in parts:
+                width = self._self_width(part, scope)
+                value = (value << width) | (self._const(part, scope) & ((1 << width) - 1))
+            return value
+        if kind == 'call' and expr[1] == '$clog2' and len(expr[2]) == 1:
+            value = self._const(expr[2][0], scope)
+            return max(0, (value - 1).bit_length())
+        raise UnsupportedConstruct(f"不支持的常量表达式: {kind}")
+
+    def _self_width(self, expr, scope):
+        """按Verilog规则计算表达式的自决定位宽"""
+        kind = expr[0]
+        if kind == 'num':
+            return expr[2]
+        if kind == 'id':
+            entry = self._lookup(expr[1], scope)
+            return entry[2] if entry[0] == 'const' else self.design.signals[entry[1]][0]
+        if kind == 'bit':
+            return 1
+        if kind == 'part':
+            return abs(self._const(expr[2], scope) - self._const(expr[3], scope)) + 1
+        if kind == 'ipart':
+            return self._const(expr[3], scope)
+        if kind == 'un':
+            if expr[1] in ('~', '-', '+'):
+                return self._self_width(expr[2], scope)
+            return 1
+        if kind == 'bin':
+            op = expr[1]
+            if op in ('==', '!=', '===', '!==', '<', '<=', '>', '>=', '&&', '||'):
+                return 1
+            if op in ('<<', '>>', '<<<', '>>>'):
+                return self._self_width(expr[2], scope)
+            return max(self._self_width(expr[2], scope), self._self_width(expr[3], scope))
+        if kind == 'tern':
+            return max(self._self_width(expr[2], scope), self._self_width(expr[3], scope))
+        if kind == 'cat':
+            return sum(self._self_width(part, scope) for part in expr[1])
+        if kind == 'rep':
+            return self._const(expr[1], scope) * sum(self._self_width(part, scope) for part in expr[2])
+        if kind == 'call':
+            if expr[1] == '$unsigned':
+                return self._self_width(expr[2][0], scope)
+            return 32
+        raise UnsupportedConstruct(f"不支持的表达式: {kind}")
+
+    # ---------------- 表达式编译 ----------------
+
+    def _compile(self, expr, width, scope):
+        """
+        把表达式编译为闭包 fn(env) -> uint64数组（或标量），结果位宽为width
+
+        width为上下文决定的位宽，调用方保证不小于表达式的自决定位宽
+        """
+        if width > _MAX_WIDTH:
+            raise UnsupportedConstruct(f"表达式位宽超过{_MAX_WIDTH}位")
+        kind = expr[0]
+        mask = _mask(width)
+
+        if kind == 'num':
+            value = np.uint64(expr[1] & ((1 << width) - 1))
+            return lambda env: value
+
+        if kind == 'call':
+            if expr[1] == '$unsigned' and len(expr[2]) == 1:
+                return self._compile(expr[2][0], width, scope)
+            try:
+                value = np.uint64(self._const(expr, scope) & ((1 << width) - 1))
+            except UnsupportedConstruct:
+                raise UnsupportedConstruct(f"不支持的系统函数: {expr[1]}")
+            return lambda env: value
+
+        if kind == 'id':
+            entry = self._lookup(expr[1], scope)
+            if entry[0] == 'const':
+                value = np.uint64(entry[1] & ((1 << width) - 1))
+                return lambda env: value
+            flat = entry[1]
+            return lambda env: env[flat]
+
+        if kind in ('bit', 'part', 'ipart'):
+            return self._compile_select(expr, scope)
+
+        if kind == 'un':
+            op = expr[1]
+            if op in ('~', '-', '+'):
+                operand = self._compile(expr[2], width, scope)
+                if op == '~':
+                    return lambda env: ~operand(env) & mask
+                if op == '-':
+                    return lambda env: (np.uint64(0) - operand(env)) & mask
+                return operand
+            operand_width = self._self_width(expr[2], scope)
+            operand = self._compile(expr[2], operand_width, scope)
+            operand_mask = _mask(operand_width)
+            if op == '!':
+                return lambda env: (operand(env) == 0).astype(np.uint64)
+            if op == '&':
+                return lambda env: (operand(env) == operand_mask).astype(np.uint64)
+            if op == '~&':
+                return lambda env: (operand(env) != operand_mask).astype(np.uint64)
+            if op == '|':
+                return lambda env: (operand(env) != 0).astype(np.uint64)
+            if op == '~|':
+                return lambda env: (operand(env) == 0).astype(np.uint64)
+            if op == '^':
+                return lambda env: _parity(operand(env))
+            return lambda env: _parity(operand(env)) ^ np.uint64(1)
+
+        if kind == 'bin':
+            return self._compile_binary(expr, width, scope)
+
+        if kind == 'tern':
+            condition_width = self._self_width(expr[1], scope)
+            condition = self._compile(expr[1], condition_width, scope)
+            then = self._compile(expr[2], width, scope)
+            otherwise = self._compile(expr[3], width, scope)
+            return lambda env: np.where(condition(env) != 0, then(env), otherwise(env)).astype(np.uint64)
+
+        if kind in ('cat', 'rep'):
+            if kind == 'cat':
+                parts = expr[1]
+            else:
+                parts = list(expr[2]) * self._const(expr[1], scope)
+            if sum(self._self_width(part, scope) for part in parts) > _MAX_WIDTH:
+                raise UnsupportedConstruct(f"拼接位宽超过{_MAX_WIDTH}位")
+            compiled = []
+            shift = 0
+            for part in reversed(parts):
+                part_width = self._self_width(part, scope)
+                compiled.append((self._compile(part, part_width, scope), np.uint64(shift)))
+                shift += part_width
+
+            def _concat(env):
+                result = np.uint64(0)
+                for fn, offset in compiled:
+                    result = result | (fn(env) << offset)
+                return result
+            return _concat
+
+        raise UnsupportedConstruct(f"不支持的表达式: {kind}")
+
+    def _compile_binary(self, expr, width, scope):
+        op, left_expr, right_expr = expr[1], expr[2], expr[3]
+        mask = _mask(width)
+
+        if op in ('&&', '||'):
+            left = self._compile(left_expr, self._self_width(left_expr, scope), scope)
+            right = self._compile(right_expr, self._self_width(right_expr, scope), scope)
+            if op == '&&':
+                return lambda env: ((left(env) != 0) & (right(env) != 0)).astype(np.uint64)
+            return lambda env: ((left(env) != 0) | (right(env) != 0)).astype(np.uint64)
+
+        if op in ('==', '!=', '===', '!==', '<', '<=', '>', '>='):
+            operand_width = max(self._self_width(left_expr, scope), self._self_width(right_expr, scope))
+            left = self._compile(left_expr, operand_width, scope)
+            right = self._compile(right_expr, operand_width, scope)
+            compare = {
+                '==': np.equal, '===': np.equal, '!=': np.not_equal, '!==': np.not_equal,
+                '<': np.less, '<=': np.less_equal, '>': np.greater, '>=': np.greater_equal
+            }[op]
+            return lambda env: compare(left(env), right(env)).astype(np.uint64)
+
+        if op in ('<<', '>>', '<<<', '>>>'):
+            left = self._compile(left_expr, width, scope)
+            right = self._compile(right_expr, self._self_width(right_expr, scope), scope)
+            limit = np.uint64(width)
+            if op in ('<<', '<<<'):
+                return lambda env: _shift(left(env), right(env), limit, True) & mask
+            return lambda env: _shift(left(env), right(env), limit, False)
+
+        left = self._compile(left_expr, width, scope)
+        right = self._compile(right_expr, width, scope)
+        if op == '+':
+            return lambda env: (left(env) + right(env)) & mask
+        if op == '-':
+            return lambda env: (left(env) - right(env)) & mask
+        if op == '*':
+            return lambda env: (left(env) * right(env)) & mask
+        if op == '&':
+            return lambda env: left(env) & right(env)
+        if op == '|':
+            return lambda env: left(env) | right(env)
+        if op == '^':
+            return lambda env: left(env) ^ right(env)
+        if op in ('~^', '^~'):
+            return lambda env: ~(left(env) ^ right(env)) & mask
+        raise UnsupportedConstruct(f"不支持的运算符: {op}")
+
+    def _position(self, flat, index):
+        """把声明范围内的下标转换为从最低位起的位置"""
+        _, msb, lsb = self.design.signals[flat]
+        return index - lsb if msb >= lsb else lsb - index
+
+    def _compile_select(self, expr, scope):
+        entry = self._lookup(expr[1], scope)
+        if entry[0] == 'const':
+            raise UnsupportedConstruct("不支持对参数做位选择")
+        flat = entry[1]
+        signal_width, msb, lsb = self.design.signals[flat]
+
+        if expr[0] == 'bit':
+            try:
+                position = self._position(flat, self._const(expr[2], scope))
+            except UnsupportedConstruct:
+                position = None
+            if position is not None:
+                if not 0 <= position < signal_width:
+                    return lambda env: np.uint64(0)
+                shift = np.uint64(position)
+                return lambda env: (env[flat] >> shift) & np.uint64(1)
+
+            # 动态下标：逐通道移位，越界时为0
+            if msb < lsb:
+                raise UnsupportedConstruct("不支持升序范围的动态位选择")
+            index = self._compile(expr[2], self._self_width(expr[2], scope), scope)
+            offset = np.uint64(lsb)
+            limit = np.uint64(signal_width)
+            return lambda env: _dynamic_bit(env[flat], index(env), offset, limit)
+
+        if expr[0] == 'part':
+            high = self._position(flat, self._const(expr[2], scope))
+            low = self._position(flat, self._const(expr[3], scope))
+            if low > high:
+                high, low = low, high
+            if low < 0 or high >= signal_width:
+                raise UnsupportedConstruct("部分选择越界")
+            shift, mask = np.uint64(low), _mask(high - low + 1)
+            return lambda env: (env[flat] >> shift) & mask
+
+        # 索引部分选择 base +: width / base -: width
+        if msb < lsb:
+            raise UnsupportedConstruct("不支持升序范围的索引部分选择")
+        part_width = self._const(expr[3], scope)
+        mask = _mask(part_width)
+        base = self._compile(expr[2], self._self_width(expr[2], scope), scope)
+        adjust = np.uint64(lsb if expr[4] else lsb + part_width - 1)
+        limit = np.uint64(signal_width)
+
+        def _indexed(env):
+            start = base(env) - adjust
+            return _shift(env[flat], start, limit, False) & mask
+        return _indexed
+
+    # ---------------- 赋值目标 ----------------
+
+    def _compile_lvalue(self, lhs, scope):
+        """
+        编译赋值目标
+
+        Returns:
+            tuple: (store(env, value, lanes, nba), 位宽, 写入的展平信号集合)
+        """
+        if lhs[0] == 'cat':
+            parts = [self._compile_lvalue(part, scope) for part in lhs[1]]
+            total = sum(width for _, width, _ in parts)
+            if total > _MAX_WIDTH:
+                raise UnsupportedConstruct(f"拼接赋值位宽超过{_MAX_WIDTH}位")
+            placed = []
+            shift = 0
+            for store, width, _ in reversed(parts):
+                placed.append((store, np.uint64(shift), _mask(width)))
+                shift += width
+
+            def _store_cat(env, value, lanes, nba):
+                for store, offset, mask in placed:
+                    store(env, (value >> offset) & mask, lanes, nba)
+            return _store_cat, total, set().union(*(written for _, _, written in parts))
+
+        entry = self._lookup(lhs[1], scope)
+        if entry[0] != 'sig':
+            raise UnsupportedConstruct(f"不能对参数赋值: {lhs[1]}")
+        flat = entry[1]
+        signal_width = self.design.signals[flat][0]
+
+        if lhs[0] == 'id':
+            low, width = 0, signal_width
+        elif lhs[0] == 'bit':
+            low, width = self._position(flat, self._const(lhs[2], scope)), 1
+        elif lhs[0] == 'part':
+            high = self._position(flat, self._const(lhs[2], scope))
+            low = self._position(flat, self._const(lhs[3], scope))
+            if low > high:
+                high, low = low, high
+            width = high - low + 1
+        else:
+            raise UnsupportedConstruct("不支持索引部分选择作为赋值目标")
+
+        if low < 0 or low + width > signal_width:
+            raise UnsupportedConstruct("赋值目标越界")
+
+        field = np.uint64(((1 << width) - 1) << low)
+        keep = np.uint64(((1 << signal_width) - 1) & ~(((1 << width) - 1) << low))
+        shift = np.uint64(low)
+        full = low == 0 and width == signal_width
+
+        def _store(env, value, lanes, nba):
+            target = env if nba is None else nba
+            current = target.get(flat, env[flat]) if nba is not None else env[flat]
+            if full:
+                new = value & field
+            else:
+                new = (current & keep) | ((value << shift) & field)
+            if lanes is not None:
+                new = np.where(lanes, new, current)
+            target[flat] = np.broadcast_to(new, env[flat].shape).astype(np.uint64)
+
+        return _store, width, {flat}
+
+    # ---------------- 语句编译 ----------------
+
+    def _compile_stmt(self, statement, scope):
+        """
+        把语句编译为闭包 fn(env, lanes, nba)
+
+        lanes为布尔通道掩码（None表示全部通道），nba为非阻塞赋值缓冲（组合块中为None）
+        """
+        kind = statement[0]
+
+        if kind == 'block':
+            body = [self._compile_stmt(item, scope) for item in statement[1]]
+
+            def _block(env, lanes, nba):
+                for fn in body:
+                    fn(env, lanes, nba)
+            return _block
+
+        if kind == 'if':
+            condition = self._compile(statement[1], self._self_width(statement[1], scope), scope)
+            then = self._compile_stmt(statement[2], scope)
+            otherwise = self._compile_stmt(statement[3], scope) if statement[3] is not None else None
+
+            def _if(env, lanes, nba):
+                taken = np.broadcast_to(condition(env) != 0, _shape(env))
+                then_lanes = taken if lanes is None else (lanes & taken)
+                if then_lanes.any():
+                    then(env, then_lanes, nba)
+                if otherwise is not None:
+                    else_lanes = ~taken if lanes is None else (lanes & ~taken)
+                    if else_lanes.any():
+                        otherwise(env, else_lanes, nba)
+            return _if
+
+        if kind == 'case':
+            subject_expr, items = statement[1], statement[2]
+            width = self._self_width(subject_expr, scope)
+            for labels, _ in items:
+                for label in labels or []:
+                    width = max(width, self._self_width(label, scope))
+            subject = self._compile(subject_expr, width, scope)
+            compiled = []
+            default = None
+            for labels, body in items:
+                fn = self._compile_stmt(body, scope)
+                if labels is None:
+                    default = fn
+                else:
+                    compiled.append(([self._compile(label, width, scope) for label in labels], fn))
+
+            def _case(env, lanes, nba):
+                value = np.broadcast_to(subject(env), _shape(env))
+                remaining = np.ones(_shape(env), dtype=bool) if lanes is None else lanes.copy()
+                # 先按顺序匹配全部分支再执行，分支中的阻塞赋值不影响后续分支的匹配
+                matches = []
+                for labels, fn in compiled:
+                    hit = np.zeros(_shape(env), dtype=bool)
+                    for label in labels:
+                        hit |= value == label(env)
+                    hit &= remaining
+                    remaining &= ~hit
+                    matches.append((hit, fn))
+                for hit, fn in matches:
+                    if hit.any():
+                        fn(env, hit, nba)
+                if default is not None and remaining.any():
+                    default(env, remaining, nba)
+            return _case
+
+        if kind == 'assign':
+            lhs, rhs, nonblocking = statement[1], statement[2], statement[3]
+            store, width, _ = self._compile_lvalue(lhs, scope)
+            value = self._compile(rhs, max(width, self._self_width(rhs, scope)), scope)
+
+            def _assign(env, lanes, nba):
+                if nonblocking and nba is not None:
+                    store(env, value(env), lanes, nba)
+                else:
+                    store(env, value(env), lanes, None)
+            return _assign
+
+        raise UnsupportedConstruct(f"不支持的语句: {kind}")
+
+
+def _shape(env):
+    return env['__shape__']
+
+
+def _parity(values):
+    """逐通道计算奇偶校验位"""
+    values = np.asarray(values, dtype=np.uint64)
+    for shift in (32, 16, 8, 4, 2, 1):
+        values = values ^ (values >> np.uint64(shift))
+    return values & np.uint64(1)
+
+
+def _shift(values, amount, limit, left):
+    """移位量不小于位宽时结果为0（NumPy对超出64位的移位行为未定义）"""
+    amount = np.asarray(amount, dtype=np.uint64)
+    safe = np.minimum(amount, np.uint64(63))
+    shifted = (values << safe) if left else (values >> safe)
+    return np.where(amount >= limit, np.uint64(0), shifted).astype(np.uint64)
+
+
+def _dynamic_bit(values, index, offset, limit):
+    """按逐通道的下标取位，越界为0"""
+    position = np.asarray(index, dtype=np.uint64) - offset
+    valid = (np.asarray(index, dtype=np.uint64) >= offset) & (position < limit)
+    bit = (values >> np.minimum(position, np.uint64(63))) & np.uint64(1)
+    return np.where(valid, bit, np.uint64(0)).astype(np.uint64)
+
+
+class PySimulator:
+    """
+    进程内的周期级Verilog仿真器
+
+    把可综合子集（连续赋值、组合/时序always块、if/case、位选择与拼接、子模块实例）
+    展平并编译为NumPy向量化闭包，一次调用在数千个随机向量上同时求值：
+    组合模块每个向量占一个通道，时序模块在多个通道上并行运行独立的激励序列。
+    遇到不支持的结构时抛出UnsupportedConstruct，由调用方回退到iverilog。
+    """
+
+    def __init__(self, num_vectors=4096, min_cycles=64, cache_size=64, logger=None):
+        """
+        初始化仿真器
+
+        Args:
+            num_vectors: 每次比较施加的测试向量总数
+            min_cycles: 时序模块每个通道至少运行的周期数（通道数为 num_vectors / min_cycles）
+            cache_size: 缓存的参考模块仿真结果数
+            logger: 日志记录器
+        """
+        self.num_vectors = max(1, num_vectors)
+        self.min_cycles = max(1, min_cycles)
+        self.cache_size = cache_size
+        self.logger = logger or logging.getLogger(self.__class__.__name__)
+
+        self._references = OrderedDict()
+        self._lock = threading.Lock()
+
+    def elaborate(self, code, port_roles):
+        """
+        解析并展平代码
+
+        Args:
+            code: Verilog代码（第一个模块为顶层）
+            port_roles: 端口角色识别函数，签名为 port_roles(ports) -> {端口名: 'tb_clk'/'tb_rst_n'/'~tb_rst_n'}
+
+        Returns:
+            _Design: 展平后的设计
+        """
+        try:
+            modules = _Parser(_tokenize(code)).parse_modules()
+            return _Elaborator(modules, port_roles).elaborate()
+        except UnsupportedConstruct:
+            raise
+        except (IndexError, KeyError, ValueError, TypeError, OverflowError) as e:
+            raise UnsupportedConstruct(f"解析失败: {type(e).__name__}: {str(e)}")
+
+    @staticmethod
+    def stateful(design):
+        """设计是否保存状态（时序块或锁存器），有状态时每个通道依次施加一串向量"""
+        return bool(design.seq or design.latches)
+
+    def simulate(self, design, roles, seed, stateful=None):
+        """
+        在确定性随机激励下仿真设计
+
+        Args:
+            design: 展平后的设计
+            roles: 顶层时钟/复位端口映射
+            seed: 激励随机种子
+            stateful: 是否按有状态设计排布激励 (可选，默认由设计本身决定；比较的双方必须一致)
+
+        Returns:
+            dict: 输出端口名 -> 形状为(周期数, 通道数)的输出值；复位变化的周期另以('reset', 端口名)
+                记录时钟沿之前的输出，用于区分同步与异步复位
+        """
+        sequential = bool(design.seq)
+        if stateful is None:
+            stateful = self.stateful(design)
+        has_inputs = any(direction == 'input' and name not in roles for direction, name, _ in design.ports)
+        if not stateful:
+            lanes, cycles = self.num_vectors, 1
+        elif not has_inputs:
+            # 没有数据输入时各通道完全相同，只运行一个较长的序列
+            lanes, cycles = 1, min(self.num_vectors, self.min_cycles * 8)
+        else:
+            cycles = min(self.min_cycles, self.num_vectors)
+            lanes = max(1, self.num_vectors // cycles)
+
+        rng = np.random.default_rng(seed)
+        inputs = {}
+        for direction, name, width_range in design.ports:
+            if direction == 'input' and name not in roles:
+                width = abs(width_range[0] - width_range[1]) + 1 if width_range else 1
+                inputs[name] = rng.integers(0, 1 << width, size=(cycles, lanes), dtype=np.uint64,
+                                            endpoint=False) if width < 64 else \
+                    rng.integers(0, np.iinfo(np.uint64).max, size=(cycles, lanes), dtype=np.uint64,
+                                 endpoint=True)
+
+        # 边界情况向量放在最前面：组合模块占前几个通道，时序模块占第0个通道的前几个周期
+        corners = StimulusPlan(design.ports, roles, seed).corner_vectors()
+        for i, vector in enumerate(corners[:cycles if stateful else lanes]):
+            for name, value in vector.items():
+                if stateful:
+                    inputs[name][i, 0] = value
+                else:
+                    inputs[name][0, i] = value
+
+        env = {'__shape__': (lanes,)}
+        for flat, (width, _, _) in design.signals.items():
+            env[flat] = np.full(lanes, design.inits.get(flat, 0) & ((1 << width) - 1), dtype=np.uint64)
+
+        # 复位阶段：输入置0，复位有效并施加两个时钟沿
+        if sequential:
+            self._apply_reset(design, env, roles, lanes, True)
+            for _ in range(2):
+                self._clock_edge(design, env)
+            self._apply_reset(design, env, roles, lanes, False)
+
+        # 序列中途再复位两个周期，检查复位路径
+        has_reset = sequential and any(role != 'tb_clk' for role in roles.values())
+        reset_cycles = range(cycles // 2, cycles // 2 + 2) if has_reset and cycles >= 8 else range(0)
+
+        outputs = [name for direction, name, _ in design.ports if direction == 'output']
+        trace = {name: np.zeros((cycles, lanes), dtype=np.uint64) for name in outputs}
+        before_edge = {name: [] for name in outputs}
+
+        # 与测试台时序一致：施加输入 -> 时钟上升沿 -> 采样输出
+        for cycle in range(cycles):
+            for name, values in inputs.items():
+                env[name] = values[cycle]
+            if reset_cycles and cycle in (reset_cycles.start, reset_cycles.stop):
+                # 异步复位在复位变化时立即生效，时钟沿之前的输出能区分同步与异步复位
+                self._apply_reset(design, env, roles, lanes, cycle in reset_cycles)
+                for name in outputs:
+                    before_edge[name].append(env[name].copy())
+            else:
+                self._settle(design, env)
+            if sequential:
+                self._clock_edge(design, env)
+            for name in outputs:
+                trace[name][cycle] = env[name]
+
+        for name, rows in before_edge.items():
+            if rows:
+                trace[('reset', name)] = np.stack(rows)
+        return trace
+
+    def _apply_reset(self, design, env, roles, lanes, asserted):
+        """驱动复位端口并稳定组合逻辑，敏感列表中含相应复位边沿的时序块立即执行"""
+        before = {flat: int(env[flat][0]) for flat in design.resets}
+        self._drive_reset(env, roles, lanes, asserted)
+        self._settle(design, env)
+
+        nba = {}
+        for events, fn in design.async_seq:
+            if any((edge == 'posedge' and not before[flat] and int(env[flat][0])) or
+                   (edge == 'negedge' and before[flat] and not int(env[flat][0])) for edge, flat in events):
+                fn(env, nba)
+        if nba:
+            env.update(nba)
+            self._settle(design, env)
+
+    def _drive_reset(self, env, roles, lanes, asserted):
+        """按极性驱动全部复位端口"""
+        for name, role in roles.items():
+            if role != 'tb_clk':
+                active_low = role == 'tb_rst_n'
+                env[name] = np.full(lanes, int(active_low != asserted), dtype=np.uint64)
+
+    def _settle(self, design, env):
+        """反复求值组合逻辑直到稳定"""
+        for _ in range(len(design.comb) + 2):
+            before = {name: env[name] for name in design.comb_written}
+            for _, fn in design.comb:
+                fn(env)
+            if all(np.array_equal(before[name], env[name]) for name in design.comb_written):
+                return
+        raise UnsupportedConstruct("组合逻辑未收敛（可能存在组合环路）")
+
+    def _clock_edge(self, design, env):
+        """时钟上升沿：全部时序块基于沿前的值计算非阻塞赋值，然后统一更新并重新稳定组合逻辑"""
+        nba = {}
+        for fn in design.seq:
+            fn(env, nba)
+        env.update(nba)
+        self._settle(design, env)
+
+    def _reference(self, original_code, port_roles):
+        """获取原始代码的仿真结果（按代码哈希缓存）"""
+        key = hashlib.sha256(original_code.encode('utf-8')).hexdigest()
+        with self._lock:
+            if key in self._references:
+                self._references.move_to_end(key)
+                return self._references[key]
+
+        design = self.elaborate(original_code, port_roles)
+        roles = port_roles(design.ports)
+        seed = int(key[:16], 16)
+        with np.errstate(over='ignore'):
+            reference = (design, roles, seed, self.simulate(design, roles, seed))
+
+        with self._lock:
+            self._references[key] = reference
+            while len(self._references) > self.cache_size:
+                self._references.popitem(last=False)
+        return reference
+
+    def check_equivalence(self, original_code, transformed_codes, port_roles):
+        """
+        比较候选与原始代码在相同随机激励下的输出
+
+        Args:
+            original_code: 原始代码
+            transformed_codes: 变换后的代码列表
+            port_roles: 端口角色识别函数
+
+        Returns:
+            list: 每个候选的结果，True/False为判定结果，None表示该候选需要回退到iverilog
+        """
+        try:
+            reference, roles, seed, expected = self._reference(original_code, port_roles)
+        except UnsupportedConstruct as e:
+            self.logger.info(f"原始代码不在本地仿真器支持范围内，回退到iverilog: {str(e)}")
+            return [None] * len(transformed_codes)
+
+        # 原始代码是纯组合逻辑而候选含锁存器时，双方都按有状态设计重新排布激励
+        stateful_expected = None
+
+        results = []
+        for i, code in enumerate(transformed_codes):
+            try:
+                design = self.elaborate(code, port_roles)
+                if design.ports != reference.ports:
+                    self.logger.info(f"候选 {i} 的端口与原始模块不一致，判定为不等价")
+                    results.append(False)
+                    continue
+                stateful = self.stateful(reference) or self.stateful(design)
+                with np.errstate(over='ignore'):
+                    if stateful and not self.stateful(reference):
+                        if stateful_expected is None:
+                            stateful_expected = self.simulate(reference, roles, seed, stateful=True)
+                        target = stateful_expected
+                    else:
+                        target = expected
+                    actual = self.simulate(design, roles, seed, stateful=stateful)
+                results.append(target.keys() == actual.keys() and
+                               all(np.array_equal(target[name], actual[name]) for name in target))
+            except UnsupportedConstruct as e:
+                self.logger.info(f"候选 {i} 不在本地仿真器支持范围内，回退到iverilog: {str(e)}")
+                results.append(None)
+        return results
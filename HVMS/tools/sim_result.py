@@ -0,0 +1,124 @@
+import re
+
+
+# 测试台输出格式（见VerilogVerifier._generate_testbench）
+_MISMATCH_RE = re.compile(
+    r'不匹配: 候选 (\d+), 向量 (\d+), 时间\s*(\d+), 信号 (\w+), 原始值 (\S+), 变换值 (\S+)'
+)
+_PASSED_RE = re.compile(r'候选 (\d+): 通过')
+
+
+class Mismatch:
+    """候选输出与参考轨迹的第一次不匹配"""
+
+    def __init__(self, candidate, vector, time, signal, expected, actual):
+        """
+        初始化不匹配记录
+
+        Args:
+            candidate: 测试台内的候选编号
+            vector: 测试向量编号
+            time: 仿真时间
+            signal: 输出信号名
+            expected: 参考值
+            actual: 候选的输出值
+        """
+        self.candidate = candidate
+        self.vector = vector
+        self.time = time
+        self.signal = signal
+        self.expected = expected
+        self.actual = actual
+
+    def to_dict(self):
+        """转换为字典"""
+        return {
+            'candidate': self.candidate,
+            'vector': self.vector,
+            'time': self.time,
+            'signal': self.signal,
+            'expected': self.expected,
+            'actual': self.actual
+        }
+
+    def __repr__(self):
+        return (f"Mismatch(候选 {self.candidate}, 向量 {self.vector}, 时间 {self.time}, 信号 {self.signal}, "
+                f"原始值 {self.expected}, 变换值 {self.actual})")
+
+
+class SimulationResult:
+    """
+    一次仿真的结构化结果
+
+    仿真输出逐行送入feed()解析；全部候选都出现不匹配后feed()返回True，
+    调用方据此立即终止vvp进程，不再等待仿真跑完。
+    """
+
+    def __init__(self, finish_marker, num_candidates=0):
+        """
+        初始化仿真结果
+
+        Args:
+            finish_marker: 测试台正常结束时打印的标记
+            num_candidates: 测试台中的候选数（参考仿真为0）
+        """
+        self.finish_marker = finish_marker
+        self.num_candidates = num_candidates
+        self.compiled = True
+        self.finished = False
+        self.timed_out = False
+        self.stopped_early = False
+        self.returncode = None
+        self.mismatches = {}
+        self.passed = set()
+        self.lines = []
+
+    def feed(self, line):
+        """
+        解析一行仿真输出
+
+        Args:
+            line: 输出行
+
+        Returns:
+            bool: 是否可以提前终止仿真（全部候选均已不匹配）
+        """
+        line = line.rstrip('\r\n')
+        self.lines.append(line)
+
+        match = _MISMATCH_RE.search(line)
+        if match:
+            candidate = int(match.group(1))
+            if candidate not in self.mismatches:
+                self.mismatches[candidate] = Mismatch(candidate, int(match.group(2)), int(match.group(3)),
+                                                      match.group(4), match.group(5), match.group(6))
+            return self.num_candidates > 0 and len(self.mismatches) >= self.num_candidates
+
+        match = _PASSED_RE.search(line)
+        if match:
+            self.passed.add(int(match.group(1)))
+        elif self.finish_marker in line:
+            self.finished = True
+        elif "仿真超时" in line:
+            self.timed_out = True
+        return False
+
+    @property
+    def output(self):
+        """完整的仿真输出"""
+        return '\n'.join(self.lines)
+
+    def equivalent(self, candidate):
+        """
+        判断候选是否通过
+
+        仿真正常结束且报告通过、没有不匹配时才认可；超时或异常退出时不认可任何候选
+
+        Args:
+            candidate: 测试台内的候选编号
+
+        Returns:
+            bool: 是否等价
+        """
+        return (self.compiled and self.finished and not self.timed_out
+                and candidate in self.passed and candidate not in self.mismatches)
@@ -0,0 +1,186 @@
+import re
+import random
+
+
+# 寄存器声明（用于估计状态位数）
+_REG_DECL_RE = re.compile(r'\b(?:reg|logic)\b\s*(?:signed\s*)?(?:\[\s*(\d+)\s*:\s*(\d+)\s*\])?([^;)]*)')
+
+_PORT_KEYWORDS = ('input', 'output', 'inout', 'wire', 'reg', 'logic')
+
+
+def estimate_state_bits(code):
+    """
+    粗略估计代码中的状态位数（reg/logic声明的总位宽，范围不是常数时按1位计）
+
+    Args:
+        code: Verilog代码
+
+    Returns:
+        int: 估计的状态位数
+    """
+    total = 0
+    for msb, lsb, names in _REG_DECL_RE.findall(code):
+        width = abs(int(msb) - int(lsb)) + 1 if msb else 1
+        # ANSI端口列表中声明会延续到下一个端口关键字为止
+        for part in names.split(','):
+            match = re.match(r'\s*([A-Za-z_]\w*)', part)
+            if not match or match.group(1) in _PORT_KEYWORDS:
+                break
+            total += width
+    return total
+
+
+class StimulusPlan:
+    """
+    覆盖率导向的激励计划
+
+    测试向量数按输入位宽和状态位数确定，向量序列以边界情况开头
+    （全0、全1、交替位、单端口全1、走1、走0），随后是带边界偏置的随机向量，
+    有复位端口时在序列中途插入一次复位。参考仿真之后可按输出翻转覆盖率截断序列：
+    覆盖率连续patience个向量不再增长时停止，验证阶段只施加截断后的前缀。
+    """
+
+    def __init__(self, ports, roles, seed, state_bits=0, min_vectors=32, max_vectors=1000,
+                 vectors_per_bit=4, patience=32):
+        """
+        初始化激励计划
+
+        Args:
+            ports: 端口列表，每个元素为(方向, 名称, 位宽)
+            roles: 时钟/复位端口映射（这些端口不施加数据激励）
+            seed: 随机种子（同一代码的激励始终相同）
+            state_bits: 设计中的状态位数（估计值）
+            min_vectors: 最少测试向量数
+            max_vectors: 最多测试向量数
+            vectors_per_bit: 每个输入位或状态位分配的测试向量数
+            patience: 输出翻转覆盖率连续多少个向量不增长时认为已饱和
+        """
+        self.inputs = [(name, abs(width[0] - width[1]) + 1 if width else 1)
+                       for direction, name, width in ports
+                       if direction == 'input' and name not in roles]
+        self.has_reset = any(role != 'tb_clk' for role in roles.values())
+        self.seed = seed
+        self.patience = max(1, patience)
+
+        input_bits = sum(width for _, width in self.inputs)
+        self.num_vectors = max(min_vectors, min(max_vectors, vectors_per_bit * (input_bits + state_bits)))
+        self.min_vectors = min(min_vectors, self.num_vectors)
+
+    def corner_vectors(self):
+        """
+        生成边界情况向量
+
+        Returns:
+            list: 每个元素为 {输入端口名: 整数值}
+        """
+        if not self.inputs:
+            return []
+
+        def fill(pattern):
+            return {name: pattern(width) for name, width in self.inputs}
+
+        ones = fill(lambda width: (1 << width) - 1)
+        vectors = [
+            fill(lambda width: 0),
+            ones,
+            fill(lambda width: int('01' * width, 2) & ((1 << width) - 1)),
+            fill(lambda width: int('10' * width, 2) & ((1 << width) - 1)),
+        ]
+        if len(self.inputs) > 1:
+            for name, width in self.inputs:
+                vector = fill(lambda w: 0)
+                vector[name] = (1 << width) - 1
+                vectors.append(vector)
+
+        # 走1/走0：位数过多时按步长抽样，边界向量最多占一半
+        positions = [(name, bit) for name, width in self.inputs for bit in range(width)]
+        budget = max(1, (self.num_vectors // 2 - len(vectors)) // 2)
+        step = max(1, -(-len(positions) // budget))
+        for name, bit in positions[::step]:
+            vector = fill(lambda width: 0)
+            vector[name] = 1 << bit
+            vectors.append(vector)
+            vector = dict(ones)
+            vector[name] ^= 1 << bit
+            vectors.append(vector)
+        return vectors[:max(1, self.num_vectors // 2)]
+
+    def reset_window(self):
+        """
+        中途复位所在的向量区间
+
+        Returns:
+            tuple: (起始向量, 结束向量)，没有复位端口时返回None
+        """
+        if not self.has_reset:
+            return None
+        start = min(len(self.corner_vectors()) + self.patience // 2, self.num_vectors - 2)
+        return max(0, start), max(0, start) + 2
+
+    def vectors(self):
+        """
+        生成完整的向量序列
+
+        Returns:
+            tuple: (向量列表，每个元素为 {输入端口名: 整数值}; 复位序列，1表示复位无效)
+        """
+        rng = random.Random(self.seed)
+        vectors = self.corner_vectors()
+        while len(vectors) < self.num_vectors:
+            vector = {}
+            for name, width in self.inputs:
+                roll = rng.random()
+                if roll < 0.05:
+                    vector[name] = 0
+                elif roll < 0.10:
+                    vector[name] = (1 << width) - 1
+                else:
+                    vector[name] = rng.getrandbits(width)
+            vectors.append(vector)
+
+        resets = [1] * self.num_vectors
+        window = self.reset_window()
+        if window:
+            for i in range(*window):
+                resets[i] = 0
+        return vectors, resets
+
+    def minimum_length(self):
+        """截断后至少保留的向量数（覆盖全部边界向量和中途复位）"""
+        window = self.reset_window()
+        covered = window[1] + 1 if window else len(self.corner_vectors())
+        return min(self.num_vectors, max(self.min_vectors, covered))
+
+    def saturation_point(self, expected):
+        """
+        按输出翻转覆盖率确定截断位置
+
+        Args:
+            expected: 输出端口名 -> 每个向量之后的二进制字符串列表（可含x/z）
+
+        Returns:
+            int: 需要保留的向量数
+        """
+        length = len(next(iter(expected.values()), []))
+        if not length:
+            return self.minimum_length()
+
+        minimum = self.minimum_length()
+        toggled = {name: 0 for name in expected}
+        previous = {name: None for name in expected}
+        last_growth = 0
+        for i in range(length):
+            grew = False
+            for name, values in expected.items():
+                value = int(re.sub(r'[^01]', '0', values[i]) or '0', 2)
+                if previous[name] is not None:
+                    new_bits = (value ^ previous[name]) & ~toggled[name]
+                    if new_bits:
+                        toggled[name] |= new_bits
+                        grew = True
+                previous[name] = value
+            if grew:
+                last_growth = i
+            if i + 1 >= minimum and i - last_growth >= self.patience:
+                return i + 1
+        return length
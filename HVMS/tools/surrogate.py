@@ -0,0 +1,759 @@
+import os
+import json
+import math
+import hashlib
+import logging
+import threading
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from utils import VerilogParser, VerilogIndex
+
+from .vivado import parse_ppa_report_text
+
+
+# 预测的PPA指标（与VivadoTool._parse_ppa_report的键一致）
+PPA_METRICS = ('lut', 'ff', 'io', 'cell_count', 'max_freq', 'critical_path_delay', 'total_power')
+
+# 参与特征统计的运算符和关键字
+_FEATURE_OPERATORS = ('+', '-', '*', '/', '%', '**', '&', '|', '^', '~', '<<', '>>', '==', '!=',
+                      '<', '>', '<=', '>=', '?', '&&', '||', '!', '{')
+_FEATURE_KEYWORDS = ('if', 'else', 'case', 'casex', 'casez', 'for', 'generate', 'function', 'integer',
+                     'wire', 'reg', 'assign', 'posedge', 'negedge', 'initial')
+
+
+def extract_features(code):
+    """
+    从代码的特征索引中提取结构特征向量（计数类特征取log1p）
+
+    Args:
+        code: Verilog代码
+
+    Returns:
+        numpy.ndarray: 特征向量
+    """
+    index = VerilogIndex.of(code)
+    input_bits = sum(port.width or 1 for port in index.ports if port.direction == 'input')
+    output_bits = sum(port.width or 1 for port in index.ports if port.direction == 'output')
+
+    counts = [
+        len(index.clean_code),
+        len(index.tokens),
+        len(index.modules),
+        len(index.instances),
+        len(index.ports),
+        len(index.inputs),
+        len(index.outputs),
+        input_bits,
+        output_bits,
+        len(index.parameters),
+        len(index.always_blocks),
+        len(index.sequential_blocks),
+        len(index.combinational_blocks),
+        sum(block.size for block in index.always_blocks),
+        len(index.case_statements),
+        sum(case.items for case in index.case_statements),
+        len(index.assigns),
+        sum(len(expression) for _, expression in index.assigns),
+        len(index.nonblocking_assigns),
+        len(index.registers),
+        index.register_bits,
+        sum(index.arithmetic_counts.values()),
+    ]
+    counts.extend(index.operator_counts[op] for op in _FEATURE_OPERATORS)
+    counts.extend(index.keyword_counts[word] for word in _FEATURE_KEYWORDS)
+
+    flags = [float(index.is_sequential), float(index.has_fsm), float(index.has_arithmetic)]
+    return np.array([math.log1p(value) for value in counts] + flags, dtype=np.float64)
+
+
+def _dataset_rows(pairs):
+    """
+    进程池工作函数：提取一组(代码文件, 报告文件)的特征和指标
+
+    Args:
+        pairs: (代码文件路径, 报告文件路径) 列表
+
+    Returns:
+        list: 每个元素为(特征列表, 指标列表)，读取或解析失败时为None
+    """
+    rows = []
+    for code_file, report_file in pairs:
+        try:
+            features = extract_features(VerilogParser.read_file(code_file))
+            metrics = parse_ppa_report_text(VerilogParser.read_file(report_file))
+            rows.append((features.tolist(), [float(metrics.get(name, 0.0)) for name in PPA_METRICS]))
+        except Exception:
+            rows.append(None)
+    return rows
+
+
+def _isotonic(values, weights=None):
+    """
+    加权保序回归（相邻违序合并），返回与输入等长的非降拟合值
+
+    Args:
+        values: 按预测变化升序排列的0/1标签
+        weights: 样本权重 (可选，默认均为1)
+
+    Returns:
+        numpy.ndarray: 拟合的通过概率
+    """
+    if weights is None:
+        weights = np.ones(len(values))
+    means = []
+    totals = []
+    sizes = []
+    for value, weight in zip(values, weights):
+        means.append(float(value))
+        totals.append(float(weight))
+        sizes.append(1)
+        while len(means) > 1 and means[-2] > means[-1]:
+            total = totals[-2] + totals[-1]
+            means[-2] = (means[-2] * totals[-2] + means[-1] * totals[-1]) / total if total > 0 else means[-1]
+            totals[-2] = total
+            sizes[-2] += sizes[-1]
+            means.pop()
+            totals.pop()
+            sizes.pop()
+    return np.repeat(means, sizes)
+
+
+class SurrogatePPAModel:
+    """
+    PPA代理模型：在进入Vivado综合之前预估候选的PPA
+
+    以结构特征（VerilogIndex）为输入，对log1p变换后的LUT/FF/IO/Cell/频率/延迟/功耗做多输出岭回归；
+    bootstrap训练ensemble_size个成员，成员间的分歧与袋外残差共同给出预测不确定度。
+    数据集中存在变体（X_variant_k）与种子X配对时，另训练一个差分模型：由特征差预测log1p指标差，
+    候选的PPA按种子实测值加预测差给出；通过概率由袋外差分预测在训练对上做保序校准得到。
+    没有配对数据时退化为绝对模型之差，通过概率按预测分布采样估计。
+
+    两个模型都以各成员的充分统计量（XᵀX、Xᵀy）保存，搜索中每得到一个Vivado结果就用update()
+    按泊松bootstrap权重累加进统计量，每refit_interval个结果重新求解一次（只需解一个小线性方程组），
+    同时把该结果追加到校准集，随着运行推进预筛越来越贴近实际搜索的分布。
+    模型（含在线更新）按训练数据集指纹持久化到cache_dir，数据集不变时直接加载，中断后续跑时继续沿用。
+    """
+
+    def __init__(self, cache_dir=None, ensemble_size=8, alpha=1.0, residual_correlation=0.75,
+                 num_samples=64, min_probability=0.3, uncertainty_threshold=0.15, online=True,
+                 refit_interval=8, online_weight=4.0, min_calibration=50, seed=0, logger=None):
+        """
+        初始化代理模型
+
+        Args:
+            cache_dir: 模型保存目录 (可选)
+            ensemble_size: bootstrap成员数
+            alpha: 岭回归正则化系数
+            residual_correlation: 候选与种子残差的相关系数（候选由种子变换而来，误差大部分相互抵消）
+            num_samples: 估计通过概率时的采样数（无配对数据时使用）
+            min_probability: 预筛选中所需的最低通过概率
+            uncertainty_threshold: 视为"不确定"的成员分歧阈值（各指标标准差的均值，log1p空间）
+            online: 是否用搜索中得到的Vivado结果在线更新模型
+            refit_interval: 每累计多少个新结果重新求解并保存模型
+            online_weight: 在线结果在校准集中的权重（相对训练数据集中的一对样本）
+            min_calibration: 使用保序校准所需的最少样本数，不足时按预测分布采样估计通过概率
+            seed: 随机种子
+            logger: 日志记录器
+        """
+        self.cache_dir = cache_dir
+        self.ensemble_size = max(1, ensemble_size)
+        self.alpha = alpha
+        self.residual_correlation = min(max(residual_correlation, 0.0), 1.0)
+        self.num_samples = max(1, num_samples)
+        self.min_probability = min_probability
+        self.uncertainty_threshold = uncertainty_threshold
+        self.online = online
+        self.refit_interval = max(1, refit_interval)
+        self.online_weight = online_weight
+        self.min_calibration = max(1, min_calibration)
+        self.seed = seed
+        self.logger = logger or logging.getLogger(self.__class__.__name__)
+
+        self.mean = None
+        self.scale = None
+        self.weights = None         # (成员数, 特征数 + 1, 指标数)
+        self.gram = None            # (成员数, 特征数 + 1, 特征数 + 1) 加权XᵀX
+        self.moment = None          # (成员数, 特征数 + 1, 指标数) 加权Xᵀy
+        self.residual_std = None    # (指标数,) 袋外残差标准差（log1p空间）
+        self.num_samples_trained = 0
+
+        self.delta_scale = None     # (特征数,) 特征差的标准差
+        self.delta_weights = None   # (成员数, 特征数, 指标数) 差分模型（无截距）
+        self.delta_gram = None
+        self.delta_moment = None
+        self.delta_residual_std = None
+        self.calibration_base = None        # (配对数, 指标数) 种子实测指标
+        self.calibration_predicted = None   # (配对数, 指标数) 袋外（在线结果为更新前）预测的log1p差
+        self.calibration_actual = None      # (配对数, 指标数) 实际的log1p差
+        self.calibration_weight = None      # (配对数,) 样本权重
+        self._calibrations = {}
+        self.fingerprint = None
+
+        # 在线更新的流式统计：预测残差（Welford）与通过概率的Brier分数
+        self.observations = 0
+        self.online_mean = np.zeros(len(PPA_METRICS))
+        self.online_m2 = np.zeros(len(PPA_METRICS))
+        self.brier_sum = 0.0
+        self.brier_count = 0
+        self._pending = 0
+        self._online_rng = np.random.default_rng(seed + 2)
+
+        self._lock = threading.Lock()
+        self.screened = 0
+        self.passed = 0
+        self.uncertain = 0
+        self.skipped = 0
+
+    @property
+    def trained(self):
+        """模型是否可用"""
+        return self.weights is not None
+
+    # ---------- 训练 ----------
+
+    def fit_from_dataset(self, code_dir, report_dir, num_workers=1):
+        """
+        从(代码, PPA报告)数据集训练模型，数据集未变化时直接加载已保存的模型
+
+        代码文件X.v与报告文件X_report.txt按文件名配对。
+
+        Args:
+            code_dir: Verilog代码目录
+            report_dir: PPA报告目录
+            num_workers: 提取特征的并行进程数
+
+        Returns:
+            bool: 模型是否可用
+        """
+        try:
+            pairs = []
+            for code_file in VerilogParser.scan_directory(code_dir):
+                name = os.path.splitext(os.path.basename(code_file))[0]
+                report_file = os.path.join(report_dir, f"{name}_report.txt")
+                if os.path.exists(report_file):
+                    pairs.append((code_file, report_file))
+
+            if len(pairs) < 10:
+                self.logger.warning(f"代理模型训练样本不足 ({len(pairs)} 对)，不启用PPA预筛")
+                return False
+
+            fingerprint = self._fingerprint(pairs)
+            if self.load(fingerprint):
+                self.logger.info(f"加载已训练的PPA代理模型（{self.num_samples_trained} 个样本，"
+                                 f"在线更新 {self.observations} 次）")
+                return True
+
+            self.logger.info(f"开始训练PPA代理模型，共 {len(pairs)} 个样本")
+            rows = []
+            if num_workers > 1:
+                chunk_size = max(1, -(-len(pairs) // (num_workers * 4)))
+                chunks = [pairs[i:i + chunk_size] for i in range(0, len(pairs), chunk_size)]
+                with ProcessPoolExecutor(max_workers=num_workers) as pool:
+                    for chunk_rows in pool.map(_dataset_rows, chunks):
+                        rows.extend(chunk_rows)
+            else:
+                rows = _dataset_rows(pairs)
+
+            names = []
+            for (code_file, _), row in zip(pairs, rows):
+                if row is not None:
+                    names.append(os.path.splitext(os.path.basename(code_file))[0])
+            rows = [row for row in rows if row is not None]
+            features = np.array([row[0] for row in rows], dtype=np.float64)
+            metrics = np.array([row[1] for row in rows], dtype=np.float64)
+
+            # 变体X_variant_k与种子X配对（与HVMSFramework输出文件的命名一致）
+            positions = {name: i for i, name in enumerate(names)}
+            variant_pairs = []
+            for i, name in enumerate(names):
+                seed_name = name.split('_variant_')[0]
+                if seed_name != name and seed_name in positions:
+                    variant_pairs.append((positions[seed_name], i))
+
+            self.fit(features, metrics, variant_pairs)
+            self.fingerprint = fingerprint
+            self.save()
+            return True
+
+        except Exception as e:
+            self.logger.error(f"训练PPA代理模型失败: {str(e)}")
+            self.logger.error(traceback.format_exc())
+            return False
+
+    def fit(self, features, metrics, pairs=None):
+        """
+        训练bootstrap岭回归集成
+
+        Args:
+            features: 特征矩阵 (样本数, 特征数)
+            metrics: PPA指标矩阵 (样本数, 指标数)，按PPA_METRICS顺序
+            pairs: (种子行号, 变体行号) 列表 (可选)，用于训练差分模型
+        """
+        targets = np.log1p(np.maximum(metrics, 0.0))
+        self.mean = features.mean(axis=0)
+        self.scale = features.std(axis=0)
+        self.scale[self.scale == 0] = 1.0
+        design = self._design(features)
+
+        rng = np.random.default_rng(self.seed)
+        count = len(design)
+        weights = []
+        grams = []
+        moments = []
+        oob_sum = np.zeros_like(targets)
+        oob_count = np.zeros(count)
+        regularizer = self.alpha * np.eye(design.shape[1])
+        regularizer[0, 0] = 0.0     # 截距不做正则化
+
+        for _ in range(self.ensemble_size):
+            sample = rng.integers(0, count, count)
+            x, y = design[sample], targets[sample]
+            grams.append(x.T @ x)
+            moments.append(x.T @ y)
+            member = np.linalg.solve(grams[-1] + regularizer, moments[-1])
+            weights.append(member)
+
+            out_of_bag = np.ones(count, dtype=bool)
+            out_of_bag[sample] = False
+            oob_sum[out_of_bag] += design[out_of_bag] @ member
+            oob_count[out_of_bag] += 1
+
+        self.weights = np.stack(weights)
+        self.gram = np.stack(grams)
+        self.moment = np.stack(moments)
+        covered = oob_count > 0
+        if covered.any():
+            residuals = targets[covered] - oob_sum[covered] / oob_count[covered, None]
+        else:
+            residuals = targets - design @ self.weights.mean(axis=0)
+        self.residual_std = residuals.std(axis=0)
+        self.num_samples_trained = count
+
+        self.logger.info(f"PPA代理模型训练完成: {count} 个样本，"
+                         f"袋外残差(log1p): {self._rounded(self.residual_std)}")
+
+        self._calibrations = {}
+        if pairs:
+            self._fit_delta(features, metrics, targets, pairs)
+
+    def _fit_delta(self, features, metrics, targets, pairs):
+        """
+        训练差分模型：特征差 -> log1p指标差
+
+        Args:
+            features: 特征矩阵
+            metrics: PPA指标矩阵
+            targets: log1p变换后的指标矩阵
+            pairs: (种子行号, 变体行号) 列表
+        """
+        seeds = np.array([pair[0] for pair in pairs])
+        variants = np.array([pair[1] for pair in pairs])
+        delta_x = features[variants] - features[seeds]
+        delta_y = targets[variants] - targets[seeds]
+
+        self.delta_scale = delta_x.std(axis=0)
+        self.delta_scale[self.delta_scale == 0] = 1.0
+        design = delta_x / self.delta_scale
+
+        # 同一种子的变体共用一个bootstrap单元，袋外预测才不会借用同族样本
+        groups, group_of = np.unique(seeds, return_inverse=True)
+        rng = np.random.default_rng(self.seed + 1)
+        weights = []
+        grams = []
+        moments = []
+        oob_sum = np.zeros_like(delta_y)
+        oob_count = np.zeros(len(pairs))
+        regularizer = self.alpha * np.eye(design.shape[1])
+
+        for _ in range(self.ensemble_size):
+            draws = np.bincount(rng.integers(0, len(groups), len(groups)), minlength=len(groups))
+            sample_weight = draws[group_of].astype(np.float64)
+            x = design * sample_weight[:, None]
+            grams.append(x.T @ design)
+            moments.append(x.T @ delta_y)
+            member = np.linalg.solve(grams[-1] + regularizer, moments[-1])
+            weights.append(member)
+
+            out_of_bag = sample_weight == 0
+            oob_sum[out_of_bag] += design[out_of_bag] @ member
+            oob_count[out_of_bag] += 1
+
+        self.delta_weights = np.stack(weights)
+        self.delta_gram = np.stack(grams)
+        self.delta_moment = np.stack(moments)
+        covered = oob_count > 0
+        predicted = oob_sum[covered] / oob_count[covered, None]
+        self.delta_residual_std = (delta_y[covered] - predicted).std(axis=0)
+        self.calibration_base = metrics[seeds[covered]]
+        self.calibration_predicted = predicted
+        self.calibration_actual = delta_y[covered]
+        self.calibration_weight = np.ones(len(predicted))
+
+        self.logger.info(f"PPA差分模型训练完成: {len(pairs)} 个种子-变体对，"
+                         f"袋外残差(log1p): {self._rounded(self.delta_residual_std)}")
+
+    @staticmethod
+    def _rounded(values):
+        """按指标名输出保留三位小数的数值"""
+        return {name: round(float(value), 3) for name, value in zip(PPA_METRICS, values)}
+
+    def _design(self, features):
+        """标准化特征并添加截距列"""
+        standardized = (np.atleast_2d(features) - self.mean) / self.scale
+        return np.hstack([np.ones((len(standardized), 1)), standardized])
+
+    # ---------- 预测 ----------
+
+    def predict(self, code):
+        """
+        预测代码的PPA（绝对值）
+
+        Args:
+            code: Verilog代码
+
+        Returns:
+            tuple: (指标名 -> 预测值, 指标名 -> log1p空间的标准差)
+        """
+        members = self._member_predictions(code)
+        sigma = np.sqrt(members.var(axis=0) + self.residual_std ** 2)
+        values = np.expm1(members.mean(axis=0))
+        return (dict(zip(PPA_METRICS, np.maximum(values, 0.0).tolist())),
+                dict(zip(PPA_METRICS, sigma.tolist())))
+
+    def predict_relative(self, seed_code, seed_ppa, code):
+        """
+        以种子实测PPA为基准预测候选的PPA
+
+        Args:
+            seed_code: 种子代码
+            seed_ppa: 种子的实测PPA指标
+            code: 候选代码
+
+        Returns:
+            tuple: (指标名 -> 预测值, 指标名 -> log1p空间的标准差)
+        """
+        delta, sigma = self._relative_delta(seed_code, code)
+        values = self._apply_delta(seed_ppa, delta.mean(axis=0))
+        return dict(zip(PPA_METRICS, values.tolist())), dict(zip(PPA_METRICS, sigma.tolist()))
+
+    def _relative_delta(self, seed_code, code):
+        """
+        候选相对种子的log1p指标差
+
+        Returns:
+            tuple: (各成员的预测差 (成员数, 指标数), 每个指标的总标准差)
+        """
+        if self.delta_weights is not None:
+            design = (extract_features(code) - extract_features(seed_code)) / self.delta_scale
+            delta = np.einsum('f,mfk->mk', design, self.delta_weights)
+            return delta, np.sqrt(delta.var(axis=0) + self.delta_residual_std ** 2)
+
+        delta = self._member_predictions(code) - self._member_predictions(seed_code)
+        residual_var = 2.0 * (1.0 - self.residual_correlation) * self.residual_std ** 2
+        return delta, np.sqrt(delta.var(axis=0) + residual_var)
+
+    @staticmethod
+    def _apply_delta(base_ppa, delta):
+        """在基准指标上叠加log1p空间的差值"""
+        if isinstance(base_ppa, dict):
+            base_ppa = [float(base_ppa.get(name, 0.0) or 0.0) for name in PPA_METRICS]
+        base = np.log1p(np.maximum(np.asarray(base_ppa, dtype=np.float64), 0.0))
+        return np.maximum(np.expm1(base + delta), 0.0)
+
+    def _member_predictions(self, code):
+        """各成员在log1p空间的预测 (成员数, 指标数)"""
+        design = self._design(extract_features(code))[0]
+        return np.einsum('f,mfk->mk', design, self.weights)
+
+    def screen(self, seed_code, seed_ppa, code, change_fn, threshold):
+        """
+        判断候选是否值得送入Vivado综合
+
+        通过概率不低于min_probability，或者模型成员间的分歧超过uncertainty_threshold时选中。
+
+        Args:
+            seed_code: 种子代码
+            seed_ppa: 种子的实测PPA指标
+            code: 候选代码
+            change_fn: PPA变化计算函数 change_fn(base_ppa, current_ppa)
+            threshold: PPA变化阈值
+
+        Returns:
+            tuple: (是否综合, 估计的通过概率, 预测的PPA指标)
+        """
+        delta, sigma = self._relative_delta(seed_code, code)
+        mean_delta = delta.mean(axis=0)
+        predicted = dict(zip(PPA_METRICS, self._apply_delta(seed_ppa, mean_delta).tolist()))
+        probability = self._probability(seed_ppa, predicted, mean_delta, sigma, code, change_fn, threshold)
+
+        uncertain = float(delta.std(axis=0).mean()) > self.uncertainty_threshold
+        selected = probability >= self.min_probability or uncertain
+        with self._lock:
+            self.screened += 1
+            if probability >= self.min_probability:
+                self.passed += 1
+            elif uncertain:
+                self.uncertain += 1
+            else:
+                self.skipped += 1
+        return selected, probability, predicted
+
+    def _probability(self, seed_ppa, predicted, mean_delta, sigma, code, change_fn, threshold):
+        """估计PPA变化超过阈值的概率：校准样本足够时查保序校准表，否则按预测分布采样"""
+        calibration = self.calibration_predicted
+        if calibration is not None and len(calibration) >= self.min_calibration:
+            scores, rates = self._calibration(change_fn, threshold)
+            position = int(np.searchsorted(scores, change_fn(seed_ppa, predicted), side='right')) - 1
+            return float(rates[min(max(position, 0), len(rates) - 1)])
+        return self._sampled_probability(seed_ppa, mean_delta, sigma, code, change_fn, threshold)
+
+    def _sampled_probability(self, seed_ppa, mean_delta, sigma, code, change_fn, threshold):
+        """按预测分布采样估计PPA变化超过阈值的概率"""
+        rng = np.random.default_rng(int(hashlib.sha256(code.encode('utf-8', errors='ignore')).hexdigest()[:8], 16))
+        samples = mean_delta + rng.standard_normal((self.num_samples, len(PPA_METRICS))) * sigma
+        passes = 0
+        for sample in samples:
+            values = self._apply_delta(seed_ppa, sample)
+            if change_fn(seed_ppa, dict(zip(PPA_METRICS, values.tolist()))) > threshold:
+                passes += 1
+        return passes / self.num_samples
+
+    def _calibration(self, change_fn, threshold):
+        """
+        在训练对上把预测的PPA变化校准为通过概率（保序回归，按阈值缓存）
+
+        Args:
+            change_fn: PPA变化计算函数
+            threshold: PPA变化阈值
+
+        Returns:
+            tuple: (升序的预测变化, 对应的通过概率)
+        """
+        key = (getattr(change_fn, '__qualname__', repr(change_fn)), float(threshold))
+        with self._lock:
+            if key in self._calibrations:
+                return self._calibrations[key]
+
+            rows = (self.calibration_base, self.calibration_predicted, self.calibration_actual,
+                    self.calibration_weight)
+
+        scores = []
+        labels = []
+        for base, predicted, actual in zip(*rows[:3]):
+            base_ppa = dict(zip(PPA_METRICS, base.tolist()))
+            scores.append(change_fn(base_ppa, dict(zip(PPA_METRICS, self._apply_delta(base, predicted).tolist()))))
+            labels.append(float(change_fn(base_ppa, dict(zip(PPA_METRICS, self._apply_delta(base, actual).tolist())))
+                                > threshold))
+
+        order = np.argsort(scores, kind='stable')
+        calibration = (np.asarray(scores)[order], _isotonic(np.asarray(labels)[order], rows[3][order]))
+        with self._lock:
+            self._calibrations[key] = calibration
+        return calibration
+
+    # ---------- 在线更新 ----------
+
+    def update(self, seed_code, seed_ppa, code, ppa_metrics, change_fn=None, threshold=None):
+        """
+        用一个新的Vivado结果在线更新模型
+
+        先以更新前的模型做一次预测，计入残差和Brier分数的流式统计（即前序验证误差），
+        再按泊松bootstrap权重把样本累加进各成员的充分统计量，并追加到校准集。
+
+        Args:
+            seed_code: 种子代码
+            seed_ppa: 种子的实测PPA指标
+            code: 候选代码
+            ppa_metrics: 候选的实测PPA指标
+            change_fn: PPA变化计算函数 (可选，提供时统计通过概率的Brier分数)
+            threshold: PPA变化阈值 (可选)
+        """
+        if not self.online or not self.trained or not ppa_metrics:
+            return
+
+        base = np.array([max(float(seed_ppa.get(name, 0.0) or 0.0), 0.0) for name in PPA_METRICS])
+        actual = np.array([max(float(ppa_metrics.get(name, 0.0) or 0.0), 0.0) for name in PPA_METRICS])
+        features = extract_features(code)
+        seed_features = extract_features(seed_code)
+        delta, sigma = self._relative_delta(seed_code, code)
+        mean_delta = delta.mean(axis=0)
+        actual_delta = np.log1p(actual) - np.log1p(base)
+
+        probability = None
+        if change_fn is not None and threshold is not None:
+            predicted = dict(zip(PPA_METRICS, self._apply_delta(base, mean_delta).tolist()))
+            probability = self._probability(seed_ppa, predicted, mean_delta, sigma, code, change_fn, threshold)
+            label = float(change_fn(seed_ppa, ppa_metrics) > threshold)
+
+        draws = self._online_rng.poisson(1.0, self.ensemble_size).astype(np.float64)
+        design = self._design(features)[0]
+        refit = False
+        with self._lock:
+            self.gram += draws[:, None, None] * np.outer(design, design)
+            self.moment += draws[:, None, None] * np.outer(design, np.log1p(actual))
+            if self.delta_gram is not None:
+                delta_design = (features - seed_features) / self.delta_scale
+                self.delta_gram += draws[:, None, None] * np.outer(delta_design, delta_design)
+                self.delta_moment += draws[:, None, None] * np.outer(delta_design, actual_delta)
+
+            if self.calibration_predicted is None:
+                self.calibration_base = np.empty((0, len(PPA_METRICS)))
+                self.calibration_predicted = np.empty((0, len(PPA_METRICS)))
+                self.calibration_actual = np.empty((0, len(PPA_METRICS)))
+                self.calibration_weight = np.empty(0)
+            self.calibration_base = np.vstack([self.calibration_base, base])
+            self.calibration_predicted = np.vstack([self.calibration_predicted, mean_delta])
+            self.calibration_actual = np.vstack([self.calibration_actual, actual_delta])
+            self.calibration_weight = np.append(self.calibration_weight, self.online_weight)
+
+            self.observations += 1
+            residual = actual_delta - mean_delta
+            step = residual - self.online_mean
+            self.online_mean = self.online_mean + step / self.observations
+            self.online_m2 = self.online_m2 + step * (residual - self.online_mean)
+            if probability is not None:
+                self.brier_sum += (probability - label) ** 2
+                self.brier_count += 1
+
+            self._pending += 1
+            if self._pending >= self.refit_interval:
+                self._refit()
+                refit = True
+
+        if refit:
+            self.save()
+
+    def _refit(self):
+        """由充分统计量重新求解各成员的权重（调用方持有锁）"""
+        regularizer = self.alpha * np.eye(self.gram.shape[1])
+        regularizer[0, 0] = 0.0
+        self.weights = np.linalg.solve(self.gram + regularizer, self.moment)
+        if self.delta_gram is not None:
+            self.delta_weights = np.linalg.solve(self.delta_gram + self.alpha * np.eye(self.delta_gram.shape[1]),
+                                                 self.delta_moment)
+        self._calibrations = {}
+        self._pending = 0
+
+    # ---------- 持久化 ----------
+
+    def _fingerprint(self, pairs):
+        """训练数据集与模型超参数的指纹"""
+        digest = hashlib.sha256()
+        digest.update(json.dumps([self.ensemble_size, self.alpha, self.seed, len(PPA_METRICS)]).encode())
+        for code_file, report_file in pairs:
+            for path in (code_file, report_file):
+                stat = os.stat(path)
+                digest.update(f"{os.path.basename(path)}:{stat.st_size}:{int(stat.st_mtime)}".encode('utf-8'))
+        return digest.hexdigest()
+
+    def _model_file(self):
+        return os.path.join(self.cache_dir, "surrogate_model.npz") if self.cache_dir else None
+
+    def save(self):
+        """保存模型参数、充分统计量、校准集和在线更新统计"""
+        model_file = self._model_file()
+        if not model_file or not self.trained or self.fingerprint is None:
+            return
+        try:
+            with self._lock:
+                arrays = {
+                    'mean': self.mean,
+                    'scale': self.scale,
+                    'weights': self.weights,
+                    'gram': self.gram.copy(),
+                    'moment': self.moment.copy(),
+                    'residual_std': self.residual_std,
+                    'num_samples': np.array(self.num_samples_trained),
+                    'fingerprint': np.array(self.fingerprint),
+                    'observations': np.array(self.observations),
+                    'online_mean': self.online_mean,
+                    'online_m2': self.online_m2,
+                    'brier': np.array([self.brier_sum, self.brier_count])
+                }
+                if self.delta_weights is not None:
+                    arrays.update(delta_scale=self.delta_scale, delta_weights=self.delta_weights,
+                                  delta_gram=self.delta_gram.copy(), delta_moment=self.delta_moment.copy(),
+                                  delta_residual_std=self.delta_residual_std)
+                if self.calibration_predicted is not None:
+                    arrays.update(calibration_base=self.calibration_base,
+                                  calibration_predicted=self.calibration_predicted,
+                                  calibration_actual=self.calibration_actual,
+                                  calibration_weight=self.calibration_weight)
+
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_file = f"{model_file}.{os.getpid()}.tmp.npz"
+            np.savez(tmp_file, **arrays)
+            os.replace(tmp_file, model_file)
+        except Exception as e:
+            self.logger.warning(f"保存PPA代理模型失败: {str(e)}")
+
+    def load(self, fingerprint):
+        """
+        加载与指纹匹配的模型（包括此前运行中的在线更新）
+
+        Args:
+            fingerprint: 数据集指纹
+
+        Returns:
+            bool: 是否加载成功
+        """
+        model_file = self._model_file()
+        if not model_file or not os.path.exists(model_file):
+            return False
+        try:
+            with np.load(model_file) as data:
+                if str(data['fingerprint']) != fingerprint or 'gram' not in data.files:
+                    return False
+                self.mean = data['mean']
+                self.scale = data['scale']
+                self.weights = data['weights']
+                self.gram = data['gram']
+                self.moment = data['moment']
+                self.residual_std = data['residual_std']
+                self.num_samples_trained = int(data['num_samples'])
+                self.observations = int(data['observations'])
+                self.online_mean = data['online_mean']
+                self.online_m2 = data['online_m2']
+                self.brier_sum, brier_count = data['brier'].tolist()
+                self.brier_count = int(brier_count)
+                if 'delta_weights' in data.files:
+                    self.delta_scale = data['delta_scale']
+                    self.delta_weights = data['delta_weights']
+                    self.delta_gram = data['delta_gram']
+                    self.delta_moment = data['delta_moment']
+                    self.delta_residual_std = data['delta_residual_std']
+                if 'calibration_predicted' in data.files:
+                    self.calibration_base = data['calibration_base']
+                    self.calibration_predicted = data['calibration_predicted']
+                    self.calibration_actual = data['calibration_actual']
+                    self.calibration_weight = data['calibration_weight']
+            self.fingerprint = fingerprint
+            self._calibrations = {}
+            self._pending = 0
+            return True
+        except Exception as e:
+            self.logger.warning(f"加载PPA代理模型失败: {str(e)}")
+            return False
+
+    def stats(self):
+        """
+        获取预筛与在线更新统计
+
+        Returns:
+            dict: 预筛数、按概率选中数、按不确定度选中数、跳过数、在线更新数、
+                  在线预测残差标准差（log1p空间）和通过概率的Brier分数
+        """
+        with self._lock:
+            residual_std = np.sqrt(self.online_m2 / (self.observations - 1)) if self.observations > 1 else None
+            return {
+                'screened': self.screened,
+                'passed': self.passed,
+                'uncertain': self.uncertain,
+                'skipped': self.skipped,
+                'observations': self.observations,
+                'online_residual_std': self._rounded(residual_std) if residual_std is not None else None,
+                'brier': round(self.brier_sum / self.brier_count, 4) if self.brier_count else None
+            }
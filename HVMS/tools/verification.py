@@ -1,318 +1,710 @@
 import os
 import re
+import json
 import string
+import shutil
+import hashlib
 import tempfile
+import threading
 import subprocess
 import logging
 import random
+import traceback
 from pathlib import Path
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows下没有resource模块，不限制CPU时间
+    resource = None
+
+from .pysim import PySimulator
+from .stimulus import StimulusPlan, estimate_state_bits
+from .sim_result import SimulationResult
+from utils.verilog_tokenizer import parse_module
 
 
 class VerilogVerifier:
     """Verilog代码功能验证工具"""
 
-    def __init__(self, logger=None):
+    def __init__(self, trace_cache_dir=None, min_vectors=32, max_vectors=1000, coverage_patience=32,
+                 sim_timeout=120, cpu_limit=60, native_sim=True, native_vectors=4096, formal_checker=None,
+                 logger=None):
         """
         初始化验证工具
 
         Args:
+            trace_cache_dir: 参考仿真轨迹的持久化目录 (可选，不提供时只在内存中缓存)
+            min_vectors: 每次验证最少施加的测试向量数
+            max_vectors: 每次验证最多施加的测试向量数（实际数目按输入位宽和状态位数确定）
+            coverage_patience: 输出翻转覆盖率连续多少个向量不增长时提前结束激励序列
+            sim_timeout: 单次iverilog编译或vvp仿真的最长运行时间(秒)
+            cpu_limit: 单次iverilog编译或vvp仿真的CPU时间上限(秒)，0表示不限制（仅Linux生效）
+            native_sim: 是否先用进程内NumPy仿真器比较（不支持的代码自动回退到iverilog）
+            native_vectors: 进程内仿真器每次比较施加的测试向量数
+            formal_checker: 形式验证工具 (可选，FormalChecker实例，小规模模块优先用形式证明代替仿真)
             logger: 日志记录器
         """
+        self.trace_cache_dir = trace_cache_dir
+        self.min_vectors = min_vectors
+        self.max_vectors = max_vectors
+        self.coverage_patience = coverage_patience
+        self.sim_timeout = sim_timeout
+        self.cpu_limit = cpu_limit
         self.logger = logger or logging.getLogger(self.__class__.__name__)
 
-    def verify_equivalence(self, original_code, transformed_code, transform_count=None):
+        if trace_cache_dir:
+            os.makedirs(trace_cache_dir, exist_ok=True)
+
+        # 进程内仿真器：可综合子集直接在NumPy上向量化求值，省去iverilog编译和vvp进程
+        self.pysim = PySimulator(num_vectors=native_vectors, logger=self.logger) if native_sim else None
+        self.native_decided = 0
+        self.native_fallbacks = 0
+
+        self.formal = formal_checker
+
+        # 参考轨迹缓存：原始代码哈希 -> 轨迹（参考仿真失败时为None），同一哈希只仿真一次
+        self._traces = {}
+        self._trace_locks = {}
+        self._traces_lock = threading.Lock()
+        self.trace_hits = 0
+        self.trace_misses = 0
+
+    def verify_equivalence(self, original_code, transformed_code, transform_count=None, work_dir=None):
         """验证两段代码的功能等价性"""
-        # 提取模块名
-        orig_module = self._extract_module_name(original_code)
+        return self.verify_equivalence_batch(original_code, [transformed_code], transform_count=transform_count,
+                                             work_dir=work_dir)[0]
 
-        if not orig_module:
+    def verify_equivalence_batch(self, original_code, transformed_codes, transform_count=None, work_dir=None):
+        """
+        批量验证多个候选与同一原始代码的功能等价性
+
+        启用本地仿真器时先在进程内比较，找到反例的候选直接判定为不等价；
+        模块规模足够小且yosys可用时，其余候选再做形式证明：组合模块的证明结论和任意反例优先于随机仿真，
+        时序模块的有界证明通过时仍需仿真；两者都无法判定的候选才交给iverilog。
+        原始代码只在首次出现时仿真一次，记录其在确定性激励下的输出轨迹；
+        所有候选在同一个测试台中并排实例化，与缓存的轨迹逐周期比较，
+        只需一次编译和一次仿真。编译失败（通常是某个候选有语法错误）时逐个回退验证。
+
+        Args:
+            original_code: 原始代码
+            transformed_codes: 变换后的代码列表
+            transform_count: 变换计数 (可选)
+            work_dir: 可复用的工作目录 (可选，由VerificationExecutor为每个工作线程分配，不提供时使用临时目录)
+
+        Returns:
+            list: 与transformed_codes顺序一致的等价性结果
+        """
+        results = [False] * len(transformed_codes)
+        if not transformed_codes:
+            return results
+
+        if not self._extract_module_name(original_code):
             self.logger.error("无法提取原始代码的模块名")
-            return False
+            return results
+
+        decided = [None] * len(transformed_codes)
+        if self.pysim is not None:
+            decided = self._verify_native(original_code, transformed_codes)
+
+        if self.formal is not None and self.formal.available() and self.formal.selects(original_code):
+            candidates = [i for i, result in enumerate(decided) if result is not False]
+            if candidates:
+                roles = self._port_roles(self._extract_ports(original_code))
+                resets = {name: role for name, role in roles.items() if role != 'tb_clk'}
+                proven = self.formal.check_batch(original_code, [transformed_codes[i] for i in candidates],
+                                                 resets=resets, work_dir=work_dir)
+                for i, result in zip(candidates, proven):
+                    # 时序模块的有界证明只覆盖复位后有限周期，通过时仍需仿真；反例始终有效
+                    if result is False or (result is True
+                                           and not self.formal.is_bounded(original_code, transformed_codes[i])):
+                        decided[i] = result
+
+        pending = [i for i, result in enumerate(decided) if result is None]
+        for i, result in enumerate(decided):
+            if result is not None:
+                results[i] = result
+        if not pending:
+            self.logger.info(f"验证完成(无需iverilog): {sum(results)}/{len(results)} 个候选等价")
+            return results
+
+        if not self._has_iverilog():
+            self.logger.error("未找到iverilog，无法执行仿真")
+            return results
+
+        trace = self.reference_trace(original_code, work_dir=work_dir)
+        if trace is None:
+            self.logger.error("原始代码参考仿真失败，无法验证")
+            return results
+
+        codes = [transformed_codes[i] for i in pending]
+        passed = self._simulate_candidates(trace, codes, transform_count, work_dir)
+        if passed is None:
+            passed = [False] * len(codes)
+            if len(codes) > 1:
+                self.logger.warning("批量验证编译失败，逐个回退验证")
+                for j, code in enumerate(codes):
+                    single = self._simulate_candidates(trace, [code], transform_count, work_dir)
+                    passed[j] = bool(single and single[0])
+
+        for i, result in zip(pending, passed):
+            results[i] = result
+        self.logger.info(f"验证完成: {sum(results)}/{len(results)} 个候选等价")
+        return results
+
+    def _verify_native(self, original_code, transformed_codes):
+        """
+        用进程内仿真器比较候选
+
+        Args:
+            original_code: 原始代码
+            transformed_codes: 变换后的代码列表
+
+        Returns:
+            list: 每个候选的结果，None表示需要回退到iverilog
+        """
+        try:
+            native = self.pysim.check_equivalence(original_code, transformed_codes, self._port_roles)
+        except Exception as e:
+            self.logger.warning(f"本地仿真失败，回退到iverilog: {str(e)}")
+            self.logger.debug(traceback.format_exc())
+            native = [None] * len(transformed_codes)
+
+        with self._traces_lock:
+            self.native_decided += sum(1 for result in native if result is not None)
+            self.native_fallbacks += sum(1 for result in native if result is None)
+        return native
+
+    def reference_trace(self, original_code, work_dir=None):
+        """
+        获取原始代码在确定性激励下的参考输出轨迹
+
+        轨迹按代码哈希缓存在内存中（配置了trace_cache_dir时同时持久化到磁盘），
+        并发请求同一代码时只有一个线程执行参考仿真。
+
+        Args:
+            original_code: 原始代码
+            work_dir: 可复用的工作目录 (可选)
+
+        Returns:
+            dict: 轨迹 {'module', 'ports', 'stimulus', 'expected'}，参考仿真失败时返回None
+        """
+        key = hashlib.sha256(original_code.encode('utf-8')).hexdigest()
+
+        with self._traces_lock:
+            if key in self._traces:
+                self.trace_hits += 1
+                return self._traces[key]
+            key_lock = self._trace_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._traces_lock:
+                if key in self._traces:
+                    self.trace_hits += 1
+                    return self._traces[key]
+                self.trace_misses += 1
+
+            trace = self._load_trace(key)
+            if trace is None:
+                self.logger.info("参考轨迹缓存未命中，仿真原始模块")
+                trace = self._simulate_reference(original_code, int(key[:16], 16), work_dir)
+                if trace is not None:
+                    self._save_trace(key, trace)
+
+            with self._traces_lock:
+                self._traces[key] = trace
+                self._trace_locks.pop(key, None)
+
+        return trace
+
+    def _load_trace(self, key):
+        """从磁盘加载参考轨迹"""
+        if not self.trace_cache_dir:
+            return None
+        trace_file = os.path.join(self.trace_cache_dir, f"{key}.json")
+        if not os.path.exists(trace_file):
+            return None
+        try:
+            with open(trace_file, 'r', encoding='utf-8') as f:
+                trace = json.load(f)
+            if trace.get('plan') != self._plan_key():
+                return None
+            trace['ports'] = [(d, n, tuple(w) if w else None) for d, n, w in trace['ports']]
+            return trace
+        except Exception as e:
+            self.logger.warning(f"加载参考轨迹失败: {str(e)}")
+            return None
+
+    def _save_trace(self, key, trace):
+        """将参考轨迹写入磁盘（写临时文件后原子替换）"""
+        if not self.trace_cache_dir:
+            return
+        trace_file = os.path.join(self.trace_cache_dir, f"{key}.json")
+        tmp_file = f"{trace_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(trace, f)
+            os.replace(tmp_file, trace_file)
+        except Exception as e:
+            self.logger.warning(f"保存参考轨迹失败: {str(e)}")
+            if os.path.exists(tmp_file):
+                os.remove(tmp_file)
+
+    def _plan_key(self):
+        """激励计划参数（参数变化后磁盘上的旧轨迹失效）"""
+        return [self.min_vectors, self.max_vectors, self.coverage_patience]
+
+    def _stimulus_plan(self, code, ports, roles, seed):
+        """为原始代码创建激励计划"""
+        return StimulusPlan(ports, roles, seed, state_bits=estimate_state_bits(code),
+                            min_vectors=self.min_vectors, max_vectors=self.max_vectors,
+                            patience=self.coverage_patience)
+
+    def _generate_stimulus(self, plan):
+        """
+        按激励计划生成确定性激励
+
+        Args:
+            plan: 激励计划
 
-        # 确定变换后的模块名
-        if transform_count is not None:
-            # 使用固定格式的迭代计数作为后缀
-            new_trans_module = f"{orig_module}_iter{transform_count}"
+        Returns:
+            tuple: (输入端口名 -> 每个测试向量的二进制字符串列表, 复位序列的二进制字符串列表)
+        """
+        vectors, resets = plan.vectors()
+        stimulus = {name: [format(vector[name], f'0{width}b') for vector in vectors]
+                    for name, width in plan.inputs}
+        return stimulus, [str(level) for level in resets]
 
-            # 添加随机字符串以确保唯一性，但保留迭代计数前缀
-            import string
-            unique_suffix = ''.join(random.choices(string.ascii_lowercase + string.digits, k=6))
-            unique_id = f"iter{transform_count}_{unique_suffix}"
+    @contextmanager
+    def _workspace(self, work_dir, name):
+        """
+        提供一次仿真使用的工作目录
+
+        给定work_dir时在其下使用固定子目录并在使用前清空（工作线程之间互不共享，可反复复用）；
+        否则创建临时目录并在用完后删除
+
+        Args:
+            work_dir: 可复用的工作目录 (可选)
+            name: 子目录名或临时目录前缀
+        """
+        if work_dir:
+            path = os.path.join(work_dir, name)
+            shutil.rmtree(path, ignore_errors=True)
+            os.makedirs(path, exist_ok=True)
+            yield path
         else:
-            # 如果没有提供计数，只使用随机后缀
-            import string
-            unique_suffix = ''.join(random.choices(string.ascii_lowercase + string.digits, k=8))
-            new_trans_module = f"{orig_module}_{unique_suffix}"
-            unique_id = unique_suffix
+            path = tempfile.mkdtemp(prefix=f"verilog_{name}_")
+            try:
+                yield path
+            finally:
+                shutil.rmtree(path, ignore_errors=True)
+
+    def _simulate_reference(self, original_code, seed, work_dir=None):
+        """
+        仿真原始模块，记录每个测试向量之后的输出值
 
-        # 使用一致的命名约定
-        self.logger.info(f"准备重命名模块: {orig_module} -> {new_trans_module}")
+        按激励计划施加完整序列，再在输出翻转覆盖率饱和处截断，验证阶段只施加截断后的前缀
 
-        # 修改变换后代码中的模块名，传递完整的目标模块名，而不是分开的后缀
-        transformed_code_renamed = self._rename_module_in_code(transformed_code, new_trans_module, unique_id)
+        Args:
+            original_code: 原始代码
+            seed: 激励随机种子
+            work_dir: 可复用的工作目录 (可选)
+
+        Returns:
+            dict: 参考轨迹，失败时返回None
+        """
+        module = self._extract_module_name(original_code)
+        ports = self._extract_ports(original_code)
+        roles = self._port_roles(ports)
+        plan = self._stimulus_plan(original_code, ports, roles, seed)
+        stimulus, resets = self._generate_stimulus(plan)
+        outputs = [name for direction, name, _ in ports if direction == 'output']
 
         try:
-            # 创建临时工作目录
-            temp_dir = tempfile.mkdtemp(prefix=f"verilog_verify_{unique_suffix}_")
-            self.logger.info(f"创建临时工作目录: {temp_dir}")
-
-            # 保存代码到临时文件
-            orig_file = os.path.join(temp_dir, f"{orig_module}_original.v")
-            trans_file = os.path.join(temp_dir, f"{new_trans_module}.v")
-
-            with open(orig_file, 'w', encoding='utf-8') as f:
-                f.write(original_code)
-
-            with open(trans_file, 'w', encoding='utf-8') as f:
-                f.write(transformed_code_renamed)
-
-            # 检查变换后文件中是否包含正确的模块名
-            with open(trans_file, 'r', encoding='utf-8') as f:
-                saved_code = f.read()
-                if f"module {new_trans_module}" not in saved_code:
-                    self.logger.error(f"保存的文件中找不到正确的模块名: {new_trans_module}")
-                    self.logger.debug(f"文件内容前100字符: {saved_code[:100]}")
-                    return False
-
-            # 生成测试台
-            tb_file = self._generate_testbench(temp_dir, orig_module, new_trans_module)
-
-            # 检查测试台文件
-            with open(tb_file, 'r', encoding='utf-8') as f:
-                tb_content = f.read()
-                if f"{new_trans_module} transformed_inst" not in tb_content:
-                    self.logger.error(f"测试台中找不到变换后的模块名: {new_trans_module}")
-                    return False
-
-            # 使用iverilog运行仿真前打印调试信息
-            self.logger.info(f"原始模块: {orig_module}, 变换后模块: {new_trans_module}")
-            self.logger.info(f"文件列表: {os.listdir(temp_dir)}")
-
-            # 使用iverilog运行仿真
-            result = self._run_simulation(temp_dir, [orig_file, trans_file, tb_file])
-
-            # 如果仿真失败，保留临时目录用于调试
-            if result is None:
-                self.logger.warning(f"保留临时目录用于调试: {temp_dir}")
-                return False
+            with self._workspace(work_dir, "reference") as temp_dir:
+                orig_file = os.path.join(temp_dir, f"{module}_original.v")
+                with open(orig_file, 'w', encoding='utf-8') as f:
+                    f.write(original_code)
+                for name, values in stimulus.items():
+                    self._write_mem_file(os.path.join(temp_dir, f"stim_{name}.mem"), values)
+                self._write_mem_file(os.path.join(temp_dir, "reset_seq.mem"), resets)
+
+                tb_file = self._generate_reference_testbench(temp_dir, module, ports, roles, len(resets))
+                result = self._run_simulation(temp_dir, [orig_file, tb_file], "参考仿真完成")
+                if not result.compiled or not result.finished:
+                    self.logger.warning(f"原始模块 {module} 参考仿真未正常结束")
+                    return None
+
+                expected = {name: [] for name in outputs}
+                if outputs:
+                    with open(os.path.join(temp_dir, "reference_trace.txt"), 'r', encoding='utf-8') as f:
+                        lines = [line.split() for line in f if line.strip()]
+                    if len(lines) != len(resets) or any(len(values) != len(outputs) for values in lines):
+                        self.logger.warning("参考轨迹行数与测试向量数不一致")
+                        return None
+                    for values in lines:
+                        for name, value in zip(outputs, values):
+                            expected[name].append(value)
+
+            length = plan.saturation_point(expected)
+            self.logger.info(f"参考仿真: 计划 {len(resets)} 个测试向量，覆盖率饱和后保留 {length} 个")
+            return {
+                'module': module,
+                'ports': ports,
+                'stimulus': {name: values[:length] for name, values in stimulus.items()},
+                'resets': resets[:length],
+                'expected': {name: values[:length] for name, values in expected.items()},
+                'plan': self._plan_key()
+            }
+
+        except Exception as e:
+            self.logger.error(f"参考仿真时出错: {str(e)}")
+            import traceback
+            self.logger.error(traceback.format_exc())
+            return None
 
-            # 解析结果
-            is_equivalent = self._parse_simulation_result(result)
+    def _simulate_candidates(self, trace, transformed_codes, transform_count=None, work_dir=None):
+        """
+        在一个测试台中仿真全部候选并与参考轨迹比较
 
-            # 清理临时文件（成功时）
-            if is_equivalent:
-                try:
-                    import shutil
-                    shutil.rmtree(temp_dir)
-                except Exception as e:
-                    self.logger.warning(f"清理临时文件失败: {str(e)}")
+        Args:
+            trace: 参考轨迹
+            transformed_codes: 变换后的代码列表
+            transform_count: 变换计数 (可选)
+            work_dir: 可复用的工作目录 (可选)
 
-            return is_equivalent
+        Returns:
+            list: 每个候选是否等价，测试台编译失败时返回None
+        """
+        orig_module = trace['module']
+        results = [False] * len(transformed_codes)
+        unique_suffix = ''.join(random.choices(string.ascii_lowercase + string.digits, k=8))
+        prefix = f"iter{transform_count}_" if transform_count is not None else ""
+
+        try:
+            with self._workspace(work_dir, "candidates") as temp_dir:
+                self.logger.info(f"工作目录: {temp_dir}，候选数 {len(transformed_codes)}")
+
+                # 每个候选使用独立的模块名和子模块后缀，避免同一次编译中重名
+                files = []
+                slots = []
+                trans_modules = []
+                for i, code in enumerate(transformed_codes):
+                    unique_id = f"{prefix}c{i}_{unique_suffix}"
+                    module_name = f"{orig_module}_{unique_id}"
+                    renamed = self._rename_module_in_code(code, module_name, unique_id)
+                    if f"module {module_name}" not in renamed:
+                        self.logger.warning(f"候选 {i} 重命名后找不到模块名 {module_name}，判定为不等价")
+                        continue
+
+                    trans_file = os.path.join(temp_dir, f"{module_name}.v")
+                    with open(trans_file, 'w', encoding='utf-8') as f:
+                        f.write(renamed)
+                    files.append(trans_file)
+                    slots.append(i)
+                    trans_modules.append(module_name)
+
+                if not trans_modules:
+                    return results
+
+                for name, values in trace['stimulus'].items():
+                    self._write_mem_file(os.path.join(temp_dir, f"stim_{name}.mem"), values)
+                for name, values in trace['expected'].items():
+                    self._write_mem_file(os.path.join(temp_dir, f"exp_{name}.mem"), values)
+                self._write_mem_file(os.path.join(temp_dir, "reset_seq.mem"), trace['resets'])
+
+                tb_file = self._generate_testbench(temp_dir, trace, trans_modules)
+                result = self._run_simulation(temp_dir, files + [tb_file], "批量验证完成",
+                                              num_candidates=len(trans_modules))
+                if not result.compiled:
+                    return None
+
+            for tb_slot, i in enumerate(slots):
+                results[i] = result.equivalent(tb_slot)
+                if tb_slot in result.mismatches:
+                    self.logger.info(f"候选 {i} 不等价: {result.mismatches[tb_slot]}")
+            return results
 
         except Exception as e:
             self.logger.error(f"验证等价性时出错: {str(e)}")
             import traceback
             self.logger.error(traceback.format_exc())
-            return False
+            return results
+
+    def _write_mem_file(self, path, values):
+        """写入$readmemb可读取的存储器初始化文件"""
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(values))
+            f.write('\n')
+
+    def _port_bits(self, width):
+        """端口位宽"""
+        return abs(width[0] - width[1]) + 1 if width else 1
 
     def _extract_module_name(self, code):
         """从Verilog代码中提取模块名"""
-        match = re.search(r'module\s+(\w+)', code)
-        if match:
-            return match.group(1)
-        return None
+        interface = parse_module(code)
+        return interface.name if interface else None
 
     def _extract_ports(self, code):
-        """从Verilog代码中提取端口信息"""
-        # 提取模块声明
-        module_match = re.search(r'module\s+\w+\s*\((.*?)\);', code, re.DOTALL)
-        if not module_match:
+        """
+        从Verilog代码中提取端口信息（共享的单遍解析器，结果按代码缓存）
+
+        Returns:
+            list: 每个元素为(方向, 名称, 位宽)，位宽为(msb, lsb)，标量端口为None
+        """
+        interface = parse_module(code)
+        if interface is None:
             return []
+        unresolved = [port.name for port in interface.ports if not port.resolved]
+        if unresolved:
+            self.logger.warning(f"无法确定端口位宽: {', '.join(unresolved)}，按1位处理")
+        return [(port.direction, port.name, port.range) for port in interface.ports]
 
-        port_text = module_match.group(1)
-        port_list = [p.strip() for p in port_text.split(',')]
-
-        ports = []
-        # 在模块定义和endmodule之间查找端口定义
-        module_body = re.search(r'module.*?endmodule', code, re.DOTALL)
-        if module_body:
-            body = module_body.group(0)
-
-            for port in port_list:
-                # 查找输入端口
-                input_match = re.search(r'input\s+(?:wire|reg)?\s*(?:\[\s*(\d+)\s*:\s*(\d+)\s*\])?\s*' + port + r'\b',
-                                        body)
-                if input_match:
-                    width = None
-                    if input_match.group(1) and input_match.group(2):
-                        width = (int(input_match.group(1)), int(input_match.group(2)))
-                    ports.append(('input', port, width))
-                    continue
-
-                # 查找输出端口
-                output_match = re.search(r'output\s+(?:wire|reg)?\s*(?:\[\s*(\d+)\s*:\s*(\d+)\s*\])?\s*' + port + r'\b',
-                                         body)
-                if output_match:
-                    width = None
-                    if output_match.group(1) and output_match.group(2):
-                        width = (int(output_match.group(1)), int(output_match.group(2)))
-                    ports.append(('output', port, width))
-                    continue
-
-                # 查找双向端口
-                inout_match = re.search(r'inout\s+(?:wire|reg)?\s*(?:\[\s*(\d+)\s*:\s*(\d+)\s*\])?\s*' + port + r'\b',
-                                        body)
-                if inout_match:
-                    width = None
-                    if inout_match.group(1) and inout_match.group(2):
-                        width = (int(inout_match.group(1)), int(inout_match.group(2)))
-                    ports.append(('inout', port, width))
-
-        return ports
-
-    def _generate_testbench(self, work_dir, orig_module, trans_module):
-        """
-        生成用于等价性验证的测试台
+    def _port_roles(self, ports):
+        """
+        识别时钟和复位端口，这两类端口由测试台统一驱动而不施加随机激励
 
         Args:
-            work_dir: 工作目录
-            orig_module: 原始模块名
-            trans_module: 变换后的模块名
+            ports: 端口列表，每个元素为(方向, 名称, 位宽)
 
         Returns:
-            str: 测试台文件路径
+            dict: 端口名到连接表达式的映射（时钟接tb_clk，复位按极性接tb_rst_n或其反相）
+        """
+        roles = {}
+        for direction, name, width in ports:
+            if direction != 'input' or width:
+                continue
+            lower = name.lower()
+            if re.fullmatch(r'(i_)?(\w+_)?a?(clk|clock)(_i|_in)?', lower):
+                roles[name] = 'tb_clk'
+            else:
+                match = re.fullmatch(r'(i_)?(\w+_)?[as]?(rst|reset)(_?n|_b|_l)?(_i|_in)?', lower)
+                if match:
+                    roles[name] = 'tb_rst_n' if match.group(4) else '~tb_rst_n'
+        return roles
+
+    def _testbench_prologue(self, ports, roles, num_vectors, failed_width=None):
         """
-        # 读取原始模块以提取端口信息
-        orig_file = os.path.join(work_dir, f"{orig_module}_original.v")
-        with open(orig_file, 'r', encoding='utf-8') as f:
-            orig_code = f.read()
+        测试台公共部分：时钟复位、激励存储器及其加载
 
-        ports = self._extract_ports(orig_code)
+        Args:
+            ports: 端口列表
+            roles: 时钟/复位端口映射
+            num_vectors: 测试向量数
+            failed_width: 候选失败标志位宽 (可选，参考测试台不需要)
 
-        # 生成测试台代码
-        tb_code = f"""
+        Returns:
+            str: 测试台代码片段
+        """
+        code = f"""
     `timescale 1ns/1ps
 
     module tb_equivalence();
 
     // 时钟和复位
-    reg clk;
-    reg rst_n;
+    reg tb_clk;
+    reg tb_rst_n;
+    integer tb_vec;
+    integer tb_index;
+    """
+        if failed_width:
+            code += f"""
+    // 每个候选的失败标志
+    reg [{failed_width - 1}:0] tb_failed;
+    """
+
+        code += "\n    // 输入信号及其激励存储器\n"
+        for direction, name, width in ports:
+            if direction == 'input' and name not in roles:
+                code += f"    reg {self._range(width)}{name};\n"
+                code += f"    reg {self._range(width)}tb_stim_{name} [0:{num_vectors - 1}];\n"
+        code += f"    reg tb_reset_seq [0:{num_vectors - 1}];\n"
 
-    // 初始化时钟和复位
+        code += f"""
+    // 初始化时钟、复位并加载激励
     initial begin
-        clk = 0;
-        rst_n = 0;
-        #100 rst_n = 1;
+        tb_clk = 0;
+        tb_rst_n = 0;
+"""
+        if failed_width:
+            code += "        tb_failed = 0;\n"
+        for direction, name, _ in ports:
+            if direction == 'input' and name not in roles:
+                code += f'        $readmemb("stim_{name}.mem", tb_stim_{name});\n'
+        code += '        $readmemb("reset_seq.mem", tb_reset_seq);\n'
+        code += """        #100 tb_rst_n = 1;
     end
 
     // 生成时钟
-    always #5 clk = ~clk;
+    always #5 tb_clk = ~tb_clk;
 
-    """
+    // 设置最大仿真时间
+    initial begin
+        #%d $display("仿真超时");
+        $finish;
+    end
+""" % (100 + num_vectors * 20 + 1000)
+        return code
 
-        # 声明用于测试的信号
-        for direction, name, width in ports:
-            if direction == 'input':
-                if width:
-                    tb_code += f"reg [{width[0]}:{width[1]}] {name};\n"
-                else:
-                    tb_code += f"reg {name};\n"
-            elif direction == 'output':
-                if width:
-                    tb_code += f"wire [{width[0]}:{width[1]}] {name}_orig, {name}_trans;\n"
-                else:
-                    tb_code += f"wire {name}_orig, {name}_trans;\n"
-            elif direction == 'inout':
-                if width:
-                    tb_code += f"wire [{width[0]}:{width[1]}] {name};\n"
-                    tb_code += f"wire [{width[0]}:{width[1]}] {name}_orig, {name}_trans;\n"
-                else:
-                    tb_code += f"wire {name};\n"
-                    tb_code += f"wire {name}_orig, {name}_trans;\n"
-
-        # 实例化原始模块
-        tb_code += f"\n// 原始模块实例\n{orig_module} original_inst (\n"
-        instance_ports = []
+    def _instance(self, module, instance, ports, roles, suffix):
+        """生成模块实例化代码，输出端口连接到带后缀的线网"""
+        connections = []
         for direction, name, _ in ports:
-            if direction == 'input':
-                instance_ports.append(f".{name}({name})")
-            elif direction == 'output':
-                instance_ports.append(f".{name}({name}_orig)")
-            elif direction == 'inout':
-                instance_ports.append(f".{name}({name}_orig)")
-        tb_code += ',\n'.join(instance_ports)
-        tb_code += "\n);\n"
-
-        # 实例化变换后的模块
-        tb_code += f"\n// 变换后的模块实例\n{trans_module} transformed_inst (\n"
-        instance_ports = []
+            if name in roles:
+                connections.append(f".{name}({roles[name]})")
+            elif direction == 'input':
+                connections.append(f".{name}({name})")
+            elif direction in ('output', 'inout'):
+                connections.append(f".{name}({name}_{suffix})")
+        return f"    {module} {instance} (\n        " + ',\n        '.join(connections) + "\n    );\n"
+
+    def _apply_stimulus(self, ports, roles):
+        """在第tb_vec个测试向量处为所有输入赋值（复位按复位序列在中途重新施加）"""
+        code = ""
+        if any(role != 'tb_clk' for role in roles.values()):
+            code += "            tb_rst_n = tb_reset_seq[tb_vec];\n"
         for direction, name, _ in ports:
-            if direction == 'input':
-                instance_ports.append(f".{name}({name})")
-            elif direction == 'output':
-                instance_ports.append(f".{name}({name}_trans)")
-            elif direction == 'inout':
-                instance_ports.append(f".{name}({name}_trans)")
-        tb_code += ',\n'.join(instance_ports)
-        tb_code += "\n);\n"
-
-        # 添加输入激励生成
-        tb_code += """
-    // 随机激励生成
+            if direction == 'input' and name not in roles:
+                code += f"            {name} = tb_stim_{name}[tb_vec];\n"
+        return code
+
+    def _range(self, width):
+        """位宽声明"""
+        return f"[{width[0]}:{width[1]}] " if width else ""
+
+    def _generate_reference_testbench(self, work_dir, module, ports, roles, num_vectors):
+        """
+        生成参考仿真测试台：驱动原始模块并把每个测试向量之后的输出写入轨迹文件
+
+        Args:
+            work_dir: 工作目录
+            module: 原始模块名
+            ports: 端口列表
+            roles: 时钟/复位端口映射
+            num_vectors: 测试向量数
+
+        Returns:
+            str: 测试台文件路径
+        """
+        outputs = [(name, width) for direction, name, width in ports if direction == 'output']
+
+        tb_code = self._testbench_prologue(ports, roles, num_vectors)
+        for direction, name, width in ports:
+            if direction in ('output', 'inout'):
+                tb_code += f"    wire {self._range(width)}{name}_ref;\n"
+        tb_code += "\n    // 原始模块实例\n" + self._instance(module, "original_inst", ports, roles, "ref")
+
+        record = ""
+        if outputs:
+            fmt = ' '.join(['%b'] * len(outputs))
+            args = ''.join(f", {name}_ref" for name, _ in outputs)
+            record = f'$fwrite(tb_fd, "{fmt}\\n"{args});'
+        tb_code += f"""
+    // 施加激励并记录输出轨迹
+    integer tb_fd;
     initial begin
-        // 等待复位完成
-        @(posedge rst_n);
+        tb_fd = $fopen("reference_trace.txt", "w");
+        @(posedge tb_rst_n);
+
+        for (tb_vec = 0; tb_vec < {num_vectors}; tb_vec = tb_vec + 1) begin
+{self._apply_stimulus(ports, roles)}
+            @(posedge tb_clk);
+            #1;
+            {record}
+        end
+
+        $fclose(tb_fd);
+        $display("参考仿真完成");
+        $finish;
+    end
 
-        // 进行100个随机测试向量
-        repeat(100) begin
-            // 对所有输入应用随机值
+    endmodule
     """
 
+        tb_file = os.path.join(work_dir, "tb_reference.v")
+        with open(tb_file, 'w', encoding='utf-8') as f:
+            f.write(tb_code)
+        return tb_file
+
+    def _generate_testbench(self, work_dir, trace, trans_modules):
+        """
+        生成用于等价性验证的测试台：全部候选并排实例化，与参考轨迹逐周期比较
+
+        Args:
+            work_dir: 工作目录
+            trace: 原始模块的参考轨迹
+            trans_modules: 变换后的模块名列表
+
+        Returns:
+            str: 测试台文件路径
+        """
+        ports = trace['ports']
+        roles = self._port_roles(ports)
+        count = len(trans_modules)
+
+        num_vectors = len(trace['resets'])
+
+        tb_code = self._testbench_prologue(ports, roles, num_vectors, failed_width=count)
+
+        # 期望输出存储器和各候选的输出线网
         for direction, name, width in ports:
-            if direction == 'input':
-                if width:
-                    bit_width = width[0] - width[1] + 1
-                    tb_code += f"        {name} = $random & {{{bit_width}{{1'b1}}}};\n"
-                else:
-                    tb_code += f"        {name} = $random & 1'b1;\n"
-
-        tb_code += """
+            if direction == 'output':
+                tb_code += f"    reg {self._range(width)}tb_exp_{name} [0:{num_vectors - 1}];\n"
+                tb_code += f'    initial $readmemb("exp_{name}.mem", tb_exp_{name});\n'
+            if direction in ('output', 'inout'):
+                names = [f"{name}_c{i}" for i in range(count)]
+                tb_code += f"    wire {self._range(width)}{', '.join(names)};\n"
+
+        for i, module in enumerate(trans_modules):
+            tb_code += f"\n    // 变换后的模块实例 (候选 {i})\n" + \
+                       self._instance(module, f"transformed_inst_{i}", ports, roles, f"c{i}")
+
+        tb_code += f"""
+    // 施加激励并与参考轨迹比较
+    initial begin
+        // 等待复位完成
+        @(posedge tb_rst_n);
+
+        for (tb_vec = 0; tb_vec < {num_vectors}; tb_vec = tb_vec + 1) begin
+{self._apply_stimulus(ports, roles)}
             // 等待一个时钟周期让结果稳定
-            @(posedge clk);
+            @(posedge tb_clk);
             #1;
 
-            // 比较输出
-    """
+            // 比较输出，每个候选只报告第一次不匹配
+"""
 
         for direction, name, width in ports:
-            if direction == 'output':
-                if width:
-                    tb_code += f"""
-            if ({name}_orig !== {name}_trans) begin
-                $display("不匹配: 时间 %t, 信号 {name}, 原始值 %h, 变换值 %h", $time, {name}_orig, {name}_trans);
-                $finish;
+            if direction != 'output':
+                continue
+            fmt = '%h' if width else '%b'
+            for i in range(count):
+                tb_code += f"""
+            if (!tb_failed[{i}] && tb_exp_{name}[tb_vec] !== {name}_c{i}) begin
+                $display("不匹配: 候选 {i}, 向量 %0d, 时间 %0t, 信号 {name}, 原始值 {fmt}, 变换值 {fmt}", tb_vec, $time, tb_exp_{name}[tb_vec], {name}_c{i});
+                $fflush;
+                tb_failed[{i}] = 1'b1;
             end
-    """
-                else:
-                    tb_code += f"""
-            if ({name}_orig !== {name}_trans) begin
-                $display("不匹配: 时间 %t, 信号 {name}, 原始值 %b, 变换值 %b", $time, {name}_orig, {name}_trans);
+"""
+
+        tb_code += f"""
+            // 全部候选均已失败时提前结束
+            if (&tb_failed) begin
+                $display("批量验证完成");
                 $finish;
             end
-    """
-
-        tb_code += """
         end
 
-        // 所有测试通过
-        $display("等价性验证通过: 所有输出匹配");
-        $finish;
-    end
+        // 汇报每个候选的结果
+        for (tb_index = 0; tb_index < {count}; tb_index = tb_index + 1)
+            if (!tb_failed[tb_index])
+                $display("候选 %0d: 通过", tb_index);
 
-    // 设置最大仿真时间
-    initial begin
-        #10000 $display("仿真超时");
+        // 所有测试通过
+        if (tb_failed == 0)
+            $display("等价性验证通过: 所有输出匹配");
+        $display("批量验证完成");
         $finish;
     end
 
@@ -326,102 +718,165 @@ class VerilogVerifier:
 
         return tb_file
 
-    def _run_simulation(self, work_dir, verilog_files):
+    def _run_limited(self, args, cwd):
+        """
+        在CPU时间和墙钟时间限制下运行命令（不经过shell）
+
+        Args:
+            args: 命令参数列表
+            cwd: 工作目录
+
+        Returns:
+            tuple: (返回码, 标准输出, 标准错误)
+
+        Raises:
+            subprocess.TimeoutExpired: 超过sim_timeout时终止进程后抛出
+        """
+        process = subprocess.Popen(
+            args,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            encoding='utf-8',  # 指定编码为UTF-8
+            errors='replace',  # 替换无法解码的字符
+            cwd=cwd
+        )
+
+        # 进程启动后立即设置CPU时间上限，超限时由内核发送SIGXCPU终止
+        if self.cpu_limit and resource is not None and hasattr(resource, 'prlimit'):
+            try:
+                resource.prlimit(process.pid, resource.RLIMIT_CPU, (self.cpu_limit, self.cpu_limit + 1))
+            except (OSError, ValueError):
+                pass
+
+        try:
+            stdout, stderr = process.communicate(timeout=self.sim_timeout or None)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.communicate()
+            raise
+
+        return process.returncode, stdout or "", stderr or ""
+
+    def _run_streaming(self, args, cwd, on_line):
+        """
+        在CPU时间和墙钟时间限制下运行命令，逐行把输出交给回调（标准错误合并到标准输出）
+
+        Args:
+            args: 命令参数列表
+            cwd: 工作目录
+            on_line: 行回调，返回True时立即终止进程
+
+        Returns:
+            tuple: (返回码, 是否超时, 是否被回调提前终止)
         """
-        使用iverilog运行仿真
+        process = subprocess.Popen(
+            args,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            encoding='utf-8',
+            errors='replace',
+            bufsize=1,
+            cwd=cwd
+        )
+
+        if self.cpu_limit and resource is not None and hasattr(resource, 'prlimit'):
+            try:
+                resource.prlimit(process.pid, resource.RLIMIT_CPU, (self.cpu_limit, self.cpu_limit + 1))
+            except (OSError, ValueError):
+                pass
+
+        # 墙钟超时由定时器终止进程，读取循环随管道关闭而结束
+        expired = threading.Event()
+
+        def _expire():
+            expired.set()
+            process.kill()
+
+        timer = threading.Timer(self.sim_timeout, _expire) if self.sim_timeout else None
+        if timer:
+            timer.daemon = True
+            timer.start()
+
+        stopped = False
+        try:
+            for line in process.stdout:
+                if on_line(line):
+                    stopped = True
+                    process.kill()
+                    break
+        finally:
+            if timer:
+                timer.cancel()
+            process.stdout.close()
+            process.wait()
+
+        return process.returncode, expired.is_set(), stopped
+
+    def _run_simulation(self, work_dir, verilog_files, finish_marker, num_candidates=0):
+        """
+        使用iverilog编译并运行仿真
+
+        仿真输出逐行解析，全部候选都出现不匹配时立即终止vvp进程
 
         Args:
             work_dir: 工作目录
             verilog_files: Verilog文件路径列表
+            finish_marker: 测试台正常结束时打印的标记
+            num_candidates: 测试台中的候选数（参考仿真为0）
 
         Returns:
-            str: 仿真输出
+            SimulationResult: 仿真结果，编译失败时compiled为False
         """
+        result = SimulationResult(finish_marker, num_candidates)
+
         # 检查是否安装了iverilog
         if not self._has_iverilog():
             self.logger.error("未找到iverilog，无法执行仿真")
-            return None
+            result.compiled = False
+            return result
 
         try:
-            # 构建命令
             vvp_file = os.path.join(work_dir, "tb_sim.vvp")
-            verilog_files_str = ' '.join([f'"{f}"' for f in verilog_files])
-
-            compile_cmd = f'iverilog -o "{vvp_file}" {verilog_files_str}'
-            run_cmd = f'vvp "{vvp_file}"'
-
-            self.logger.info(f"编译命令: {compile_cmd}")
-
-            # 编译 - 使用特定编码
-            compile_result = subprocess.run(
-                compile_cmd,
-                shell=True,
-                capture_output=True,
-                text=True,
-                encoding='utf-8',  # 指定编码为UTF-8
-                errors='replace',  # 替换无法解码的字符
-                cwd=work_dir
-            )
+            compile_cmd = ["iverilog", "-o", vvp_file] + list(verilog_files)
 
-            if compile_result.returncode != 0:
-                self.logger.error(f"编译失败: {compile_result.stderr}")
-                return None
-
-            self.logger.info("编译成功，运行仿真")
+            self.logger.info(f"编译命令: {subprocess.list2cmdline(compile_cmd)}")
 
-            # 运行仿真 - 使用特定编码
-            sim_result = subprocess.run(
-                run_cmd,
-                shell=True,
-                capture_output=True,
-                text=True,
-                encoding='utf-8',  # 指定编码为UTF-8
-                errors='replace',  # 替换无法解码的字符
-                cwd=work_dir
-            )
+            try:
+                returncode, _, stderr = self._run_limited(compile_cmd, work_dir)
+            except subprocess.TimeoutExpired:
+                self.logger.error(f"编译超时（{self.sim_timeout} 秒）")
+                result.compiled = False
+                return result
 
-            # 检查返回码
-            if sim_result.returncode != 0:
-                self.logger.error(f"仿真失败，返回码: {sim_result.returncode}")
+            if returncode != 0:
+                self.logger.error(f"编译失败: {stderr}")
+                result.compiled = False
+                return result
 
-            # 安全合并输出和错误
-            stdout = sim_result.stdout if sim_result.stdout else ""
-            stderr = sim_result.stderr if sim_result.stderr else ""
-            output = stdout + "\n" + stderr
+            self.logger.info("编译成功，运行仿真")
 
-            self.logger.info(f"仿真输出: {output}")
+            returncode, expired, stopped = self._run_streaming(["vvp", vvp_file], work_dir, result.feed)
+            result.returncode = returncode
+            result.stopped_early = stopped
+            if expired:
+                result.timed_out = True
+                self.logger.error(f"仿真超时（{self.sim_timeout} 秒），已终止vvp进程")
+            elif stopped:
+                self.logger.info(f"全部 {num_candidates} 个候选均已不匹配，提前终止仿真")
+            elif returncode != 0:
+                self.logger.error(f"仿真失败，返回码: {returncode}")
 
-            return output
+            self.logger.info(f"仿真输出: {result.output}")
+            return result
 
         except Exception as e:
             self.logger.error(f"运行仿真时出错: {str(e)}")
             import traceback
             self.logger.error(traceback.format_exc())  # 打印完整堆栈跟踪
-            return None
-
-    def _parse_simulation_result(self, output):
-        """
-        解析仿真输出，判断是否等价
-
-        Args:
-            output: 仿真输出
-
-        Returns:
-            bool: 是否等价
-        """
-        if output is None:
-            self.logger.error("仿真输出为空，无法解析")
-            return False
-
-        # 检查是否有不匹配的信息
-        if "不匹配" in output:
-            return False
-
-        # 检查是否有通过的信息
-        if "等价性验证通过" in output:
-            return True
-
-        return False
+            result.compiled = False
+            return result
 
     def _has_iverilog(self):
         """检查系统中是否安装了iverilog"""
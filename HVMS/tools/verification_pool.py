@@ -0,0 +1,105 @@
+import os
+import queue
+import shutil
+import logging
+import tempfile
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+
+class VerificationExecutor:
+    """
+    功能验证专用线程池
+
+    每个工作线程独占一个可复用的工作目录（每次任务前清空，不再为每次验证创建临时目录），
+    提交接口返回Future，搜索代码可以在等待验证的同时继续发起LLM调用。
+    单个iverilog/vvp进程的CPU时间和运行时间上限由VerilogVerifier的sim_timeout和cpu_limit控制。
+    """
+
+    def __init__(self, verifier, num_workers=4, scratch_root=None, logger=None):
+        """
+        初始化验证线程池
+
+        Args:
+            verifier: 功能验证工具 (VerilogVerifier实例)
+            num_workers: 同时运行的验证任务数
+            scratch_root: 工作目录的父目录 (可选，不提供时在系统临时目录下创建，关闭时删除)
+            logger: 日志记录器
+        """
+        self.verifier = verifier
+        self.num_workers = max(1, num_workers)
+        self.logger = logger or logging.getLogger(self.__class__.__name__)
+
+        # 自行创建的根目录在关闭或进程退出时整体删除
+        if scratch_root:
+            os.makedirs(scratch_root, exist_ok=True)
+            self.scratch_root = tempfile.mkdtemp(prefix="hvms_verify_", dir=scratch_root)
+        else:
+            self.scratch_root = tempfile.mkdtemp(prefix="hvms_verify_")
+        self._finalizer = weakref.finalize(self, shutil.rmtree, self.scratch_root, True)
+
+        # 工作目录池：任务执行期间独占一个目录，结束后归还
+        self._scratch_dirs = queue.Queue()
+        for i in range(self.num_workers):
+            scratch_dir = os.path.join(self.scratch_root, f"worker_{i}")
+            os.makedirs(scratch_dir, exist_ok=True)
+            self._scratch_dirs.put(scratch_dir)
+
+        self._pool = ThreadPoolExecutor(max_workers=self.num_workers, thread_name_prefix="hvms-verify")
+
+        self._stats_lock = threading.Lock()
+        self.jobs = 0
+        self.candidates = 0
+
+        self.logger.info(f"验证线程池已启动: {self.num_workers} 个工作线程，工作目录 {self.scratch_root}")
+
+    def submit(self, original_code, transformed_codes, transform_count=None):
+        """
+        提交一批候选的等价性验证
+
+        Args:
+            original_code: 原始代码
+            transformed_codes: 变换后的代码列表
+            transform_count: 变换计数 (可选)
+
+        Returns:
+            Future: 结果为与transformed_codes顺序一致的等价性列表
+        """
+        return self._pool.submit(self._run, original_code, list(transformed_codes), transform_count)
+
+    def verify_batch(self, original_code, transformed_codes, transform_count=None):
+        """同步验证一批候选，返回等价性列表"""
+        return self.submit(original_code, transformed_codes, transform_count).result()
+
+    def _run(self, original_code, transformed_codes, transform_count):
+        """在工作线程中执行验证"""
+        scratch_dir = self._scratch_dirs.get()
+        try:
+            return self.verifier.verify_equivalence_batch(
+                original_code,
+                transformed_codes,
+                transform_count=transform_count,
+                work_dir=scratch_dir
+            )
+        finally:
+            self._scratch_dirs.put(scratch_dir)
+            with self._stats_lock:
+                self.jobs += 1
+                self.candidates += len(transformed_codes)
+
+    def stats(self):
+        """
+        获取统计信息
+
+        Returns:
+            dict: 已完成的任务数和候选数
+        """
+        with self._stats_lock:
+            return {'jobs': self.jobs, 'candidates': self.candidates}
+
+    def shutdown(self, wait=True):
+        """关闭线程池并删除工作目录"""
+        self._pool.shutdown(wait=wait)
+        if wait:
+            self._finalizer()
@@ -1,17 +1,95 @@
 import os
 import re
+import math
+import asyncio
 import tempfile
-import subprocess
 import logging
 import time
 import shutil
+import hashlib
 from pathlib import Path
+from .vivado_runner import VivadoJobRunner
+
+
+# 默认的批量综合驱动脚本
+DEFAULT_BATCH_SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                    "scripts", "vivado_batch.tcl")
+
+# 评估精度：synth只运行综合（功耗在综合网表上估算），full运行综合与实现
+FIDELITY_LEVELS = ('synth', 'full')
+
+
+def parse_ppa_report_text(content):
+    """
+    解析PPA报告文本
+
+    Args:
+        content: 报告内容
+
+    Returns:
+        dict: PPA指标，报告中缺失的指标为0；fidelity为报告的评估精度（未标注的报告来自完整流程）
+    """
+    ppa_metrics = {
+        'lut': 0,
+        'ff': 0,
+        'io': 0,
+        'cell_count': 0,  # 替换原有的utilization
+        'max_freq': 0.0,
+        'critical_path_delay': 0.0,
+        'total_power': 0.0,
+        'fidelity': 'full',
+    }
+
+    fidelity_match = re.search(r'Fidelity:\s*(\w+)', content)
+    if fidelity_match and fidelity_match.group(1) in FIDELITY_LEVELS:
+        ppa_metrics['fidelity'] = fidelity_match.group(1)
+
+    # 解析面积指标
+    lut_match = re.search(r'LUT (?:Count|Usage):\s*(\d+)', content)
+    if lut_match:
+        ppa_metrics['lut'] = int(lut_match.group(1))
+
+    ff_match = re.search(r'FF (?:Count|Usage):\s*(\d+)', content)
+    if ff_match:
+        ppa_metrics['ff'] = int(ff_match.group(1))
+
+    io_match = re.search(r'IO (?:Count|Usage):\s*(\d+)', content)
+    if io_match:
+        ppa_metrics['io'] = int(io_match.group(1))
+
+    # 新增: 提取Cell数量
+    cell_match = re.search(r'Cell Count:\s*(\d+)', content)
+    if cell_match:
+        ppa_metrics['cell_count'] = int(cell_match.group(1))
+
+    # 解析性能指标
+    freq_match = re.search(r'Maximum (?:Clock )?Frequency:\s*([\d\.]+)\s*MHz', content)
+    if freq_match:
+        ppa_metrics['max_freq'] = float(freq_match.group(1))
+
+    delay_match = re.search(r'(?:Longest Path|Critical Path) Delay:\s*([\d\.]+)\s*ns', content)
+    if delay_match:
+        ppa_metrics['critical_path_delay'] = float(delay_match.group(1))
+
+    # 解析功耗指标 - 只保留总功耗
+    total_power_match = re.search(r'Total Power(?: Consumption)?:\s*([\d\.]+)\s*W', content)
+    if total_power_match:
+        ppa_metrics['total_power'] = float(total_power_match.group(1))
+
+    return ppa_metrics
 
 
 class VivadoTool:
-    """Vivado工具接口，用于获取Verilog代码的PPA指标"""
+    """
+    Vivado工具接口，用于获取Verilog代码的PPA指标
+
+    fidelity为halving时采用多精度评估：先对所有候选只运行综合得到粗略PPA，
+    再由select_promotions挑出排名靠前或接近PPA阈值的候选运行完整流程。
+    """
 
-    def __init__(self, vivado_path, tcl_script, fpga_part, logger=None):
+    def __init__(self, vivado_path, tcl_script, fpga_part, logger=None, cache=None, tool_version=None,
+                 session_pool=None, runner=None, fidelity='full', promote_fraction=0.25, promote_margin=0.05,
+                 batch_script=None):
         """
         初始化Vivado工具接口
 
@@ -20,74 +98,401 @@ class VivadoTool:
             tcl_script: 用于综合和实现的TCL脚本路径
             fpga_part: 目标FPGA型号
             logger: 日志记录器
+            cache: PPA结果缓存 (可选，PPACache实例)
+            tool_version: Vivado版本 (可选，默认从可执行文件路径中推断)
+            session_pool: 常驻Vivado会话池 (可选，VivadoSessionPool实例)
+            runner: 批处理模式的任务执行器 (可选，VivadoJobRunner实例)
+            fidelity: 评估精度 full(综合+实现)/synth(只综合)/halving(先综合，再把部分候选提升到完整流程)
+            promote_fraction: halving模式下提升到完整流程的候选比例（按综合阶段的PPA变化排名）
+            promote_margin: halving模式下PPA变化不低于(阈值 - 该值)的候选全部提升到完整流程
+            batch_script: 批量综合驱动脚本路径 (可选，默认使用scripts/vivado_batch.tcl)
         """
         self.vivado_path = vivado_path
         self.tcl_script = tcl_script
         self.fpga_part = fpga_part
         self.logger = logger or logging.getLogger(self.__class__.__name__)
+        self.cache = cache
+        self.session_pool = session_pool
+        self.runner = runner or VivadoJobRunner(logger=self.logger)
+        if fidelity not in FIDELITY_LEVELS + ('halving',):
+            raise ValueError(f"未知的评估精度: {fidelity}")
+        self.fidelity = fidelity
+        self.promote_fraction = min(max(promote_fraction, 0.0), 1.0)
+        self.promote_margin = promote_margin
+        self.batch_script = batch_script or DEFAULT_BATCH_SCRIPT
+        self.tool_version = tool_version or self._detect_tool_version()
+        self.tcl_digest = self._compute_tcl_digest()
+
+    def _detect_tool_version(self):
+        """从Vivado路径中推断版本号 (如 .../Vivado/2018.3/bin/vivado.bat)"""
+        match = re.search(r'(\d{4}\.\d+)', self.vivado_path or "")
+        if match:
+            return match.group(1)
+        return os.path.basename(self.vivado_path or "vivado")
+
+    def _compute_tcl_digest(self):
+        """计算综合TCL脚本的摘要，脚本变化后缓存自动失效"""
+        try:
+            with open(self.tcl_script, 'rb') as f:
+                return hashlib.sha256(f.read()).hexdigest()
+        except Exception:
+            return hashlib.sha256(str(self.tcl_script).encode('utf-8')).hexdigest()
+
+    @property
+    def default_fidelity(self):
+        """未指定精度时单次评估使用的精度（halving模式下为完整流程）"""
+        return 'full' if self.fidelity == 'halving' else self.fidelity
+
+    def _cache_key(self, code, fidelity='full'):
+        """计算代码在给定精度下的PPA缓存键"""
+        return self.cache.make_key(code, self.fpga_part, f"{self.tcl_digest}:{fidelity}", self.tool_version)
 
-    def get_ppa_metrics(self, code, module_name=None):
+    def select_promotions(self, scores, threshold, history=None):
+        """
+        halving模式下挑选需要提升到完整流程的候选
+
+        综合阶段PPA变化排名前promote_fraction（提供history时在history与本批的全部分数中排名，
+        逐个评估的候选也能按比例提升）的候选，以及变化不低于threshold - promote_margin的全部候选被选中，
+        可能通过阈值的候选都会由完整流程确认。
+
+        Args:
+            scores: 本批候选在综合阶段的PPA变化，综合失败的候选为None
+            threshold: PPA变化阈值
+            history: 此前各批的综合阶段分数 (可选，本批分数会追加进去)
+
+        Returns:
+            list: 被选中候选的下标
+        """
+        valid = [score for score in scores if score is not None]
+        if not valid:
+            return []
+
+        cutoff = None
+        if self.promote_fraction > 0:
+            ranked = sorted((history or []) + valid, reverse=True)
+            cutoff = ranked[max(math.ceil(self.promote_fraction * len(ranked)), 1) - 1]
+        if history is not None:
+            history.extend(valid)
+
+        return [i for i, score in enumerate(scores)
+                if score is not None and ((cutoff is not None and score >= cutoff)
+                                          or score >= threshold - self.promote_margin)]
+
+    def get_ppa_metrics(self, code, module_name=None, fidelity=None):
         """
         使用Vivado获取Verilog代码的PPA指标
 
         Args:
             code: Verilog代码
             module_name: 模块名称 (可选，如果不提供则会从代码中提取)
+            fidelity: 评估精度 synth/full (可选，默认为default_fidelity)
 
         Returns:
-            dict: PPA指标
+            dict: PPA指标，fidelity键为实际的评估精度
         """
-        try:
-            # 确定模块名
-            if not module_name:
-                module_match = re.search(r'module\s+(\w+)', code)
-                if module_match:
-                    module_name = module_match.group(1)
-                else:
-                    self.logger.error("无法从代码中提取模块名称")
-                    return None
+        fidelity = fidelity or self.default_fidelity
 
-            # 创建临时工作目录
-            temp_dir = tempfile.mkdtemp(prefix="vivado_ppa_")
-            self.logger.info(f"创建临时工作目录: {temp_dir}")
+        # 查询PPA缓存
+        cache_key, cached_metrics = self._lookup_cache(code, fidelity)
+        if cached_metrics is not None:
+            return cached_metrics
 
-            # 保存代码到临时文件
-            verilog_file = os.path.join(temp_dir, f"{module_name}.v")
-            with open(verilog_file, 'w', encoding='utf-8') as f:
-                f.write(code)
+        return self._synthesize_one(code, module_name, fidelity, cache_key)
 
-            # 运行Vivado
-            result = self._run_vivado(verilog_file, module_name, temp_dir)
+    def _synthesize_one(self, code, module_name, fidelity, cache_key):
+        """
+        综合单个已确认未命中缓存的候选并写入缓存（不再查询缓存，避免重复计入未命中）
+
+        Args:
+            code: Verilog代码
+            module_name: 模块名称 (可选，为None时从代码中提取)
+            fidelity: 评估精度 synth/full
+            cache_key: 缓存键，未启用缓存时为None
 
-            if not result:
-                self.logger.error("Vivado执行失败")
+        Returns:
+            dict: PPA指标，失败时返回None
+        """
+        temp_dir = None
+        try:
+            job = self._prepare_job(code, module_name)
+            if job is None:
                 return None
+            module_name, temp_dir, verilog_file = job
 
-            # 解析PPA报告
-            ppa_metrics = self._parse_ppa_report(os.path.join(temp_dir, f"{module_name}_ppa_report.txt"))
+            # 运行Vivado
+            result = self._run_vivado(verilog_file, module_name, temp_dir, fidelity)
 
-            # 清理临时文件
-            if os.path.exists(temp_dir):
-                try:
-                    shutil.rmtree(temp_dir)
-                except Exception as e:
-                    self.logger.warning(f"清理临时目录失败: {str(e)}")
+            return self._finish_job(result, module_name, temp_dir, cache_key)
 
-            return ppa_metrics
+        except Exception as e:
+            self.logger.error(f"获取PPA指标失败: {str(e)}")
+            import traceback
+            self.logger.error(traceback.format_exc())
+            self._cleanup(temp_dir)
+            return None
+
+    async def get_ppa_metrics_async(self, code, module_name=None, fidelity=None):
+        """
+        异步获取Verilog代码的PPA指标，可在同一事件循环中并发运行多个综合任务
+
+        Args:
+            code: Verilog代码
+            module_name: 模块名称 (可选，如果不提供则会从代码中提取)
+            fidelity: 评估精度 synth/full (可选，默认为default_fidelity)
+
+        Returns:
+            dict: PPA指标
+        """
+        fidelity = fidelity or self.default_fidelity
+        cache_key, cached_metrics = self._lookup_cache(code, fidelity)
+        if cached_metrics is not None:
+            return cached_metrics
+
+        temp_dir = None
+        try:
+            job = self._prepare_job(code, module_name)
+            if job is None:
+                return None
+            module_name, temp_dir, verilog_file = job
+
+            if self.session_pool is not None:
+                # 会话池基于阻塞管道，放到线程中等待
+                result = await asyncio.to_thread(self._run_vivado_in_pool, verilog_file, module_name, temp_dir,
+                                                 fidelity)
+            else:
+                result = await self._run_vivado_batch(verilog_file, module_name, temp_dir, fidelity)
+
+            return self._finish_job(result, module_name, temp_dir, cache_key)
 
         except Exception as e:
             self.logger.error(f"获取PPA指标失败: {str(e)}")
             import traceback
             self.logger.error(traceback.format_exc())
-            # 尝试清理临时文件
-            if 'temp_dir' in locals() and os.path.exists(temp_dir):
-                try:
-                    shutil.rmtree(temp_dir)
-                except:
-                    pass
+            self._cleanup(temp_dir)
             return None
 
-    def _run_vivado(self, verilog_file, module_name, work_dir):
+    def get_ppa_metrics_batch(self, codes, fidelity=None, module_names=None):
+        """
+        在一次Vivado运行中综合多个候选
+
+        未命中缓存的候选各自写入批次目录下的独立工作目录，由vivado_batch.tcl依次调用综合脚本；
+        单个模块出错只影响该模块。Vivado进程中途退出时，正在综合的模块记为失败，
+        其后尚未综合的模块重新提交一次批处理；一个模块都没有开始综合时整批记为失败，不再重试。
+        使用会话池时会话已常驻，逐个提交。
+
+        Args:
+            codes: Verilog代码列表
+            fidelity: 评估精度 synth/full (可选，默认为default_fidelity)
+            module_names: 与codes对应的模块名列表 (可选，元素为None时从代码中提取)
+
+        Returns:
+            list: 与codes顺序一致的PPA指标，失败的候选为None
+        """
+        fidelity = fidelity or self.default_fidelity
+        module_names = module_names or [None] * len(codes)
+        results = [None] * len(codes)
+
+        pending = []
+        for i, code in enumerate(codes):
+            cache_key, cached_metrics = self._lookup_cache(code, fidelity)
+            if cached_metrics is not None:
+                results[i] = cached_metrics
+            else:
+                pending.append((i, cache_key))
+
+        if self.session_pool is not None or len(pending) <= 1:
+            for i, cache_key in pending:
+                results[i] = self._synthesize_one(codes[i], module_names[i], fidelity, cache_key)
+            return results
+
+        batch_dir = tempfile.mkdtemp(prefix="vivado_batch_")
+        self.logger.info(f"创建批量综合目录: {batch_dir}，共 {len(pending)} 个模块")
+        failed = False
+        try:
+            jobs = []
+            for i, cache_key in pending:
+                module_name = module_names[i] or self._extract_module_name(codes[i])
+                if not module_name:
+                    failed = True
+                    continue
+                job_dir = os.path.join(batch_dir, f"job_{i}")
+                os.makedirs(job_dir)
+                verilog_file = os.path.join(job_dir, f"{module_name}.v")
+                with open(verilog_file, 'w', encoding='utf-8') as f:
+                    f.write(codes[i])
+                jobs.append((i, cache_key, module_name, job_dir, verilog_file))
+
+            remaining = jobs
+            while remaining:
+                self._run_vivado_manifest(remaining, batch_dir, fidelity)
+
+                unfinished = []
+                for job in remaining:
+                    i, cache_key, module_name, job_dir, _ = job
+                    status_file = os.path.join(job_dir, "status.txt")
+                    if not os.path.exists(status_file):
+                        unfinished.append(job)
+                        continue
+
+                    ppa_report = os.path.join(job_dir, f"{module_name}_ppa_report.txt")
+                    with open(status_file, 'r', encoding='utf-8') as f:
+                        ok = f.read().strip() == "ok"
+                    if not ok or not os.path.exists(ppa_report):
+                        self.logger.error(f"批量综合中模块 {module_name} (候选 {i + 1}) 失败")
+                        failed = True
+                        continue
+
+                    results[i] = self._parse_ppa_report(ppa_report)
+                    if cache_key is not None:
+                        self.cache.put(cache_key, results[i])
+
+                # 没有任何模块开始综合：Vivado未能启动或批处理脚本本身出错，重新提交也会同样失败
+                if len(unfinished) == len(remaining) and not self._batch_started(batch_dir):
+                    failed = True
+                    self.logger.error(f"Vivado批处理未开始综合任何模块，整批 {len(remaining)} 个模块记为失败，"
+                                      f"详见 {os.path.join(batch_dir, 'vivado.log')}")
+                    break
+
+                # 进程中途退出：正在综合的模块记为失败，其余模块重新提交
+                if unfinished:
+                    failed = True
+                    self.logger.error(f"Vivado批处理在模块 {unfinished[0][2]} (候选 {unfinished[0][0] + 1}) 处中断"
+                                      + (f"，剩余 {len(unfinished) - 1} 个模块重新提交" if len(unfinished) > 1 else ""))
+                remaining = unfinished[1:]
+
+        except Exception as e:
+            failed = True
+            self.logger.error(f"批量获取PPA指标失败: {str(e)}")
+            import traceback
+            self.logger.error(traceback.format_exc())
+
+        # 全部成功时清理批次目录，否则保留用于调试
+        if not failed:
+            self._cleanup(batch_dir)
+
+        self.logger.info(f"批量综合完成: {sum(1 for result in results if result)}/{len(codes)} 个候选获得PPA指标")
+        return results
+
+    def _batch_started(self, batch_dir):
+        """本次批处理是否至少开始综合了一个模块（日志中出现vivado_batch.tcl的模块标记）"""
+        try:
+            with open(os.path.join(batch_dir, "vivado.log"), 'r', encoding='utf-8', errors='ignore') as f:
+                return any("HVMS_BATCH_MODULE" in line for line in f)
+        except OSError:
+            return False
+
+    def _run_vivado_manifest(self, jobs, batch_dir, fidelity):
+        """
+        写入任务清单并以批处理模式运行vivado_batch.tcl
+
+        Args:
+            jobs: (候选下标, 缓存键, 模块名, 工作目录, Verilog文件路径) 列表
+            batch_dir: 批次目录
+            fidelity: 评估精度
+
+        Returns:
+            int: 进程返回代码，超时返回None
+        """
+        manifest_file = os.path.join(batch_dir, "manifest.txt")
+        with open(manifest_file, 'w', encoding='utf-8') as f:
+            for _, _, module_name, job_dir, verilog_file in jobs:
+                f.write(f"{module_name}\t{verilog_file}\t{job_dir}\n")
+
+        cmd = [self.vivado_path, "-mode", "batch", "-nojournal", "-nolog",
+               "-source", self.batch_script,
+               "-tclargs", manifest_file, self.fpga_part, self.tcl_script, fidelity]
+        self.logger.info(f"运行Vivado批量综合: {len(jobs)} 个模块")
+
+        start_time = time.time()
+        returncode = asyncio.run(self.runner.run(cmd, batch_dir, os.path.join(batch_dir, "vivado.log"),
+                                                 total_timeout=self.runner.total_timeout * len(jobs)))
+        self.logger.info(f"Vivado批量综合结束，返回代码: {returncode}，耗时: {time.time() - start_time:.2f}秒")
+        return returncode
+
+    def _lookup_cache(self, code, fidelity='full'):
+        """
+        查询PPA缓存，只需综合精度时已有的完整流程结果同样可用
+
+        Returns:
+            tuple: (缓存键, 缓存的PPA指标)，未启用缓存时缓存键为None
+        """
+        if self.cache is None:
+            return None, None
+
+        cache_key = self._cache_key(code, fidelity)
+        if fidelity != 'full':
+            # 完整流程结果优先，两个键一次查询，只计一次命中或未命中
+            cached_metrics = self.cache.get(self._cache_key(code, 'full'), cache_key)
+        else:
+            cached_metrics = self.cache.get(cache_key)
+        if cached_metrics is not None:
+            self.logger.info(f"PPA缓存命中: {cache_key[:12]}")
+        return cache_key, cached_metrics
+
+    def _prepare_job(self, code, module_name):
+        """
+        创建临时工作目录并写入代码
+
+        Returns:
+            tuple: (模块名, 工作目录, Verilog文件路径)，无法确定模块名时返回None
+        """
+        # 确定模块名
+        if not module_name:
+            module_name = self._extract_module_name(code)
+            if not module_name:
+                return None
+
+        # 创建临时工作目录
+        temp_dir = tempfile.mkdtemp(prefix="vivado_ppa_")
+        self.logger.info(f"创建临时工作目录: {temp_dir}")
+
+        # 保存代码到临时文件
+        verilog_file = os.path.join(temp_dir, f"{module_name}.v")
+        with open(verilog_file, 'w', encoding='utf-8') as f:
+            f.write(code)
+
+        return module_name, temp_dir, verilog_file
+
+    def _extract_module_name(self, code):
+        """从代码中提取模块名，失败时返回None"""
+        module_match = re.search(r'module\s+(\w+)', code)
+        if module_match:
+            return module_match.group(1)
+        self.logger.error("无法从代码中提取模块名称")
+        return None
+
+    def _finish_job(self, result, module_name, temp_dir, cache_key):
+        """
+        解析综合结果、清理工作目录并写入缓存
+
+        Returns:
+            dict: PPA指标，综合失败时返回None（保留工作目录用于调试）
+        """
+        if not result:
+            self.logger.error("Vivado执行失败")
+            return None
+
+        # 解析PPA报告
+        ppa_metrics = self._parse_ppa_report(os.path.join(temp_dir, f"{module_name}_ppa_report.txt"))
+
+        # 清理临时文件
+        self._cleanup(temp_dir)
+
+        # 写入PPA缓存
+        if cache_key is not None:
+            self.cache.put(cache_key, ppa_metrics)
+
+        return ppa_metrics
+
+    def _cleanup(self, temp_dir):
+        """清理临时工作目录"""
+        if temp_dir and os.path.exists(temp_dir):
+            try:
+                shutil.rmtree(temp_dir)
+            except Exception as e:
+                self.logger.warning(f"清理临时目录失败: {str(e)}")
+
+    def _run_vivado(self, verilog_file, module_name, work_dir, fidelity='full'):
         """
         运行Vivado
 
@@ -95,55 +500,49 @@ class VivadoTool:
             verilog_file: Verilog文件路径
             module_name: 模块名
             work_dir: 工作目录
+            fidelity: 评估精度
+
+        Returns:
+            bool: 是否成功运行
+        """
+        if self.session_pool is not None:
+            return self._run_vivado_in_pool(verilog_file, module_name, work_dir, fidelity)
+
+        return asyncio.run(self._run_vivado_batch(verilog_file, module_name, work_dir, fidelity))
+
+    async def _run_vivado_batch(self, verilog_file, module_name, work_dir, fidelity='full'):
+        """
+        以批处理模式运行Vivado，进程退出即返回
+
+        Args:
+            verilog_file: Verilog文件路径
+            module_name: 模块名
+            work_dir: 工作目录
+            fidelity: 评估精度
 
         Returns:
             bool: 是否成功运行
         """
         try:
             # 构建命令
-            cmd = f'"{self.vivado_path}" -mode batch -nojournal -nolog -source "{self.tcl_script}" -tclargs "{verilog_file}" "{module_name}" "{self.fpga_part}" "{work_dir}"'
+            cmd = [self.vivado_path, "-mode", "batch", "-nojournal", "-nolog",
+                   "-source", self.tcl_script,
+                   "-tclargs", verilog_file, module_name, self.fpga_part, work_dir, fidelity]
 
             # 创建日志文件
             log_file = os.path.join(work_dir, "vivado.log")
-            self.logger.info(f"运行Vivado命令: {cmd}")
+            self.logger.info(f"运行Vivado命令: {' '.join(cmd)}")
 
-            # 运行Vivado
-            with open(log_file, 'w') as f:
-                start_time = time.time()
-                process = subprocess.Popen(
-                    cmd,
-                    shell=True,
-                    stdout=f,
-                    stderr=subprocess.STDOUT,
-                    cwd=work_dir
-                )
-
-            # 等待完成，最多等待30分钟
-            timeout_seconds = 1800
-            completed = False
-
-            while not completed and (time.time() - start_time) < timeout_seconds:
-                # 检查进程是否还在运行
-                if process.poll() is not None:
-                    completed = True
-                else:
-                    # 避免CPU过载
-                    time.sleep(5)
-
-            # 如果超时，强制终止进程
-            if not completed:
-                self.logger.warning(f"Vivado执行超时（{timeout_seconds}秒），强制终止")
-                process.terminate()
-                # 给进程一些时间来终止
-                time.sleep(5)
-                # 如果仍然在运行，强制终止
-                if process.poll() is None:
-                    process.kill()
+            # 运行Vivado，逐行读取输出并按阶段检查截止时间
+            start_time = time.time()
+            returncode = await self.runner.run(cmd, work_dir, log_file)
+
+            if returncode is None:
                 return False
 
             # 检查返回代码
-            if process.returncode != 0:
-                self.logger.error(f"Vivado运行失败，返回代码: {process.returncode}")
+            if returncode != 0:
+                self.logger.error(f"Vivado运行失败，返回代码: {returncode}")
                 return False
 
             # 检查是否生成了PPA报告
@@ -162,61 +561,58 @@ class VivadoTool:
             self.logger.error(traceback.format_exc())
             return False
 
-    def _parse_ppa_report(self, report_file):
+    def _run_vivado_in_pool(self, verilog_file, module_name, work_dir, fidelity='full'):
         """
-        解析PPA报告文件
+        在常驻Vivado会话池中运行综合
 
         Args:
-            report_file: PPA报告文件路径
+            verilog_file: Verilog文件路径
+            module_name: 模块名
+            work_dir: 工作目录
+            fidelity: 评估精度
 
         Returns:
-            dict: PPA指标
+            bool: 是否成功运行
         """
-        ppa_metrics = {
-            'lut': 0,
-            'ff': 0,
-            'io': 0,
-            'cell_count': 0,  # 替换原有的utilization
-            'max_freq': 0.0,
-            'critical_path_delay': 0.0,
-            'total_power': 0.0,
-        }
-
         try:
-            with open(report_file, 'r') as f:
-                content = f.read()
+            start_time = time.time()
+            if not self.session_pool.run(verilog_file, module_name, self.fpga_part, work_dir,
+                                         extra_args=[fidelity]):
+                self.logger.error("Vivado会话任务执行失败")
+                return False
 
-                # 解析面积指标
-                lut_match = re.search(r'LUT (?:Count|Usage):\s*(\d+)', content)
-                if lut_match:
-                    ppa_metrics['lut'] = int(lut_match.group(1))
+            ppa_report = os.path.join(work_dir, f"{module_name}_ppa_report.txt")
+            if not os.path.exists(ppa_report):
+                self.logger.error(f"PPA报告文件不存在: {ppa_report}")
+                return False
 
-                ff_match = re.search(r'FF (?:Count|Usage):\s*(\d+)', content)
-                if ff_match:
-                    ppa_metrics['ff'] = int(ff_match.group(1))
+            self.logger.info(f"Vivado会话任务完成，耗时: {time.time() - start_time:.2f}秒")
+            return True
 
-                io_match = re.search(r'IO (?:Count|Usage):\s*(\d+)', content)
-                if io_match:
-                    ppa_metrics['io'] = int(io_match.group(1))
+        except Exception as e:
+            self.logger.error(f"Vivado会话任务出错: {str(e)}")
+            import traceback
+            self.logger.error(traceback.format_exc())
+            return False
 
-                # 新增: 提取Cell数量
-                cell_match = re.search(r'Cell Count:\s*(\d+)', content)
-                if cell_match:
-                    ppa_metrics['cell_count'] = int(cell_match.group(1))
+    def close(self):
+        """释放Vivado会话池等长期资源"""
+        if self.session_pool is not None:
+            self.session_pool.shutdown()
 
-                # 解析性能指标
-                freq_match = re.search(r'Maximum (?:Clock )?Frequency:\s*([\d\.]+)\s*MHz', content)
-                if freq_match:
-                    ppa_metrics['max_freq'] = float(freq_match.group(1))
+    def _parse_ppa_report(self, report_file):
+        """
+        解析PPA报告文件
 
-                delay_match = re.search(r'(?:Longest Path|Critical Path) Delay:\s*([\d\.]+)\s*ns', content)
-                if delay_match:
-                    ppa_metrics['critical_path_delay'] = float(delay_match.group(1))
+        Args:
+            report_file: PPA报告文件路径
 
-                # 解析功耗指标 - 只保留总功耗
-                total_power_match = re.search(r'Total Power(?: Consumption)?:\s*([\d\.]+)\s*W', content)
-                if total_power_match:
-                    ppa_metrics['total_power'] = float(total_power_match.group(1))
+        Returns:
+            dict: PPA指标，报告无法读取时返回None
+        """
+        try:
+            with open(report_file, 'r') as f:
+                ppa_metrics = parse_ppa_report_text(f.read())
 
             self.logger.info(f"解析PPA指标: {ppa_metrics}")
             return ppa_metrics
@@ -225,7 +621,7 @@ class VivadoTool:
             self.logger.error(f"解析PPA报告时出错: {str(e)}")
             import traceback
             self.logger.error(traceback.format_exc())
-            return ppa_metrics
+            return None
 
     def save_ppa_report(self, metrics, file_path, module_name=None):
         """
@@ -255,7 +651,8 @@ class VivadoTool:
                 f.write(f"PPA Report for {module_name}.v (Module: {module_name})\n")
                 f.write(f"==========================================\n\n")
 
-                f.write(f"FPGA Device: {self.fpga_part} (UltraScale+ 16nm Technology)\n\n")
+                f.write(f"FPGA Device: {self.fpga_part} (UltraScale+ 16nm Technology)\n")
+                f.write(f"Fidelity: {metrics.get('fidelity', 'full')}\n\n")
 
                 f.write("AREA METRICS:\n")
                 f.write("------------\n")
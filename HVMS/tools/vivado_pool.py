@@ -0,0 +1,354 @@
+import os
+import time
+import queue
+import signal
+import atexit
+import logging
+import threading
+import itertools
+import subprocess
+
+
+# 默认的会话驱动脚本
+DEFAULT_SESSION_SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                      "scripts", "hvms_session.tcl")
+
+
+class VivadoSessionError(Exception):
+    """Vivado会话异常（启动失败或崩溃）"""
+    pass
+
+
+class VivadoSessionTimeout(VivadoSessionError):
+    """Vivado会话任务超时"""
+    pass
+
+
+def kill_pid_tree(pid):
+    """
+    终止进程及其所有子进程
+
+    vivado.bat等启动脚本会派生真正的Vivado进程，只终止外层进程会留下孤儿进程
+
+    Args:
+        pid: 进程ID（POSIX下需为进程组组长）
+    """
+    try:
+        if os.name == 'nt':
+            subprocess.run(f"taskkill /F /T /PID {pid}", shell=True,
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        else:
+            os.killpg(os.getpgid(pid), signal.SIGKILL)
+    except Exception:
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except Exception:
+            pass
+
+
+def kill_process_tree(process):
+    """
+    终止subprocess.Popen进程及其所有子进程
+
+    Args:
+        process: subprocess.Popen实例
+    """
+    if process is None or process.poll() is not None:
+        return
+
+    kill_pid_tree(process.pid)
+
+    try:
+        process.wait(timeout=10)
+    except Exception:
+        process.kill()
+
+
+def _tcl_quote(value):
+    """将参数包装为Tcl花括号字面量"""
+    return "{" + str(value).replace("\\", "/") + "}"
+
+
+class VivadoSession:
+    """单个常驻Vivado Tcl会话，通过标准输入输出管道交互"""
+
+    def __init__(self, vivado_path, session_script, session_id=0, startup_timeout=300, logger=None):
+        """
+        初始化Vivado会话
+
+        Args:
+            vivado_path: Vivado可执行文件路径
+            session_script: 会话驱动TCL脚本路径
+            session_id: 会话编号
+            startup_timeout: 会话启动超时时间(秒)
+            logger: 日志记录器
+        """
+        self.vivado_path = vivado_path
+        self.session_script = session_script
+        self.session_id = session_id
+        self.startup_timeout = startup_timeout
+        self.logger = logger or logging.getLogger(self.__class__.__name__)
+
+        self.process = None
+        self.jobs_done = 0
+        self._lines = None
+        self._reader = None
+
+    @property
+    def is_alive(self):
+        """会话进程是否仍在运行"""
+        return self.process is not None and self.process.poll() is None
+
+    def start(self):
+        """启动Vivado会话并加载驱动脚本"""
+        cmd = [self.vivado_path, "-mode", "tcl", "-nojournal", "-nolog"]
+        self.logger.info(f"启动Vivado会话 #{self.session_id}: {' '.join(cmd)}")
+
+        popen_kwargs = {}
+        if os.name != 'nt':
+            popen_kwargs['start_new_session'] = True
+
+        self.process = subprocess.Popen(
+            cmd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            encoding='utf-8',
+            errors='replace',
+            bufsize=1,
+            **popen_kwargs
+        )
+        self.jobs_done = 0
+
+        # 后台线程读取输出，主线程按超时等待
+        self._lines = queue.Queue()
+        self._reader = threading.Thread(target=self._read_output, args=(self.process, self._lines), daemon=True)
+        self._reader.start()
+
+        self._send(f"source {_tcl_quote(self.session_script)}")
+        self._wait_for("HVMS_SESSION_READY", self.startup_timeout)
+        self.logger.info(f"Vivado会话 #{self.session_id} 已就绪")
+
+    @staticmethod
+    def _read_output(process, lines):
+        """读取会话输出的后台线程，进程结束时放入None"""
+        try:
+            for line in process.stdout:
+                lines.put(line.rstrip('\r\n'))
+        except Exception:
+            pass
+        lines.put(None)
+
+    def _send(self, command):
+        """向会话发送一条Tcl命令"""
+        try:
+            self.process.stdin.write(command + "\n")
+            self.process.stdin.flush()
+        except Exception as e:
+            raise VivadoSessionError(f"向Vivado会话 #{self.session_id} 写入命令失败: {str(e)}")
+
+    def _wait_for(self, marker, timeout, log=None):
+        """
+        等待输出中出现指定标记
+
+        Args:
+            marker: 标记前缀
+            timeout: 超时时间(秒)
+            log: 输出日志文件对象 (可选)
+
+        Returns:
+            str: 从标记开始的输出行
+        """
+        deadline = time.time() + timeout
+        while True:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                raise VivadoSessionTimeout(f"Vivado会话 #{self.session_id} 等待 {marker} 超时（{timeout}秒）")
+            try:
+                line = self._lines.get(timeout=remaining)
+            except queue.Empty:
+                continue
+
+            if line is None:
+                try:
+                    returncode = self.process.wait(timeout=5)
+                except subprocess.TimeoutExpired:
+                    returncode = None
+                raise VivadoSessionError(f"Vivado会话 #{self.session_id} 意外退出，返回代码: {returncode}")
+
+            if log is not None:
+                log.write(line + "\n")
+
+            # -mode tcl下回显可能带有提示符前缀 (如 "Vivado% ")
+            position = line.find(marker)
+            if position >= 0:
+                return line[position:]
+
+    def run_job(self, job_id, tcl_script, verilog_file, module_name, fpga_part, work_dir, timeout,
+                extra_args=None):
+        """
+        在会话中执行一个综合任务
+
+        Args:
+            job_id: 任务编号
+            tcl_script: 综合TCL脚本
+            verilog_file: Verilog文件路径
+            module_name: 模块名
+            fpga_part: FPGA型号
+            work_dir: 工作目录
+            timeout: 任务超时时间(秒)
+            extra_args: 传递给综合脚本的额外参数 (可选)
+
+        Returns:
+            bool: 任务是否成功
+        """
+        args = [job_id, tcl_script, verilog_file, module_name, fpga_part, work_dir]
+        command = "hvms_run_job " + " ".join(_tcl_quote(a) for a in args)
+        if extra_args:
+            command += " " + _tcl_quote(" ".join(str(a) for a in extra_args))
+
+        log_file = os.path.join(work_dir, "vivado.log")
+        with open(log_file, 'w', encoding='utf-8') as log:
+            self._send(command)
+            done_line = self._wait_for(f"HVMS_JOB_DONE {job_id} ", timeout, log=log)
+
+        self.jobs_done += 1
+        return done_line.endswith(" ok")
+
+    def stop(self):
+        """关闭会话"""
+        if self.process is None:
+            return
+
+        if self.is_alive:
+            try:
+                self.process.stdin.write("exit\n")
+                self.process.stdin.flush()
+                self.process.wait(timeout=30)
+            except Exception:
+                pass
+
+        kill_process_tree(self.process)
+        self.logger.info(f"Vivado会话 #{self.session_id} 已关闭")
+        self.process = None
+
+
+class VivadoSessionPool:
+    """常驻Vivado Tcl会话池，避免每个候选都重新启动Vivado"""
+
+    def __init__(self, vivado_path, tcl_script, size=2, jobs_per_session=20, job_timeout=1800,
+                 startup_timeout=300, session_script=None, logger=None):
+        """
+        初始化会话池
+
+        Args:
+            vivado_path: Vivado可执行文件路径
+            tcl_script: 用于综合和实现的TCL脚本路径
+            size: 会话数量
+            jobs_per_session: 每个会话执行多少个任务后回收重启
+            job_timeout: 单个任务超时时间(秒)
+            startup_timeout: 会话启动超时时间(秒)
+            session_script: 会话驱动TCL脚本路径 (可选)
+            logger: 日志记录器
+        """
+        self.vivado_path = vivado_path
+        self.tcl_script = tcl_script
+        self.size = size
+        self.jobs_per_session = jobs_per_session
+        self.job_timeout = job_timeout
+        self.startup_timeout = startup_timeout
+        self.session_script = session_script or DEFAULT_SESSION_SCRIPT
+        self.logger = logger or logging.getLogger(self.__class__.__name__)
+
+        self._job_ids = itertools.count(1)
+        self._closed = False
+
+        # 空闲会话队列，会话在首次使用时才启动
+        self._all_sessions = []
+        self._idle = queue.Queue()
+        for i in range(size):
+            session = self._new_session(i)
+            self._idle.put(session)
+
+        atexit.register(self.shutdown)
+
+    def _new_session(self, session_id):
+        """创建一个未启动的会话"""
+        session = VivadoSession(
+            vivado_path=self.vivado_path,
+            session_script=self.session_script,
+            session_id=session_id,
+            startup_timeout=self.startup_timeout,
+            logger=self.logger
+        )
+        self._all_sessions.append(session)
+        return session
+
+    def _replace_session(self, session):
+        """关闭会话并创建替代会话"""
+        session.stop()
+        if session in self._all_sessions:
+            self._all_sessions.remove(session)
+        return self._new_session(session.session_id)
+
+    def run(self, verilog_file, module_name, fpga_part, work_dir, extra_args=None, retries=1):
+        """
+        使用池中的会话运行综合任务
+
+        Args:
+            verilog_file: Verilog文件路径
+            module_name: 模块名
+            fpga_part: FPGA型号
+            work_dir: 工作目录
+            extra_args: 传递给综合脚本的额外参数 (可选)
+            retries: 会话崩溃时的重试次数
+
+        Returns:
+            bool: 任务是否成功
+        """
+        if self._closed:
+            raise VivadoSessionError("Vivado会话池已关闭")
+
+        session = self._idle.get()
+        try:
+            for attempt in range(retries + 1):
+                job_id = next(self._job_ids)
+                try:
+                    if not session.is_alive:
+                        session.start()
+
+                    start_time = time.time()
+                    success = session.run_job(job_id, self.tcl_script, verilog_file, module_name,
+                                              fpga_part, work_dir, self.job_timeout, extra_args)
+                    self.logger.info(f"会话 #{session.session_id} 完成任务 {job_id}，"
+                                     f"耗时: {time.time() - start_time:.2f}秒")
+                    return success
+
+                except VivadoSessionTimeout as e:
+                    # 任务本身超时：销毁会话，不再重试
+                    self.logger.warning(f"{str(e)}，终止并重启会话")
+                    session = self._replace_session(session)
+                    return False
+
+                except VivadoSessionError as e:
+                    # 会话崩溃：以新会话替代后重试
+                    self.logger.warning(f"{str(e)}，重启会话 (尝试 {attempt + 1}/{retries + 1})")
+                    session = self._replace_session(session)
+
+            return False
+
+        finally:
+            # 达到任务上限的会话回收重启，释放Vivado累积的内存
+            if session.jobs_done >= self.jobs_per_session:
+                self.logger.info(f"会话 #{session.session_id} 已执行 {session.jobs_done} 个任务，回收重启")
+                session = self._replace_session(session)
+            self._idle.put(session)
+
+    def shutdown(self):
+        """关闭池中所有会话"""
+        if self._closed:
+            return
+        self._closed = True
+        for session in list(self._all_sessions):
+            session.stop()
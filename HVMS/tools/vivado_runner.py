@@ -0,0 +1,133 @@
+import os
+import time
+import asyncio
+import logging
+from .vivado_pool import kill_pid_tree
+
+
+# vivado_synth.tcl输出中的阶段标记，按出现顺序排列（vivado_batch.tcl每开始一个模块重新进入startup）
+# 使用ASCII标记：中文区域设置的Windows主机上Vivado以GBK输出，按UTF-8解码后中文无法匹配
+STAGE_MARKERS = [
+    ('startup', 'HVMS_BATCH_MODULE'),
+    ('synthesis', 'HVMS_STAGE synthesis'),
+    ('implementation', 'HVMS_STAGE implementation'),
+    ('report', 'HVMS_STAGE report'),
+]
+
+# 未输出ASCII标记的旧版综合脚本，在UTF-8输出的主机上按中文提示识别阶段
+LEGACY_STAGE_MARKERS = [
+    ('synthesis', '开始综合'),
+    ('implementation', '开始实现'),
+    ('report', '生成PPA报告'),
+]
+
+# 各阶段默认截止时间(秒)，startup指从启动到开始综合
+DEFAULT_STAGE_TIMEOUTS = {
+    'startup': 300,
+    'synthesis': 900,
+    'implementation': 1200,
+    'report': 300,
+}
+
+
+class VivadoJobRunner:
+    """基于asyncio的Vivado批处理任务执行器，进程退出即时感知，并按阶段设置截止时间"""
+
+    def __init__(self, stage_timeouts=None, total_timeout=1800, logger=None):
+        """
+        初始化任务执行器
+
+        Args:
+            stage_timeouts: 各阶段截止时间(秒)的字典 (可选，未给出的阶段使用默认值)
+            total_timeout: 整个任务的超时时间(秒)
+            logger: 日志记录器
+        """
+        self.stage_timeouts = dict(DEFAULT_STAGE_TIMEOUTS)
+        self.stage_timeouts.update(stage_timeouts or {})
+        self.total_timeout = total_timeout
+        self.logger = logger or logging.getLogger(self.__class__.__name__)
+
+    def _detect_stage(self, line, current_stage):
+        """根据输出行识别新的阶段"""
+        for stage, marker in STAGE_MARKERS + LEGACY_STAGE_MARKERS:
+            if marker in line and stage != current_stage:
+                return stage
+        return None
+
+    async def run(self, cmd, work_dir, log_file, total_timeout=None):
+        """
+        运行Vivado并等待结束，同时将输出写入日志文件
+
+        Args:
+            cmd: 命令参数列表
+            work_dir: 工作目录
+            log_file: 日志文件路径
+            total_timeout: 本次运行的总超时时间(秒) (可选，默认为self.total_timeout，批量综合时按模块数放大)
+
+        Returns:
+            int: 进程返回代码，超时返回None
+        """
+        total_timeout = total_timeout or self.total_timeout
+        popen_kwargs = {}
+        if os.name != 'nt':
+            popen_kwargs['start_new_session'] = True
+
+        process = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT,
+            cwd=work_dir,
+            **popen_kwargs
+        )
+
+        start_time = time.time()
+        total_deadline = start_time + total_timeout
+        stage = 'startup'
+        stage_deadline = start_time + self.stage_timeouts['startup']
+
+        try:
+            with open(log_file, 'w', encoding='utf-8') as log:
+                while True:
+                    remaining = min(stage_deadline, total_deadline) - time.time()
+                    if remaining <= 0:
+                        raise asyncio.TimeoutError()
+
+                    raw_line = await asyncio.wait_for(process.stdout.readline(), timeout=remaining)
+                    if not raw_line:
+                        break
+
+                    line = raw_line.decode('utf-8', errors='replace').rstrip('\r\n')
+                    log.write(line + "\n")
+
+                    new_stage = self._detect_stage(line, stage)
+                    if new_stage:
+                        elapsed = time.time() - start_time
+                        self.logger.info(f"Vivado进入阶段: {new_stage}（已用时 {elapsed:.1f}秒）")
+                        stage = new_stage
+                        stage_deadline = time.time() + self.stage_timeouts.get(stage, total_timeout)
+
+            # 输出结束即进程退出，无需轮询
+            remaining = max(total_deadline - time.time(), 1)
+            return await asyncio.wait_for(process.wait(), timeout=remaining)
+
+        except asyncio.TimeoutError:
+            if time.time() >= total_deadline:
+                self.logger.warning(f"Vivado执行超时（{total_timeout}秒），强制终止")
+            else:
+                self.logger.warning(f"Vivado阶段 {stage} 超过截止时间"
+                                    f"（{self.stage_timeouts.get(stage)}秒），强制终止")
+            await self._kill(process)
+            return None
+
+        except asyncio.CancelledError:
+            await self._kill(process)
+            raise
+
+    async def _kill(self, process):
+        """终止Vivado进程树"""
+        if process.returncode is None:
+            kill_pid_tree(process.pid)
+            try:
+                await asyncio.wait_for(process.wait(), timeout=10)
+            except Exception:
+                pass
@@ -1,18 +1,53 @@
+import hashlib
+import inspect
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from utils import VerilogParser
 from .arch_transformers import FSMEncodingTransformer, InterfaceProtocolTransformer, ComputationUnitTransformer
 from .logic_transformers import ControlFlowTransformer, OperatorRewriteTransformer, LogicLayerTransformer
 from .timing_transformers import CriticalPathTransformer, RegisterRetimingTransformer, PipelineTransformer
+from .transform_memo import TransformationMemo
+
+
+def _code_key(code):
+    """适用性缓存的键（代码内容哈希）"""
+    return hashlib.sha256(code.encode('utf-8', errors='ignore')).hexdigest()
+
+
+def _applicability_rows(paths):
+    """
+    进程池工作函数：计算一组种子文件的适用性向量
+
+    Args:
+        paths: 种子文件路径列表
+
+    Returns:
+        list: 每个文件对应 (代码哈希, 适用性向量)，读取或检查失败时为None
+    """
+    manager = TransformerManager(agent=None)
+    rows = []
+    for path in paths:
+        try:
+            code = VerilogParser.read_file(path)
+            rows.append((_code_key(code), manager.applicability_vector(code)))
+        except Exception:
+            rows.append(None)
+    return rows
 
 
 class TransformerManager:
     """Verilog代码变换器管理器"""
 
-    def __init__(self, agent, logger=None):
+    def __init__(self, agent, logger=None, memo=None, cache_size=4096):
         """
         初始化变换器管理器
 
         Args:
             agent: Claude Agent实例
             logger: 日志记录器
+            memo: 变换结果记忆表 (可选，TransformationMemo实例)
+            cache_size: 适用性向量缓存的最大条目数
         """
         # 初始化所有变换器
         self.transformers = {
@@ -33,6 +68,118 @@ class TransformerManager:
         }
 
         self.logger = logger
+        self.agent = agent
+        self.memo = memo
+        self._prompt_variants = {}
+
+        # 适用性向量缓存：代码哈希 -> 按self.transformers顺序排列的布尔元组
+        self.cache_size = cache_size
+        self._applicability = OrderedDict()
+        self._applicability_lock = threading.Lock()
+        self.applicability_hits = 0
+        self.applicability_misses = 0
+
+    @property
+    def transformation_names(self):
+        """变换名称列表（适用性向量的列顺序）"""
+        return list(self.transformers)
+
+    def applicability_vector(self, code):
+        """
+        获取代码的适用性向量（按代码哈希缓存）
+
+        Args:
+            code: Verilog代码
+
+        Returns:
+            tuple: 与transformation_names顺序一致的布尔元组
+        """
+        key = _code_key(code)
+        with self._applicability_lock:
+            vector = self._applicability.get(key)
+            if vector is not None:
+                self._applicability.move_to_end(key)
+                self.applicability_hits += 1
+                return vector
+
+        vector = tuple(bool(transformer.is_applicable(code)) for transformer in self.transformers.values())
+
+        self._store_vector(key, vector)
+        with self._applicability_lock:
+            self.applicability_misses += 1
+        return vector
+
+    def _store_vector(self, key, vector):
+        """写入适用性缓存"""
+        with self._applicability_lock:
+            self._applicability[key] = vector
+            self._applicability.move_to_end(key)
+            while len(self._applicability) > self.cache_size:
+                self._applicability.popitem(last=False)
+
+    def applicability_matrix(self, seeds, num_workers=1):
+        """
+        批量计算种子的适用性矩阵，结果同时写入缓存（搜索开始时根节点直接命中）
+
+        Args:
+            seeds: 种子目录路径，或种子文件路径列表
+            num_workers: 并行进程数，大于1时按文件分块在进程池中计算
+
+        Returns:
+            dict: {'transformations': 变换名称列表, 'seeds': 种子文件路径列表,
+                   'matrix': 每个种子一行的布尔元组列表（读取失败的种子整行为False）}
+        """
+        paths = VerilogParser.scan_directory(seeds) if isinstance(seeds, str) else list(seeds)
+        empty = tuple(False for _ in self.transformers)
+
+        rows = []
+        if num_workers > 1 and len(paths) > 1:
+            chunk_size = max(1, -(-len(paths) // (num_workers * 4)))
+            chunks = [paths[i:i + chunk_size] for i in range(0, len(paths), chunk_size)]
+            with ProcessPoolExecutor(max_workers=num_workers) as pool:
+                for chunk_rows in pool.map(_applicability_rows, chunks):
+                    rows.extend(chunk_rows)
+        else:
+            for path in paths:
+                try:
+                    code = VerilogParser.read_file(path)
+                    rows.append((_code_key(code), self.applicability_vector(code)))
+                except Exception as e:
+                    if self.logger:
+                        self.logger.warning(f"计算 {path} 的适用性失败: {str(e)}")
+                    rows.append(None)
+
+        matrix = []
+        for row in rows:
+            if row is None:
+                matrix.append(empty)
+                continue
+            key, vector = row
+            self._store_vector(key, vector)
+            matrix.append(vector)
+
+        if self.logger:
+            self.logger.info(f"计算了 {len(paths)} 个种子的变换适用性矩阵")
+
+        return {
+            'transformations': self.transformation_names,
+            'seeds': paths,
+            'matrix': matrix
+        }
+
+    def applicability_stats(self):
+        """
+        获取适用性缓存统计
+
+        Returns:
+            dict: 缓存条目数、命中数和未命中数
+        """
+        with self._applicability_lock:
+            return {
+                'entries': len(self._applicability),
+                'hits': self.applicability_hits,
+                'misses': self.applicability_misses
+            }
 
     def get_available_transformations(self, code):
         """
@@ -44,16 +191,38 @@ class TransformerManager:
         Returns:
             list: 适用的变换名称列表
         """
-        available = []
-        for name, transformer in self.transformers.items():
-            if transformer.is_applicable(code):
-                available.append(name)
+        vector = self.applicability_vector(code)
+        available = [name for name, applicable in zip(self.transformers, vector) if applicable]
 
         if self.logger:
             self.logger.info(f"可用变换: {available}")
 
         return available
 
+    def prompt_variant(self, transformation_name):
+        """
+        计算变换的提示版本：变换器提示生成代码、代理提示模板和模型的摘要，提示或模型变化后记忆表中的旧输出不再复用
+
+        Args:
+            transformation_name: 变换名称
+
+        Returns:
+            str: 提示版本摘要
+        """
+        variant = self._prompt_variants.get(transformation_name)
+        if variant is None:
+            parts = [type(self.transformers[transformation_name]), type(self.agent)]
+            digest = hashlib.sha256(str(getattr(self.agent, 'model', '')).encode('utf-8'))
+            for part in parts:
+                try:
+                    source = inspect.getsource(part)
+                except (OSError, TypeError):
+                    source = part.__qualname__
+                digest.update(source.encode('utf-8'))
+            variant = digest.hexdigest()[:16]
+            self._prompt_variants[transformation_name] = variant
+        return variant
+
     def apply_transformation(self, code, transformation_name):
         """
         应用指定的变换到代码
@@ -71,4 +240,43 @@ class TransformerManager:
             raise ValueError(f"未知的变换类型: {transformation_name}")
 
         transformer = self.transformers[transformation_name]
-        return transformer.transform(code)
+
+        # 优先复用记忆表中已有的变换结果
+        if self.memo is not None:
+            memo_output = self.memo.choose(code, transformation_name, self.prompt_variant(transformation_name))
+            if memo_output is not None:
+                if self.logger:
+                    self.logger.info(f"复用记忆表中的 {transformation_name} 变换结果")
+                return memo_output
+
+        transformed_code = transformer.transform(code)
+
+        if self.memo is not None and transformed_code and transformed_code != code:
+            self.memo.record(code, transformation_name, transformed_code, self.prompt_variant(transformation_name))
+
+        return transformed_code
+
+    def known_results(self, code, transformation_name):
+        """
+        查询记忆表中已有的变换结果
+
+        Args:
+            code: Verilog代码
+            transformation_name: 变换名称
+
+        Returns:
+            list: 记录列表，每个元素为 {'slot', 'output', 'verified', 'ppa', 'current_run'}；未启用记忆表时为空列表
+        """
+        if self.memo is None:
+            return []
+        return self.memo.lookup(code, transformation_name, self.prompt_variant(transformation_name))
+
+    def record_verification(self, code, transformation_name, transformed_code, equivalent):
+        """记录变换结果的功能验证结论"""
+        if self.memo is not None:
+            self.memo.record_verification(code, transformation_name, transformed_code, equivalent)
+
+    def record_ppa(self, transformed_code, ppa_metrics):
+        """记录变换结果的PPA指标"""
+        if self.memo is not None:
+            self.memo.record_ppa(transformed_code, ppa_metrics)
@@ -1,4 +1,5 @@
 import re
+from utils import VerilogParser
 from .transformer import BaseTransformer
 
 
@@ -102,6 +103,8 @@ class InterfaceProtocolTransformer(BaseTransformer):
                 self.logger.info("未发现端口定义，不适用接口变换")
                 return False
 
+            code_lower = code_no_comments.lower()
+
             # 接口协议特征检测
             features = {
                 # 握手机制检测（更精确的模式）
@@ -113,12 +116,12 @@ class InterfaceProtocolTransformer(BaseTransformer):
                                                     code_no_comments)),
 
                 # 总线协议检测
-                'axi': bool(re.search(r'\b(axi|axi4|axi_lite|axil)\b', code_no_comments.lower())),
-                'axi_stream': bool(re.search(r'\b(axis|axi_stream|tvalid|tready|tdata)\b', code_no_comments.lower())),
-                'wishbone': bool(re.search(r'\b(wishbone|wb_)\b', code_no_comments.lower())) or
-                            bool(re.search(r'\bwb_(adr|dat|sel|cyc|stb|ack|we)\b', code_no_comments.lower())),
-                'avalon': bool(re.search(r'\b(avalon|avmm|avst)\b', code_no_comments.lower())),
-                'apb': bool(re.search(r'\b(apb|psel|penable|pready|pwrite)\b', code_no_comments.lower())),
+                'axi': bool(re.search(r'\b(axi|axi4|axi_lite|axil)\b', code_lower)),
+                'axi_stream': bool(re.search(r'\b(axis|axi_stream|tvalid|tready|tdata)\b', code_lower)),
+                'wishbone': bool(re.search(r'\b(wishbone|wb_)\b', code_lower)) or
+                            bool(re.search(r'\bwb_(adr|dat|sel|cyc|stb|ack|we)\b', code_lower)),
+                'avalon': bool(re.search(r'\b(avalon|avmm|avst)\b', code_lower)),
+                'apb': bool(re.search(r'\b(apb|psel|penable|pready|pwrite)\b', code_lower)),
 
                 # 数据宽度检测
                 'data_width_4': bool(re.search(r'\[\s*3\s*:\s*0\s*\]', code_no_comments)),
@@ -131,26 +134,24 @@ class InterfaceProtocolTransformer(BaseTransformer):
                                  bool(re.search(r'\[\s*\d+\s*:\s*0\s*\]\s*channel', code_no_comments)),
 
                 # 突发传输检测
-                'burst_support': bool(re.search(r'\b(burst|len|size|length|awlen|arlen)\b', code_no_comments.lower())),
+                'burst_support': bool(re.search(r'\b(burst|len|size|length|awlen|arlen)\b', code_lower)),
 
                 # 时序特性检测
-                'pipeline': bool(re.search(r'\b(pipeline|pipe|stage)\b', code_no_comments.lower())),
+                'pipeline': bool(re.search(r'\b(pipeline|pipe|stage)\b', code_lower)),
                 'single_cycle': bool(re.search(r'always\s*@\s*\([^)]*posedge[^)]*\)', code_no_comments)) and
-                                not bool(re.search(r'\b(pipeline|pipe|stage)\b', code_no_comments.lower())),
+                                not bool(re.search(r'\b(pipeline|pipe|stage)\b', code_lower)),
 
                 # 流控制检测
                 'flow_control': bool(
-                    re.search(r'\b(backpressure|back_pressure|flow_control|throttle)\b', code_no_comments.lower()))
+                    re.search(r'\b(backpressure|back_pressure|flow_control|throttle)\b', code_lower))
             }
 
             # 判断是否适用于协议变换
             has_protocol_feature = any(features.values())
 
             # 接口信号数量检查 - 确保有足够的接口信号才考虑变换
-            port_match = re.search(r'module\s+\w+\s*\(([\s\S]*?)\);', code_no_comments)
-            if port_match:
-                port_text = port_match.group(1)
-                port_count = len([p for p in port_text.split(',') if p.strip()])
+            port_count = len(VerilogParser.extract_port_info(code))
+            if port_count:
                 # 如果端口数量太少（<3），可能不是复杂接口
                 if port_count < 3:
                     self.logger.info(f"接口端口数量较少 ({port_count}), 可能不适用于复杂接口变换")
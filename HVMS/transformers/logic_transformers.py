@@ -661,8 +661,7 @@ class LogicLayerTransformer(BaseTransformer):
                 # 检查是否有相似代码块
                 for i in range(len(simplified_blocks)):
                     for j in range(i + 1, len(simplified_blocks)):
-                        similarity = self._calculate_similarity(simplified_blocks[i], simplified_blocks[j])
-                        if similarity > 0.7:  # 70%相似度阈值
+                        if self._is_similar(simplified_blocks[i], simplified_blocks[j], 0.7):  # 70%相似度阈值
                             has_duplicate_patterns = True
                             break
                     if has_duplicate_patterns:
@@ -751,6 +750,13 @@ class LogicLayerTransformer(BaseTransformer):
         from difflib import SequenceMatcher
         return SequenceMatcher(None, str1, str2).ratio()
 
+    def _is_similar(self, str1, str2, threshold):
+        """判断两个字符串的相似度是否超过阈值，先用上界快速排除，结果与_calculate_similarity一致"""
+        from difflib import SequenceMatcher
+        matcher = SequenceMatcher(None, str1, str2)
+        return (matcher.real_quick_ratio() > threshold and matcher.quick_ratio() > threshold and
+                matcher.ratio() > threshold)
+
     def _analyze_logic_structure(self, code):
         """分析代码的逻辑结构"""
         try:
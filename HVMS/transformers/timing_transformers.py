@@ -141,6 +141,7 @@ class CriticalPathTransformer(BaseTransformer):
 
 import re
 import random
+from utils import VerilogParser
 from .transformer import BaseTransformer
 
 
@@ -182,24 +183,37 @@ class RegisterRetimingTransformer(BaseTransformer):
             output_near_regs = 0
 
             # 提取模块输入输出
-            inputs = re.findall(r'input\s+(?:wire\s+)?(?:\[\s*\d+\s*:\s*\d+\s*\]\s*)?(\w+)', clean_code)
-            outputs = re.findall(r'output\s+(?:wire|reg)?\s+(?:\[\s*\d+\s*:\s*\d+\s*\]\s*)?(\w+)', clean_code)
+            ports = VerilogParser.extract_port_info(code)
+            inputs = [port.name for port in ports if port.direction == 'input']
+            outputs = [port.name for port in ports if port.direction == 'output']
+
+            # 每个输入的右操作数区间只计算一次，之后每个寄存器只做子串查找
+            input_windows = [self._operand_windows(clean_code, input_signal) for input_signal in inputs]
+            output_targets = [self._assign_targets(clean_code, output_signal) for output_signal in outputs]
 
             # 检查输入附近的寄存器
             for reg in reg_declarations:
                 # 简单检查寄存器是否与输入相关联
-                for input_signal in inputs:
-                    if re.search(
+                for input_signal, windows in zip(inputs, input_windows):
+                    if windows is None:
+                        matched = re.search(
                             rf'{input_signal}\s*(?:\[[^\]]+\])?\s*(?:&|\||\^|\+|-|\*|/|%|<<|>>|==|!=|<|>|<=|>=)\s*.*{reg}',
-                            clean_code):
+                            clean_code)
+                    else:
+                        matched = any(clean_code.find(reg, start, end) != -1 for start, end in windows)
+                    if matched:
                         input_near_regs += 1
                         break
 
             # 检查输出附近的寄存器
             for reg in reg_declarations:
                 # 检查寄存器是否直接连接到输出
-                for output_signal in outputs:
-                    if re.search(rf'assign\s+{output_signal}\s*=\s*{reg}', clean_code) or output_signal == reg:
+                for output_signal, targets in zip(outputs, output_targets):
+                    if targets is None:
+                        matched = bool(re.search(rf'assign\s+{output_signal}\s*=\s*{reg}', clean_code))
+                    else:
+                        matched = any(clean_code.startswith(reg, target) for target in targets)
+                    if matched or output_signal == reg:
                         output_near_regs += 1
                         break
 
@@ -253,6 +267,62 @@ class RegisterRetimingTransformer(BaseTransformer):
         请返回完整的优化后的Verilog代码。不需要解释，只需要返回代码。
         """
 
+    # 与is_applicable中输入关联正则的运算符候选项一致
+    _OPERATORS = ('&', '|', '^', '+', '-', '*', '/', '%', '<<', '>>', '==', '!=', '<', '>', '<=', '>=')
+
+    def _operand_windows(self, code, signal):
+        """
+        计算信号参与运算时右侧寄存器可能出现的区间
+
+        与正则 signal\\s*(?:\\[[^\\]]+\\])?\\s*(?:运算符)\\s*.*reg 等价：reg在某个区间内
+        出现即匹配。信号名不是普通标识符时返回None，由调用方退回正则匹配
+
+        Args:
+            code: 已去除注释的代码
+            signal: 输入信号名
+
+        Returns:
+            list: (起始位置, 结束位置)区间列表，或None
+        """
+        if not re.fullmatch(r'\w+', signal):
+            return None
+
+        windows = set()
+        position = code.find(signal)
+        while position != -1:
+            operator_start = re.compile(r'\s*').match(code, position + len(signal)).end()
+            if code.startswith('[', operator_start):
+                # 可选的位选择 [..]，至少包含一个字符
+                close = code.find(']', operator_start + 1)
+                if close > operator_start + 1:
+                    operator_start = re.compile(r'\s*').match(code, close + 1).end()
+
+            for operator in self._OPERATORS:
+                if code.startswith(operator, operator_start):
+                    start = operator_start + len(operator)
+                    # \s* 可以跨行，其后的 .* 只能延伸到行尾
+                    line_end = code.find('\n', re.compile(r'\s*').match(code, start).end())
+                    windows.add((start, len(code) if line_end == -1 else line_end))
+
+            position = code.find(signal, position + 1)
+
+        return list(windows)
+
+    def _assign_targets(self, code, signal):
+        """
+        查找assign语句中赋给信号的表达式起始位置
+
+        Args:
+            code: 已去除注释的代码
+            signal: 输出信号名
+
+        Returns:
+            list: 表达式起始位置列表，信号名不是普通标识符时返回None
+        """
+        if not re.fullmatch(r'\w+', signal):
+            return None
+        return [match.end(1) for match in re.finditer(rf'(?=(assign\s+{signal}\s*=\s*))', code)]
+
     def _select_retiming_strategy(self):
         """根据代码特征选择最合适的重定时策略"""
         input_near_regs = self.code_features.get("input_near_regs", 0)
@@ -335,9 +405,13 @@ class PipelineTransformer(BaseTransformer):
             reg_declarations = re.findall(r'reg\s+(?:\[\s*\d+\s*:\s*\d+\s*\]\s*)?(\w+)', clean_code)
             reg_dependencies = 0
 
+            # 每个寄存器后续引用所在的区间只计算一次
+            reference_windows = {reg: self._reference_windows(clean_code, reg) for reg in set(reg_declarations)}
+
             for reg in reg_declarations:
                 for other_reg in reg_declarations:
-                    if reg != other_reg and re.search(rf'{reg}[\s\[\]].*{other_reg}', clean_code):
+                    if reg != other_reg and any(
+                            clean_code.find(other_reg, start, end) != -1 for start, end in reference_windows[reg]):
                         reg_dependencies += 1
 
             # 存储检测到的特征
@@ -395,6 +469,29 @@ class PipelineTransformer(BaseTransformer):
         请返回完整的优化后的Verilog代码。不需要解释，只需要返回代码。
         """
 
+    def _reference_windows(self, code, reg):
+        """
+        计算寄存器之后同一行内可能引用其他寄存器的区间
+
+        与正则 reg[\\s\\[\\]].*other_reg 等价：other_reg在某个区间内出现即匹配
+
+        Args:
+            code: 已去除注释的代码
+            reg: 寄存器名
+
+        Returns:
+            list: (起始位置, 结束位置)区间列表
+        """
+        windows = set()
+        position = code.find(reg)
+        while position != -1:
+            separator = position + len(reg)
+            if re.compile(r'[\s\[\]]').match(code, separator):
+                line_end = code.find('\n', separator + 1)
+                windows.add((separator + 1, len(code) if line_end == -1 else line_end))
+            position = code.find(reg, position + 1)
+        return list(windows)
+
     def _detect_pipeline_structure(self, code):
         """检测代码中的流水线结构"""
         # 查找可能的流水线寄存器模式
@@ -0,0 +1,250 @@
+import os
+import json
+import time
+import uuid
+import random
+import sqlite3
+import logging
+import threading
+from utils import VerilogParser
+
+
+class TransformationMemo:
+    """
+    持久化的变换结果记忆表
+
+    以(输入代码规范哈希, 变换器名, 提示版本, 样本槽位)为键记录每次LLM变换的输出，
+    并附带该输出的功能验证结果和PPA指标，供后续运行直接复用。
+    只复用此前运行记录的输出，且每个输出在一次运行中最多复用一次，
+    同一运行中对同一组合的重复扩展仍会请求LLM产生新的变体。
+    """
+
+    def __init__(self, db_path, logger=None):
+        """
+        初始化记忆表
+
+        Args:
+            db_path: SQLite数据库文件路径
+            logger: 日志记录器
+        """
+        self.db_path = db_path
+        self.logger = logger or logging.getLogger(self.__class__.__name__)
+
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+
+        # 本次运行的标识，本次运行写入的记录不在本次运行中复用
+        self.run_id = uuid.uuid4().hex
+
+        self._stats_lock = threading.Lock()
+        self._reused = set()  # 本次运行已复用的记录 (输入哈希, 变换器名, 槽位)
+        self.hits = 0
+        self.misses = 0
+
+        self._init_db()
+
+    def _connect(self):
+        """创建数据库连接（每次操作独立连接）"""
+        conn = sqlite3.connect(self.db_path, timeout=60)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _init_db(self):
+        """初始化记忆表结构"""
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS transform_memo ("
+                    "  input_hash TEXT NOT NULL,"
+                    "  transformer TEXT NOT NULL,"
+                    "  slot INTEGER NOT NULL,"
+                    "  output TEXT NOT NULL,"
+                    "  output_hash TEXT NOT NULL,"
+                    "  verified INTEGER,"
+                    "  ppa TEXT,"
+                    "  created REAL NOT NULL,"
+                    "  prompt_variant TEXT NOT NULL DEFAULT '',"
+                    "  run_id TEXT,"
+                    "  PRIMARY KEY (input_hash, transformer, slot)"
+                    ")"
+                )
+                # 旧版记忆表补充提示版本和运行标识列（旧记录的提示版本为空，不会被复用）
+                columns = {row[1] for row in conn.execute("PRAGMA table_info(transform_memo)")}
+                if 'prompt_variant' not in columns:
+                    conn.execute("ALTER TABLE transform_memo ADD COLUMN prompt_variant TEXT NOT NULL DEFAULT ''")
+                if 'run_id' not in columns:
+                    conn.execute("ALTER TABLE transform_memo ADD COLUMN run_id TEXT")
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_memo_output ON transform_memo(output_hash)")
+        finally:
+            conn.close()
+
+    @staticmethod
+    def code_hash(code):
+        """计算代码的规范哈希"""
+        return VerilogParser.canonical_hash(code)
+
+    def lookup(self, code, transformer, prompt_variant=''):
+        """
+        查询已记录的变换结果
+
+        Args:
+            code: 输入代码
+            transformer: 变换器名
+            prompt_variant: 提示版本
+
+        Returns:
+            list: 记录列表，每个元素为 {'slot', 'output', 'verified', 'ppa', 'current_run'}，
+                verified为None表示未验证，current_run表示是否为本次运行写入
+        """
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT slot, output, verified, ppa, run_id FROM transform_memo "
+                "WHERE input_hash = ? AND transformer = ? AND prompt_variant = ? ORDER BY slot",
+                (self.code_hash(code), transformer, prompt_variant)
+            ).fetchall()
+        finally:
+            conn.close()
+
+        return [{
+            'slot': slot,
+            'output': output,
+            'verified': None if verified is None else bool(verified),
+            'ppa': json.loads(ppa) if ppa else None,
+            'current_run': run_id == self.run_id
+        } for slot, output, verified, ppa, run_id in rows]
+
+    def choose(self, code, transformer, prompt_variant=''):
+        """
+        决定是否复用已有样本
+
+        从此前运行记录、未被判定为不等价且本次运行尚未复用过的样本中随机选择一个，
+        已验证通过的样本优先；没有这样的样本时返回None（调用方应请求LLM）
+
+        Args:
+            code: 输入代码
+            transformer: 变换器名
+            prompt_variant: 提示版本
+
+        Returns:
+            str: 复用的输出代码，需要请求LLM时返回None
+        """
+        input_hash = self.code_hash(code)
+        entries = [e for e in self.lookup(code, transformer, prompt_variant)
+                   if not e['current_run'] and e['verified'] is not False]
+
+        with self._stats_lock:
+            entries = [e for e in entries if (input_hash, transformer, e['slot']) not in self._reused]
+            if not entries:
+                self.misses += 1
+                return None
+
+            verified = [e for e in entries if e['verified']]
+            entry = random.choice(verified or entries)
+            self._reused.add((input_hash, transformer, entry['slot']))
+            self.hits += 1
+        return entry['output']
+
+    def record(self, code, transformer, output, prompt_variant=''):
+        """
+        记录一次LLM变换输出
+
+        Args:
+            code: 输入代码
+            transformer: 变换器名
+            output: 变换后的代码
+            prompt_variant: 提示版本
+
+        Returns:
+            int: 写入的样本槽位，失败时返回None
+        """
+        input_hash = self.code_hash(code)
+        try:
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.execute("BEGIN IMMEDIATE")
+                    row = conn.execute(
+                        "SELECT COALESCE(MAX(slot) + 1, 0) FROM transform_memo "
+                        "WHERE input_hash = ? AND transformer = ?",
+                        (input_hash, transformer)
+                    ).fetchone()
+                    slot = row[0]
+                    conn.execute(
+                        "INSERT INTO transform_memo (input_hash, transformer, slot, output, output_hash, created, "
+                        "prompt_variant, run_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        (input_hash, transformer, slot, output, self.code_hash(output), time.time(),
+                         prompt_variant, self.run_id)
+                    )
+            finally:
+                conn.close()
+            return slot
+        except Exception as e:
+            self.logger.warning(f"写入变换记忆表失败: {str(e)}")
+            return None
+
+    def record_verification(self, code, transformer, output, equivalent):
+        """
+        记录变换输出的功能验证结果
+
+        Args:
+            code: 输入代码
+            transformer: 变换器名
+            output: 变换后的代码
+            equivalent: 是否功能等价
+        """
+        try:
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.execute(
+                        "UPDATE transform_memo SET verified = ? "
+                        "WHERE input_hash = ? AND transformer = ? AND output_hash = ?",
+                        (int(bool(equivalent)), self.code_hash(code), transformer, self.code_hash(output))
+                    )
+            finally:
+                conn.close()
+        except Exception as e:
+            self.logger.warning(f"更新变换记忆表失败: {str(e)}")
+
+    def record_ppa(self, output, ppa_metrics):
+        """
+        记录变换输出的PPA指标
+
+        Args:
+            output: 变换后的代码
+            ppa_metrics: PPA指标
+        """
+        if not ppa_metrics:
+            return
+        try:
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.execute(
+                        "UPDATE transform_memo SET ppa = ? WHERE output_hash = ?",
+                        (json.dumps(ppa_metrics), self.code_hash(output))
+                    )
+            finally:
+                conn.close()
+        except Exception as e:
+            self.logger.warning(f"更新变换记忆表失败: {str(e)}")
+
+    def stats(self):
+        """
+        获取记忆表统计信息
+
+        Returns:
+            dict: 复用次数、请求LLM次数及记录总数
+        """
+        with self._stats_lock:
+            hits, misses = self.hits, self.misses
+
+        conn = self._connect()
+        try:
+            entries = conn.execute("SELECT COUNT(*) FROM transform_memo").fetchone()[0]
+        finally:
+            conn.close()
+
+        return {'reused': hits, 'llm_calls': misses, 'entries': entries}
@@ -1,2 +1,4 @@
 from .logger import setup_logger
-from .verilog_parser import VerilogParser
+from .verilog_parser import VerilogParser, VerilogIndex, AlwaysBlock, CaseStatement
+from .variant_index import VariantIndex
+from .verilog_tokenizer import PortInfo, ParamInfo, ModuleInterface, parse_module
@@ -0,0 +1,74 @@
+import threading
+from .verilog_parser import VerilogParser
+
+
+class VariantIndex:
+    """基于规范形式哈希的变体索引，用于O(1)判重"""
+
+    def __init__(self, codes=None):
+        """
+        初始化变体索引
+
+        Args:
+            codes: 初始加入索引的代码列表 (可选)
+        """
+        self._hashes = set()
+        self._lock = threading.Lock()
+
+        for code in codes or []:
+            self.add(code)
+
+    @staticmethod
+    def key(code):
+        """
+        计算代码在索引中的键
+
+        Args:
+            code: Verilog代码
+
+        Returns:
+            str: 规范形式哈希
+        """
+        return VerilogParser.canonical_hash(code)
+
+    @staticmethod
+    def same(code_a, code_b):
+        """
+        判断两段代码是否只在注释、空白或内部信号命名上不同
+
+        Args:
+            code_a: Verilog代码
+            code_b: Verilog代码
+
+        Returns:
+            bool: 规范形式是否相同
+        """
+        if code_a == code_b:
+            return True
+        return VerilogParser.canonical_hash(code_a) == VerilogParser.canonical_hash(code_b)
+
+    def add(self, code):
+        """
+        加入代码
+
+        Args:
+            code: Verilog代码
+
+        Returns:
+            bool: 是否为新变体（已存在时返回False）
+        """
+        code_key = self.key(code)
+        with self._lock:
+            if code_key in self._hashes:
+                return False
+            self._hashes.add(code_key)
+            return True
+
+    def __contains__(self, code):
+        code_key = self.key(code)
+        with self._lock:
+            return code_key in self._hashes
+
+    def __len__(self):
+        with self._lock:
+            return len(self._hashes)
@@ -1,5 +1,33 @@
 import re
 import os
+import hashlib
+import threading
+from collections import Counter, OrderedDict
+
+from .verilog_tokenizer import TOKEN_PATTERN, evaluate, parse_module
+
+
+# 规范化时使用的词法模式（与端口解析共用同一个词法器）
+_CANONICAL_TOKEN_PATTERN = TOKEN_PATTERN
+
+# Verilog/SystemVerilog关键字，规范化时不参与重命名
+_VERILOG_KEYWORDS = frozenset("""
+    always always_comb always_ff always_latch and assign automatic begin bit buf bufif0 bufif1 byte case casex
+    casez cmos deassign default defparam disable edge else end endcase endfunction endgenerate endmodule
+    endprimitive endspecify endtable endtask enum event for force forever fork function generate genvar
+    highz0 highz1 if ifnone initial inout input int integer join large localparam logic longint macromodule
+    medium module nand negedge nmos nor not notif0 notif1 or output parameter pmos posedge primitive pull0
+    pull1 pulldown pullup rcmos real realtime reg release repeat rnmos rpmos rtran rtranif0 rtranif1
+    scalared shortint signed small specify specparam strong0 strong1 supply0 supply1 table task time tran
+    tranif0 tranif1 tri tri0 tri1 triand trior trireg typedef unique unsigned vectored wait wand weak0
+    weak1 while wire wor xnor xor
+""".split())
+
+# 后接宏名的编译指令
+_MACRO_DIRECTIVES = frozenset(('`define', '`undef', '`ifdef', '`ifndef', '`elsif'))
+
+# 表达式中的标识符（跳过基数数字如8'hff中的hff）
+_IDENTIFIER_RE = re.compile(r"(?<!['\w$])[A-Za-z_][\w$]*")
 
 
 class VerilogParser:
@@ -16,11 +44,8 @@ class VerilogParser:
         Returns:
             str: 模块名称
         """
-        pattern = r'module\s+(\w+)'
-        match = re.search(pattern, code)
-        if match:
-            return match.group(1)
-        return None
+        interface = parse_module(code)
+        return interface.name if interface else None
 
     @staticmethod
     def extract_ports(code):
@@ -31,23 +56,128 @@ class VerilogParser:
             code (str): Verilog代码
 
         Returns:
-            list: 端口列表
+            list: 端口名列表（按端口列表顺序）
+        """
+        return [port.name for port in VerilogParser.extract_port_info(code)]
+
+    @staticmethod
+    def extract_port_info(code):
+        """
+        从Verilog代码中提取带方向和位宽的端口记录
+
+        Args:
+            code (str): Verilog代码
+
+        Returns:
+            list: PortInfo列表，找不到模块时为空列表
+        """
+        interface = parse_module(code)
+        return interface.ports if interface else []
+
+    @staticmethod
+    def strip_comments(code):
+        """
+        移除Verilog代码中的注释（字符串中的内容保持不变）
+
+        Args:
+            code (str): Verilog代码
+
+        Returns:
+            str: 去除注释后的代码
+        """
+        return _CANONICAL_TOKEN_PATTERN.sub(
+            lambda m: ' ' if m.lastgroup == 'comment' else m.group(0), code)
+
+    @staticmethod
+    def canonicalize(code):
+        """
+        生成代码的规范形式：去除注释、统一空白，并按出现顺序对内部信号做alpha重命名
+
+        端口名、参数名、模块名、宏名、关键字以及命名端口连接(.port(...))保持不变，
+        因此只在注释、空白或内部信号命名上不同的代码会得到相同的规范形式。
+
+        Args:
+            code (str): Verilog代码
+
+        Returns:
+            str: 规范形式
         """
-        # 匹配模块声明中的端口列表
-        pattern = r'module\s+\w+\s*\(([\s\S]*?)\);'
-        match = re.search(pattern, code)
+        tokens = []
+        for match in _CANONICAL_TOKEN_PATTERN.finditer(code):
+            kind = match.lastgroup
+            if kind == 'comment':
+                continue
+            text = match.group(0)
+            if kind == 'number':
+                text = re.sub(r'\s+', '', text).lower()
+            tokens.append((kind, text))
+
+        # 收集需要保留的名称：模块名、端口、参数、子模块类型及命名端口连接
+        preserved = set()
+        declaring = False
+        in_header = False
+        paren_depth = 0
+        bracket_depth = 0
+        for i, (kind, text) in enumerate(tokens):
+            previous = tokens[i - 1][1] if i > 0 else None
+            following = tokens[i + 1][1] if i + 1 < len(tokens) else None
+
+            if kind == 'ident' and text not in _VERILOG_KEYWORDS:
+                if previous in ('module', 'macromodule', '.') or previous in _MACRO_DIRECTIVES:
+                    # 宏名在`NAME使用处是编译指令记号，不参与重命名，定义处也保持原名
+                    preserved.add(text)
+                elif bracket_depth == 0 and following in (',', ';', ')', '=', '['):
+                    # 端口/参数声明中的名称，以及非ANSI端口列表中的端口名
+                    if declaring or (in_header and paren_depth == 1 and following in (',', ')')):
+                        preserved.add(text)
+                elif i + 2 < len(tokens) and tokens[i + 1][0] == 'ident' and tokens[i + 2][1] in ('(', '#') \
+                        and following not in _VERILOG_KEYWORDS:
+                    # 子模块实例化中的模块类型名
+                    preserved.add(text)
+
+            if text in ('input', 'output', 'inout', 'parameter'):
+                declaring = True
+            elif text == ';':
+                declaring = False
+            elif text == '[':
+                bracket_depth += 1
+            elif text == ']':
+                bracket_depth = max(bracket_depth - 1, 0)
+
+            if text == 'module':
+                in_header, paren_depth = True, 0
+            elif in_header and text == '(':
+                paren_depth += 1
+            elif in_header and text == ')':
+                paren_depth -= 1
+                if paren_depth == 0:
+                    declaring = False
+            elif in_header and text == ';' and paren_depth == 0:
+                in_header = False
+
+        renamed = {}
+        result = []
+        for kind, text in tokens:
+            if kind == 'ident' and text not in _VERILOG_KEYWORDS and text not in preserved:
+                if text not in renamed:
+                    renamed[text] = f"_l{len(renamed)}"
+                text = renamed[text]
+            result.append(text)
+
+        return ' '.join(result)
 
-        if not match:
-            return []
+    @staticmethod
+    def canonical_hash(code):
+        """
+        计算代码规范形式的哈希值
 
-        port_text = match.group(1)
-        # 移除注释
-        port_text = re.sub(r'//.*?\n', '\n', port_text)
-        port_text = re.sub(r'/\*[\s\S]*?\*/', '', port_text)
+        Args:
+            code (str): Verilog代码
 
-        # 分割端口
-        ports = [p.strip() for p in port_text.split(',')]
-        return [p for p in ports if p]
+        Returns:
+            str: sha256十六进制摘要
+        """
+        return hashlib.sha256(VerilogParser.canonicalize(code).encode('utf-8')).hexdigest()
 
     @staticmethod
     def has_fsm(code):
@@ -168,3 +298,517 @@ class VerilogParser:
         os.makedirs(os.path.dirname(file_path), exist_ok=True)
         with open(file_path, 'w', encoding='utf-8') as f:
             f.write(content)
+
+
+class AlwaysBlock:
+    """always块记录"""
+
+    def __init__(self, keyword, sensitivity, edges, text):
+        """
+        初始化always块记录
+
+        Args:
+            keyword: always、always_ff、always_comb或always_latch
+            sensitivity: 敏感列表文本（@(*)为'*'，没有事件控制时为None）
+            edges: 边沿事件列表 [('posedge', 'clk'), ...]
+            text: 整个块的源码（已去注释）
+        """
+        self.keyword = keyword
+        self.sensitivity = sensitivity
+        self.edges = edges
+        self.text = text
+
+    @property
+    def sequential(self):
+        """是否为边沿触发的时序块"""
+        return bool(self.edges) or self.keyword == 'always_ff'
+
+    @property
+    def combinational(self):
+        """是否为组合逻辑块"""
+        if self.sequential:
+            return False
+        return self.keyword in ('always_comb', 'always_latch') or self.sensitivity is not None
+
+    @property
+    def size(self):
+        """块源码长度（字符数）"""
+        return len(self.text)
+
+    def __repr__(self):
+        return f"AlwaysBlock({self.keyword} @({self.sensitivity}), size={self.size})"
+
+
+class CaseStatement:
+    """case语句记录"""
+
+    def __init__(self, keyword, selector, items, has_default, text):
+        """
+        初始化case语句记录
+
+        Args:
+            keyword: case、casex或casez
+            selector: 选择表达式文本
+            items: 分支数（含default）
+            has_default: 是否有default分支
+            text: 整个语句的源码（已去注释）
+        """
+        self.keyword = keyword
+        self.selector = selector
+        self.items = items
+        self.has_default = has_default
+        self.text = text
+
+    def __repr__(self):
+        return f"CaseStatement({self.keyword} ({self.selector}), items={self.items})"
+
+
+class VerilogIndex:
+    """
+    代码特征索引
+
+    对一份代码只做一次去注释和词法切分，提取模块、端口、always块、case语句、
+    连续赋值、寄存器、实例化和各类关键字/运算符计数，供代理模型等需要结构特征的
+    调用方直接查询，不必各自去注释、反复扫描全文。
+    索引按代码内容哈希缓存（VerilogIndex.of），剩余的文本启发式通过search/findall
+    在去注释后的代码上执行，结果同样按模式缓存。索引在调用方之间共享，不应修改。
+    """
+
+    _cache = OrderedDict()
+    _cache_lock = threading.Lock()
+    cache_size = 256
+
+    _CASE_KEYWORDS = ('case', 'casex', 'casez')
+    _ALWAYS_KEYWORDS = ('always', 'always_ff', 'always_comb', 'always_latch')
+    _REG_TYPES = ('reg', 'logic')
+    _ARITHMETIC_OPS = ('+', '-', '*', '/', '%', '**')
+
+    @classmethod
+    def of(cls, code):
+        """
+        获取代码的特征索引（按内容哈希缓存）
+
+        Args:
+            code (str): Verilog代码
+
+        Returns:
+            VerilogIndex: 特征索引
+        """
+        key = hashlib.sha256(code.encode('utf-8', errors='ignore')).hexdigest()
+        with cls._cache_lock:
+            index = cls._cache.get(key)
+            if index is not None:
+                cls._cache.move_to_end(key)
+                return index
+
+        index = cls(code)
+        with cls._cache_lock:
+            cls._cache[key] = index
+            while len(cls._cache) > cls.cache_size:
+                cls._cache.popitem(last=False)
+        return index
+
+    def __init__(self, code):
+        """
+        建立特征索引（一般通过VerilogIndex.of获取，以便复用缓存）
+
+        Args:
+            code (str): Verilog代码
+        """
+        self.code = code
+        self.clean_code = VerilogParser.strip_comments(code)
+        self._lower_code = None
+        self._regex_cache = {}
+
+        # 去注释后的记号，附带在clean_code中的位置；编译指令不参与结构分析
+        self.tokens = [(m.lastgroup, m.group(0), m.start(), m.end())
+                       for m in _CANONICAL_TOKEN_PATTERN.finditer(self.clean_code)
+                       if m.lastgroup not in ('comment', 'directive')]
+
+        self.interface = parse_module(code)
+        self.modules = []
+        self.always_blocks = []
+        self.case_statements = []
+        self.assigns = []
+        self.nonblocking_assigns = []
+        self.registers = {}
+        self.instances = []
+        self.keyword_counts = Counter()
+        self.identifier_counts = Counter()
+        self.operator_counts = Counter()
+        self.arithmetic_counts = Counter()
+
+        self._build()
+
+    # ---------- 特征查询 ----------
+
+    @property
+    def lower_code(self):
+        """小写的去注释代码"""
+        if self._lower_code is None:
+            self._lower_code = self.clean_code.lower()
+        return self._lower_code
+
+    @property
+    def module_name(self):
+        """第一个模块名，找不到时为None"""
+        return self.modules[0] if self.modules else None
+
+    @property
+    def ports(self):
+        """第一个模块的端口列表（PortInfo）"""
+        return self.interface.ports if self.interface else []
+
+    @property
+    def inputs(self):
+        """输入端口名列表"""
+        return [port.name for port in self.ports if port.direction == 'input']
+
+    @property
+    def outputs(self):
+        """输出端口名列表"""
+        return [port.name for port in self.ports if port.direction == 'output']
+
+    @property
+    def parameters(self):
+        """参数名 -> 求值结果（含localparam）"""
+        return self.interface.param_values() if self.interface else {}
+
+    @property
+    def sequential_blocks(self):
+        """边沿触发的always块"""
+        return [block for block in self.always_blocks if block.sequential]
+
+    @property
+    def combinational_blocks(self):
+        """组合逻辑always块"""
+        return [block for block in self.always_blocks if block.combinational]
+
+    @property
+    def is_sequential(self):
+        """是否包含时序逻辑"""
+        return bool(self.sequential_blocks)
+
+    @property
+    def register_bits(self):
+        """寄存器总位数（位宽无法求值的寄存器按1位计）"""
+        return sum(width or 1 for width in self.registers.values())
+
+    @property
+    def has_fsm(self):
+        """是否包含有限状态机（状态寄存器或状态参数，并且有case语句）"""
+        has_state_reg = any('state' in name.lower() for name in self.registers)
+        has_state_param = any('STATE' in name.upper() for name in self.parameters)
+        return (has_state_reg or has_state_param) and bool(self.case_statements)
+
+    @property
+    def has_arithmetic(self):
+        """是否包含算术运算（不计位选择范围和敏感列表中的符号）"""
+        return any(self.arithmetic_counts[op] for op in self._ARITHMETIC_OPS)
+
+    @staticmethod
+    def identifiers(text):
+        """
+        提取表达式或赋值目标中引用的标识符（按出现顺序，不含关键字和数字）
+
+        Args:
+            text: 表达式文本
+
+        Returns:
+            list: 标识符列表
+        """
+        return [name for name in _IDENTIFIER_RE.findall(text) if name not in _VERILOG_KEYWORDS]
+
+    def count(self, token):
+        """
+        统计关键字、标识符或运算符的出现次数（按记号匹配，不会匹配到更长标识符的一部分）
+
+        Args:
+            token: 关键字、标识符或运算符
+
+        Returns:
+            int: 出现次数
+        """
+        return self.keyword_counts[token] + self.identifier_counts[token] + self.operator_counts[token]
+
+    def search(self, pattern, lower=False):
+        """
+        在去注释后的代码上执行re.search（结果按模式缓存）
+
+        Args:
+            pattern: 正则表达式
+            lower: 是否在小写代码上匹配
+
+        Returns:
+            re.Match: 匹配结果，没有匹配时为None
+        """
+        key = ('search', pattern, lower)
+        if key not in self._regex_cache:
+            self._regex_cache[key] = re.search(pattern, self.lower_code if lower else self.clean_code)
+        return self._regex_cache[key]
+
+    def findall(self, pattern, lower=False):
+        """
+        在去注释后的代码上执行re.findall（结果按模式缓存，调用方不应修改返回的列表）
+
+        Args:
+            pattern: 正则表达式
+            lower: 是否在小写代码上匹配
+
+        Returns:
+            list: 匹配结果
+        """
+        key = ('findall', pattern, lower)
+        if key not in self._regex_cache:
+            self._regex_cache[key] = re.findall(pattern, self.lower_code if lower else self.clean_code)
+        return self._regex_cache[key]
+
+    # ---------- 单遍提取 ----------
+
+    def _text(self, start, end):
+        """记号区间[start, end)对应的源码"""
+        if start >= end or start >= len(self.tokens):
+            return ''
+        end = min(end, len(self.tokens))
+        return self.clean_code[self.tokens[start][2]:self.tokens[end - 1][3]]
+
+    def _word(self, i):
+        return self.tokens[i][1] if i < len(self.tokens) else None
+
+    def _skip_group(self, i):
+        """i指向开括号时返回匹配的闭括号之后的位置，否则原样返回"""
+        pairs = {'(': ')', '[': ']', '{': '}'}
+        if self._word(i) not in pairs:
+            return i
+        depth = 0
+        while i < len(self.tokens):
+            word = self.tokens[i][1]
+            if word in pairs:
+                depth += 1
+            elif word in (')', ']', '}'):
+                depth -= 1
+                if depth == 0:
+                    return i + 1
+            i += 1
+        return i
+
+    def _block_end(self, i, openers, closers):
+        """i指向块起始关键字时返回匹配的结束关键字之后的位置"""
+        depth = 0
+        while i < len(self.tokens):
+            word = self.tokens[i][1]
+            if word in openers:
+                depth += 1
+            elif word in closers:
+                depth -= 1
+                if depth == 0:
+                    i += 1
+                    # 命名块的结束标签
+                    if self._word(i) == ':' and i + 1 < len(self.tokens):
+                        i += 2
+                    return i
+            elif word in ('endmodule', 'endfunction', 'endtask'):
+                return i
+            i += 1
+        return i
+
+    def _statement_end(self, i):
+        """返回从i开始的一条过程语句之后的位置"""
+        while i < len(self.tokens):
+            word = self.tokens[i][1]
+            if word == 'begin':
+                return self._block_end(i, ('begin',), ('end',))
+            if word == 'fork':
+                return self._block_end(i, ('fork',), ('join', 'join_any', 'join_none'))
+            if word in self._CASE_KEYWORDS:
+                return self._block_end(i, self._CASE_KEYWORDS, ('endcase',))
+            if word == 'if':
+                # else if链迭代处理，避免长链递归过深
+                end = self._statement_end(self._skip_group(i + 1))
+                if self._word(end) != 'else':
+                    return end
+                i = end + 1
+                continue
+            if word in ('for', 'while', 'repeat'):
+                i = self._skip_group(i + 1)
+                continue
+            if word in ('forever', 'unique', 'priority', 'else'):
+                i += 1
+                continue
+            if word in ('@', '#'):
+                i = self._skip_group(i + 1) if self._word(i + 1) == '(' else i + 2
+                continue
+            # 普通语句：到深度为0的分号为止
+            depth = 0
+            while i < len(self.tokens):
+                word = self.tokens[i][1]
+                if word in ('(', '[', '{'):
+                    depth += 1
+                elif word in (')', ']', '}'):
+                    depth -= 1
+                elif depth <= 0 and word == ';':
+                    return i + 1
+                elif depth <= 0 and word in ('end', 'endcase', 'endmodule', 'join'):
+                    return i
+                i += 1
+            return i
+        return i
+
+    def _until(self, i, stops):
+        """返回从i开始第一个深度为0的stops记号的位置"""
+        depth = 0
+        while i < len(self.tokens):
+            word = self.tokens[i][1]
+            if depth <= 0 and word in stops:
+                return i
+            if word in ('(', '[', '{'):
+                depth += 1
+            elif word in (')', ']', '}'):
+                depth -= 1
+            i += 1
+        return i
+
+    def _build(self):
+        """单遍扫描记号，提取结构特征和计数"""
+        bracket_depth = 0
+        paren_depth = 0
+        for i, (kind, word, _, _) in enumerate(self.tokens):
+            if kind == 'ident':
+                if word in _VERILOG_KEYWORDS:
+                    self.keyword_counts[word] += 1
+                else:
+                    self.identifier_counts[word] += 1
+            elif kind == 'op':
+                self.operator_counts[word] += 1
+                if word == '[':
+                    bracket_depth += 1
+                elif word == ']':
+                    bracket_depth = max(0, bracket_depth - 1)
+                elif word == '(':
+                    paren_depth += 1
+                elif word == ')':
+                    paren_depth = max(0, paren_depth - 1)
+                elif word in self._ARITHMETIC_OPS and bracket_depth == 0:
+                    # 排除@(*)、@*和(* 属性 *)
+                    if word == '*' and (self._word(i - 1) in ('(', '@') or self._word(i + 1) == ')'):
+                        continue
+                    self.arithmetic_counts[word] += 1
+                elif word == '<=' and bracket_depth == 0 and paren_depth == 0:
+                    self._index_nonblocking(i)
+                continue
+            else:
+                continue
+
+            if word in ('module', 'macromodule') and self._word(i + 1):
+                self.modules.append(self._word(i + 1))
+            elif word in self._ALWAYS_KEYWORDS:
+                self._index_always(i)
+            elif word in self._CASE_KEYWORDS:
+                self._index_case(i)
+            elif word == 'assign':
+                self._index_assign(i)
+            elif word in self._REG_TYPES:
+                self._index_registers(i)
+            elif word not in _VERILOG_KEYWORDS:
+                self._index_instance(i)
+
+    def _index_always(self, i):
+        keyword = self.tokens[i][1]
+        j = i + 1
+        sensitivity = None
+        edges = []
+        if self._word(j) == '@':
+            if self._word(j + 1) == '(':
+                end = self._skip_group(j + 1)
+                sensitivity = self._text(j + 2, end - 1).strip()
+                for k in range(j + 2, end - 1):
+                    if self.tokens[k][1] in ('posedge', 'negedge') and k + 1 < end - 1:
+                        edges.append((self.tokens[k][1], self.tokens[k + 1][1]))
+                j = end
+            else:
+                sensitivity = self._word(j + 1)
+                j += 2
+        end = self._statement_end(j)
+        self.always_blocks.append(AlwaysBlock(keyword, sensitivity, edges, self._text(i, end)))
+
+    def _index_case(self, i):
+        keyword = self.tokens[i][1]
+        selector_end = self._skip_group(i + 1)
+        selector = self._text(i + 2, selector_end - 1).strip()
+        j = selector_end
+        items = 0
+        has_default = False
+        while j < len(self.tokens) and self.tokens[j][1] not in ('endcase', 'endmodule'):
+            colon = self._until(j, (':', 'endcase'))
+            if self._word(colon) != ':':
+                j = colon
+                break
+            items += 1
+            has_default = has_default or self.tokens[j][1] == 'default'
+            j = self._statement_end(colon + 1)
+        end = j + 1 if self._word(j) == 'endcase' else j
+        self.case_statements.append(CaseStatement(keyword, selector, items, has_default, self._text(i, end)))
+
+    def _index_assign(self, i):
+        equals = self._until(i + 1, ('=', ';'))
+        end = self._until(equals, (';',))
+        if self._word(equals) == '=':
+            self.assigns.append((self._text(i + 1, equals).strip(), self._text(equals + 1, end).strip()))
+
+    def _index_nonblocking(self, i):
+        # 向前找到语句起点（上一个分号、begin/end或事件控制之后）
+        start = i - 1
+        while start > 0 and self.tokens[start - 1][1] not in (';', 'begin', 'end', ')', 'else', ':'):
+            start -= 1
+        end = self._until(i + 1, (';', 'end'))
+        self.nonblocking_assigns.append((self._text(start, i).strip(), self._text(i + 1, end).strip()))
+
+    def _index_registers(self, i):
+        # input logic声明的是输入端口而非寄存器
+        if self._word(i - 1) in ('input', 'inout'):
+            return
+        params = self.parameters
+        j = i + 1
+        if self._word(j) in ('signed', 'unsigned'):
+            j += 1
+        width = self._dims_width(j, params)
+        j = self._skip_dims(j)
+        while j < len(self.tokens) and self.tokens[j][0] == 'ident' and self.tokens[j][1] not in _VERILOG_KEYWORDS:
+            name = self.tokens[j][1]
+            depth = self._dims_width(j + 1, params)
+            self.registers[name] = width * depth if width is not None and depth is not None else None
+            j = self._until(j + 1, (',', ';', ')'))
+            if self._word(j) != ',':
+                break
+            j += 1
+
+    def _index_instance(self, i):
+        # 模块类型 [#(参数)] 实例名 (
+        j = i + 1
+        if self._word(j) == '#':
+            j = self._skip_group(j + 1)
+        if j >= len(self.tokens) or self.tokens[j][0] != 'ident' or self.tokens[j][1] in _VERILOG_KEYWORDS:
+            return
+        if self._word(j + 1) == '(' and self._word(i - 1) not in ('.', '#'):
+            self.instances.append((self.tokens[i][1], self.tokens[j][1]))
+
+    def _skip_dims(self, j):
+        while self._word(j) == '[':
+            j = self._skip_group(j)
+        return j
+
+    def _dims_width(self, j, params):
+        """计算从j开始的连续[msb:lsb]维度的总宽度，无维度时为1，无法求值时为None"""
+        width = 1
+        while self._word(j) == '[':
+            end = self._skip_group(j)
+            colon = self._until(j + 1, (':', ']'))
+            if self._word(colon) != ':':
+                return None
+            msb = evaluate([token[:2] for token in self.tokens[j + 1:colon]], params)
+            lsb = evaluate([token[:2] for token in self.tokens[colon + 1:end - 1]], params)
+            if msb is None or lsb is None:
+                return None
+            width *= abs(msb - lsb) + 1
+            j = end
+        return width
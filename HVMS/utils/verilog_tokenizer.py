@@ -0,0 +1,567 @@
+import re
+from functools import lru_cache
+
+
+# 词法模式（顺序即匹配优先级），规范化、去注释和端口解析共用
+TOKEN_PATTERN = re.compile(r"""
+    (?P<comment>//[^\n]*|/\*[\s\S]*?\*/)
+  | (?P<string>"(?:\\.|[^"\\])*")
+  | (?P<number>(?:\d[\d_]*)?\s*'[sS]?[bBoOdDhH]\s*[0-9a-fA-FxXzZ_?]+|\d[\d_]*(?:\.\d+)?(?:[eE][+-]?\d+)?)
+  | (?P<system>\$[A-Za-z_][\w$]*)
+  | (?P<directive>`[A-Za-z_]\w*)
+  | (?P<ident>[A-Za-z_][\w$]*|\\\S+)
+  | (?P<op><<<|>>>|===|!==|<<|>>|<=|>=|==|!=|&&|\|\||~&|~\||~\^|\^~|\*\*|->|\+:|-:|\S)
+""", re.VERBOSE)
+
+_DIRECTIONS = ('input', 'output', 'inout')
+_NET_TYPES = ('wire', 'reg', 'logic', 'bit', 'tri', 'wand', 'wor', 'supply0', 'supply1', 'var')
+_PARAM_TYPES = ('integer', 'int', 'logic', 'bit', 'reg', 'signed', 'unsigned', 'real', 'time', 'longint')
+
+# 求值的二元运算符优先级（数值越大优先级越高）
+_PRECEDENCE = {
+    '||': 1, '&&': 2, '|': 3, '^': 4, '&': 5, '==': 6, '!=': 6, '===': 6, '!==': 6,
+    '<': 7, '<=': 7, '>': 7, '>=': 7, '<<': 8, '>>': 8, '<<<': 8, '>>>': 8,
+    '+': 9, '-': 9, '*': 10, '/': 10, '%': 10, '**': 11,
+}
+
+
+class PortInfo:
+    """模块端口记录"""
+
+    def __init__(self, name, direction, net_type=None, signed=False, dims=None, resolved=True):
+        """
+        初始化端口记录
+
+        Args:
+            name: 端口名
+            direction: 'input'、'output'或'inout'
+            net_type: 线网/变量类型（wire、reg、logic等，未声明时为None）
+            signed: 是否有符号
+            dims: 已求值的压缩维度列表 [(msb, lsb), ...]，标量端口为空列表
+            resolved: 位宽表达式是否全部求值成功
+        """
+        self.name = name
+        self.direction = direction
+        self.net_type = net_type
+        self.signed = signed
+        self.dims = dims or []
+        self.resolved = resolved
+
+    @property
+    def width(self):
+        """端口总位宽（多维压缩数组按乘积计算），无法求值时为None"""
+        if not self.resolved:
+            return None
+        width = 1
+        for msb, lsb in self.dims:
+            width *= abs(msb - lsb) + 1
+        return width
+
+    @property
+    def range(self):
+        """
+        与旧接口兼容的位宽范围
+
+        Returns:
+            tuple: 单维端口为声明的(msb, lsb)，多维端口展平为(width-1, 0)，标量或无法求值时为None
+        """
+        if not self.resolved or not self.dims:
+            return None
+        if len(self.dims) == 1:
+            return self.dims[0]
+        return (self.width - 1, 0)
+
+    def __repr__(self):
+        return f"PortInfo({self.direction} {self.name}, width={self.width})"
+
+
+class ParamInfo:
+    """模块参数记录"""
+
+    def __init__(self, name, value, expr, local=False):
+        """
+        初始化参数记录
+
+        Args:
+            name: 参数名
+            value: 求值结果（整数），无法求值时为None
+            expr: 原始表达式文本
+            local: 是否为localparam
+        """
+        self.name = name
+        self.value = value
+        self.expr = expr
+        self.local = local
+
+    def __repr__(self):
+        return f"ParamInfo({self.name}={self.value})"
+
+
+class ModuleInterface:
+    """模块接口：模块名、参数和端口"""
+
+    def __init__(self, name, parameters, ports, ansi):
+        """
+        初始化模块接口
+
+        Args:
+            name: 模块名
+            parameters: 参数记录列表（按声明顺序）
+            ports: 端口记录列表（按端口列表顺序）
+            ansi: 端口列表是否为ANSI风格
+        """
+        self.name = name
+        self.parameters = parameters
+        self.ports = ports
+        self.ansi = ansi
+
+    def port(self, name):
+        """按名称查找端口"""
+        for port in self.ports:
+            if port.name == name:
+                return port
+        return None
+
+    def param_values(self):
+        """参数名 -> 求值结果"""
+        return {param.name: param.value for param in self.parameters}
+
+
+def tokenize(code):
+    """
+    单遍切分Verilog代码
+
+    注释被丢弃；编译指令所在行整体跳过，其中的`define记录下来，
+    后续出现的宏引用按定义文本展开一次（不支持带参数的宏）。
+
+    Args:
+        code: Verilog代码
+
+    Returns:
+        list: (类别, 文本) 元组列表
+    """
+    tokens = []
+    defines = {}
+    skip_until = -1
+    for match in TOKEN_PATTERN.finditer(code):
+        start = match.start()
+        if start < skip_until:
+            continue
+        kind = match.lastgroup
+        text = match.group(0)
+        if kind == 'comment':
+            continue
+        if kind == 'directive':
+            if text in defines:
+                tokens.extend(defines[text])
+                continue
+            line_end = code.find('\n', start)
+            skip_until = len(code) if line_end < 0 else line_end
+            if text == '`define':
+                body = code[match.end():skip_until].strip()
+                parts = body.split(None, 1)
+                if parts and '(' not in parts[0]:
+                    defines['`' + parts[0]] = tokenize(parts[1]) if len(parts) > 1 else []
+            continue
+        tokens.append((kind, text))
+    return tokens
+
+
+def parse_number(text):
+    """
+    解析整数常量
+
+    Args:
+        text: 数字文本（十进制或带基数的常量）
+
+    Returns:
+        int: 数值，含x/z或是实数时返回None
+    """
+    text = re.sub(r'[\s_]', '', text)
+    if "'" not in text:
+        return int(text) if text.isdigit() else None
+    _, literal = text.split("'", 1)
+    literal = literal.lstrip('sS')
+    base = {'b': 2, 'o': 8, 'd': 10, 'h': 16}[literal[0].lower()]
+    digits = literal[1:]
+    if re.search(r'[xXzZ?]', digits):
+        return None
+    return int(digits, base)
+
+
+def _truncating_div(left, right):
+    """向零取整的整数除法（与Verilog一致）"""
+    quotient = abs(left) // abs(right)
+    return quotient if (left >= 0) == (right >= 0) else -quotient
+
+
+class _Evaluator:
+    """常量表达式求值（参数、位宽范围）"""
+
+    def __init__(self, tokens, params):
+        self.tokens = tokens
+        self.params = params
+        self.pos = 0
+
+    def evaluate(self):
+        value = self._ternary()
+        if self.pos != len(self.tokens):
+            raise ValueError(f"多余的记号: {self.tokens[self.pos][1]}")
+        return value
+
+    def _peek(self):
+        return self.tokens[self.pos][1] if self.pos < len(self.tokens) else None
+
+    def _next(self):
+        token = self.tokens[self.pos]
+        self.pos += 1
+        return token
+
+    def _expect(self, text):
+        if self._peek() != text:
+            raise ValueError(f"期望 {text}")
+        self.pos += 1
+
+    def _ternary(self):
+        condition = self._binary(1)
+        if self._peek() == '?':
+            self.pos += 1
+            if_true = self._ternary()
+            self._expect(':')
+            if_false = self._ternary()
+            return if_true if condition else if_false
+        return condition
+
+    def _binary(self, min_precedence):
+        left = self._unary()
+        while True:
+            op = self._peek()
+            precedence = _PRECEDENCE.get(op)
+            if precedence is None or precedence < min_precedence:
+                return left
+            self.pos += 1
+            # 幂运算右结合
+            right = self._binary(precedence if op == '**' else precedence + 1)
+            left = self._apply(op, left, right)
+
+    def _apply(self, op, left, right):
+        if op in ('/', '%') and right == 0:
+            raise ValueError("除数为0")
+        return {
+            '||': lambda: int(bool(left) or bool(right)), '&&': lambda: int(bool(left) and bool(right)),
+            '|': lambda: left | right, '^': lambda: left ^ right, '&': lambda: left & right,
+            '==': lambda: int(left == right), '!=': lambda: int(left != right),
+            '===': lambda: int(left == right), '!==': lambda: int(left != right),
+            '<': lambda: int(left < right), '<=': lambda: int(left <= right),
+            '>': lambda: int(left > right), '>=': lambda: int(left >= right),
+            '<<': lambda: left << right, '>>': lambda: left >> right,
+            '<<<': lambda: left << right, '>>>': lambda: left >> right,
+            '+': lambda: left + right, '-': lambda: left - right, '*': lambda: left * right,
+            '/': lambda: _truncating_div(left, right), '%': lambda: left - _truncating_div(left, right) * right,
+            '**': lambda: left ** right,
+        }[op]()
+
+    def _unary(self):
+        op = self._peek()
+        if op in ('-', '+', '~', '!'):
+            self.pos += 1
+            value = self._unary()
+            return {'-': -value, '+': value, '~': ~value, '!': int(not value)}[op]
+        return self._primary()
+
+    def _primary(self):
+        kind, text = self._next()
+        if text == '(':
+            value = self._ternary()
+            self._expect(')')
+            return value
+        if kind == 'number':
+            value = parse_number(text)
+            if value is None:
+                raise ValueError(f"无法求值的常量: {text}")
+            return value
+        if kind == 'system' and text == '$clog2':
+            self._expect('(')
+            value = self._ternary()
+            self._expect(')')
+            return max(0, (value - 1).bit_length())
+        if kind == 'ident' and self.params.get(text) is not None:
+            return self.params[text]
+        raise ValueError(f"无法求值的记号: {text}")
+
+
+def evaluate(tokens, params):
+    """
+    求值常量表达式
+
+    Args:
+        tokens: 表达式记号列表
+        params: 参数名 -> 数值
+
+    Returns:
+        int: 求值结果，无法求值时返回None
+    """
+    if not tokens:
+        return None
+    try:
+        return _Evaluator(tokens, params).evaluate()
+    except (ValueError, IndexError, KeyError, OverflowError, ZeroDivisionError):
+        return None
+
+
+class _InterfaceParser:
+    """模块头和模块体中端口/参数声明的单遍解析"""
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.pos = 0
+        self.params = []        # (名称, 表达式记号, 是否local)
+        self.ports = {}         # 名称 -> 声明信息
+        self.order = []         # 端口列表顺序
+        self.net_ranges = {}    # 非ANSI端口在reg/wire声明中给出的位宽
+        self.ansi = False
+
+    def _peek(self, offset=0):
+        index = self.pos + offset
+        return self.tokens[index][1] if index < len(self.tokens) else None
+
+    def _until(self, stops):
+        """收集深度为0的记号直到遇到stops中的任一记号（不消耗终止记号）"""
+        depth = 0
+        collected = []
+        while self.pos < len(self.tokens):
+            text = self._peek()
+            if depth == 0 and text in stops:
+                break
+            if text in ('(', '[', '{'):
+                depth += 1
+            elif text in (')', ']', '}'):
+                depth -= 1
+            collected.append(self.tokens[self.pos])
+            self.pos += 1
+        return collected
+
+    def _ranges(self):
+        """读取连续的 [msb:lsb] 维度，返回(msb记号, lsb记号)列表"""
+        dims = []
+        while self._peek() == '[':
+            self.pos += 1
+            msb = self._until((':', ']'))
+            lsb = msb
+            if self._peek() == ':':
+                self.pos += 1
+                lsb = self._until((']',))
+            self.pos += 1
+            dims.append((msb, lsb))
+        return dims
+
+    def parse(self, module=None):
+        # 定位模块
+        while self.pos < len(self.tokens):
+            if self._peek() in ('module', 'macromodule') and (module is None or self._peek(1) == module):
+                break
+            self.pos += 1
+        if self.pos >= len(self.tokens):
+            return None
+        self.pos += 1
+        name = self._peek()
+        self.pos += 1
+
+        if self._peek() == '#':
+            self.pos += 2
+            self._parameter_list()
+        if self._peek() == '(':
+            self.pos += 1
+            self._port_list()
+        self._body()
+        return name
+
+    def _parameter_list(self):
+        """#( ... ) 中的参数声明"""
+        local = False
+        while self.pos < len(self.tokens) and self._peek() != ')':
+            text = self._peek()
+            if text in ('parameter', 'localparam'):
+                local = text == 'localparam'
+                self.pos += 1
+                continue
+            if text == ',':
+                self.pos += 1
+                continue
+            self._parameter_assignment(local)
+        self.pos += 1
+
+    def _parameter_assignment(self, local):
+        """[类型] [范围] 名称 = 表达式"""
+        while self._peek() in _PARAM_TYPES:
+            self.pos += 1
+        self._ranges()
+        name = self._peek()
+        self.pos += 1
+        expr = []
+        if self._peek() == '=':
+            self.pos += 1
+            expr = self._until((',', ')', ';'))
+        self.params.append((name, expr, local))
+
+    def _port_list(self):
+        """模块头中的端口列表"""
+        if self._peek() in _DIRECTIONS:
+            self.ansi = True
+        current = None
+        while self.pos < len(self.tokens) and self._peek() != ')':
+            text = self._peek()
+            if text == ',':
+                self.pos += 1
+            elif text in _DIRECTIONS:
+                current = self._declaration_head()
+            elif self.ansi and current is not None:
+                self._declare(current, self._peek())
+                self.pos += 1
+                self._ranges()  # 非压缩维度
+                if self._peek() == '=':
+                    self.pos += 1
+                    self._until((',', ')'))
+            else:
+                # 非ANSI端口列表只给出名字，方向和位宽在模块体中声明
+                if self.tokens[self.pos][0] == 'ident':
+                    self.order.append(text)
+                self._until((',', ')'))
+        self.pos += 1
+
+    def _declaration_head(self):
+        """方向 [线网类型] [signed] [维度]"""
+        direction = self._peek()
+        self.pos += 1
+        net_type = None
+        signed = False
+        resolved = True
+        while True:
+            text = self._peek()
+            if text in _NET_TYPES:
+                net_type = text
+            elif text in ('signed', 'unsigned'):
+                signed = text == 'signed'
+            elif self.tokens[self.pos][0] == 'ident' and self.pos + 1 < len(self.tokens) \
+                    and self.tokens[self.pos + 1][0] == 'ident':
+                # 用户自定义类型（结构体、接口等）无法确定位宽
+                net_type = text
+                resolved = False
+            else:
+                break
+            self.pos += 1
+        return {'direction': direction, 'net_type': net_type, 'signed': signed,
+                'dims': self._ranges(), 'resolved': resolved}
+
+    def _declare(self, head, name):
+        """记录一个端口声明"""
+        if name not in self.ports:
+            self.ports[name] = dict(head)
+            if self.ansi:
+                self.order.append(name)
+
+    def _body(self):
+        """模块体：端口/参数声明，跳过函数和任务"""
+        while self.pos < len(self.tokens):
+            text = self._peek()
+            if text == 'endmodule':
+                return
+            if text in ('function', 'task'):
+                end = 'end' + text
+                while self.pos < len(self.tokens) and self._peek() != end:
+                    self.pos += 1
+                self.pos += 1
+            elif text in ('parameter', 'localparam'):
+                self.pos += 1
+                local = text == 'localparam'
+                while self.pos < len(self.tokens) and self._peek() != ';':
+                    self._parameter_assignment(local)
+                    if self._peek() == ',':
+                        self.pos += 1
+                self.pos += 1
+            elif text in _DIRECTIONS and not self.ansi:
+                head = self._declaration_head()
+                while self.pos < len(self.tokens) and self._peek() != ';':
+                    if self._peek() == ',':
+                        self.pos += 1
+                        continue
+                    self._declare(head, self._peek())
+                    self.pos += 1
+                    self._until((',', ';'))
+                self.pos += 1
+            elif text in _NET_TYPES and not self.ansi:
+                self.pos += 1
+                signed = self._peek() == 'signed'
+                if signed:
+                    self.pos += 1
+                dims = self._ranges()
+                while self.pos < len(self.tokens) and self._peek() != ';':
+                    name = self._peek()
+                    if name in self.ports:
+                        self.net_ranges[name] = (text, signed, dims)
+                    self.pos += 1
+                    self._until((',', ';'))
+                    if self._peek() == ',':
+                        self.pos += 1
+                self.pos += 1
+            else:
+                self.pos += 1
+
+    def build(self, name):
+        """求值参数和位宽，生成模块接口"""
+        values = {}
+        parameters = []
+        for param_name, expr, local in self.params:
+            value = evaluate(expr, values)
+            values[param_name] = value
+            parameters.append(ParamInfo(param_name, value, ' '.join(t for _, t in expr), local))
+
+        ports = []
+        for port_name in self.order:
+            head = self.ports.get(port_name)
+            if head is None:
+                continue
+            net_type, signed, dims = head['net_type'], head['signed'], head['dims']
+            if port_name in self.net_ranges:
+                extra_type, extra_signed, extra_dims = self.net_ranges[port_name]
+                net_type = net_type or extra_type
+                signed = signed or extra_signed
+                dims = dims or extra_dims
+
+            resolved = head['resolved']
+            resolved_dims = []
+            for msb, lsb in dims:
+                msb_value, lsb_value = evaluate(msb, values), evaluate(lsb, values)
+                if msb_value is None or lsb_value is None:
+                    resolved = False
+                    break
+                resolved_dims.append((msb_value, lsb_value))
+            ports.append(PortInfo(port_name, head['direction'], net_type, signed,
+                                  resolved_dims if resolved else [], resolved))
+        return ModuleInterface(name, parameters, ports, self.ansi)
+
+
+@lru_cache(maxsize=256)
+def parse_module(code, module=None):
+    """
+    解析模块接口（结果按代码文本缓存，同一代码反复解析只扫描一次）
+
+    支持ANSI和非ANSI端口列表、#()参数列表与模块体内的parameter/localparam、
+    signed、多维压缩数组、参数化位宽（如[WIDTH-1:0]、[$clog2(DEPTH)-1:0]）以及无参数的`define宏。
+    返回的记录在调用方之间共享，不应修改。
+
+    Args:
+        code: Verilog代码
+        module: 模块名 (可选，默认为第一个模块)
+
+    Returns:
+        ModuleInterface: 模块接口，找不到模块时返回None
+    """
+    parser = _InterfaceParser(tokenize(code))
+    try:
+        name = parser.parse(module)
+    except IndexError:
+        return None
+    if name is None:
+        return None
+    return parser.build(name)